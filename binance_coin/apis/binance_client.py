@@ -0,0 +1,97 @@
+# -*- coding: utf-8 -*-
+import threading
+from typing import Callable, Optional, Tuple
+
+from binance_coin.apis.request_scheduler import record_response
+import binance_coin.utils.log_common as logCommon
+
+# (connect, read) giây cho mọi request REST
+DEFAULT_TIMEOUT = (3.05, 10)
+
+
+def create_client(api_key: str, secret_key: str, pool_size: int = 8,
+                  timeout: Tuple[float, float] = DEFAULT_TIMEOUT):
+    """
+    Tạo Binance Client dùng một requests.Session chung:
+    - không ping lúc khởi tạo (ping=False), timeout rõ ràng cho mọi request
+    - connection pool keep-alive đủ cho số symbol chạy song song
+    """
+    # python-binance kéo theo aiohttp + dateparser (~1s) -> chỉ import khi thật sự tạo client
+    from binance.client import Client
+    from requests.adapters import HTTPAdapter
+
+    client = Client(api_key, secret_key, requests_params={'timeout': timeout}, ping=False)
+    adapter = HTTPAdapter(pool_connections=1, pool_maxsize=max(1, pool_size), max_retries=0)
+    client.session.mount('https://', adapter)
+    client.session.mount('http://', adapter)
+    # Header weight theo từng request (client.response dùng chung giữa các thread)
+    client.session.hooks['response'].append(record_response)
+    return client
+
+
+def is_api_error(error: Exception) -> bool:
+    """True nếu là BinanceAPIException (import muộn, chỉ khi đã có lỗi)"""
+    from binance.exceptions import BinanceAPIException
+    return isinstance(error, BinanceAPIException)
+
+
+class LazyClient:
+    """
+    Proxy tạo client ở thread nền ngay khi khởi tạo: phần import/khởi tạo nặng chạy song song
+    với việc nạp trạng thái, truy cập thuộc tính đầu tiên sẽ chờ client sẵn sàng.
+    """
+
+    def __init__(self, factory: Callable[[], object]):
+        self._factory = factory
+        self._client = None
+        self._error: Optional[BaseException] = None
+        self._ready = threading.Event()
+        self._thread = threading.Thread(target=self._build, name='binance-client-init', daemon=True)
+        self._thread.start()
+
+    def _build(self) -> None:
+        try:
+            self._client = self._factory()
+        except BaseException as e:
+            self._error = e
+        finally:
+            self._ready.set()
+
+    def resolve(self):
+        self._ready.wait()
+        if self._error is not None:
+            raise self._error
+        return self._client
+
+    def __getattr__(self, name):
+        return getattr(self.resolve(), name)
+
+
+class AccountCheck:
+    """Kiểm tra get_account() ở thread nền để không chặn chu kỳ đầu tiên"""
+
+    def __init__(self, client):
+        self.logger = logCommon.getLog(__name__)
+        self._client = client
+        self.account_info: Optional[dict] = None
+        self.error: Optional[Exception] = None
+        self._done = threading.Event()
+
+    def run(self) -> Optional[dict]:
+        try:
+            self.account_info = self._client.get_account()
+            self.logger.info("✅ Kết nối Binance API thành công!")
+            self.logger.info(f"Account status: {self.account_info.get('accountType', 'Unknown')}")
+        except Exception as e:
+            self.error = e
+            self.logger.error(f"❌ Lỗi kết nối Binance API: {e}")
+        finally:
+            self._done.set()
+        return self.account_info
+
+    def start(self) -> 'AccountCheck':
+        threading.Thread(target=self.run, name='account-check', daemon=True).start()
+        return self
+
+    def wait(self, timeout: Optional[float] = None) -> bool:
+        return self._done.wait(timeout)
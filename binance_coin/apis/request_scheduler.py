@@ -0,0 +1,282 @@
+# -*- coding: utf-8 -*-
+import heapq
+import itertools
+import math
+import re
+import threading
+import time
+from typing import Callable, Dict, Optional
+
+from binance_coin.utils.common import interval_to_milliseconds
+import binance_coin.utils.log_common as logCommon
+
+# Độ ưu tiên (số nhỏ chạy trước): lệnh > giá > tải nến
+PRIORITY_ORDER = 0
+PRIORITY_PRICE = 1
+PRIORITY_KLINE = 2
+PRIORITY_NAMES = {PRIORITY_ORDER: 'order', PRIORITY_PRICE: 'price', PRIORITY_KLINE: 'kline'}
+
+KLINE_PAGE_LIMIT = 1000
+_AGO_PATTERN = re.compile(r'^\s*(\d+)\s+(minute|hour|day|week)s?\s+ago', re.IGNORECASE)
+_UNIT_MS = {'minute': 60_000, 'hour': 3_600_000, 'day': 86_400_000, 'week': 604_800_000}
+
+
+def _start_ms(start_str, now_ms: int) -> Optional[int]:
+    """Mốc bắt đầu (ms) của timestamp hoặc chuỗi kiểu "5 days ago UTC"; None nếu không đọc được"""
+    if isinstance(start_str, (int, float)) or (isinstance(start_str, str) and start_str.isdigit()):
+        return int(start_str)
+    match = _AGO_PATTERN.match(start_str) if isinstance(start_str, str) else None
+    if match is None:
+        return None
+    return now_ms - int(match.group(1)) * _UNIT_MS[match.group(2).lower()]
+
+
+def historical_klines_weight(now_ms: int, symbol=None, interval=None, start_str=None, end_str=None, limit=None,
+                             **kwargs) -> int:
+    """
+    Weight ước lượng của get_historical_klines: 2 cho mỗi trang 1000 nến từ start_str tới end_str (hoặc now_ms)
+    + 2 cho request tìm nến sớm nhất; sai lệch được sửa lại theo header sau khi gọi.
+    """
+    start = _start_ms(start_str, now_ms)
+    if start is None or interval is None:
+        return 2
+    end = _start_ms(end_str, now_ms) if end_str is not None else now_ms
+    page_ms = interval_to_milliseconds(interval) * min(limit or KLINE_PAGE_LIMIT, KLINE_PAGE_LIMIT)
+    pages = max(1, math.ceil(((end or now_ms) - start) / page_ms))
+    if limit:
+        pages = min(pages, math.ceil(limit / KLINE_PAGE_LIMIT))
+    return 2 * (pages + 1)
+
+
+# (priority, weight) của các hàm Client mà bot dùng, theo bảng request weight của Binance Spot.
+# weight có thể là hàm (now_ms của scheduler + tham số của hàm Client) cho request tự phân trang.
+CLIENT_METHODS = {
+    'get_klines': (PRIORITY_KLINE, 2),
+    'get_historical_klines': (PRIORITY_KLINE, historical_klines_weight),
+    'get_symbol_ticker': (PRIORITY_PRICE, 2),
+    'get_all_tickers': (PRIORITY_PRICE, 4),
+    'get_orderbook_ticker': (PRIORITY_PRICE, 4),
+    'get_ticker': (PRIORITY_PRICE, 80),
+    'get_account': (PRIORITY_PRICE, 20),
+    'get_asset_balance': (PRIORITY_ORDER, 20),
+    'get_exchange_info': (PRIORITY_PRICE, 20),
+    'get_symbol_info': (PRIORITY_PRICE, 20),
+    'create_order': (PRIORITY_ORDER, 1),
+    'order_market_buy': (PRIORITY_ORDER, 1),
+    'order_market_sell': (PRIORITY_ORDER, 1),
+    'order_limit_buy': (PRIORITY_ORDER, 1),
+    'order_limit_sell': (PRIORITY_ORDER, 1),
+    'get_order': (PRIORITY_ORDER, 4),
+    'get_my_trades': (PRIORITY_ORDER, 5),  # weight 5 khi lọc theo orderId (bot luôn truyền)
+    'cancel_order': (PRIORITY_ORDER, 1),
+    'stream_get_listen_key': (PRIORITY_ORDER, 2),
+    'stream_keepalive': (PRIORITY_ORDER, 2),
+}
+
+WEIGHT_HEADER = 'x-mbx-used-weight-1m'
+ORDER_COUNT_HEADER = 'x-mbx-order-count-10s'
+
+# Header của response gần nhất theo từng thread: Client dùng chung giữa các thread nên client.response
+# có thể là response của thread khác
+_last_response = threading.local()
+
+
+def record_response(response, *args, **kwargs):
+    """Hook 'response' của requests.Session (chạy trên chính thread gửi request): lưu header cho thread đó"""
+    _last_response.headers = response.headers
+    return response
+
+
+class TokenBucket:
+    """Token bucket cho một cửa sổ giới hạn: capacity token, nạp lại đều trong window_seconds"""
+
+    def __init__(self, capacity: float, window_seconds: float, clock: Callable[[], float] = time.monotonic):
+        self.capacity = capacity
+        self.rate = capacity / window_seconds
+        self._clock = clock
+        self._tokens = capacity
+        self._updated = clock()
+
+    def _refill(self) -> None:
+        now = self._clock()
+        self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    @property
+    def tokens(self) -> float:
+        self._refill()
+        return self._tokens
+
+    def wait_time(self, amount: float) -> float:
+        """Số giây cần chờ để đủ amount token (0 nếu đủ ngay)"""
+        self._refill()
+        missing = min(amount, self.capacity) - self._tokens
+        return max(0.0, missing / self.rate)
+
+    def consume(self, amount: float) -> None:
+        self._refill()
+        self._tokens -= amount
+
+    def sync_used(self, used: float, limit: float) -> None:
+        """Đồng bộ theo số weight server báo đã dùng (header) trên giới hạn thật limit"""
+        self._refill()
+        self._tokens = min(self._tokens, self.capacity - used * (self.capacity / limit))
+
+
+class RequestScheduler:
+    """
+    Bộ điều phối trung tâm cho mọi request REST tới Binance.
+    - Token bucket cho request weight (mặc định 6000/phút) và số lệnh (100/10s), chừa headroom.
+    - Hàng đợi ưu tiên: lệnh trước giá, giá trước tải nến; cùng ưu tiên thì FIFO.
+    - Đồng bộ weight đã dùng từ header X-MBX-USED-WEIGHT-1M, khi bị 429/418 thì dừng theo Retry-After.
+    """
+
+    def __init__(self, weight_limit: int = 6000, weight_window: float = 60, order_limit: int = 100,
+                 order_window: float = 10, headroom: float = 0.9, max_retries: int = 3,
+                 headers_getter: Callable[[object], Optional[dict]] = None,
+                 clock: Callable[[], float] = time.monotonic, wall_clock: Callable[[], float] = time.time):
+        self.logger = logCommon.getLog(__name__)
+        self.weight_limit = weight_limit
+        self.order_limit = order_limit
+        self.max_retries = max_retries
+        self._clock = clock
+        self._wall_clock = wall_clock
+        self._headers_getter = headers_getter or self._default_headers
+        self._weight_bucket = TokenBucket(weight_limit * headroom, weight_window, clock)
+        self._order_bucket = TokenBucket(order_limit * headroom, order_window, clock)
+
+        self._condition = threading.Condition()
+        self._queue = []
+        self._sequence = itertools.count()
+        self._blocked_until = 0.0
+
+        self.requests = 0
+        self.weight_spent = 0
+        self.throttled = 0
+        self.used_weight_header: Optional[int] = None
+
+    def now_ms(self) -> int:
+        """Thời điểm hiện tại (epoch ms) theo đồng hồ của scheduler, dùng để ước lượng weight"""
+        return int(self._wall_clock() * 1000)
+
+    @staticmethod
+    def _default_headers(client) -> Optional[dict]:
+        """Header do record_response ghi cho request vừa gọi trên thread hiện tại"""
+        return getattr(_last_response, 'headers', None)
+
+    # --- HÀNG ĐỢI ---
+    def _acquire(self, priority: int, weight: int) -> None:
+        with self._condition:
+            ticket = (priority, next(self._sequence))
+            heapq.heappush(self._queue, ticket)
+            try:
+                while True:
+                    wait = self._blocked_until - self._clock()
+                    if self._queue[0] == ticket and wait <= 0:
+                        wait = self._weight_bucket.wait_time(weight)
+                        if priority == PRIORITY_ORDER:
+                            wait = max(wait, self._order_bucket.wait_time(1))
+                        if wait <= 0:
+                            self._weight_bucket.consume(weight)
+                            if priority == PRIORITY_ORDER:
+                                self._order_bucket.consume(1)
+                            return
+                    # Không phải lượt mình thì chờ được đánh thức, nếu là lượt mình thì chờ đủ token
+                    self._condition.wait(timeout=wait if wait > 0 and self._queue[0] == ticket else 1.0)
+            finally:
+                self._queue.remove(ticket)
+                heapq.heapify(self._queue)
+                self._condition.notify_all()
+
+    def execute(self, priority: int, weight: int, func: Callable, *args, client=None, **kwargs):
+        """Chờ tới lượt + đủ weight rồi gọi func(*args, **kwargs); tự thử lại sau Retry-After khi bị 429/418"""
+        attempt = 0
+        while True:
+            self._acquire(priority, weight)
+            self.requests += 1
+            self.weight_spent += weight
+            _last_response.headers = None
+            try:
+                result = func(*args, **kwargs)
+                self._update_from_headers(self._headers_getter(client) if client is not None else None)
+                return result
+            except Exception as e:
+                status = getattr(e, 'status_code', None)
+                if status not in (418, 429) or attempt >= self.max_retries:
+                    raise
+                attempt += 1
+                self._on_rate_limited(status, getattr(getattr(e, 'response', None), 'headers', None))
+
+    def _update_from_headers(self, headers: Optional[dict]) -> None:
+        if not headers:
+            return
+        headers = {key.lower(): value for key, value in headers.items()}
+        with self._condition:
+            if WEIGHT_HEADER in headers:
+                self.used_weight_header = int(headers[WEIGHT_HEADER])
+                self._weight_bucket.sync_used(self.used_weight_header, self.weight_limit)
+            if ORDER_COUNT_HEADER in headers:
+                self._order_bucket.sync_used(int(headers[ORDER_COUNT_HEADER]), self.order_limit)
+
+    def _on_rate_limited(self, status: int, headers: Optional[dict]) -> None:
+        retry_after = 60.0
+        if headers:
+            lowered = {key.lower(): value for key, value in headers.items()}
+            try:
+                retry_after = float(lowered.get('retry-after', retry_after))
+            except (TypeError, ValueError):
+                pass
+        with self._condition:
+            self.throttled += 1
+            self._blocked_until = max(self._blocked_until, self._clock() + retry_after)
+            self._condition.notify_all()
+        self.logger.warning(f"⚠️ Binance trả về {status}, tạm dừng mọi request {retry_after:.1f}s (Retry-After)")
+
+    # --- THỐNG KÊ ---
+    def stats(self) -> dict:
+        with self._condition:
+            by_priority: Dict[str, int] = {name: 0 for name in PRIORITY_NAMES.values()}
+            for priority, _ in self._queue:
+                by_priority[PRIORITY_NAMES.get(priority, str(priority))] += 1
+            return {
+                'queue_depth': len(self._queue),
+                'queue_by_priority': by_priority,
+                'weight_available': round(self._weight_bucket.tokens, 1),
+                'used_weight_1m': self.used_weight_header,
+                'weight_limit': self.weight_limit,
+                'requests': self.requests,
+                'weight_spent': self.weight_spent,
+                'throttled': self.throttled,
+                'blocked_for': max(0.0, self._blocked_until - self._clock()),
+            }
+
+
+class ScheduledClient:
+    """
+    Proxy bọc Binance Client: các hàm trong CLIENT_METHODS đi qua RequestScheduler,
+    các thuộc tính khác được chuyển thẳng tới client gốc.
+    """
+
+    def __init__(self, client, scheduler: RequestScheduler, methods: Dict[str, tuple] = None):
+        self._client = client
+        self._scheduler = scheduler
+        self._methods = methods or CLIENT_METHODS
+
+    @property
+    def scheduler(self) -> RequestScheduler:
+        return self._scheduler
+
+    @property
+    def raw_client(self):
+        return self._client
+
+    def __getattr__(self, name):
+        attribute = getattr(self._client, name)
+        if name not in self._methods or not callable(attribute):
+            return attribute
+        priority, weight = self._methods[name]
+
+        def scheduled(*args, **kwargs):
+            cost = weight(self._scheduler.now_ms(), *args, **kwargs) if callable(weight) else weight
+            return self._scheduler.execute(priority, cost, attribute, *args, client=self._client, **kwargs)
+        return scheduled
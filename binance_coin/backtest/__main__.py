@@ -0,0 +1,57 @@
+# -*- coding: utf-8 -*-
+"""
+Chạy backtest offline từ file CSV nến Binance:
+
+    python -m binance_coin.backtest data/BTCUSDT-15m.csv data/ETHUSDT-15m.csv
+    python -m binance_coin.backtest --synthetic 50 --candles 100000
+"""
+import argparse
+import os
+
+from binance_coin.backtest.engine import BacktestEngine, load_klines_csv, load_store_data, synthetic_data
+from binance_coin.services.kline_store import DEFAULT_STORE_DIR, KlineStore
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Backtest MA crossover strategy offline')
+    parser.add_argument('files', nargs='*', help='CSV klines, tên file bắt đầu bằng symbol (vd: BTCUSDT-15m.csv)')
+    parser.add_argument('--fast', type=int, default=7)
+    parser.add_argument('--slow', type=int, default=25)
+    parser.add_argument('--no-price-filter', action='store_true')
+    parser.add_argument('--synthetic', type=int, default=0, help='Số symbol giả lập')
+    parser.add_argument('--store', action='store_true', help='Đọc nến từ kho data/klines (memmap)')
+    parser.add_argument('--store-dir', default=DEFAULT_STORE_DIR)
+    parser.add_argument('--interval', default='15m')
+    parser.add_argument('--candles', type=int, default=35040, help='Số nến mỗi symbol giả lập (mặc định ~1 năm 15m)')
+    args = parser.parse_args()
+
+    data = {}
+    for file_path in args.files:
+        symbol = os.path.basename(file_path).split('-')[0].split('.')[0].upper()
+        data[symbol] = load_klines_csv(file_path)
+    if args.store:
+        data.update(load_store_data(KlineStore(args.store_dir), args.interval))
+    if args.synthetic:
+        data.update(synthetic_data(args.synthetic, args.candles))
+    if not data:
+        parser.error('Cần ít nhất một file CSV, --store hoặc --synthetic N')
+
+    engine = BacktestEngine(args.fast, args.slow, price_filter=not args.no_price_filter)
+    result = engine.run(data)
+
+    print(f"{'SYMBOL':<14}{'CANDLES':>10}{'TRADES':>8}{'WIN%':>8}{'AVG%':>9}{'RETURN%':>10}{'MAXDD%':>9}  POSITION")
+    for symbol_result in result.results.values():
+        s = symbol_result.summary()
+        print(f"{s['symbol']:<14}{s['candles']:>10}{s['trades']:>8}{s['win_rate']:>8.1f}{s['avg_profit']:>9.3f}"
+              f"{s['total_return']:>10.2f}{s['max_drawdown']:>9.2f}  {s['final_position']}")
+
+    summary = result.summary()
+    print('-' * 80)
+    print(f"Symbols: {summary['symbols']} | Trades: {summary['trades']} | Win rate: {summary['win_rate']:.1f}% "
+          f"| Avg profit: {summary['avg_profit']:.3f}% | Avg return: {summary['avg_total_return']:.2f}%")
+    print(f"Speed: {summary['candles']:,} candles in {summary['elapsed_seconds']:.3f}s "
+          f"= {summary['candles_per_second']:,.0f} candles/s")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,201 @@
+# -*- coding: utf-8 -*-
+import time
+from collections import namedtuple
+from typing import Dict, List, Tuple
+
+import numpy as np
+
+from binance_coin.enums.position_state import PositionState
+from binance_coin.models.sell_buy import calculate_profit
+from binance_coin.services.signal_evaluator import crossover_conditions, rolling_mean
+
+# Một lần mua-bán hoàn chỉnh (hoặc đang mở nếu sell_index là None)
+Trade = namedtuple('Trade', ['symbol', 'buy_index', 'buy_time', 'buy_price',
+                             'sell_index', 'sell_time', 'sell_price', 'profit'])
+
+
+def load_klines_csv(file_path: str) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Đọc file CSV nến định dạng Binance (data.binance.vision, 12 cột, không header).
+    Trả về (open_time int64 ms, close float64).
+    """
+    data = np.loadtxt(file_path, delimiter=',', usecols=(0, 4), dtype=np.float64, ndmin=2)
+    return data[:, 0].astype(np.int64), data[:, 1]
+
+
+def load_store_data(store, interval: str, symbols=None) -> Dict[str, Tuple[np.ndarray, np.ndarray]]:
+    """Đọc (open_time, close) của các symbol từ KlineStore dưới dạng memmap, không copy"""
+    data = {}
+    for symbol in symbols or store.symbols(interval):
+        columns = store.read(symbol, interval, ['open_time', 'close'])
+        if len(columns['close']):
+            data[symbol] = (columns['open_time'], columns['close'])
+    return data
+
+
+def synthetic_data(n_symbols: int, n_candles: int, seed: int = 42) -> Dict[str, Tuple[np.ndarray, np.ndarray]]:
+    """Chuỗi giá random walk, nến 15m, để đo tốc độ khi không có dữ liệu thật"""
+    rng = np.random.default_rng(seed)
+    open_times = np.arange(n_candles, dtype=np.int64) * 15 * 60 * 1000
+    closes = 100 * np.cumprod(1 + rng.normal(0, 0.005, size=(n_symbols, n_candles)), axis=1)
+    return {f"SYN{i:04d}USDT": (open_times, closes[i]) for i in range(n_symbols)}
+
+
+def pair_trades(buy_indexes: np.ndarray, sell_indexes: np.ndarray) -> List[Tuple[int, int]]:
+    """
+    Áp dụng chuyển trạng thái PositionState lên các nến có điều kiện MUA/BÁN:
+    KHONG_VI_THE --MUA--> CO_VI_THE --BÁN--> KHONG_VI_THE.
+    Chỉ nhảy qua các điểm sự kiện (searchsorted) nên chi phí theo số giao dịch, không theo số nến.
+    sell_index = -1 nghĩa là vị thế vẫn đang mở ở cuối dữ liệu.
+    """
+    pairs = []
+    start = 0
+    while True:
+        k = np.searchsorted(buy_indexes, start)
+        if k >= len(buy_indexes):
+            break
+        buy_index = int(buy_indexes[k])
+        m = np.searchsorted(sell_indexes, buy_index, side='right')
+        if m >= len(sell_indexes):
+            pairs.append((buy_index, -1))
+            break
+        sell_index = int(sell_indexes[m])
+        pairs.append((buy_index, sell_index))
+        start = sell_index + 1
+    return pairs
+
+
+def position_mask(n_candles: int, pairs: List[Tuple[int, int]]) -> np.ndarray:
+    """Mảng bool: True ở các nến đang giữ coin (sau nến mua, tới hết nến bán)"""
+    delta = np.zeros(n_candles + 1, dtype=np.int32)
+    for buy_index, sell_index in pairs:
+        delta[buy_index + 1] += 1
+        delta[(sell_index + 1) if sell_index >= 0 else n_candles] -= 1
+    return np.cumsum(delta[:-1]) > 0
+
+
+def max_drawdown(equity: np.ndarray) -> float:
+    """Mức sụt giảm lớn nhất của đường vốn, tính theo %"""
+    if len(equity) == 0:
+        return 0.0
+    peaks = np.maximum.accumulate(equity)
+    return float(((equity / peaks) - 1).min() * 100)
+
+
+class SymbolBacktest:
+    """Kết quả backtest của một symbol"""
+
+    def __init__(self, symbol: str, open_times: np.ndarray, trades: List[Trade], equity: np.ndarray,
+                 final_position: PositionState):
+        self.symbol = symbol
+        self.open_times = open_times
+        self.trades = trades
+        self.equity = equity
+        self.final_position = final_position
+
+    @property
+    def closed_trades(self) -> List[Trade]:
+        return [trade for trade in self.trades if trade.sell_index is not None]
+
+    def summary(self) -> dict:
+        profits = np.array([trade.profit for trade in self.closed_trades], dtype=np.float64)
+        return {
+            'symbol': self.symbol,
+            'candles': len(self.open_times),
+            'trades': len(profits),
+            'win_rate': float((profits > 0).mean() * 100) if len(profits) else 0.0,
+            'avg_profit': float(profits.mean()) if len(profits) else 0.0,
+            'total_return': float((self.equity[-1] - 1) * 100) if len(self.equity) else 0.0,
+            'max_drawdown': max_drawdown(self.equity),
+            'final_position': self.final_position.name,
+        }
+
+
+class BacktestResult:
+    """Kết quả backtest nhiều symbol + tốc độ xử lý"""
+
+    def __init__(self, results: Dict[str, SymbolBacktest], elapsed_seconds: float):
+        self.results = results
+        self.elapsed_seconds = elapsed_seconds
+
+    @property
+    def total_candles(self) -> int:
+        return sum(len(result.open_times) for result in self.results.values())
+
+    @property
+    def candles_per_second(self) -> float:
+        return self.total_candles / self.elapsed_seconds if self.elapsed_seconds > 0 else float('inf')
+
+    @property
+    def trades(self) -> List[Trade]:
+        return [trade for result in self.results.values() for trade in result.trades]
+
+    def summary(self) -> dict:
+        per_symbol = [result.summary() for result in self.results.values()]
+        profits = np.array([trade.profit for trade in self.trades if trade.sell_index is not None], dtype=np.float64)
+        return {
+            'symbols': len(per_symbol),
+            'candles': self.total_candles,
+            'trades': len(profits),
+            'win_rate': float((profits > 0).mean() * 100) if len(profits) else 0.0,
+            'avg_profit': float(profits.mean()) if len(profits) else 0.0,
+            'avg_total_return': float(np.mean([s['total_return'] for s in per_symbol])) if per_symbol else 0.0,
+            'elapsed_seconds': self.elapsed_seconds,
+            'candles_per_second': self.candles_per_second,
+        }
+
+
+class BacktestEngine:
+    """
+    Backtest chiến lược MA nhanh/MA chậm offline, cùng quy tắc với TradingBot.analyze_and_signal.
+    Tín hiệu được đánh giá trên nến đã đóng, giá hiện tại = giá đóng cửa của nến đó.
+    """
+
+    def __init__(self, fast: int = 7, slow: int = 25, price_filter: bool = True):
+        if fast >= slow:
+            raise ValueError("fast window phải nhỏ hơn slow window")
+        self.fast = fast
+        self.slow = slow
+        self.price_filter = price_filter
+
+    def signal_indexes(self, closes: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        """Chỉ số các nến thỏa điều kiện MUA / BÁN (chưa xét vị thế)"""
+        ma_fast = rolling_mean(closes, self.fast)
+        ma_slow = rolling_mean(closes, self.slow)
+        prev_ma_fast = np.concatenate(([np.nan], ma_fast[:-1]))
+        prev_ma_slow = np.concatenate(([np.nan], ma_slow[:-1]))
+        buy_condition, sell_condition = crossover_conditions(ma_fast, ma_slow, prev_ma_fast, prev_ma_slow,
+                                                             closes, self.price_filter)
+        return np.flatnonzero(buy_condition), np.flatnonzero(sell_condition)
+
+    def run_symbol(self, symbol: str, open_times: np.ndarray, closes: np.ndarray) -> SymbolBacktest:
+        closes = np.asarray(closes, dtype=np.float64)
+        open_times = np.asarray(open_times, dtype=np.int64)
+        buy_indexes, sell_indexes = self.signal_indexes(closes)
+        pairs = pair_trades(buy_indexes, sell_indexes)
+
+        trades = []
+        for buy_index, sell_index in pairs:
+            if sell_index < 0:
+                trades.append(Trade(symbol, buy_index, int(open_times[buy_index]), float(closes[buy_index]),
+                                    None, None, None, None))
+                continue
+            trades.append(Trade(symbol, buy_index, int(open_times[buy_index]), float(closes[buy_index]),
+                                sell_index, int(open_times[sell_index]), float(closes[sell_index]),
+                                float(calculate_profit(closes[buy_index], closes[sell_index]))))
+
+        # Đường vốn mark-to-market: chỉ ăn biến động giá ở những nến đang giữ coin
+        returns = np.zeros(len(closes), dtype=np.float64)
+        if len(closes) > 1:
+            returns[1:] = closes[1:] / closes[:-1] - 1
+        equity = np.cumprod(1 + np.where(position_mask(len(closes), pairs), returns, 0.0))
+
+        final_position = PositionState.CO_VI_THE if pairs and pairs[-1][1] < 0 else PositionState.KHONG_VI_THE
+        return SymbolBacktest(symbol, open_times, trades, equity, final_position)
+
+    def run(self, data: Dict[str, Tuple[np.ndarray, np.ndarray]]) -> BacktestResult:
+        """data: symbol -> (open_times, closes)"""
+        start = time.perf_counter()
+        results = {symbol: self.run_symbol(symbol, open_times, closes)
+                   for symbol, (open_times, closes) in data.items()}
+        return BacktestResult(results, time.perf_counter() - start)
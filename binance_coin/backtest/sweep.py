@@ -0,0 +1,149 @@
+# -*- coding: utf-8 -*-
+"""
+Quét tham số chiến lược MA (fast, slow, price filter) song song bằng process pool.
+Dữ liệu nến nằm trong shared memory, worker chỉ attach và tạo view numpy, không pickle DataFrame.
+
+    python -m binance_coin.backtest.sweep --synthetic 50 --fast 5 7 9 --slow 20 25 30 50
+"""
+import argparse
+import itertools
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import shared_memory
+from typing import Dict, List, Sequence, Tuple
+
+import numpy as np
+
+from binance_coin.backtest.engine import BacktestEngine, load_klines_csv, load_store_data, synthetic_data
+from binance_coin.services.kline_store import DEFAULT_STORE_DIR, KlineStore
+
+# Dữ liệu chia sẻ của worker, được gán trong _init_worker
+_worker_blocks = []
+_worker_data: Dict[str, Tuple[np.ndarray, np.ndarray]] = {}
+
+
+class SharedCandles:
+    """
+    Ghép open_time/close của mọi symbol thành 2 mảng liên tục trong shared memory.
+    layout: danh sách (symbol, offset, length) đủ nhỏ để truyền cho worker.
+    """
+
+    def __init__(self, data: Dict[str, Tuple[np.ndarray, np.ndarray]]):
+        total = sum(len(closes) for _, closes in data.values())
+        self.times_block = shared_memory.SharedMemory(create=True, size=max(1, total * 8))
+        self.closes_block = shared_memory.SharedMemory(create=True, size=max(1, total * 8))
+        times = np.ndarray((total,), dtype=np.int64, buffer=self.times_block.buf)
+        closes = np.ndarray((total,), dtype=np.float64, buffer=self.closes_block.buf)
+
+        self.layout: List[Tuple[str, int, int]] = []
+        offset = 0
+        for symbol, (symbol_times, symbol_closes) in data.items():
+            length = len(symbol_closes)
+            times[offset:offset + length] = symbol_times
+            closes[offset:offset + length] = symbol_closes
+            self.layout.append((symbol, offset, length))
+            offset += length
+        self.total = total
+
+    def worker_args(self) -> tuple:
+        return self.times_block.name, self.closes_block.name, self.total, self.layout
+
+    def close(self) -> None:
+        for block in (self.times_block, self.closes_block):
+            block.close()
+            block.unlink()
+
+
+def _init_worker(times_name: str, closes_name: str, total: int, layout: List[Tuple[str, int, int]]) -> None:
+    times_block = shared_memory.SharedMemory(name=times_name)
+    closes_block = shared_memory.SharedMemory(name=closes_name)
+    # Giữ tham chiếu để block không bị đóng khi worker còn dùng view
+    _worker_blocks.extend([times_block, closes_block])
+    times = np.ndarray((total,), dtype=np.int64, buffer=times_block.buf)
+    closes = np.ndarray((total,), dtype=np.float64, buffer=closes_block.buf)
+    times.flags.writeable = False
+    closes.flags.writeable = False
+    for symbol, offset, length in layout:
+        _worker_data[symbol] = (times[offset:offset + length], closes[offset:offset + length])
+
+
+def _run_combination(params: Tuple[int, int, bool]) -> dict:
+    fast, slow, price_filter = params
+    summary = BacktestEngine(fast, slow, price_filter).run(_worker_data).summary()
+    summary.update({'fast': fast, 'slow': slow, 'price_filter': price_filter})
+    return summary
+
+
+def build_grid(fast_windows: Sequence[int], slow_windows: Sequence[int],
+               price_filters: Sequence[bool] = (True, False)) -> List[Tuple[int, int, bool]]:
+    """Mọi tổ hợp hợp lệ (fast < slow)"""
+    return [(fast, slow, price_filter)
+            for fast, slow, price_filter in itertools.product(fast_windows, slow_windows, price_filters)
+            if fast < slow]
+
+
+def run_sweep(data: Dict[str, Tuple[np.ndarray, np.ndarray]], grid: List[Tuple[int, int, bool]],
+              workers: int = None, sort_by: str = 'avg_total_return') -> Tuple[List[dict], float]:
+    """Chạy toàn bộ grid, trả về (kết quả đã xếp hạng giảm dần theo sort_by, thời gian chạy)"""
+    workers = workers or os.cpu_count() or 1
+    shared = SharedCandles(data)
+    start = time.perf_counter()
+    try:
+        with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker,
+                                 initargs=shared.worker_args()) as executor:
+            results = list(executor.map(_run_combination, grid))
+    finally:
+        shared.close()
+    elapsed = time.perf_counter() - start
+    results.sort(key=lambda result: result[sort_by], reverse=True)
+    return results, elapsed
+
+
+def print_results(results: List[dict], elapsed: float, top: int = 20) -> None:
+    print(f"{'RANK':>4} {'FAST':>5} {'SLOW':>5} {'FILTER':>7} {'TRADES':>8} {'WIN%':>7} {'AVG%':>8} {'RETURN%':>9}")
+    for rank, result in enumerate(results[:top], start=1):
+        print(f"{rank:>4} {result['fast']:>5} {result['slow']:>5} {str(result['price_filter']):>7} "
+              f"{result['trades']:>8} {result['win_rate']:>7.1f} {result['avg_profit']:>8.3f} "
+              f"{result['avg_total_return']:>9.2f}")
+    candles = sum(result['candles'] for result in results)
+    print('-' * 60)
+    print(f"{len(results)} combinations in {elapsed:.2f}s = {candles / elapsed:,.0f} candles/s")
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Parallel parameter sweep for the MA crossover strategy')
+    parser.add_argument('files', nargs='*', help='CSV klines, tên file bắt đầu bằng symbol')
+    parser.add_argument('--fast', type=int, nargs='+', default=[5, 7, 9, 12])
+    parser.add_argument('--slow', type=int, nargs='+', default=[20, 25, 30, 50, 99])
+    parser.add_argument('--filter', choices=['both', 'on', 'off'], default='both')
+    parser.add_argument('--workers', type=int, default=None)
+    parser.add_argument('--sort-by', default='avg_total_return',
+                        choices=['avg_total_return', 'avg_profit', 'win_rate', 'trades'])
+    parser.add_argument('--top', type=int, default=20)
+    parser.add_argument('--synthetic', type=int, default=0)
+    parser.add_argument('--store', action='store_true', help='Đọc nến từ kho data/klines (memmap)')
+    parser.add_argument('--store-dir', default=DEFAULT_STORE_DIR)
+    parser.add_argument('--interval', default='15m')
+    parser.add_argument('--candles', type=int, default=35040)
+    args = parser.parse_args()
+
+    data = {}
+    for file_path in args.files:
+        symbol = os.path.basename(file_path).split('-')[0].split('.')[0].upper()
+        data[symbol] = load_klines_csv(file_path)
+    if args.store:
+        data.update(load_store_data(KlineStore(args.store_dir), args.interval))
+    if args.synthetic:
+        data.update(synthetic_data(args.synthetic, args.candles))
+    if not data:
+        parser.error('Cần ít nhất một file CSV, --store hoặc --synthetic N')
+
+    price_filters = {'both': (True, False), 'on': (True,), 'off': (False,)}[args.filter]
+    grid = build_grid(args.fast, args.slow, price_filters)
+    results, elapsed = run_sweep(data, grid, args.workers, args.sort_by)
+    print_results(results, elapsed, args.top)
+
+
+if __name__ == '__main__':
+    main()
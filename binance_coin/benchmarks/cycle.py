@@ -0,0 +1,194 @@
+# -*- coding: utf-8 -*-
+"""
+Benchmark run_single_cycle với SyntheticClient (tất định, latency cấu hình được).
+Mỗi cấu hình (số symbol x số nến lookback) chạy trong một process mới và đo:
+- chu kỳ lạnh (cache rỗng, tải toàn bộ lịch sử) và các chu kỳ nóng (chỉ nến mới)
+- wall time, CPU time, thời gian client giả tự sinh dữ liệu (để trừ ra), số lần gọi từng API
+- cấp phát bộ nhớ của một chu kỳ nóng (tracemalloc, chạy riêng để không làm sai wall time)
+
+    python -m binance_coin.benchmarks.cycle --symbols 10 100 1000 5000 --lookback 100 1000 5000 --output bench.json
+    python -m binance_coin.benchmarks.cycle --quick --compare bench.json --threshold 0.2
+
+Lưới mặc định (tới 5000 symbols x 5000 nến) giữ toàn bộ nến dạng list trong KlineCache: ô lớn nhất cần nhiều GB RAM.
+--compare so với file kết quả trước (vd: của commit trước): chậm hơn threshold -> exit code 1.
+"""
+import argparse
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# Chỉ số dùng để so sánh giữa hai lần chạy
+COMPARED_METRICS = ('cold_wall_s', 'warm_wall_s', 'warm_cpu_s')
+
+
+def _measure(bot, fake) -> dict:
+    calls_before = dict(fake.calls)
+    generate_before = fake.generate_seconds
+    wall_start, cpu_start = time.perf_counter(), time.process_time()
+    bot.run_single_cycle()
+    wall, cpu = time.perf_counter() - wall_start, time.process_time() - cpu_start
+    generate = fake.generate_seconds - generate_before
+    calls = {name: count - calls_before.get(name, 0) for name, count in fake.calls.items()
+             if count - calls_before.get(name, 0)}
+    # Trừ phần CPU client giả dùng để sinh dữ liệu (xấp xỉ khi nhiều thread chia nhau GIL)
+    return {'wall_s': wall - generate, 'cpu_s': max(0.0, cpu - generate), 'client_s': generate, 'api_calls': calls}
+
+
+def _child(args) -> None:
+    import binance_coin.services.trading_bot as trading_bot
+    from binance_coin.benchmarks.fake_client import SyntheticClient
+
+    symbols = os.environ['LIST_COIN_SYMBOL'].split('|')
+    fake = SyntheticClient(symbols, interval=args.interval, latency=args.latency, history_candles=args.lookback_one)
+    bot = trading_bot.TradingBot(client=fake)
+
+    cold = _measure(bot, fake)
+    warm = [_measure(bot, fake) for _ in range(args.cycles)]
+
+    tracemalloc.start()
+    bot.run_single_cycle()
+    allocated, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    # Ghi ra file riêng vì stdout còn có log console của bot
+    with open(args.result_file, 'w', encoding='utf-8') as f:
+        json.dump({
+            'symbols': len(symbols),
+            'lookback': args.lookback_one,
+            'cold_wall_s': cold['wall_s'],
+            'cold_cpu_s': cold['cpu_s'],
+            'cold_client_s': cold['client_s'],
+            'cold_api_calls': cold['api_calls'],
+            'warm_wall_s': statistics.median(run['wall_s'] for run in warm),
+            'warm_cpu_s': statistics.median(run['cpu_s'] for run in warm),
+            'warm_api_calls': warm[-1]['api_calls'],
+            'warm_alloc_bytes': allocated,
+            'warm_alloc_peak_bytes': peak,
+        }, f)
+
+
+def _run_config(args, symbols: int, lookback: int) -> dict:
+    with tempfile.TemporaryDirectory() as workdir:
+        env = dict(os.environ)
+        env.update({
+            'PYTHONPATH': PROJECT_ROOT + os.pathsep + env.get('PYTHONPATH', ''),
+            'API_KEY': 'benchmark',
+            'SECRET_KEY': 'benchmark',
+            'LIST_COIN_SYMBOL': '|'.join(f"SYM{i:05d}USDT" for i in range(symbols)),
+            'TIME_INTERVAL': args.interval,
+            'KLINE_CACHE_SIZE': str(max(lookback, 1000)),
+            'KLINE_STORE_DIR': '',
+            'STATE_FILE': os.path.join(workdir, 'bot_state.json'),
+            'LOG_FILENAME': os.path.join(workdir, 'trading_bot.log'),
+            'SIGNAL_LOG_FILENAME': os.path.join(workdir, 'signals.log'),
+            'LOG_LEVEL': args.log_level,
+            'STREAM_MODE': 'false',
+            'BATCH_SIGNALS': 'true' if args.batch else 'false',
+            'MAX_CONCURRENT_SYMBOLS': str(args.concurrency),
+            'ACCOUNT_CHECK': 'off',
+        })
+        command = [sys.executable, '-m', 'binance_coin.benchmarks.cycle', '--child',
+                   '--lookback-one', str(lookback), '--cycles', str(args.cycles),
+                   '--interval', args.interval, '--latency', str(args.latency),
+                   '--result-file', os.path.join(workdir, 'result.json')]
+        completed = subprocess.run(command, cwd=workdir, env=env, capture_output=True, text=True)
+        if completed.returncode != 0:
+            raise RuntimeError(f"Benchmark {symbols} symbols x {lookback} lỗi:\n{completed.stderr[-2000:]}")
+        with open(os.path.join(workdir, 'result.json'), 'r', encoding='utf-8') as f:
+            return json.load(f)
+
+
+def _git_commit() -> str:
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], cwd=PROJECT_ROOT,
+                              capture_output=True, text=True).stdout.strip()
+    except OSError:
+        return ''
+
+
+def compare(current: dict, baseline: dict, threshold: float) -> list:
+    """Các dòng (symbols, lookback, metric, cũ, mới, tỉ lệ) chậm hơn baseline quá threshold"""
+    previous = {(row['symbols'], row['lookback']): row for row in baseline['results']}
+    regressions = []
+    for row in current['results']:
+        old = previous.get((row['symbols'], row['lookback']))
+        if old is None:
+            continue
+        for metric in COMPARED_METRICS:
+            if old[metric] > 0 and row[metric] / old[metric] - 1 > threshold:
+                regressions.append((row['symbols'], row['lookback'], metric, old[metric], row[metric],
+                                    row[metric] / old[metric]))
+    return regressions
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description='Benchmark run_single_cycle against a synthetic exchange')
+    parser.add_argument('--symbols', type=int, nargs='+', default=[10, 100, 1000, 5000])
+    parser.add_argument('--lookback', type=int, nargs='+', default=[100, 1000, 5000])
+    parser.add_argument('--quick', action='store_true', help='lưới nhỏ: 10/100 symbols x 100/1000 nến')
+    parser.add_argument('--cycles', type=int, default=3, help='số chu kỳ nóng mỗi cấu hình')
+    parser.add_argument('--interval', default='15m')
+    parser.add_argument('--latency', type=float, default=0.0, help='giây trễ giả lập mỗi request')
+    parser.add_argument('--concurrency', type=int, default=8, help='MAX_CONCURRENT_SYMBOLS')
+    parser.add_argument('--batch', action='store_true', help='BATCH_SIGNALS=true')
+    parser.add_argument('--log-level', default='INFO')
+    parser.add_argument('--output', help='ghi kết quả JSON ra file')
+    parser.add_argument('--compare', help='file JSON kết quả trước để so sánh')
+    parser.add_argument('--threshold', type=float, default=0.2, help='tỉ lệ chậm hơn cho phép khi --compare')
+    parser.add_argument('--child', action='store_true', help=argparse.SUPPRESS)
+    parser.add_argument('--lookback-one', type=int, help=argparse.SUPPRESS)
+    parser.add_argument('--result-file', help=argparse.SUPPRESS)
+    args = parser.parse_args(argv)
+
+    if args.child:
+        _child(args)
+        return 0
+
+    if args.quick:
+        args.symbols, args.lookback = [10, 100], [100, 1000]
+
+    results = []
+    print(f"{'symbols':>8} {'lookback':>8} {'cold s':>9} {'warm s':>9} {'warm cpu s':>10} "
+          f"{'alloc MB':>9} {'cold calls':>10} {'warm calls':>10}")
+    for symbols in args.symbols:
+        for lookback in args.lookback:
+            row = _run_config(args, symbols, lookback)
+            results.append(row)
+            print(f"{symbols:>8} {lookback:>8} {row['cold_wall_s']:>9.3f} {row['warm_wall_s']:>9.3f} "
+                  f"{row['warm_cpu_s']:>10.3f} {row['warm_alloc_peak_bytes'] / 1e6:>9.1f} "
+                  f"{sum(row['cold_api_calls'].values()):>10} {sum(row['warm_api_calls'].values()):>10}")
+
+    report = {
+        'commit': _git_commit(),
+        'python': platform.python_version(),
+        'created': time.strftime('%Y-%m-%dT%H:%M:%S'),
+        'params': {'cycles': args.cycles, 'interval': args.interval, 'latency': args.latency,
+                   'concurrency': args.concurrency, 'batch': args.batch, 'log_level': args.log_level},
+        'results': results,
+    }
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(report, f, indent=2)
+
+    if args.compare:
+        with open(args.compare, 'r', encoding='utf-8') as f:
+            baseline = json.load(f)
+        regressions = compare(report, baseline, args.threshold)
+        for symbols, lookback, metric, old, new, ratio in regressions:
+            print(f"❌ {symbols} symbols x {lookback}: {metric} {old:.4f}s -> {new:.4f}s ({ratio:.2f}x)")
+        if regressions:
+            return 1
+        print(f"✅ Không có hồi quy so với {baseline.get('commit') or args.compare}")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,358 @@
+# -*- coding: utf-8 -*-
+import json
+import math
+import threading
+import time
+import zlib
+from collections import Counter, defaultdict
+from decimal import Decimal
+from typing import Callable, List, Optional
+
+from binance_coin.utils.common import interval_to_milliseconds
+
+# Số nến trả về khi lookback là chuỗi kiểu "5 days ago UTC"
+DEFAULT_HISTORY_CANDLES = 500
+QUOTE_ASSETS = ('USDT', 'FDUSD', 'USDC', 'BTC', 'ETH', 'BNB')
+# Phí taker, tính bằng tài sản nhận về
+FEE_RATE = 0.001
+
+
+def _api_error(code: int, message: str, status_code: int = 400):
+    from binance.exceptions import BinanceAPIException
+    return BinanceAPIException(None, status_code, json.dumps({'code': code, 'msg': message}))
+
+
+class SyntheticClient:
+    """
+    Client giả, tất định: cùng (symbol, open_time) luôn cho cùng một nến, không cần mạng.
+    Trả dữ liệu đúng dạng của python-binance (list 12 cột, số dạng chuỗi) và đếm số lần gọi từng hàm.
+    symbols: danh sách symbol của "sàn" (cho get_all_tickers); interval: nến dùng làm giá ticker hiện tại;
+    latency: số giây chờ giả lập mỗi request.
+    Lệnh: khớp ngay MARKET và LIMIT chạm giá tại bid/ask (spread như ticker 24h), kiểm tra filter + số dư,
+    phát executionReport cho user_listeners; lost_ack_every=N: cứ N lệnh thì một lệnh vào sổ nhưng
+    request báo timeout (thử gửi lại an toàn).
+    """
+
+    def __init__(self, symbols: List[str] = (), interval: str = '15m', latency: float = 0.0,
+                 history_candles: int = DEFAULT_HISTORY_CANDLES, now_ms: Optional[int] = None,
+                 quote_balance: float = 1e9, lost_ack_every: int = 0):
+        self.symbols = list(symbols)
+        self.interval = interval
+        self.latency = latency
+        self.history_candles = history_candles
+        self._now_ms = now_ms
+        self.calls = Counter()
+        # Thời gian CPU (thread_time, không tính lúc chờ GIL) client giả tự tốn để sinh dữ liệu (trừ ra khi đo bot)
+        self.generate_seconds = 0.0
+        self._lock = threading.Lock()
+        self.response = None
+        # --- Sổ lệnh ---
+        self.lost_ack_every = lost_ack_every
+        self.balances = defaultdict(float, {asset: quote_balance for asset in QUOTE_ASSETS})
+        self.orders = {}
+        self.trades: List[dict] = []
+        self.duplicate_orders = 0
+        self.user_listeners: List[Callable[[dict], None]] = []
+        self._open_orders = set()
+        self._order_seq = 0
+
+    # --- DỮ LIỆU ---
+    def now_ms(self) -> int:
+        return self._now_ms if self._now_ms is not None else int(time.time() * 1000)
+
+    @staticmethod
+    def _seed(symbol: str) -> int:
+        return zlib.crc32(symbol.encode('utf-8'))
+
+    def price_at(self, symbol: str, index: int) -> float:
+        """Giá đóng cửa của nến thứ index (tính từ epoch theo interval): sóng chồng nhau để MA cắt nhau thường xuyên"""
+        seed = self._seed(symbol)
+        base = 1 + seed % 50000
+        phase = (seed % 360) * math.pi / 180
+        return base * (1 + 0.05 * math.sin(index / 17 + phase) + 0.02 * math.sin(index / 5.3 + 2 * phase))
+
+    def _kline(self, symbol: str, open_time: int, interval_ms: int) -> list:
+        index = open_time // interval_ms
+        open_price = self.price_at(symbol, index - 1)
+        close = self.price_at(symbol, index)
+        high, low = max(open_price, close) * 1.001, min(open_price, close) * 0.999
+        volume = 100 + index % 37
+        return [open_time, f"{open_price:.8f}", f"{high:.8f}", f"{low:.8f}", f"{close:.8f}", f"{volume:.8f}",
+                open_time + interval_ms - 1, f"{volume * close:.8f}", int(volume), f"{volume / 2:.8f}",
+                f"{volume * close / 2:.8f}", "0"]
+
+    def _klines(self, symbol: str, interval: str, start_ms: Optional[int], limit: int) -> List[list]:
+        start = time.thread_time()
+        klines = self._generate(symbol, interval, start_ms, limit)
+        with self._lock:
+            self.generate_seconds += time.thread_time() - start
+        return klines
+
+    def _generate(self, symbol: str, interval: str, start_ms: Optional[int], limit: int) -> List[list]:
+        interval_ms = interval_to_milliseconds(interval)
+        last_open = self.now_ms() // interval_ms * interval_ms
+        if start_ms is None:
+            first_open = last_open - (limit - 1) * interval_ms
+        else:
+            first_open = -(-int(start_ms) // interval_ms) * interval_ms
+        last_open = min(last_open, first_open + (limit - 1) * interval_ms)
+        return [self._kline(symbol, open_time, interval_ms)
+                for open_time in range(first_open, last_open + 1, interval_ms)]
+
+    def _call(self, name: str) -> None:
+        with self._lock:
+            self.calls[name] += 1
+        if self._open_orders:
+            self.match_open_orders()
+        if self.latency:
+            time.sleep(self.latency)
+
+    # --- API GIỐNG python-binance ---
+    def get_klines(self, symbol: str, interval: str, startTime: int = None, limit: int = 500, **kwargs) -> List[list]:
+        self._call('get_klines')
+        return self._klines(symbol, interval, startTime, limit)
+
+    def get_historical_klines(self, symbol: str, interval: str, start_str=None, end_str=None,
+                              limit: int = 1000, **kwargs) -> List[list]:
+        self._call('get_historical_klines')
+        if isinstance(start_str, int):
+            interval_ms = interval_to_milliseconds(interval)
+            count = max(1, (self.now_ms() - start_str) // interval_ms + 1)
+            return self._klines(symbol, interval, start_str, count)
+        return self._klines(symbol, interval, None, self.history_candles)
+
+    def get_symbol_ticker(self, symbol: str, **kwargs) -> dict:
+        self._call('get_symbol_ticker')
+        return {'symbol': symbol, 'price': f"{self._current_price(symbol):.8f}"}
+
+    def get_all_tickers(self, **kwargs) -> List[dict]:
+        self._call('get_all_tickers')
+        return [{'symbol': symbol, 'price': f"{self._current_price(symbol):.8f}"} for symbol in self.symbols]
+
+    def get_ticker(self, symbol: str = None, **kwargs):
+        """Thống kê 24h (GET /api/v3/ticker/24hr): mọi symbol nếu không truyền symbol"""
+        self._call('get_ticker')
+        if symbol is not None:
+            return self._ticker_24h(symbol)
+        return [self._ticker_24h(symbol) for symbol in self.symbols]
+
+    def _ticker_24h(self, symbol: str) -> dict:
+        interval_ms = interval_to_milliseconds(self.interval)
+        now = self.now_ms()
+        last_index = now // interval_ms
+        prices = [self.price_at(symbol, index)
+                  for index in range(last_index - 24 * 60 * 60 * 1000 // interval_ms, last_index + 1)]
+        seed = self._seed(symbol)
+        last, open_price = prices[-1], prices[0]
+        # Spread 1-40 bps và quote volume từ 10^4 tới 10^9 tùy symbol
+        half_spread = last * (1 + seed % 40) / 20000
+        volume = 10 ** (4 + seed % 6) / last * (1 + (seed >> 8) % 10 / 10)
+        return {
+            'symbol': symbol, 'priceChange': f"{last - open_price:.8f}",
+            'priceChangePercent': f"{(last / open_price - 1) * 100:.3f}",
+            'lastPrice': f"{last:.8f}", 'openPrice': f"{open_price:.8f}",
+            'highPrice': f"{max(prices):.8f}", 'lowPrice': f"{min(prices):.8f}",
+            'bidPrice': f"{last - half_spread:.8f}", 'askPrice': f"{last + half_spread:.8f}",
+            'volume': f"{volume:.8f}", 'quoteVolume': f"{volume * last:.8f}",
+            'openTime': now - 24 * 60 * 60 * 1000, 'closeTime': now, 'count': int(volume) % 100000,
+        }
+
+    def get_account(self, **kwargs) -> dict:
+        self._call('get_account')
+        return {'accountType': 'SPOT', 'canTrade': True, 'balances': []}
+
+    def _current_price(self, symbol: str) -> float:
+        """Giá hiện tại = giá đóng của nến đang mở"""
+        return self.price_at(symbol, self.now_ms() // interval_to_milliseconds(self.interval))
+
+    # --- LỆNH ---
+    @staticmethod
+    def split_symbol(symbol: str):
+        for quote in QUOTE_ASSETS:
+            if symbol.endswith(quote) and len(symbol) > len(quote):
+                return symbol[:-len(quote)], quote
+        return symbol[:-4], symbol[-4:]
+
+    def _symbol_info(self, symbol: str) -> dict:
+        """tickSize / stepSize theo độ lớn giá (giá lớn -> bước số lượng nhỏ) như các cặp thật"""
+        magnitude = math.floor(math.log10(self._current_price(symbol)))
+        tick = 10.0 ** max(-8, magnitude - 4)
+        step = 10.0 ** max(-8, min(0, -magnitude - 1))
+        base, quote = self.split_symbol(symbol)
+        return {'symbol': symbol, 'status': 'TRADING', 'baseAsset': base, 'quoteAsset': quote,
+                'baseAssetPrecision': 8, 'quoteAssetPrecision': 8,
+                'filters': [
+                    {'filterType': 'PRICE_FILTER', 'minPrice': f"{tick:.8f}", 'maxPrice': '1000000.00000000',
+                     'tickSize': f"{tick:.8f}"},
+                    {'filterType': 'LOT_SIZE', 'minQty': f"{step:.8f}", 'maxQty': '9000000.00000000',
+                     'stepSize': f"{step:.8f}"},
+                    {'filterType': 'MARKET_LOT_SIZE', 'minQty': '0.00000000', 'maxQty': '9000000.00000000',
+                     'stepSize': '0.00000000'},
+                    {'filterType': 'NOTIONAL', 'minNotional': '5.00000000', 'applyMinToMarket': True,
+                     'maxNotional': '9000000.00000000', 'applyMaxToMarket': False},
+                ]}
+
+    def get_exchange_info(self, **kwargs) -> dict:
+        self._call('get_exchange_info')
+        return {'timezone': 'UTC', 'serverTime': self.now_ms(),
+                'symbols': [self._symbol_info(symbol) for symbol in self.symbols]}
+
+    def _book(self, symbol: str):
+        """(bid, ask) quanh giá hiện tại với spread cố định theo symbol"""
+        last = self._current_price(symbol)
+        half_spread = last * (1 + self._seed(symbol) % 40) / 20000
+        return last - half_spread, last + half_spread
+
+    def _check_filters(self, info: dict, quantity: Decimal, price: Decimal, is_market: bool) -> None:
+        filters = {item['filterType']: item for item in info['filters']}
+        step, min_qty = Decimal(filters['LOT_SIZE']['stepSize']), Decimal(filters['LOT_SIZE']['minQty'])
+        if quantity < min_qty or quantity % step:
+            raise _api_error(-1013, 'Filter failure: LOT_SIZE')
+        if not is_market and price % Decimal(filters['PRICE_FILTER']['tickSize']):
+            raise _api_error(-1013, 'Filter failure: PRICE_FILTER')
+        if quantity * price < Decimal(filters['NOTIONAL']['minNotional']):
+            raise _api_error(-1013, 'Filter failure: NOTIONAL')
+
+    def create_order(self, **params) -> dict:
+        self._call('create_order')
+        symbol, side, order_type = params['symbol'], params['side'], params['type']
+        client_id = params.get('newClientOrderId') or f"synthetic-{self._order_seq + 1}"
+        info = self._symbol_info(symbol)
+        base, quote = info['baseAsset'], info['quoteAsset']
+        bid, ask = self._book(symbol)
+        with self._lock:
+            existing = self.orders.get(client_id)
+            if existing is not None:
+                # Như Binance: chỉ chặn id trùng với lệnh đang mở
+                if existing['status'] in ('NEW', 'PARTIALLY_FILLED'):
+                    raise _api_error(-2010, 'Duplicate order sent.')
+                self.duplicate_orders += 1
+
+            market_price = Decimal(f"{ask if side == 'BUY' else bid:.8f}")
+            step = Decimal(info['filters'][1]['stepSize'])
+            if order_type == 'MARKET' and 'quoteOrderQty' in params:
+                quantity = (Decimal(params['quoteOrderQty']) / market_price // step) * step
+            else:
+                quantity = Decimal(params['quantity'])
+            limit_price = Decimal(params['price']) if order_type == 'LIMIT' else market_price
+            self._check_filters(info, quantity, limit_price, order_type == 'MARKET')
+
+            marketable = order_type == 'MARKET' or (limit_price >= market_price if side == 'BUY'
+                                                    else limit_price <= market_price)
+            cost = quantity * (market_price if marketable else limit_price)
+            if (side == 'BUY' and Decimal(str(self.balances[quote])) < cost) or \
+                    (side == 'SELL' and Decimal(str(self.balances[base])) < quantity):
+                raise _api_error(-2010, 'Account has insufficient balance for requested action.')
+
+            self._order_seq += 1
+            now = self.now_ms()
+            order = {'symbol': symbol, 'orderId': self._order_seq, 'clientOrderId': client_id,
+                     'price': f"{limit_price if order_type == 'LIMIT' else 0:.8f}", 'origQty': f"{quantity:.8f}",
+                     'executedQty': '0.00000000', 'cummulativeQuoteQty': '0.00000000', 'status': 'NEW',
+                     'timeInForce': params.get('timeInForce', 'GTC'), 'type': order_type, 'side': side,
+                     'time': now, 'updateTime': now, 'transactTime': now}
+            self.orders[client_id] = order
+            events = [self._execution_report(order, 'NEW')]
+            fills = []
+            if marketable:
+                event = self._fill(order, market_price)
+                fills.append({'price': f"{market_price:.8f}", 'qty': order['executedQty'],
+                              'commission': event['n'], 'commissionAsset': event['N']})
+                events.append(event)
+            else:
+                self._open_orders.add(client_id)
+            seq = self._order_seq
+
+        for listener in self.user_listeners:
+            for event in events:
+                listener(event)
+        if self.lost_ack_every and seq % self.lost_ack_every == 0:
+            from requests.exceptions import ReadTimeout
+            raise ReadTimeout('Synthetic lost ack')
+
+        response_type = params.get('newOrderRespType', 'FULL')
+        response = {'symbol': symbol, 'orderId': order['orderId'], 'clientOrderId': client_id,
+                    'transactTime': order['transactTime']}
+        if response_type != 'ACK':
+            response.update({key: order[key] for key in ('price', 'origQty', 'executedQty', 'cummulativeQuoteQty',
+                                                         'status', 'timeInForce', 'type', 'side')})
+        if response_type == 'FULL':
+            response['fills'] = fills
+        return response
+
+    def _fill(self, order: dict, price: Decimal) -> dict:
+        """Khớp toàn bộ lệnh tại price (gọi khi giữ lock): cập nhật số dư + lệnh, trả executionReport TRADE"""
+        base, quote = self.split_symbol(order['symbol'])
+        quantity = Decimal(order['origQty'])
+        cost = quantity * price
+        if order['side'] == 'BUY':
+            commission, commission_asset = float(quantity) * FEE_RATE, base
+            self.balances[quote] -= float(cost)
+            self.balances[base] += float(quantity) - commission
+        else:
+            commission, commission_asset = float(cost) * FEE_RATE, quote
+            self.balances[base] -= float(quantity)
+            self.balances[quote] += float(cost) - commission
+        order.update(executedQty=f"{quantity:.8f}", cummulativeQuoteQty=f"{cost:.8f}", status='FILLED',
+                     updateTime=self.now_ms())
+        self.trades.append({'symbol': order['symbol'], 'id': len(self.trades) + 1, 'orderId': order['orderId'],
+                            'price': f"{price:.8f}", 'qty': order['executedQty'], 'quoteQty': f"{cost:.8f}",
+                            'commission': f"{commission:.8f}", 'commissionAsset': commission_asset,
+                            'time': order['updateTime'], 'isBuyer': order['side'] == 'BUY'})
+        return self._execution_report(order, 'TRADE', last_qty=quantity, last_price=price,
+                                      commission=commission, commission_asset=commission_asset)
+
+    def match_open_orders(self) -> int:
+        """Khớp các lệnh LIMIT đang chờ mà giá hiện tại đã chạm (tại giá đặt, như lệnh maker)"""
+        events = []
+        with self._lock:
+            for client_id in list(self._open_orders):
+                order = self.orders[client_id]
+                bid, ask = self._book(order['symbol'])
+                price = Decimal(order['price'])
+                if (order['side'] == 'BUY' and ask <= price) or (order['side'] == 'SELL' and bid >= price):
+                    self._open_orders.discard(client_id)
+                    events.append(self._fill(order, price))
+        for listener in self.user_listeners:
+            for event in events:
+                listener(event)
+        return len(events)
+
+    @staticmethod
+    def _execution_report(order: dict, execution_type: str, last_qty: Decimal = Decimal(0),
+                          last_price: Decimal = Decimal(0), commission: float = 0.0,
+                          commission_asset: str = None) -> dict:
+        return {'e': 'executionReport', 'E': order['updateTime'], 's': order['symbol'], 'c': order['clientOrderId'],
+                'S': order['side'], 'o': order['type'], 'f': order['timeInForce'], 'q': order['origQty'],
+                'p': order['price'], 'C': '', 'x': execution_type, 'X': order['status'], 'r': 'NONE',
+                'i': order['orderId'], 'l': f"{last_qty:.8f}", 'z': order['executedQty'], 'L': f"{last_price:.8f}",
+                'n': f"{commission:.8f}", 'N': commission_asset, 'T': order['updateTime'],
+                'Z': order['cummulativeQuoteQty']}
+
+    def get_order(self, symbol: str = None, origClientOrderId: str = None, orderId: int = None, **kwargs) -> dict:
+        self._call('get_order')
+        with self._lock:
+            order = self.orders.get(origClientOrderId)
+            if order is None and orderId is not None:
+                order = next((item for item in self.orders.values() if item['orderId'] == orderId), None)
+            if order is None or order['symbol'] != symbol:
+                raise _api_error(-2013, 'Order does not exist.')
+            return dict(order)
+
+    def get_my_trades(self, symbol: str = None, orderId: int = None, **kwargs) -> List[dict]:
+        self._call('get_my_trades')
+        with self._lock:
+            return [dict(trade) for trade in self.trades
+                    if trade['symbol'] == symbol and (orderId is None or trade['orderId'] == orderId)]
+
+    def get_asset_balance(self, asset: str = None, **kwargs) -> dict:
+        self._call('get_asset_balance')
+        return {'asset': asset, 'free': f"{self.balances[asset]:.8f}", 'locked': '0.00000000'}
+
+    def stream_get_listen_key(self) -> str:
+        self._call('stream_get_listen_key')
+        return 'synthetic-listen-key'
+
+    def stream_keepalive(self, listenKey: str) -> dict:
+        self._call('stream_keepalive')
+        return {}
@@ -0,0 +1,72 @@
+# -*- coding: utf-8 -*-
+"""
+So sánh giải mã nến: cách cũ của get_historical_data (DataFrame 12 cột chuỗi -> to_datetime/to_numeric)
+với kline_decoder (chỉ các cột cần, thẳng sang mảng numpy) và DataFrame view dựng từ mảng đó.
+
+    python -m binance_coin.benchmarks.kline_decode --candles 100 1000 5000 --repeat 200
+"""
+import argparse
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+
+from binance_coin.benchmarks.fake_client import SyntheticClient
+from binance_coin.services.kline_decoder import KLINE_FIELDS, decode_klines, klines_to_frame
+
+
+def legacy_frame(klines):
+    """Đường cũ của TradingBot.get_historical_data"""
+    df = pd.DataFrame(klines, columns=list(KLINE_FIELDS))
+    df = df[['open_time', 'close']].copy()
+    df['open_time'] = pd.to_datetime(df['open_time'], unit='ms')
+    df['close'] = pd.to_numeric(df['close'], errors='coerce')
+    df.dropna(inplace=True)
+    return df
+
+
+def _time_us(func, klines, repeat: int) -> float:
+    func(klines)
+    start = time.perf_counter()
+    for _ in range(repeat):
+        func(klines)
+    return (time.perf_counter() - start) / repeat * 1e6
+
+
+def run(candle_counts, repeat: int) -> list:
+    fake = SyntheticClient(['BTCUSDT'])
+    results = []
+    for count in candle_counts:
+        klines = fake.get_klines(symbol='BTCUSDT', interval='15m', limit=count)
+        # Cùng kết quả với đường cũ
+        legacy, decoded = legacy_frame(klines), decode_klines(klines)
+        assert np.array_equal(legacy['close'].to_numpy(), decoded['close'])
+        assert np.array_equal(legacy['open_time'].to_numpy().astype('datetime64[ms]').astype(np.int64),
+                              decoded['open_time'])
+        results.append({
+            'candles': count,
+            'legacy_us': _time_us(legacy_frame, klines, repeat),
+            'decode_us': _time_us(decode_klines, klines, repeat),
+            'decode_ohlcv_us': _time_us(lambda rows: decode_klines(
+                rows, ('open_time', 'open', 'high', 'low', 'close', 'volume')), klines, repeat),
+            'frame_us': _time_us(klines_to_frame, klines, repeat),
+        })
+    return results
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description='Kline decoding micro-benchmark')
+    parser.add_argument('--candles', type=int, nargs='+', default=[100, 1000, 5000])
+    parser.add_argument('--repeat', type=int, default=200)
+    args = parser.parse_args(argv)
+
+    print(f"{'candles':>8} {'legacy us':>10} {'decode us':>10} {'ohlcv us':>10} {'frame us':>10} {'speedup':>8}")
+    for row in run(args.candles, args.repeat):
+        print(f"{row['candles']:>8} {row['legacy_us']:>10.1f} {row['decode_us']:>10.1f} "
+              f"{row['decode_ohlcv_us']:>10.1f} {row['frame_us']:>10.1f} {row['legacy_us'] / row['decode_us']:>7.1f}x")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,86 @@
+# -*- coding: utf-8 -*-
+"""
+Đo chi phí một lời gọi logger.info() trên thread giao dịch:
+- direct: các handler ghi đồng bộ (như getLog cũ, flush sau mỗi record)
+- queue: QueueHandler + BatchingListener của log_common
+với số handler tăng dần, để thấy chi phí đường nóng của queue không phụ thuộc số handler.
+
+    python -m binance_coin.benchmarks.logging_overhead --records 20000 --handlers 1 3 6
+"""
+import argparse
+import logging
+import os
+import queue
+import sys
+import tempfile
+import time
+from logging.handlers import QueueHandler, RotatingFileHandler
+
+from binance_coin.utils.common import AsciiFilter
+from binance_coin.utils.log_common import BatchFileHandler, BatchingListener
+
+FORMAT = '%(asctime)s - %(levelname)s - %(message)s'
+
+
+def _file_handlers(workdir: str, count: int, handler_class):
+    handlers = []
+    for index in range(count):
+        handler = handler_class(os.path.join(workdir, f"{handler_class.__name__}-{index}.log"),
+                                maxBytes=10 * 1024 * 1024, backupCount=1, encoding='utf-8')
+        handler.addFilter(AsciiFilter())
+        handler.setFormatter(logging.Formatter(FORMAT))
+        handlers.append(handler)
+    return handlers
+
+
+def _measure(logger: logging.Logger, records: int) -> float:
+    start = time.perf_counter()
+    for index in range(records):
+        logger.info("Price: %.4f | MA7: %.4f | MA25: %.4f", 100.0 + index, 99.5, 98.7)
+    return (time.perf_counter() - start) / records * 1e6
+
+
+def run(records: int, handler_counts) -> list:
+    results = []
+    with tempfile.TemporaryDirectory() as workdir:
+        for count in handler_counts:
+            direct = logging.getLogger(f"bench.direct.{count}")
+            direct.propagate = False
+            direct.setLevel(logging.INFO)
+            for handler in _file_handlers(workdir, count, RotatingFileHandler):
+                direct.addHandler(handler)
+            direct_us = _measure(direct, records)
+
+            log_queue = queue.Queue()
+            listener = BatchingListener(log_queue, _file_handlers(workdir, count, BatchFileHandler))
+            listener.start()
+            queued = logging.getLogger(f"bench.queue.{count}")
+            queued.propagate = False
+            queued.setLevel(logging.INFO)
+            queued.addHandler(QueueHandler(log_queue))
+            queue_us = _measure(queued, records)
+            drain_start = time.perf_counter()
+            listener.stop()
+            drain_s = time.perf_counter() - drain_start
+
+            for handler in direct.handlers:
+                handler.close()
+            results.append({'handlers': count, 'direct_us': direct_us, 'queue_us': queue_us, 'drain_s': drain_s})
+    return results
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description='Logging hot-path overhead')
+    parser.add_argument('--records', type=int, default=20000)
+    parser.add_argument('--handlers', type=int, nargs='+', default=[1, 3, 6])
+    args = parser.parse_args(argv)
+
+    print(f"{'handlers':>8} {'direct us/call':>15} {'queue us/call':>14} {'listener drain s':>17}")
+    for result in run(args.records, args.handlers):
+        print(f"{result['handlers']:>8} {result['direct_us']:>15.2f} {result['queue_us']:>14.2f} "
+              f"{result['drain_s']:>17.3f}")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,164 @@
+# -*- coding: utf-8 -*-
+"""
+Kiểm tra đầu-cuối đường tín hiệu -> lệnh -> khớp với sàn giả lập cục bộ:
+REST qua SyntheticClient (độ trễ + mất ack định kỳ) và user data stream qua WebSocket server cục bộ.
+In độ trễ tín hiệu -> ack / -> khớp; mã thoát 1 nếu có lệnh trùng, lệnh lỗi hoặc lệch số dư.
+
+    python -m binance_coin.benchmarks.order_pipeline --orders 96 --latency 0.02 --lost-ack-every 10
+    python -m binance_coin.benchmarks.order_pipeline --order-type LIMIT --limit-offset-bps 25
+"""
+import argparse
+import asyncio
+import json
+import sys
+import threading
+import time
+from typing import Set
+
+from binance_coin.apis.request_scheduler import RequestScheduler, ScheduledClient
+from binance_coin.benchmarks.fake_client import SyntheticClient
+from binance_coin.services.order_executor import ExchangeFilters, OrderExecutor, UserDataStream
+
+
+class UserStreamServer:
+    """WebSocket server cục bộ (thread nền): đẩy executionReport của SyntheticClient tới mọi kết nối /ws/<key>"""
+
+    def __init__(self, host: str = '127.0.0.1', port: int = 0):
+        self.host = host
+        self.port = port
+        self._queues: Set[asyncio.Queue] = set()
+        self._loop = None
+        self._server = None
+        self._ready = threading.Event()
+
+    @property
+    def url(self) -> str:
+        return f"ws://{self.host}:{self.port}"
+
+    async def _handler(self, websocket) -> None:
+        events = asyncio.Queue()
+        self._queues.add(events)
+        try:
+            while True:
+                await websocket.send(json.dumps(await events.get()))
+        finally:
+            self._queues.discard(events)
+
+    def publish(self, event: dict) -> None:
+        """Gọi từ thread của client giả (listener của SyntheticClient)"""
+        for events in list(self._queues):
+            self._loop.call_soon_threadsafe(events.put_nowait, event)
+
+    async def _serve(self) -> None:
+        from websockets.asyncio.server import serve
+        self._server = await serve(self._handler, self.host, self.port)
+        self.port = self._server.sockets[0].getsockname()[1]
+        self._ready.set()
+        await self._server.serve_forever()
+
+    def start(self) -> 'UserStreamServer':
+        self._loop = asyncio.new_event_loop()
+        threading.Thread(target=self._loop.run_until_complete, args=(self._serve(),),
+                         name='user-stream-server', daemon=True).start()
+        self._ready.wait(5)
+        return self
+
+    def stop(self) -> None:
+        if self._server is not None:
+            self._loop.call_soon_threadsafe(self._server.close)
+
+
+def run(args) -> int:
+    symbols = [f"SYM{i:03d}USDT" for i in range(args.symbols)] + ['BTCUSDT', 'ETHUSDT']
+    fake = SyntheticClient(symbols, latency=args.latency, lost_ack_every=args.lost_ack_every)
+    client = ScheduledClient(fake, RequestScheduler())
+    server = UserStreamServer().start()
+    fake.user_listeners.append(server.publish)
+    initial_balances = dict(fake.balances)
+
+    executor = OrderExecutor(client, ExchangeFilters(client), order_type=args.order_type,
+                             quote_amount=args.quote_amount, limit_offset_bps=args.limit_offset_bps,
+                             retry_delay=0.01, workers=args.workers,
+                             # Sàn giả vừa tạo: chưa có lệnh nào từ lần chạy trước, không cần tra trước lần gửi đầu
+                             resume_signal_id=-1).start()
+    stream = UserDataStream(client, executor.on_execution_report, on_reconnect=executor.reconcile,
+                            base_url=server.url).start()
+    if not stream.connected.wait(5):
+        print('❌ user data stream không kết nối được')
+        return 1
+    executor.filters.load()
+
+    # Mỗi symbol luân phiên BUY rồi SELL, mỗi tín hiệu được gửi hai lần (lần sau phải trả về cùng lệnh)
+    records, resubmit_mismatch = [], 0
+    start = time.perf_counter()
+    for i in range(args.orders):
+        symbol, round_index = symbols[i % len(symbols)], i // len(symbols)
+        side = 'BUY' if round_index % 2 == 0 else 'SELL'
+        if side == 'SELL':
+            records[i - len(symbols)].done.wait(10)
+        price = fake.get_symbol_ticker(symbol=symbol)['price']
+        record = executor.submit(symbol, symbol, side, float(price), signal_id=round_index)
+        if executor.submit(symbol, symbol, side, float(price), signal_id=round_index) is not record:
+            resubmit_mismatch += 1
+        records.append(record)
+        if args.gap:
+            time.sleep(args.gap)
+
+    for record in records:
+        record.done.wait(10)
+    # Sự kiện khớp có thể đến sau ack RESULT/ACK một chút
+    deadline = time.monotonic() + 5
+    while time.monotonic() < deadline and any(record.fill_ns is None and record.status == 'FILLED'
+                                              for record in records):
+        time.sleep(0.01)
+    elapsed = time.perf_counter() - start
+    stream.stop()
+    executor.stop()
+    server.stop()
+
+    stats = executor.stats()
+    unfinished = sum(1 for record in records if not record.done.is_set())
+    # Lượng executor nghĩ đang giữ phải khớp phần số dư base asset tăng thêm trên sàn
+    mismatched = []
+    for symbol in symbols:
+        base = fake.split_symbol(symbol)[0]
+        if abs(executor.holdings.get(symbol, 0.0) - (fake.balances[base] - initial_balances.get(base, 0.0))) > 1e-6:
+            mismatched.append(symbol)
+
+    def fmt(item):
+        return ' '.join(f"{name} {value:.2f}ms" for name, value in item.items() if value is not None) or '-'
+
+    print(f"{args.orders} signals on {len(symbols)} symbols ({args.order_type}, {args.workers} workers, "
+          f"latency {args.latency * 1000:.0f}ms, lost ack every {args.lost_ack_every or '-'}) in {elapsed:.2f}s")
+    print(f"  filled {stats['filled']} | rejected {stats['rejected']} | failed {stats['failed']} | "
+          f"retries {stats['retries']} | unfinished {unfinished}")
+    print(f"  signal -> ack : {fmt(stats['ack_ms'])}")
+    print(f"  signal -> fill: {fmt(stats['fill_ms'])}")
+    print(f"  exchange orders {len(fake.orders)} | duplicate orders {fake.duplicate_orders} | "
+          f"resubmit mismatches {resubmit_mismatch} | stream events {stream.event_count} | "
+          f"holding mismatches {len(mismatched)}")
+
+    ok = (not fake.duplicate_orders and not resubmit_mismatch and not unfinished and not mismatched
+          and stats['filled'] == args.orders and len(fake.orders) == args.orders)
+    print('✅ OK' if ok else '❌ FAILED')
+    return 0 if ok else 1
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description='Kiểm tra pipeline thực thi lệnh với sàn giả lập')
+    # Mặc định dưới giới hạn 100 lệnh / 10s của Binance (vượt quá thì RequestScheduler giữ lệnh lại)
+    parser.add_argument('--orders', type=int, default=96)
+    parser.add_argument('--symbols', type=int, default=48)
+    parser.add_argument('--order-type', default='MARKET', choices=['MARKET', 'LIMIT'])
+    parser.add_argument('--quote-amount', type=float, default=20.0)
+    parser.add_argument('--limit-offset-bps', type=float, default=25.0,
+                        help='LIMIT: lệch khỏi giá tín hiệu về phía khớp (spread giả lập tới 40 bps)')
+    parser.add_argument('--latency', type=float, default=0.02, help='độ trễ mỗi request REST (giây)')
+    parser.add_argument('--lost-ack-every', type=int, default=10)
+    parser.add_argument('--workers', type=int, default=4)
+    parser.add_argument('--gap', type=float, default=0.0, help='giây giữa hai tín hiệu')
+    return run(parser.parse_args(argv))
+
+
+if __name__ == '__main__':
+    sys.exit(main())
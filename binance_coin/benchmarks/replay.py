@@ -0,0 +1,306 @@
+# -*- coding: utf-8 -*-
+"""
+Replay thị trường tăng tốc: chạy đúng vòng lặp TradingBot.run() (lịch đóng nến, phân tích, tín hiệu, lệnh)
+trên đồng hồ giả lập SimClock và sàn giả lập cục bộ ReplayClient.
+Dữ liệu: nến ghi sẵn trong KlineStore (--store-dir, vd: data/klines) hoặc nến tổng hợp của SyntheticClient.
+Mỗi lần replay chạy trong một process mới (như benchmarks/cycle.py) và in:
+- thông lượng: số ngày giả lập / giây thật, số chu kỳ, thời gian chu kỳ (giây thật)
+- độ trễ tín hiệu: từ lúc nến đóng tới lúc process_signal (giây giả lập), độ trễ ack/khớp lệnh nếu bật --order-mode
+- digest các tín hiệu: --repeat 2 ở chế độ nhảy (--speed 0) phải cho cùng digest (tái hiện sự cố tất định)
+
+    python -m binance_coin.benchmarks.replay --days 7 --symbols 20
+    python -m binance_coin.benchmarks.replay --speed 500 --days 1 --order-mode market
+    python -m binance_coin.benchmarks.replay --store-dir data/klines --interval 1m --start 2024-03-01 --end 2024-03-02 --repeat 2
+
+--speed 0 (mặc định): thời gian chỉ trôi khi bot chờ, xử lý tốn 0 giây giả lập -> nhanh nhất và tất định.
+--speed N > 0: N lần thời gian thực, thời gian xử lý của bot cũng bị nhân N (đo được chu kỳ chạy lố nến).
+"""
+import argparse
+import hashlib
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from bisect import bisect_left, bisect_right
+from datetime import datetime, timezone
+from typing import Dict, List, Optional
+
+from binance_coin.benchmarks.fake_client import SyntheticClient
+from binance_coin.utils.clock import SimClock
+from binance_coin.utils.common import interval_to_milliseconds
+
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# Ngày bắt đầu mặc định cho dữ liệu tổng hợp (cố định để hai lần chạy giống nhau)
+DEFAULT_START = '2025-01-06'
+
+
+class ReplayClient(SyntheticClient):
+    """
+    SyntheticClient chạy theo SimClock. Symbol có trong recorded ({symbol: nến dạng REST theo interval})
+    lấy nến/giá từ dữ liệu ghi sẵn: nến đang mở chỉ lộ giá mở cửa (không nhìn trước giá đóng),
+    lệnh khớp quanh giá đó. Symbol không có dữ liệu dùng giá tổng hợp như SyntheticClient.
+    """
+
+    def __init__(self, symbols: List[str], interval: str, clock: SimClock,
+                 recorded: Dict[str, List[list]] = None, **kwargs):
+        super().__init__(symbols, interval=interval, **kwargs)
+        self.clock = clock
+        self.interval_ms = interval_to_milliseconds(interval)
+        self.recorded = recorded or {}
+        self._open_times = {symbol: [int(kline[0]) for kline in klines] for symbol, klines in self.recorded.items()}
+
+    def now_ms(self) -> int:
+        return int(self.clock.time() * 1000)
+
+    @staticmethod
+    def _open_candle(kline: list) -> list:
+        open_price = kline[1]
+        return [kline[0], open_price, open_price, open_price, open_price, '0', kline[6], '0', 0, '0', '0', '0']
+
+    def _generate(self, symbol: str, interval: str, start_ms: Optional[int], limit: int) -> List[list]:
+        klines = self.recorded.get(symbol)
+        if klines is None:
+            return super()._generate(symbol, interval, start_ms, limit)
+        if interval != self.interval:
+            raise ValueError(f"Chỉ có nến {self.interval} ghi sẵn cho {symbol}, không có {interval}")
+        now = self.now_ms()
+        open_times = self._open_times[symbol]
+        end = bisect_right(open_times, now)
+        begin = max(0, end - limit) if start_ms is None else bisect_left(open_times, start_ms)
+        rows = klines[begin:min(end, begin + limit)]
+        if rows and int(rows[-1][6]) >= now:
+            rows = rows[:-1] + [self._open_candle(rows[-1])]
+        return rows
+
+    def price_at(self, symbol: str, index: int) -> float:
+        klines = self.recorded.get(symbol)
+        if klines is None:
+            return super().price_at(symbol, index)
+        position = bisect_right(self._open_times[symbol], index * self.interval_ms) - 1
+        if position < 0:
+            return float(klines[0][1])
+        kline = klines[position]
+        return float(kline[1] if int(kline[6]) >= self.now_ms() else kline[4])
+
+
+def load_recorded(store_dir: str, interval: str, symbols: List[str] = None) -> Dict[str, List[list]]:
+    """Toàn bộ nến interval trong KlineStore (symbols rỗng = mọi symbol có trong kho)"""
+    from binance_coin.services.kline_store import KlineStore
+
+    store = KlineStore(store_dir)
+    recorded = {}
+    for symbol in symbols or store.symbols(interval):
+        rows = store.rows(symbol, interval)
+        if rows:
+            recorded[symbol] = store.tail_klines(symbol, interval, rows)
+    return recorded
+
+
+def _parse_time(value: str) -> float:
+    """'2025-01-06' hoặc '2025-01-06T12:00' (UTC) -> epoch giây"""
+    return datetime.fromisoformat(value).replace(tzinfo=timezone.utc).timestamp()
+
+
+def _percentiles(values: List[float]) -> dict:
+    if not values:
+        return {'p50': None, 'p95': None, 'max': None}
+    ordered = sorted(values)
+    return {'p50': statistics.median(ordered), 'p95': ordered[min(len(ordered) - 1, int(len(ordered) * 0.95))],
+            'max': ordered[-1]}
+
+
+def _child(args) -> None:
+    import binance_coin.services.trading_bot as trading_bot
+
+    interval_ms = interval_to_milliseconds(args.interval)
+    recorded = load_recorded(args.store_dir, args.interval, args.symbol) if args.store_dir else {}
+    if args.store_dir and not recorded:
+        raise SystemExit(f"Không có nến {args.interval} trong {args.store_dir}")
+    symbols = sorted(recorded) if recorded else args.symbol_list
+    # Bot đọc danh sách symbol từ env (với dữ liệu ghi sẵn chỉ biết sau khi đọc kho)
+    os.environ['LIST_COIN_SYMBOL'] = '|'.join(symbols)
+
+    if recorded:
+        # Bắt đầu sau warmup nến đầu tiên (đủ lịch sử cho indicator), kết thúc ở nến cuối chung của mọi symbol
+        first = max(klines[min(args.warmup, len(klines) - 1)][0] for klines in recorded.values()) / 1000
+        last = min(int(klines[-1][6]) + 1 for klines in recorded.values()) / 1000
+        start = max(first, _parse_time(args.start)) if args.start else first
+        end = min(last, _parse_time(args.end)) if args.end else last
+    else:
+        start = _parse_time(args.start or DEFAULT_START)
+        end = _parse_time(args.end) if args.end else start + args.days * 86400
+    if end <= start:
+        raise SystemExit('Khoảng replay rỗng (kiểm tra --start/--end và dữ liệu)')
+
+    clock = SimClock(start, speed=args.speed, end=end)
+    exchange = ReplayClient(symbols, args.interval, clock, recorded, latency=args.latency,
+                            history_candles=args.warmup, lost_ack_every=args.lost_ack_every)
+    bot = trading_bot.TradingBot(client=exchange, clock=clock)
+    clock.on_end = bot.stop
+
+    # Bọc process_signal của instance: ghi (nến, symbol, chiến lược, hành động, giá) và độ trễ sau đóng nến
+    signals, latencies = [], []
+    process_signal = bot.process_signal
+
+    def recording_process_signal(symbol, position_suggest, price_suggest, item, strategy=None):
+        now = clock.time()
+        candle_close = int(now * 1000) // interval_ms * interval_ms
+        signals.append((candle_close, symbol, strategy or '', position_suggest.name, round(float(price_suggest), 8)))
+        latencies.append(now - candle_close / 1000)
+        return process_signal(symbol, position_suggest, price_suggest, item, strategy)
+
+    bot.process_signal = recording_process_signal
+
+    wall_start, cpu_start = time.perf_counter(), time.process_time()
+    bot.run()
+    wall, cpu = time.perf_counter() - wall_start, time.process_time() - cpu_start
+
+    simulated = clock.time() - start
+    cycle = bot.metrics.cycle_seconds.snapshot() or {}
+    orders = bot.order_executor.stats() if bot.order_executor is not None else None
+    digest = hashlib.sha1(json.dumps(sorted(signals)).encode('utf-8')).hexdigest()
+    with open(args.result_file, 'w', encoding='utf-8') as f:
+        json.dump({
+            'symbols': len(symbols),
+            'recorded': bool(recorded),
+            'start': start,
+            'end': end,
+            'simulated_s': simulated,
+            'wall_s': wall,
+            'cpu_s': cpu,
+            'cycles': int(bot.metrics.cycles.value()),
+            'cycle_s': cycle,
+            'signals': len(signals),
+            'signal_latency_s': _percentiles(latencies),
+            'orders': orders,
+            'exchange_orders': len(exchange.orders),
+            'duplicate_orders': exchange.duplicate_orders,
+            'digest': digest,
+        }, f)
+
+
+def _run_once(args, workdir: str, run_index: int) -> dict:
+    result_file = os.path.join(workdir, f"result-{run_index}.json")
+    env = dict(os.environ)
+    env.update({
+        'PYTHONPATH': PROJECT_ROOT + os.pathsep + env.get('PYTHONPATH', ''),
+        'API_KEY': 'replay',
+        'SECRET_KEY': 'replay',
+        'TIME_INTERVAL': args.interval,
+        'SCHEDULE_MODE': 'candle',
+        'STREAM_MODE': 'false',
+        'KLINE_STORE_DIR': '',
+        # Mỗi lần chạy bắt đầu từ trạng thái rỗng
+        'STATE_FILE': os.path.join(workdir, f"bot_state-{run_index}.json"),
+        'LOG_FILENAME': os.path.join(workdir, 'trading_bot.log'),
+        'SIGNAL_LOG_FILENAME': os.path.join(workdir, 'signals.log'),
+        'LOG_LEVEL': args.log_level,
+        'ACCOUNT_CHECK': 'off',
+        # RequestScheduler vẫn đo theo giờ thật: nhiều ngày giả lập dồn vào vài giây không được bị giới hạn weight
+        'API_WEIGHT_LIMIT': str(10 ** 9),
+        'MAX_CONCURRENT_SYMBOLS': str(args.concurrency),
+        'ORDER_MODE': args.order_mode,
+        'USER_STREAM': 'off',
+        'METRICS_PORT': '0',
+        'SHARD_DIR': '',
+        'SCREEN_MODE': 'off',
+    })
+    command = [sys.executable, '-m', 'binance_coin.benchmarks.replay', '--child', '--result-file', result_file,
+               *args.child_argv]
+    completed = subprocess.run(command, cwd=workdir, env=env, capture_output=True, text=True)
+    if completed.returncode != 0:
+        raise RuntimeError(f"Replay lỗi:\n{completed.stderr[-2000:]}")
+    with open(result_file, 'r', encoding='utf-8') as f:
+        return json.load(f)
+
+
+def _report(result: dict) -> None:
+    def fmt(item, unit, scale=1.0):
+        return ' '.join(f"{name} {value * scale:.2f}{unit}" for name, value in item.items()
+                        if value is not None) or '-'
+
+    days = result['simulated_s'] / 86400
+    start = datetime.fromtimestamp(result['start'], timezone.utc).strftime('%Y-%m-%d %H:%M')
+    cycle = result['cycle_s']
+    print(f"{'recorded' if result['recorded'] else 'synthetic'} {result['symbols']} symbols from {start} UTC: "
+          f"{days:.2f} simulated days in {result['wall_s']:.2f}s ({days / max(result['wall_s'], 1e-9):.2f} days/s, "
+          f"cpu {result['cpu_s']:.2f}s)")
+    if cycle.get('count'):
+        print(f"  cycles {result['cycles']} | cycle mean {cycle['sum'] / cycle['count'] * 1000:.1f}ms")
+    else:
+        print(f"  cycles {result['cycles']}")
+    print(f"  signals {result['signals']} | candle close -> signal: {fmt(result['signal_latency_s'], 's')}")
+    orders = result['orders']
+    if orders is not None:
+        print(f"  orders: filled {orders['filled']} | rejected {orders['rejected']} | failed {orders['failed']} | "
+              f"retries {orders['retries']} | exchange orders {result['exchange_orders']} | "
+              f"duplicates {result['duplicate_orders']}")
+        print(f"  signal -> ack : {fmt(orders['ack_ms'], 'ms')}")
+        print(f"  signal -> fill: {fmt(orders['fill_ms'], 'ms')}")
+    print(f"  digest {result['digest']}")
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description='Accelerated market replay driving the real TradingBot loop')
+    parser.add_argument('--speed', type=float, default=0.0,
+                        help='số lần nhanh hơn thời gian thực; 0 = chỉ nhảy khi bot chờ (tất định)')
+    parser.add_argument('--days', type=float, default=3.0, help='số ngày replay với dữ liệu tổng hợp')
+    parser.add_argument('--symbols', type=int, default=10, help='số symbol tổng hợp')
+    parser.add_argument('--symbol', action='append', default=[],
+                        help='symbol cụ thể (lặp lại được); với --store-dir: chỉ replay các symbol này')
+    parser.add_argument('--store-dir', default='', help='thư mục KlineStore chứa nến ghi sẵn')
+    parser.add_argument('--interval', default='15m')
+    parser.add_argument('--start', default='', help=f"UTC, vd: 2025-01-06T08:00 (tổng hợp: mặc định {DEFAULT_START})")
+    parser.add_argument('--end', default='')
+    parser.add_argument('--warmup', type=int, default=300, help='số nến lịch sử trước điểm bắt đầu')
+    # LIMIT nằm chờ trên sổ chỉ báo khớp qua user data stream, replay không mở stream nên chỉ hỗ trợ MARKET
+    parser.add_argument('--order-mode', default='off', choices=['off', 'market'])
+    parser.add_argument('--latency', type=float, default=0.0, help='độ trễ mỗi request REST (giây thật)')
+    parser.add_argument('--lost-ack-every', type=int, default=0)
+    parser.add_argument('--concurrency', type=int, default=1)
+    parser.add_argument('--repeat', type=int, default=1, help='chạy lại N lần và so digest')
+    parser.add_argument('--log-level', default='WARNING')
+    parser.add_argument('--output', help='ghi kết quả JSON')
+    parser.add_argument('--child', action='store_true', help=argparse.SUPPRESS)
+    parser.add_argument('--result-file', help=argparse.SUPPRESS)
+    args = parser.parse_args(argv)
+    args.symbol_list = args.symbol or [f"SYM{i:03d}USDT" for i in range(args.symbols)]
+
+    if args.child:
+        _child(args)
+        return 0
+
+    # Process con nhận lại đúng các tham số replay (bỏ các tham số chỉ dành cho process cha)
+    args.child_argv = ['--speed', str(args.speed), '--days', str(args.days), '--symbols', str(args.symbols),
+                       '--interval', args.interval,
+                       '--warmup', str(args.warmup), '--order-mode', args.order_mode,
+                       '--latency', str(args.latency), '--lost-ack-every', str(args.lost_ack_every)]
+    args.child_argv += [f"--symbol={symbol}" for symbol in args.symbol]
+    if args.store_dir:
+        args.child_argv.append(f"--store-dir={os.path.abspath(args.store_dir)}")
+    args.child_argv += [f"--{name}={getattr(args, name)}" for name in ('start', 'end') if getattr(args, name)]
+
+    results = []
+    with tempfile.TemporaryDirectory() as workdir:
+        for run_index in range(args.repeat):
+            result = _run_once(args, workdir, run_index)
+            _report(result)
+            results.append(result)
+
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump({'args': vars(args), 'results': results}, f, indent=2, default=str)
+
+    digests = {result['digest'] for result in results}
+    ok = len(digests) == 1 and not any(result['duplicate_orders'] for result in results)
+    if args.repeat > 1:
+        print('✅ tái hiện tất định' if len(digests) == 1 else f"❌ {len(digests)} digest khác nhau giữa các lần chạy")
+    return 0 if ok else 1
+
+
+if __name__ == '__main__':
+    sys.exit(main())
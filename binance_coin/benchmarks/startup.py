@@ -0,0 +1,145 @@
+# -*- coding: utf-8 -*-
+"""
+Benchmark khởi động: đo thời gian từ lúc tạo process tới tín hiệu đầu tiên (analyze_and_signal đầu tiên xong).
+Mỗi lần đo chạy một process mới với SyntheticClient (không cần mạng/API key), log + state ghi vào thư mục tạm.
+
+    python -m binance_coin.benchmarks.startup --runs 5 --symbols 20 --max-seconds 3
+
+--max-seconds là ngưỡng hồi quy: vượt ngưỡng (median) hoặc import nặng bị nạp sớm -> exit code 1.
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# Các module không được nạp khi chỉ import trading_bot (phải import muộn)
+LAZY_MODULES = ('pandas', 'binance')
+
+
+def _child(args) -> None:
+    ready = time.time()
+    import binance_coin.services.trading_bot as trading_bot
+    imported = time.time()
+    eager = [name for name in LAZY_MODULES if name in sys.modules]
+
+    from binance_coin.apis.binance_client import LazyClient, create_client
+    from binance_coin.benchmarks.fake_client import SyntheticClient
+
+    symbols = os.environ['LIST_COIN_SYMBOL'].split('|')
+    fake = SyntheticClient(symbols, interval=args.interval, latency=args.latency)
+    client = fake
+    if not args.no_binance:
+        # Tạo Client thật (không gọi mạng) ở thread nền như khi chạy thật, nhưng dữ liệu lấy từ client giả
+        client = LazyClient(lambda: create_client('benchmark', 'benchmark') and fake)
+    bot = trading_bot.TradingBot(client=client)
+    initialized = time.time()
+    # Với --no-binance, dựng bot xong vẫn chưa được nạp các module nặng (Client thật thì binance nạp ở thread nền)
+    init_imports = [name for name in LAZY_MODULES if name in sys.modules and name not in eager]
+
+    first_signal = []
+    analyze = bot.analyze_and_signal
+
+    def timed_analyze(*a, **kw):
+        result = analyze(*a, **kw)
+        if not first_signal:
+            first_signal.append(time.time())
+        return result
+    bot.analyze_and_signal = timed_analyze
+    bot.run_single_cycle()
+    finished = time.time()
+
+    spawned = args.spawned_at
+    print(json.dumps({
+        'interpreter_s': ready - spawned,
+        'import_s': imported - ready,
+        'init_s': initialized - imported,
+        'first_signal_s': (first_signal[0] if first_signal else finished) - spawned,
+        'first_cycle_s': finished - spawned,
+        'eager_imports': eager,
+        'init_imports': init_imports,
+        'api_calls': dict(fake.calls),
+    }))
+
+
+def _run_once(args, workdir: str) -> dict:
+    env = dict(os.environ)
+    env.update({
+        'PYTHONPATH': PROJECT_ROOT + os.pathsep + env.get('PYTHONPATH', ''),
+        'API_KEY': 'benchmark',
+        'SECRET_KEY': 'benchmark',
+        'LIST_COIN_SYMBOL': '|'.join(f"SYM{i:04d}USDT" for i in range(args.symbols)),
+        'TIME_INTERVAL': args.interval,
+        'STATE_FILE': os.path.join(workdir, 'bot_state.json'),
+        'KLINE_STORE_DIR': '',
+        'LOG_FILENAME': os.path.join(workdir, 'trading_bot.log'),
+        'SIGNAL_LOG_FILENAME': os.path.join(workdir, 'signals.log'),
+        'STREAM_MODE': 'false',
+        'BATCH_SIGNALS': 'false',
+        'ACCOUNT_CHECK': 'background',
+        'LOG_LEVEL': 'WARNING',
+    })
+    command = [sys.executable, '-m', 'binance_coin.benchmarks.startup', '--child',
+               '--spawned-at', repr(time.time()), '--interval', args.interval, '--latency', str(args.latency)]
+    if args.no_binance:
+        command.append('--no-binance')
+    output = subprocess.run(command, cwd=workdir, env=env, capture_output=True, text=True, check=True).stdout
+    return json.loads(output.strip().splitlines()[-1])
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description='Startup benchmark: time to first signal')
+    parser.add_argument('--runs', type=int, default=5)
+    parser.add_argument('--symbols', type=int, default=20)
+    parser.add_argument('--interval', default='15m')
+    parser.add_argument('--latency', type=float, default=0.0, help='giây trễ giả lập mỗi request')
+    parser.add_argument('--no-binance', action='store_true',
+                        help='bỏ qua việc tạo Client thật (khi chưa cài python-binance)')
+    parser.add_argument('--max-seconds', type=float, default=None, help='ngưỡng median first_signal_s')
+    parser.add_argument('--output', help='ghi kết quả JSON ra file')
+    parser.add_argument('--child', action='store_true', help=argparse.SUPPRESS)
+    parser.add_argument('--spawned-at', type=float, help=argparse.SUPPRESS)
+    args = parser.parse_args(argv)
+
+    if args.child:
+        _child(args)
+        return 0
+
+    runs = []
+    for _ in range(args.runs):
+        with tempfile.TemporaryDirectory() as workdir:
+            runs.append(_run_once(args, workdir))
+
+    summary = {
+        'symbols': args.symbols,
+        'runs': len(runs),
+        'median': {key: statistics.median(run[key] for run in runs)
+                   for key in ('interpreter_s', 'import_s', 'init_s', 'first_signal_s', 'first_cycle_s')},
+        'eager_imports': sorted({name for run in runs for name in run['eager_imports']}),
+        'api_calls': runs[-1]['api_calls'],
+    }
+    for key, value in summary['median'].items():
+        print(f"{key:>16}: {value * 1000:8.1f} ms")
+    print(f"{'eager imports':>16}: {', '.join(summary['eager_imports']) or '-'}")
+    print(f"{'api calls':>16}: {summary['api_calls']}")
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(summary, f, indent=2)
+
+    failed = False
+    if summary['eager_imports']:
+        print(f"❌ Import nặng bị nạp ngay khi import trading_bot: {', '.join(summary['eager_imports'])}")
+        failed = True
+    if args.max_seconds is not None and summary['median']['first_signal_s'] > args.max_seconds:
+        print(f"❌ first_signal_s {summary['median']['first_signal_s']:.3f}s > ngưỡng {args.max_seconds:.3f}s")
+        failed = True
+    return 1 if failed else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,94 @@
+# -*- coding: utf-8 -*-
+"""
+WebSocket server giả lập combined streams của Binance, phát lại các frame đã ghi.
+Dùng để chạy STREAM_MODE mà không cần kết nối Binance thật:
+
+    python -m binance_coin.benchmarks.ws_replay_server frames.jsonl --port 8765
+    STREAM_URL=ws://127.0.0.1:8765 python main.py
+"""
+import argparse
+import asyncio
+import json
+from typing import List
+from urllib.parse import parse_qs, urlparse
+
+
+def load_frames(file_path: str) -> List[dict]:
+    """Mỗi dòng của file là một frame JSON dạng {"stream": ..., "data": {...}}"""
+    frames = []
+    with open(file_path, 'r', encoding='utf-8') as f:
+        for line in f:
+            line = line.strip()
+            if line:
+                frames.append(json.loads(line))
+    return frames
+
+
+class WsReplayServer:
+    """
+    Phát lại frame cho mỗi client kết nối, chỉ gửi các stream mà client đăng ký.
+    drop_after: đóng kết nối sau N frame để thử luồng kết nối lại + backfill.
+    """
+
+    def __init__(self, frames: List[dict], host: str = '127.0.0.1', port: int = 8765,
+                 frame_delay: float = 0.0, drop_after: int = None):
+        self.frames = frames
+        self.host = host
+        self.port = port
+        self.frame_delay = frame_delay
+        self.drop_after = drop_after
+        self.connections = 0
+        self.sent = 0
+        self._server = None
+
+    @property
+    def url(self) -> str:
+        return f"ws://{self.host}:{self.port}"
+
+    async def _handler(self, websocket) -> None:
+        self.connections += 1
+        query = parse_qs(urlparse(websocket.request.path).query)
+        streams = set('/'.join(query.get('streams', [])).split('/'))
+
+        sent_this_connection = 0
+        # Kết nối lại sẽ tiếp tục từ frame chưa gửi
+        while self.sent < len(self.frames):
+            frame = self.frames[self.sent]
+            self.sent += 1
+            if streams and frame.get('stream') not in streams:
+                continue
+            await websocket.send(json.dumps(frame))
+            sent_this_connection += 1
+            if self.frame_delay:
+                await asyncio.sleep(self.frame_delay)
+            if self.drop_after is not None and sent_this_connection >= self.drop_after:
+                await websocket.close()
+                return
+        await websocket.wait_closed()
+
+    async def start(self) -> None:
+        from websockets.asyncio.server import serve
+        self._server = await serve(self._handler, self.host, self.port)
+
+    async def stop(self) -> None:
+        if self._server is not None:
+            self._server.close()
+            await self._server.wait_closed()
+
+    async def serve_forever(self) -> None:
+        await self.start()
+        await self._server.serve_forever()
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Replay recorded Binance WebSocket frames')
+    parser.add_argument('frames_file')
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8765)
+    parser.add_argument('--frame-delay', type=float, default=0.0)
+    parser.add_argument('--drop-after', type=int, default=None)
+    args = parser.parse_args()
+
+    server = WsReplayServer(load_frames(args.frames_file), args.host, args.port, args.frame_delay, args.drop_after)
+    print(f"Replaying {len(server.frames)} frames on {server.url}")
+    asyncio.run(server.serve_forever())
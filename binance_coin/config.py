@@ -37,42 +37,49 @@ class AppConfig:
         Tải cấu hình từ config.yaml và dataRun.yaml.
         Ưu tiên các giá trị trong dataRun.yaml nếu có trùng lặp.
         """
-        app_config = {}
-        data_run_config = {}
-
-        # Tải config.yaml
-        if os.path.exists(APP_CONFIG_PATH):
-            try:
-                with open(APP_CONFIG_PATH, 'r', encoding='utf-8') as f:
-                    app_config = yaml.safe_load(f) or {} # Đảm bảo là dict rỗng nếu file trống
-                logging.info(f"Đã tải cấu hình chung từ: {APP_CONFIG_PATH}")
-            except yaml.YAMLError as e:
-                logging.error(f"Lỗi khi đọc file cấu hình chung '{APP_CONFIG_PATH}': {e}")
-            except IOError as e:
-                logging.error(f"Không thể mở file cấu hình chung '{APP_CONFIG_PATH}': {e}")
-        else:
-            logging.warning(f"Không tìm thấy file cấu hình chung: '{APP_CONFIG_PATH}'. Tiếp tục mà không có.")
-
-        # Tải dataRun.yaml
-        if os.path.exists(DATA_RUN_CONFIG_PATH):
-            try:
-                with open(DATA_RUN_CONFIG_PATH, 'r', encoding='utf-8') as f:
-                    data_run_config = yaml.safe_load(f) or {} # Đảm bảo là dict rỗng nếu file trống
-                logging.info(f"Đã tải cấu hình chạy từ: {DATA_RUN_CONFIG_PATH}")
-            except yaml.YAMLError as e:
-                logging.error(f"Lỗi khi đọc file cấu hình chạy '{DATA_RUN_CONFIG_PATH}': {e}")
-            except IOError as e:
-                logging.error(f"Không thể mở file cấu hình chạy '{DATA_RUN_CONFIG_PATH}': {e}")
-        else:
-            logging.warning(f"Không tìm thấy file cấu hình chạy: '{DATA_RUN_CONFIG_PATH}'. Tiếp tục mà không có.")
-
+        self._config_data, _ = self._read_configs()
+
+    @staticmethod
+    def _read_yaml(path: str, label: str):
+        """(dữ liệu, ok): ok = False nếu file tồn tại nhưng không đọc/parse được"""
+        if not os.path.exists(path):
+            logging.warning(f"Không tìm thấy file cấu hình {label}: '{path}'. Tiếp tục mà không có.")
+            return {}, True
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                data = yaml.safe_load(f) or {} # Đảm bảo là dict rỗng nếu file trống
+            logging.info(f"Đã tải cấu hình {label} từ: {path}")
+            return data, True
+        except yaml.YAMLError as e:
+            logging.error(f"Lỗi khi đọc file cấu hình {label} '{path}': {e}")
+        except IOError as e:
+            logging.error(f"Không thể mở file cấu hình {label} '{path}': {e}")
+        return {}, False
+
+    def _read_configs(self):
+        app_config, app_ok = self._read_yaml(APP_CONFIG_PATH, 'chung')
+        data_run_config, data_run_ok = self._read_yaml(DATA_RUN_CONFIG_PATH, 'chạy')
 
         # Hợp nhất các cấu hình: dataRun.yaml sẽ ghi đè appConfig.yaml nếu có key trùng
         # Sử dụng copy() và update() để tránh sửa đổi trực tiếp các dict gốc
         combined_config = app_config.copy()
         combined_config.update(data_run_config)
+        return combined_config, app_ok and data_run_ok
 
+    def reload(self) -> list:
+        """
+        Đọc lại hai file YAML khi đang chạy (ConfigWatcher gọi khi file thay đổi).
+        File lỗi cú pháp -> giữ nguyên cấu hình cũ. Trả về danh sách key đã thay đổi.
+        """
+        combined_config, ok = self._read_configs()
+        if not ok:
+            logging.error("Giữ nguyên cấu hình cũ vì file cấu hình mới không hợp lệ")
+            return []
+        old_config = self._config_data
+        changed = sorted(key for key in set(old_config) | set(combined_config)
+                         if old_config.get(key) != combined_config.get(key))
         self._config_data = combined_config
+        return changed
 
     def get(self, key: str, default=None):
         """
@@ -0,0 +1,211 @@
+import threading
+from datetime import datetime, timedelta
+from typing import Dict, List, Optional
+
+import numpy as np
+
+from binance_coin.enums.position_state import PositionState
+
+# Thời gian lưu dạng int64 micro-giây tính từ 1970-01-01 (datetime naive, không đổi múi giờ)
+_EPOCH = datetime(1970, 1, 1)
+_MICROSECOND = timedelta(microseconds=1)
+NO_TIME = np.iinfo(np.int64).min
+
+TRADE_DTYPE = np.dtype([
+    ('symbol_id', np.int32),
+    ('buy_time', np.int64),
+    ('buy_price', np.float64),
+    ('sell_time', np.int64),
+    ('sell_price', np.float64),
+    ('profit', np.float64),
+])
+
+
+def datetime_to_micros(value: Optional[datetime]) -> int:
+    return NO_TIME if value is None else (value - _EPOCH) // _MICROSECOND
+
+
+def micros_to_datetime(value: int) -> Optional[datetime]:
+    return None if value == NO_TIME else _EPOCH + timedelta(microseconds=int(value))
+
+
+class PositionTable:
+    """
+    Bảng vị thế dạng struct-of-arrays: mỗi symbol là một dòng (symbol id), mỗi thuộc tính là một mảng numpy.
+    Lịch sử giao dịch (mỗi lần mua-bán hoàn chỉnh) nằm trong một mảng có kiểu cố định, chỉ nối thêm.
+    Mọi thao tác ghi đi qua lock (RLock, dùng chung được với journal qua thuộc tính lock); đọc không cần lock.
+    """
+
+    def __init__(self, capacity: int = 64, history_capacity: int = 256):
+        self._lock = threading.RLock()
+        self._ids: Dict[str, int] = {}
+        self._symbols: List[str] = []
+        self.state = np.full(capacity, PositionState.KHONG_VI_THE.value, dtype=np.int8)
+        self.buy_price = np.full(capacity, np.nan, dtype=np.float64)
+        self.buy_time = np.full(capacity, NO_TIME, dtype=np.int64)
+        self.sell_price = np.full(capacity, np.nan, dtype=np.float64)
+        self.sell_time = np.full(capacity, NO_TIME, dtype=np.int64)
+        self.profit = np.zeros(capacity, dtype=np.float64)
+        # Lượng base asset sổ đang giữ theo khớp lệnh thật (NaN = chưa biết, vd: ORDER_MODE=off)
+        self.quantity = np.full(capacity, np.nan, dtype=np.float64)
+        self._history = np.zeros(history_capacity, dtype=TRADE_DTYPE)
+        self._history_size = 0
+
+    @property
+    def lock(self) -> threading.RLock:
+        return self._lock
+
+    def __len__(self) -> int:
+        return len(self._symbols)
+
+    def __contains__(self, symbol: str) -> bool:
+        return symbol in self._ids
+
+    @property
+    def symbols(self) -> List[str]:
+        return list(self._symbols)
+
+    def symbol_of(self, row: int) -> str:
+        return self._symbols[row]
+
+    def row_of(self, symbol: str) -> Optional[int]:
+        return self._ids.get(symbol)
+
+    def get_or_create(self, symbol: str) -> int:
+        row = self._ids.get(symbol)
+        if row is not None:
+            return row
+        with self._lock:
+            row = self._ids.get(symbol)
+            if row is None:
+                row = len(self._symbols)
+                if row >= len(self.state):
+                    self._grow(len(self.state) * 2)
+                self._symbols.append(symbol)
+                self._ids[symbol] = row
+            return row
+
+    def _grow(self, capacity: int) -> None:
+        def extend(array, fill):
+            grown = np.full(capacity, fill, dtype=array.dtype)
+            grown[:len(array)] = array
+            return grown
+        self.state = extend(self.state, PositionState.KHONG_VI_THE.value)
+        self.buy_price = extend(self.buy_price, np.nan)
+        self.buy_time = extend(self.buy_time, NO_TIME)
+        self.sell_price = extend(self.sell_price, np.nan)
+        self.sell_time = extend(self.sell_time, NO_TIME)
+        self.profit = extend(self.profit, 0.0)
+        self.quantity = extend(self.quantity, np.nan)
+
+    # --- GHI ---
+    def set_row(self, row: int, state: PositionState, buy_price, buy_time: Optional[datetime],
+                sell_price, sell_time: Optional[datetime], profit: float, quantity: float = None) -> None:
+        with self._lock:
+            self.state[row] = state.value
+            self.buy_price[row] = np.nan if buy_price is None else buy_price
+            self.buy_time[row] = datetime_to_micros(buy_time)
+            self.sell_price[row] = np.nan if sell_price is None else sell_price
+            self.sell_time[row] = datetime_to_micros(sell_time)
+            self.profit[row] = profit or 0
+            self.quantity[row] = np.nan if quantity is None else quantity
+
+    def record_buy(self, row: int, price: float, at: datetime) -> None:
+        with self._lock:
+            self.buy_price[row] = price
+            self.buy_time[row] = datetime_to_micros(at)
+            self.state[row] = PositionState.CO_VI_THE.value
+
+    def record_sell(self, row: int, price: float, at: datetime, profit: float) -> None:
+        """Cập nhật dòng và nối một giao dịch hoàn chỉnh vào lịch sử"""
+        with self._lock:
+            self.sell_price[row] = price
+            self.sell_time[row] = datetime_to_micros(at)
+            self.state[row] = PositionState.KHONG_VI_THE.value
+            self.profit[row] = profit
+            self._append_history(row, self.buy_time[row], self.buy_price[row], self.sell_time[row], price, profit)
+
+    def record_quantity(self, row: int, quantity: Optional[float]) -> None:
+        with self._lock:
+            self.quantity[row] = np.nan if quantity is None else quantity
+
+    def _append_history(self, row: int, buy_time: int, buy_price: float, sell_time: int, sell_price: float,
+                        profit: float) -> None:
+        if self._history_size >= len(self._history):
+            grown = np.zeros(len(self._history) * 2, dtype=TRADE_DTYPE)
+            grown[:self._history_size] = self._history[:self._history_size]
+            self._history = grown
+        self._history[self._history_size] = (row, buy_time, buy_price, sell_time, sell_price, profit)
+        self._history_size += 1
+
+    def load_history(self, trades: List[list]) -> None:
+        """Nạp lịch sử từ snapshot: [symbol, buy_time iso, buy_price, sell_time iso, sell_price, profit]"""
+        for symbol, buy_time, buy_price, sell_time, sell_price, profit in trades:
+            row = self.get_or_create(symbol)
+            with self._lock:
+                self._append_history(row,
+                                     datetime_to_micros(datetime.fromisoformat(buy_time) if buy_time else None),
+                                     np.nan if buy_price is None else buy_price,
+                                     datetime_to_micros(datetime.fromisoformat(sell_time) if sell_time else None),
+                                     sell_price, profit)
+
+    # --- ĐỌC ---
+    @property
+    def history(self) -> np.ndarray:
+        """Mảng cấu trúc TRADE_DTYPE của mọi giao dịch đã đóng (view, không copy)"""
+        return self._history[:self._history_size]
+
+    def history_rows(self, symbol: str = None) -> List[list]:
+        """Lịch sử dạng JSON được (để ghi snapshot); symbol: chỉ lấy giao dịch của symbol đó"""
+        history = self.history
+        if symbol is not None:
+            row = self._ids.get(symbol)
+            if row is None:
+                return []
+            history = history[history['symbol_id'] == row]
+        rows = []
+        for trade in history:
+            buy_time = micros_to_datetime(int(trade['buy_time']))
+            sell_time = micros_to_datetime(int(trade['sell_time']))
+            rows.append([self._symbols[trade['symbol_id']],
+                         buy_time.isoformat() if buy_time else None,
+                         None if np.isnan(trade['buy_price']) else float(trade['buy_price']),
+                         sell_time.isoformat() if sell_time else None,
+                         float(trade['sell_price']), float(trade['profit'])])
+        return rows
+
+    def realized_profit_by_symbol(self) -> Dict[str, float]:
+        """Tổng % lợi nhuận đã chốt theo symbol (bincount trên lịch sử)"""
+        history = self.history
+        totals = np.bincount(history['symbol_id'], weights=history['profit'], minlength=len(self._symbols))
+        return {symbol: float(totals[row]) for row, symbol in enumerate(self._symbols) if totals[row]}
+
+    def open_positions(self) -> List[str]:
+        rows = np.flatnonzero(self.state[:len(self._symbols)] == PositionState.CO_VI_THE.value)
+        return [self._symbols[row] for row in rows]
+
+    def unrealized_profit(self, prices: Dict[str, float]) -> Dict[str, float]:
+        """% lãi/lỗ tạm tính của các vị thế đang mở theo bảng giá"""
+        n = len(self._symbols)
+        current = np.array([prices.get(symbol, np.nan) for symbol in self._symbols], dtype=np.float64)
+        is_open = self.state[:n] == PositionState.CO_VI_THE.value
+        with np.errstate(invalid='ignore', divide='ignore'):
+            profit = (current / self.buy_price[:n] - 1) * 100
+        rows = np.flatnonzero(is_open & ~np.isnan(profit))
+        return {self._symbols[row]: float(profit[row]) for row in rows}
+
+    def summary(self) -> dict:
+        history = self.history
+        profits = history['profit']
+        return {
+            'symbols': len(self._symbols),
+            'open_positions': int((self.state[:len(self._symbols)] == PositionState.CO_VI_THE.value).sum()),
+            'trades': int(len(history)),
+            'win_rate': float((profits > 0).mean() * 100) if len(profits) else 0.0,
+            'total_profit': float(profits.sum()),
+        }
+
+    def nbytes(self) -> int:
+        """Bộ nhớ của các cột + lịch sử (không tính chỉ mục symbol)"""
+        return sum(array.nbytes for array in (self.state, self.buy_price, self.buy_time, self.sell_price,
+                                              self.sell_time, self.profit, self.quantity, self._history))
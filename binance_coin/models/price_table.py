@@ -0,0 +1,59 @@
+import threading
+import time
+from typing import Callable, Dict, Iterable, Optional, Tuple
+
+
+class PriceTable:
+    """
+    Bảng giá trong bộ nhớ theo symbol: symbol -> (price, timestamp_ms).
+    Được nạp một lần mỗi chu kỳ bằng snapshot toàn bộ symbol, hoặc cập nhật lẻ từ ticker stream.
+    """
+
+    def __init__(self, clock: Callable[[], float] = time.time):
+        self._prices: Dict[str, Tuple[float, int]] = {}
+        self._lock = threading.Lock()
+        self._clock = clock
+        self.snapshot_time: Optional[int] = None
+
+    def _now_ms(self) -> int:
+        return int(self._clock() * 1000)
+
+    def load_snapshot(self, tickers: Iterable[dict], symbols: Iterable[str] = None) -> int:
+        """
+        Nạp kết quả client.get_all_tickers() ([{'symbol': ..., 'price': ...}, ...]).
+        Nếu truyền symbols thì chỉ giữ các symbol đó. Trả về số giá đã nạp.
+        """
+        wanted = set(symbols) if symbols is not None else None
+        now = self._now_ms()
+        prices = {}
+        for ticker in tickers:
+            symbol = ticker['symbol']
+            if wanted is None or symbol in wanted:
+                prices[symbol] = (float(ticker['price']), now)
+        with self._lock:
+            self._prices.update(prices)
+            self.snapshot_time = now
+        return len(prices)
+
+    def set(self, symbol: str, price: float, timestamp: int = None) -> None:
+        with self._lock:
+            self._prices[symbol] = (price, timestamp if timestamp is not None else self._now_ms())
+
+    def get(self, symbol: str, max_age_ms: int = None) -> Optional[float]:
+        """Giá của symbol, None nếu chưa có hoặc cũ hơn max_age_ms"""
+        entry = self._prices.get(symbol)
+        if entry is None:
+            return None
+        price, timestamp = entry
+        if max_age_ms is not None and self._now_ms() - timestamp > max_age_ms:
+            return None
+        return price
+
+    def get_entry(self, symbol: str) -> Optional[Tuple[float, int]]:
+        return self._prices.get(symbol)
+
+    def __contains__(self, symbol: str) -> bool:
+        return symbol in self._prices
+
+    def __len__(self) -> int:
+        return len(self._prices)
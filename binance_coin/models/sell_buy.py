@@ -1,47 +1,140 @@
 from datetime import datetime
 
+import numpy as np
+
 from binance_coin.enums.position_state import PositionState
+from binance_coin.models.position_table import PositionTable, micros_to_datetime
+
+
+def calculate_profit(buy_price, sell_price):
+    """ % lợi nhuận của một lần mua-bán (dùng được cho cả float lẫn mảng numpy) """
+    return ((sell_price / buy_price) - 1) * 100
+
+
+def _price_or_none(value):
+    return None if np.isnan(value) else float(value)
+
 
 class SellBuy:
+    """ View mỏng lên một dòng của PositionTable (không có __dict__ riêng) """
+    __slots__ = ('_table', '_row', '_listener')
+
+    def __init__(self, coin_symbol, sell_time: datetime = None, sell_price: float = None, buy_time: datetime = None, buy_price: float = None, listener=None, table: PositionTable = None):
+        self._table = table if table is not None else PositionTable(capacity=1, history_capacity=1)
+        self._row = self._table.get_or_create(coin_symbol)
+        # Callback (symbol, action, price, time) được gọi sau mỗi lần mua/bán, vd: ghi journal
+        self._listener = listener
+        if any(value is not None for value in (sell_time, sell_price, buy_time, buy_price)):
+            self._table.set_row(self._row, PositionState.KHONG_VI_THE, buy_price, buy_time, sell_price, sell_time, 0)
+
+    @classmethod
+    def view(cls, table: PositionTable, row: int, listener=None) -> 'SellBuy':
+        """ Tạo view lên dòng đã có, không ghi gì vào bảng """
+        item = object.__new__(cls)
+        item._table = table
+        item._row = row
+        item._listener = listener
+        return item
+
+    @property
+    def coin_symbol(self) -> str:
+        return self._table.symbol_of(self._row)
 
-    def __init__(self, coin_symbol, sell_time: datetime = None, sell_price: float = None, buy_time: datetime = None, buy_price: float = None):
-        self.__coin_symbol = coin_symbol
-        self.__sell_time = sell_time
-        self.__sell_price = sell_price  # Giá bán
-        self.__buy_time = buy_time
-        self.__buy_price = buy_price  # Giá mua
-        self.__position_active: PositionState = PositionState.KHONG_VI_THE
-        self.__profit: float = 0
+    @property
+    def buy_price(self):
+        return _price_or_none(self._table.buy_price[self._row])
+
+    @property
+    def sell_price(self):
+        return _price_or_none(self._table.sell_price[self._row])
+
+    @property
+    def quantity(self):
+        """ Lượng base asset sổ đang giữ theo khớp lệnh thật, None nếu chưa biết """
+        return _price_or_none(self._table.quantity[self._row])
+
+    @property
+    def buy_time(self):
+        return micros_to_datetime(self._table.buy_time[self._row])
+
+    @property
+    def sell_time(self):
+        return micros_to_datetime(self._table.sell_time[self._row])
 
     def __str__(self):
-        return (f"Sell at {self.__sell_time}, Price: {self.__sell_price}\n"
-                f"Buy at {self.__buy_time}, Price: {self.__buy_price}")
+        return (f"Sell at {self.sell_time}, Price: {self.sell_price}\n"
+                f"Buy at {self.buy_time}, Price: {self.buy_price}")
 
     def is_buy(self) -> bool:
-        return self.__buy_time is None
+        return self.buy_time is None
 
     def is_sell(self) -> bool:
-        return self.__sell_time is None
+        return self.sell_time is None
 
-    def buy(self, amount: float) -> None:
-        self.__buy_price = amount
-        self.__buy_time = datetime.now()
-        self.__position_active = PositionState.CO_VI_THE
+    def buy(self, amount: float, at: datetime = None) -> None:
+        at = at or datetime.now()
+        # Cập nhật bảng và ghi journal trong cùng một lock để snapshot luôn nhất quán với seq của journal
+        with self._table.lock:
+            self._table.record_buy(self._row, amount, at)
+            if self._listener is not None:
+                self._listener(self.coin_symbol, 'BUY', amount, at)
 
-    def sell(self, amount: float) -> None:
+    def sell(self, amount: float, at: datetime = None) -> None:
         """ Cap nhat trang thai khi Ban COIN """
-        self.__sell_price = amount
-        self.__sell_time = datetime.now()
-        self.__position_active = PositionState.KHONG_VI_THE
-        self.__profit = ((self.__sell_price / self.__buy_price) - 1) * 100
+        at = at or datetime.now()
+        with self._table.lock:
+            profit = calculate_profit(self.buy_price, amount)
+            self._table.record_sell(self._row, amount, at, profit)
+            if self._listener is not None:
+                self._listener(self.coin_symbol, 'SELL', amount, at)
+
+    def set_quantity(self, quantity, at: datetime = None) -> None:
+        """ Cập nhật lượng đang giữ sau khi lệnh thật kết thúc (None = không còn biết chắc) """
+        at = at or datetime.now()
+        with self._table.lock:
+            self._table.record_quantity(self._row, quantity)
+            if self._listener is not None:
+                self._listener(self.coin_symbol, 'QTY', quantity, at)
+
+    def set_listener(self, listener) -> None:
+        self._listener = listener
 
     def get_profit_price(self) -> float:
         """ So sánh về giá khi không còn vị thế """
-        return self.__profit
+        return float(self._table.profit[self._row])
 
     def check_other_current_position(self, position_suggest: PositionState) -> bool:
         """ Truyền vào trạng thái tool suggest. Kiểm tra xem có khác vị the hiện tại không """
-        return self.__position_active == position_suggest
+        return self.get_position() == position_suggest
 
     def get_position(self) -> PositionState:
-        return self.__position_active
+        return PositionState(int(self._table.state[self._row]))
+
+    def to_dict(self) -> dict:
+        sell_time, buy_time = self.sell_time, self.buy_time
+        return {
+            "coin_symbol": self.coin_symbol,
+            "sell_time": sell_time.isoformat() if sell_time else None,
+            "sell_price": self.sell_price,
+            "buy_time": buy_time.isoformat() if buy_time else None,
+            "buy_price": self.buy_price,
+            "position_active": self.get_position().name,
+            "profit": self.get_profit_price(),
+            "quantity": self.quantity
+        }
+
+    @classmethod
+    def from_dict(cls, data: dict, listener=None, table: PositionTable = None) -> 'SellBuy':
+        table = table if table is not None else PositionTable(capacity=1, history_capacity=1)
+        row = table.get_or_create(data["coin_symbol"])
+        table.set_row(
+            row,
+            PositionState[data.get("position_active", PositionState.KHONG_VI_THE.name)],
+            data.get("buy_price"),
+            datetime.fromisoformat(data["buy_time"]) if data.get("buy_time") else None,
+            data.get("sell_price"),
+            datetime.fromisoformat(data["sell_time"]) if data.get("sell_time") else None,
+            data.get("profit") or 0,
+            data.get("quantity"),
+        )
+        return cls.view(table, row, listener)
@@ -0,0 +1,98 @@
+# -*- coding: utf-8 -*-
+"""
+Theo dõi file cấu hình (.env, config.yaml, dataRun.yaml) khi bot đang chạy để áp dụng thay đổi không cần restart.
+Polling mtime + kích thước (không cần inotify, chạy được trên ổ mạng); một thay đổi chỉ được báo khi file
+đã đứng yên một lượt poll (không đọc phải file editor đang ghi dở).
+"""
+import os
+import threading
+from typing import Callable, Dict, List, Mapping, Optional, Sequence, Tuple
+
+import binance_coin.utils.log_common as logCommon
+
+
+def _signature(path: str) -> Optional[Tuple[int, int]]:
+    try:
+        stat = os.stat(path)
+    except OSError:
+        return None
+    return stat.st_mtime_ns, stat.st_size
+
+
+class ConfigWatcher:
+    """
+    Gọi on_change(các file đã đổi) trên thread nền. File chưa tồn tại cũng được theo dõi (tạo mới = thay đổi).
+    """
+
+    def __init__(self, paths: Sequence[str], on_change: Callable[[List[str]], None], interval: float = 2.0):
+        self.logger = logCommon.getLog(__name__)
+        self.paths = [os.path.abspath(path) for path in dict.fromkeys(paths) if path]
+        self.on_change = on_change
+        self.interval = interval
+        self._signatures: Dict[str, Optional[Tuple[int, int]]] = {path: _signature(path) for path in self.paths}
+        # File vừa đổi ở lượt poll trước, chờ đứng yên
+        self._settling = set()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def poll(self) -> List[str]:
+        """Các file đã đổi và đã đứng yên kể từ lượt poll trước"""
+        changed = []
+        for path in self.paths:
+            signature = _signature(path)
+            if signature != self._signatures[path]:
+                self._signatures[path] = signature
+                self._settling.add(path)
+            elif path in self._settling:
+                self._settling.discard(path)
+                changed.append(path)
+        return changed
+
+    def start(self) -> 'ConfigWatcher':
+        self._thread = threading.Thread(target=self._run, name='config-watcher', daemon=True)
+        self._thread.start()
+        return self
+
+    def _run(self) -> None:
+        while not self._stop.wait(self.interval):
+            changed = self.poll()
+            if not changed:
+                continue
+            try:
+                self.on_change(changed)
+            except Exception as e:
+                self.logger.error(f"❌ Lỗi khi áp dụng cấu hình mới từ {', '.join(changed)}: {e}")
+
+    def stop(self) -> None:
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout=self.interval + 1)
+            self._thread = None
+
+
+def diff_env(previous: Mapping[str, Optional[str]], current: Mapping[str, Optional[str]],
+             environ: Mapping[str, str] = os.environ) -> Dict[str, Optional[str]]:
+    """
+    Thay đổi cần ghi vào os.environ sau khi file .env đổi: {key: giá trị mới, None = xóa}.
+    Chỉ đụng tới key mà giá trị đang dùng đến từ file: biến đặt từ shell / systemd vẫn được ưu tiên
+    như load_dotenv lúc khởi động.
+    """
+    changes = {}
+    for key, value in current.items():
+        if value is None or previous.get(key) == value:
+            continue
+        if key in environ and environ[key] != previous.get(key):
+            continue
+        changes[key] = value
+    for key, value in previous.items():
+        if key not in current and environ.get(key) == value:
+            changes[key] = None
+    return changes
+
+
+def apply_env(changes: Mapping[str, Optional[str]], environ=os.environ) -> None:
+    for key, value in changes.items():
+        if value is None:
+            environ.pop(key, None)
+        else:
+            environ[key] = value
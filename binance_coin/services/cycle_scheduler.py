@@ -0,0 +1,124 @@
+# -*- coding: utf-8 -*-
+import threading
+import time
+from typing import Callable, Optional
+
+from binance_coin.utils.common import interval_offset_ms, interval_to_milliseconds
+
+TICK_CANDLE = 'candle'
+TICK_PRICE = 'price'
+TICK_WAKE = 'wake'
+
+
+class CandleScheduler:
+    """
+    Lịch chạy bám theo thời điểm đóng nến của TIME_INTERVAL thay vì sleep cố định sau mỗi chu kỳ.
+    - Thời điểm chạy = lúc nến đóng + grace_seconds (chờ Binance chốt nến), tính từ mốc nến nên không bị trôi.
+    - Chờ bằng deadline monotonic (không bị ảnh hưởng khi đồng hồ hệ thống nhảy trong lúc ngủ).
+    - price_tick_seconds > 0: giữa hai lần đóng nến thức dậy định kỳ chỉ để làm mới giá.
+    - Nếu chu kỳ chạy quá một hoặc nhiều nến, chạy ngay một lần cho nến mới nhất (bỏ các nến đã lỡ).
+    - interrupt(): đánh thức lần chờ hiện tại (hoặc kế tiếp) sớm, vd: để áp dụng cấu hình mới.
+    """
+
+    def __init__(self, interval: str, grace_seconds: float = 2.0, price_tick_seconds: float = 0,
+                 clock: Callable[[], float] = time.time, monotonic: Callable[[], float] = time.monotonic,
+                 waiter: Callable[[threading.Event, Optional[float]], bool] = threading.Event.wait):
+        self.interval = interval
+        self.interval_ms = interval_to_milliseconds(interval)
+        self.offset_ms = interval_offset_ms(interval)
+        self.grace_ms = int(grace_seconds * 1000)
+        self.price_tick_seconds = price_tick_seconds
+        self._clock = clock
+        self._monotonic = monotonic
+        # waiter(event, timeout): chờ event tối đa timeout giây theo đồng hồ của scheduler
+        self._waiter = waiter
+        # Được set bởi stop() hoặc interrupt()
+        self._wake = threading.Event()
+        self._stopped = False
+        self._last_index: Optional[int] = None
+        self._next_price_tick: Optional[float] = None
+        self.missed_candles = 0
+
+    def _now_ms(self) -> int:
+        return int(self._clock() * 1000)
+
+    def _due_index(self, now_ms: int) -> int:
+        """Chỉ số của nến gần nhất đã đóng + hết grace tại now_ms (mốc đóng = (index + 1) * interval)"""
+        return (now_ms - self.offset_ms - self.grace_ms) // self.interval_ms - 1
+
+    def fire_time_ms(self, index: int) -> int:
+        """Thời điểm (ms epoch) chạy cho nến index: lúc nến đóng + grace"""
+        return (index + 1) * self.interval_ms + self.offset_ms + self.grace_ms
+
+    def mark_started(self) -> None:
+        """Gọi khi chạy chu kỳ đầu tiên ngay lúc khởi động (chưa chờ): lần chờ sau sẽ tới nến kế tiếp"""
+        self._last_index = self._due_index(self._now_ms())
+
+    def next_fire_ms(self) -> int:
+        due = self._due_index(self._now_ms())
+        if self._last_index is None or due > self._last_index:
+            # Chưa chạy cho nến mới nhất (hoặc đã lỡ nến) -> nến kế tiếp là nến đó, chạy ngay
+            target = due if self._last_index is not None else due + 1
+        else:
+            target = self._last_index + 1
+        return self.fire_time_ms(target)
+
+    def wait_next(self) -> Optional[str]:
+        """
+        Chờ tới sự kiện kế tiếp: TICK_CANDLE (phân tích đầy đủ), TICK_PRICE (chỉ làm mới giá),
+        TICK_WAKE nếu interrupt() được gọi, None nếu stop() được gọi.
+        """
+        now_ms = self._now_ms()
+        due = self._due_index(now_ms)
+        if self._last_index is not None and due > self._last_index:
+            self.missed_candles += max(0, due - self._last_index - 1)
+            self._last_index = due
+            return TICK_CANDLE
+
+        target_index = (self._last_index + 1) if self._last_index is not None else due + 1
+        # Quy đổi mốc đồng hồ thực sang deadline monotonic một lần
+        candle_deadline = self._monotonic() + (self.fire_time_ms(target_index) - now_ms) / 1000
+
+        if self.price_tick_seconds > 0:
+            if self._next_price_tick is None:
+                self._next_price_tick = self._monotonic() + self.price_tick_seconds
+            if self._next_price_tick < candle_deadline:
+                if not self._sleep_until(self._next_price_tick):
+                    return self._woken()
+                self._next_price_tick += self.price_tick_seconds
+                if self._next_price_tick < self._monotonic():
+                    self._next_price_tick = self._monotonic() + self.price_tick_seconds
+                return TICK_PRICE
+
+        if not self._sleep_until(candle_deadline):
+            return self._woken()
+        self._last_index = max(target_index, self._due_index(self._now_ms()))
+        self._next_price_tick = None
+        return TICK_CANDLE
+
+    def _sleep_until(self, deadline: float) -> bool:
+        """Ngủ tới deadline monotonic; False nếu bị stop() / interrupt()"""
+        while True:
+            if self._wake.is_set():
+                return False
+            remaining = deadline - self._monotonic()
+            if remaining <= 0:
+                return True
+            if self._waiter(self._wake, remaining):
+                return False
+
+    def _woken(self) -> Optional[str]:
+        if self._stopped:
+            return None
+        self._wake.clear()
+        return TICK_WAKE
+
+    def seconds_until_next(self) -> float:
+        return max(0.0, (self.next_fire_ms() - self._now_ms()) / 1000)
+
+    def interrupt(self) -> None:
+        self._wake.set()
+
+    def stop(self) -> None:
+        self._stopped = True
+        self._wake.set()
@@ -0,0 +1,187 @@
+# -*- coding: utf-8 -*-
+import math
+from collections import deque, namedtuple
+from typing import Dict, Optional, Sequence, Tuple
+
+# Sai số cho phép so với pandas rolling().mean(): |a - b| <= MA_TOLERANCE * max(1, |b|)
+MA_TOLERANCE = 1e-9
+
+MovingAverages = namedtuple('MovingAverages', ['ma_fast', 'ma_slow', 'prev_ma_fast', 'prev_ma_slow', 'count'])
+
+
+class _RunningSum:
+    """Tổng trượt có bù sai số Kahan để không bị trôi số khi cộng/trừ liên tục"""
+    __slots__ = ('total', '_compensation')
+
+    def __init__(self):
+        self.total = 0.0
+        self._compensation = 0.0
+
+    def add(self, value: float) -> None:
+        y = value - self._compensation
+        t = self.total + y
+        self._compensation = (t - self.total) - y
+        self.total = t
+
+    def reset(self, values) -> None:
+        self.total = math.fsum(values)
+        self._compensation = 0.0
+
+
+class _SymbolMovingAverage:
+    """Trạng thái MA nhanh/chậm của một (symbol, interval)"""
+
+    def __init__(self, fast: int, slow: int):
+        self.fast = fast
+        self.slow = slow
+        self.closes = deque(maxlen=slow)
+        self.fast_sum = _RunningSum()
+        self.slow_sum = _RunningSum()
+        self.last_open_time = None
+        self.count = 0
+        self.prev_ma_fast = None
+        self.prev_ma_slow = None
+
+    def ma_fast(self) -> Optional[float]:
+        return self.fast_sum.total / self.fast if len(self.closes) >= self.fast else None
+
+    def ma_slow(self) -> Optional[float]:
+        return self.slow_sum.total / self.slow if len(self.closes) >= self.slow else None
+
+    def update(self, open_time, close: float) -> None:
+        """Nến cùng open_time thì thay giá đóng cửa, nến mới hơn thì nối thêm. O(1)"""
+        if self.last_open_time is not None and open_time == self.last_open_time:
+            self._replace_last(close)
+        elif self.last_open_time is None or open_time > self.last_open_time:
+            self._append(close)
+            self.last_open_time = open_time
+
+    def _append(self, close: float) -> None:
+        # Giá trị MA hiện tại trở thành giá trị của nến trước
+        self.prev_ma_fast = self.ma_fast()
+        self.prev_ma_slow = self.ma_slow()
+
+        closes = self.closes
+        if len(closes) >= self.fast:
+            self.fast_sum.add(-closes[-self.fast])
+        if len(closes) == self.slow:
+            self.slow_sum.add(-closes[0])
+        closes.append(close)
+        self.fast_sum.add(close)
+        self.slow_sum.add(close)
+        self.count += 1
+
+        # Đồng bộ lại tổng chính xác mỗi khi cửa sổ chậm quay hết một vòng (chi phí khấu hao O(1))
+        if self.count % self.slow == 0:
+            self._resync()
+
+    def _replace_last(self, close: float) -> None:
+        delta = close - self.closes[-1]
+        self.closes[-1] = close
+        self.fast_sum.add(delta)
+        self.slow_sum.add(delta)
+
+    def _resync(self) -> None:
+        values = list(self.closes)
+        self.fast_sum.reset(values[-self.fast:])
+        self.slow_sum.reset(values)
+
+    def snapshot(self) -> MovingAverages:
+        return MovingAverages(self.ma_fast(), self.ma_slow(), self.prev_ma_fast, self.prev_ma_slow, self.count)
+
+
+class MovingAverageEngine:
+    """
+    Tính MA nhanh/chậm (mặc định MA7/MA25) tăng dần cho từng (symbol, interval).
+    Mỗi nến mới hoặc mỗi lần nến đang mở thay đổi chỉ tốn O(1), không tính lại toàn bộ DataFrame.
+    """
+
+    def __init__(self, fast: int = 7, slow: int = 25):
+        if fast >= slow:
+            raise ValueError("fast window phải nhỏ hơn slow window")
+        self.fast = fast
+        self.slow = slow
+        self._states: Dict[Tuple[str, str], _SymbolMovingAverage] = {}
+
+    @property
+    def min_candles(self) -> int:
+        """Số nến tối thiểu để có MA hiện tại và MA của nến trước (giống điều kiện len(df) >= 3 sau dropna)"""
+        return self.slow + 2
+
+    def update(self, symbol: str, interval: str, open_time, close: float) -> MovingAverages:
+        """Cập nhật một nến (đã đóng hoặc đang mở)"""
+        state = self._get_state(symbol, interval)
+        state.update(open_time, close)
+        return state.snapshot()
+
+    def sync(self, symbol: str, interval: str, open_times: Sequence, closes: Sequence[float]) -> MovingAverages:
+        """
+        Đồng bộ với chuỗi nến đầy đủ (vd: từ KlineCache).
+        Chỉ xử lý các nến có open_time >= nến cuối đã thấy, duyệt ngược từ cuối nên thường chỉ 1-2 nến.
+        """
+        state = self._get_state(symbol, interval)
+        last = state.last_open_time
+        start = len(open_times)
+        while start > 0 and (last is None or open_times[start - 1] >= last):
+            start -= 1
+        for i in range(start, len(open_times)):
+            state.update(open_times[i], float(closes[i]))
+        return state.snapshot()
+
+    def get(self, symbol: str, interval: str) -> Optional[MovingAverages]:
+        state = self._states.get((symbol, interval))
+        return state.snapshot() if state else None
+
+    def reset(self, symbol: str, interval: str = None) -> None:
+        for key in list(self._states):
+            if key[0] == symbol and (interval is None or key[1] == interval):
+                del self._states[key]
+
+    def _get_state(self, symbol: str, interval: str) -> _SymbolMovingAverage:
+        key = (symbol, interval)
+        state = self._states.get(key)
+        if state is None:
+            state = _SymbolMovingAverage(self.fast, self.slow)
+            self._states[key] = state
+        return state
+
+
+def verify_against_pandas(n_candles: int = 2000, seed: int = 7) -> float:
+    """
+    So sánh engine với pandas rolling().mean() trên chuỗi giá ngẫu nhiên, có cả cập nhật nến đang mở.
+    Trả về sai số tương đối lớn nhất, raise AssertionError nếu vượt MA_TOLERANCE.
+    """
+    import random
+    import pandas as pd
+
+    rnd = random.Random(seed)
+    engine = MovingAverageEngine()
+    closes = []
+    price = 100.0
+    max_error = 0.0
+    for open_time in range(n_candles):
+        price *= 1 + rnd.uniform(-0.01, 0.01)
+        closes.append(price)
+        engine.update('TEST', '15m', open_time, price)
+        # Nến đang mở thay đổi vài lần trước khi đóng
+        for _ in range(rnd.randint(0, 2)):
+            price *= 1 + rnd.uniform(-0.002, 0.002)
+            closes[-1] = price
+            engine.update('TEST', '15m', open_time, price)
+
+        if len(closes) >= engine.min_candles:
+            series = pd.Series(closes[-(engine.slow + 2):])
+            expected_fast = series.rolling(engine.fast).mean().iloc[-2:]
+            expected_slow = series.rolling(engine.slow).mean().iloc[-2:]
+            ma = engine.get('TEST', '15m')
+            pairs = [(ma.prev_ma_fast, expected_fast.iloc[0]), (ma.ma_fast, expected_fast.iloc[1]),
+                     (ma.prev_ma_slow, expected_slow.iloc[0]), (ma.ma_slow, expected_slow.iloc[1])]
+            for actual, expected in pairs:
+                error = abs(actual - expected) / max(1.0, abs(expected))
+                max_error = max(max_error, error)
+                assert error <= MA_TOLERANCE, f"Lệch pandas tại nến {open_time}: {actual} != {expected}"
+    return max_error
+
+
+if __name__ == '__main__':
+    print(f"Sai số tương đối lớn nhất so với pandas: {verify_against_pandas():.3e} (cho phép {MA_TOLERANCE:.0e})")
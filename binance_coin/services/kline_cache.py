@@ -0,0 +1,175 @@
+# -*- coding: utf-8 -*-
+import threading
+import time
+from collections import deque
+from typing import Callable, Deque, Dict, List, Set, Tuple
+
+import binance_coin.utils.log_common as logCommon
+from binance_coin.utils.common import interval_to_milliseconds
+
+# Số nến tối đa mà Binance trả về cho một request get_klines
+KLINE_REQUEST_LIMIT = 1000
+
+
+class KlineCache:
+    """
+    Cache nến theo từng cặp (symbol, interval).
+    Lần đầu tải toàn bộ lookback, các lần sau chỉ hỏi những nến từ nến cuối cùng trong cache trở đi.
+    Nếu có KlineStore: seed từ kho trên đĩa + REST cho phần còn thiếu, và ghi nến đã đóng xuống kho.
+    """
+
+    def __init__(self, client, max_candles: int = 1000, lookback: str = "5 days ago UTC", store=None,
+                 clock: Callable[[], float] = time.time):
+        self.logger = logCommon.getLog(__name__)
+        self._client = client
+        self._clock = clock
+        self._store = store
+        self._max_candles = max_candles
+        self._lookback = lookback
+        self._candles: Dict[Tuple[str, str], Deque[list]] = {}
+        # Các key đang được WebSocket cập nhật trực tiếp -> không cần gọi REST
+        self._live: Set[Tuple[str, str]] = set()
+        self.hits = 0
+        self.misses = 0
+        # Bảo vệ bộ đếm khi nhiều worker cùng đọc cache
+        self._stats_lock = threading.Lock()
+
+    def get_klines(self, symbol: str, interval: str, lookback: str = None) -> List[list]:
+        """
+        Trả về danh sách nến (định dạng raw của Binance) cho symbol/interval.
+        Nến cuối (đang mở) được thay thế tại chỗ, nến mới được nối thêm, cửa sổ bị giới hạn bởi max_candles.
+        """
+        key = (symbol, interval)
+        candles = self._candles.get(key)
+
+        if not candles:
+            self._count(miss=True)
+            return self._seed(key, lookback or self._lookback)
+
+        self._count(miss=False)
+        if key in self._live:
+            return list(candles)
+
+        # Hỏi từ open_time của nến cuối (= close_time của nến trước + 1) để cập nhật nến đang mở
+        new_klines = self._client.get_klines(symbol=symbol, interval=interval,
+                                             startTime=candles[-1][0], limit=KLINE_REQUEST_LIMIT)
+        if len(new_klines) >= KLINE_REQUEST_LIMIT:
+            # Khoảng trống quá lớn (bot dừng lâu) -> tải lại từ đầu
+            self.logger.debug(f"Khoảng trống dữ liệu lớn cho {symbol} {interval}, tải lại cache")
+            self._count(miss=True)
+            return self._seed(key, lookback or self._lookback)
+
+        self._merge(candles, new_klines)
+        self._persist(key, candles)
+        return list(candles)
+
+    def _count(self, miss: bool) -> None:
+        with self._stats_lock:
+            if miss:
+                self.misses += 1
+            else:
+                self.hits += 1
+
+    def _seed(self, key: Tuple[str, str], lookback: str) -> List[list]:
+        symbol, interval = key
+        stored = []
+        if self._store is not None:
+            try:
+                stored = self._store.tail_klines(symbol, interval, self._max_candles)
+            except ValueError as e:
+                # Kho định dạng cũ: tải lại qua REST, lần ghi kế tiếp dựng lại kho đủ cột
+                self.logger.warning(f"⚠️ Không seed được {symbol} {interval} từ kho: {e}")
+
+        # Không tải xa hơn cửa sổ cache: kho cũ (bot dừng lâu) không kéo theo tải nhiều trang mỗi symbol
+        interval_ms = interval_to_milliseconds(interval)
+        window_start = int(self._clock() * 1000) // interval_ms * interval_ms - (self._max_candles - 1) * interval_ms
+        if stored and stored[-1][0] >= window_start:
+            # Chỉ tải phần nến sau nến cuối trong kho (bỏ phần trước khoảng trống do lần tải cửa sổ bên dưới)
+            candles = deque(self._contiguous_tail(stored, interval_ms), maxlen=self._max_candles)
+            self._merge(candles, self._client.get_historical_klines(symbol, interval, stored[-1][0]))
+        else:
+            # Kho quá cũ: nến trong kho nằm ngoài cửa sổ (ghép vào sẽ có khoảng trống) -> chỉ tải cửa sổ cache
+            klines = self._client.get_historical_klines(symbol, interval, window_start if stored else lookback)
+            if not klines:
+                self._candles.pop(key, None)
+                return []
+            candles = deque(klines, maxlen=self._max_candles)
+
+        self._candles[key] = candles
+        self._persist(key, candles)
+        return list(candles)
+
+    @staticmethod
+    def _contiguous_tail(klines: List[list], interval_ms: int) -> List[list]:
+        start = len(klines) - 1
+        while start > 0 and klines[start][0] - klines[start - 1][0] == interval_ms:
+            start -= 1
+        return klines[start:]
+
+    def _persist(self, key: Tuple[str, str], candles: Deque[list]) -> None:
+        """Ghi các nến đã đóng chưa có trong kho (duyệt ngược từ cuối, thường chỉ 1-2 nến)"""
+        if self._store is None:
+            return
+        symbol, interval = key
+        try:
+            last_stored = self._store.last_open_time(symbol, interval)
+            now_ms = int(self._clock() * 1000)
+            closed = []
+            for kline in reversed(candles):
+                if last_stored is not None and kline[0] <= last_stored:
+                    break
+                if kline[6] < now_ms:
+                    closed.append(kline)
+            if closed:
+                self._store.append(symbol, interval, closed)
+        except Exception as e:
+            self.logger.error(f"❌ Lỗi khi ghi nến {symbol} {interval} vào kho: {e}")
+
+    @staticmethod
+    def _merge(candles: Deque[list], new_klines: List[list]) -> None:
+        for kline in new_klines:
+            last_open_time = candles[-1][0]
+            if kline[0] == last_open_time:
+                candles[-1] = kline
+            elif kline[0] > last_open_time:
+                candles.append(kline)
+
+    def update(self, symbol: str, interval: str, klines: List[list]) -> bool:
+        """
+        Gộp nến nhận từ nguồn ngoài (WebSocket) vào cache.
+        Trả về False nếu key chưa được seed (cần gọi get_klines trước).
+        """
+        candles = self._candles.get((symbol, interval))
+        if not candles:
+            return False
+        self._merge(candles, klines)
+        self._persist((symbol, interval), candles)
+        return True
+
+    def set_live(self, symbol: str, interval: str, live: bool) -> None:
+        """Bật/tắt chế độ live: khi bật, get_klines chỉ đọc cache, không gọi REST"""
+        if live:
+            self._live.add((symbol, interval))
+        else:
+            self._live.discard((symbol, interval))
+
+    def invalidate(self, symbol: str = None, interval: str = None) -> None:
+        """Xóa cache của một symbol/interval, hoặc toàn bộ nếu không truyền tham số"""
+        if symbol is None:
+            self._candles.clear()
+            self._live.clear()
+            return
+        for key in list(self._candles):
+            if key[0] == symbol and (interval is None or key[1] == interval):
+                del self._candles[key]
+                self._live.discard(key)
+
+    def stats(self) -> dict:
+        """Thống kê hit/miss của cache"""
+        total = self.hits + self.misses
+        return {
+            'hits': self.hits,
+            'misses': self.misses,
+            'hit_rate': (self.hits / total) if total else 0.0,
+            'entries': len(self._candles),
+        }
@@ -0,0 +1,44 @@
+# -*- coding: utf-8 -*-
+"""
+Giải mã nến dạng REST (list 12 cột, số dạng chuỗi; nến WebSocket được đổi sang cùng dạng ở stream_feed)
+thành mảng numpy có kiểu: thời gian int64 (ms), giá/khối lượng float64.
+Chỉ đọc các cột được yêu cầu, mỗi cột một lượt chuyển đổi trong C (không tạo DataFrame 12 cột chuỗi).
+"""
+from operator import itemgetter
+from typing import TYPE_CHECKING, Dict, Sequence
+
+import numpy as np
+
+if TYPE_CHECKING:
+    # pandas chỉ được import khi dựng DataFrame (klines_to_frame)
+    import pandas as pd
+
+KLINE_FIELDS = ('open_time', 'open', 'high', 'low', 'close', 'volume', 'close_time', 'quote_asset_volume',
+                'number_of_trades', 'taker_buy_base_asset_volume', 'taker_buy_quote_asset_volume', 'ignore')
+KLINE_INDEX = {name: index for index, name in enumerate(KLINE_FIELDS)}
+INT_FIELDS = frozenset(('open_time', 'close_time', 'number_of_trades'))
+
+
+def decode_klines(klines: Sequence[list], columns: Sequence[str] = ('open_time', 'close')) -> Dict[str, np.ndarray]:
+    """{tên cột: mảng} cho các cột yêu cầu; ValueError nếu có giá trị không phải số"""
+    count = len(klines)
+    result = {}
+    for name in columns:
+        getter = itemgetter(KLINE_INDEX[name])
+        if name in INT_FIELDS:
+            result[name] = np.fromiter(map(getter, klines), dtype=np.int64, count=count)
+        else:
+            # numpy parse thẳng list chuỗi sang float64 (list chỉ giữ tham chiếu tới chuỗi sẵn có)
+            result[name] = np.array(list(map(getter, klines)), dtype=np.float64)
+    return result
+
+
+def klines_to_frame(klines: Sequence[list], columns: Sequence[str] = ('open_time', 'close')) -> 'pd.DataFrame':
+    """DataFrame cho nơi cần pandas: cùng dạng với get_historical_data cũ (open_time là datetime64)"""
+    import pandas as pd
+
+    data = decode_klines(klines, columns)
+    for name in ('open_time', 'close_time'):
+        if name in data:
+            data[name] = pd.to_datetime(data[name], unit='ms')
+    return pd.DataFrame(data, columns=list(columns))
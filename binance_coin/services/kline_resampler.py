@@ -0,0 +1,289 @@
+# -*- coding: utf-8 -*-
+"""
+Dựng nến khung lớn (1h, 4h, ...) từ nến khung cơ sở (vd 15m) đã có trong KlineCache, không cần tải thêm.
+
+Kiểm tra với nến native của Binance đã ghi lại:
+    python -m binance_coin.services.kline_resampler --store-dir data/klines --symbol BTCUSDT --base 15m --target 1h
+    python -m binance_coin.services.kline_resampler --base-csv BTCUSDT-15m.csv --native-csv BTCUSDT-1h.csv --base 15m --target 1h
+
+Ghi lại nến từ Binance (API public, không cần key) thành CSV cho lệnh trên / fixture của tests:
+    python -m binance_coin.services.kline_resampler --record tests/fixtures/klines --symbol BTCUSDT --base 1m \
+        --target 15m --start 2025-01-06T00:00 --end 2025-01-06T03:00
+"""
+import argparse
+import csv
+import sys
+from collections import deque
+from typing import Deque, Dict, List, Optional, Sequence, Tuple
+
+from binance_coin.utils.common import interval_offset_ms, interval_to_milliseconds
+
+# Cột cộng dồn: volume, quote_asset_volume, number_of_trades, taker_buy_base, taker_buy_quote
+SUMMED_COLUMNS = (5, 7, 8, 9, 10)
+# Cột so sánh khi kiểm tra: open, high, low, close, volume, quote_asset_volume, number_of_trades
+COMPARED_COLUMNS = {1: 'open', 2: 'high', 3: 'low', 4: 'close', 5: 'volume', 7: 'quote_volume', 8: 'trades'}
+
+
+def bucket_start(open_time: int, target_ms: int, offset_ms: int = 0) -> int:
+    """open_time của nến khung lớn chứa nến bắt đầu tại open_time"""
+    return (open_time - offset_ms) // target_ms * target_ms + offset_ms
+
+
+class _Bucket:
+    """Nến khung lớn đang gộp (giá trị float, xuất ra định dạng REST khi cần)"""
+    __slots__ = ('open_time', 'open', 'high', 'low', 'close', 'sums')
+
+    def __init__(self, open_time: int):
+        self.open_time = open_time
+        self.open = None
+        self.high = float('-inf')
+        self.low = float('inf')
+        self.close = None
+        self.sums = [0.0] * len(SUMMED_COLUMNS)
+
+    def add(self, kline: list) -> '_Bucket':
+        if self.open is None:
+            self.open = float(kline[1])
+        self.high = max(self.high, float(kline[2]))
+        self.low = min(self.low, float(kline[3]))
+        self.close = float(kline[4])
+        for i, column in enumerate(SUMMED_COLUMNS):
+            self.sums[i] += float(kline[column])
+        return self
+
+    def copy(self) -> '_Bucket':
+        bucket = _Bucket(self.open_time)
+        bucket.open, bucket.high, bucket.low, bucket.close = self.open, self.high, self.low, self.close
+        bucket.sums = list(self.sums)
+        return bucket
+
+    def to_kline(self, target_ms: int) -> list:
+        volume, quote_volume, trades, taker_base, taker_quote = self.sums
+        return [self.open_time, f"{self.open:.8f}", f"{self.high:.8f}", f"{self.low:.8f}", f"{self.close:.8f}",
+                f"{volume:.8f}", self.open_time + target_ms - 1, f"{quote_volume:.8f}", int(round(trades)),
+                f"{taker_base:.8f}", f"{taker_quote:.8f}", '0']
+
+
+class _ResampleState:
+    __slots__ = ('completed', 'bucket', 'pending', 'skip_before')
+
+    def __init__(self, max_candles: int):
+        # Nến khung lớn đã đóng (định dạng REST)
+        self.completed: Deque[list] = deque(maxlen=max_candles)
+        # Phần đã chốt (gồm các nến cơ sở đã đóng) của nến khung lớn hiện tại
+        self.bucket: Optional[_Bucket] = None
+        # Nến cơ sở mới nhất: có thể còn đang mở và bị thay thế ở lần cập nhật sau
+        self.pending: Optional[list] = None
+        # Bỏ qua nến cơ sở trước mốc này (nến khung lớn đầu tiên bị thiếu phần đầu)
+        self.skip_before: Optional[int] = None
+
+
+class KlineResampler:
+    """
+    Gộp nến cơ sở thành nến khung lớn theo từng (symbol, target_interval), tăng dần:
+    mỗi lần update chỉ xử lý các nến cơ sở mới/được thay thế kể từ lần trước.
+    - Nến cơ sở cuối (có thể đang mở) chỉ được gộp tạm vào nến khung lớn cuối, chưa chốt.
+    - Nến khung lớn đầu tiên nếu lịch sử cơ sở không bắt đầu đúng mốc sẽ bị bỏ (open sai).
+    """
+
+    def __init__(self, base_interval: str, max_candles: int = 1000):
+        self.base_interval = base_interval
+        self.base_ms = interval_to_milliseconds(base_interval)
+        self.max_candles = max_candles
+        self._states: Dict[Tuple[str, str], _ResampleState] = {}
+
+    def supports(self, interval: str) -> bool:
+        """interval là bội số của khung cơ sở (và mốc của nến cơ sở trùng mốc khung lớn)"""
+        try:
+            target_ms = interval_to_milliseconds(interval)
+        except ValueError:
+            return False
+        return (target_ms > self.base_ms and target_ms % self.base_ms == 0
+                and interval_offset_ms(interval) % self.base_ms == 0)
+
+    def closes_bucket(self, base_kline: list, interval: str) -> bool:
+        """True nếu nến cơ sở này là nến cuối cùng của một nến khung lớn (dùng khi nhận nến đóng từ stream)"""
+        next_open = base_kline[0] + self.base_ms
+        return bucket_start(next_open, interval_to_milliseconds(interval), interval_offset_ms(interval)) == next_open
+
+    def update(self, symbol: str, interval: str, base_klines: Sequence[list]) -> List[list]:
+        """Gộp các nến cơ sở mới và trả về toàn bộ nến khung lớn (nến cuối có thể đang hình thành)"""
+        if not self.supports(interval):
+            raise ValueError(f"Không resample được {self.base_interval} -> {interval}")
+        target_ms, offset_ms = interval_to_milliseconds(interval), interval_offset_ms(interval)
+        key = (symbol, interval)
+        state = self._states.get(key)
+        if not base_klines:
+            return self._output(state, target_ms, offset_ms) if state else []
+
+        if state is not None and state.pending is not None and base_klines[0][0] > state.pending[0]:
+            # Cache đã tải lại với khoảng trống -> dựng lại từ đầu
+            state = None
+        if state is None:
+            state = self._states[key] = _ResampleState(self.max_candles)
+            first = base_klines[0][0]
+            if bucket_start(first, target_ms, offset_ms) != first:
+                state.skip_before = bucket_start(first, target_ms, offset_ms) + target_ms
+            start = 0
+        else:
+            # Chỉ xử lý từ nến pending trở đi (duyệt ngược, thường 1-2 nến)
+            start = len(base_klines)
+            while start > 0 and base_klines[start - 1][0] >= state.pending[0]:
+                start -= 1
+
+        for kline in base_klines[start:]:
+            if state.skip_before is not None and kline[0] < state.skip_before:
+                continue
+            if state.pending is None or kline[0] == state.pending[0]:
+                state.pending = kline
+            elif kline[0] > state.pending[0]:
+                self._commit(state, state.pending, target_ms, offset_ms)
+                state.pending = kline
+        return self._output(state, target_ms, offset_ms)
+
+    @staticmethod
+    def _commit(state: _ResampleState, kline: list, target_ms: int, offset_ms: int) -> None:
+        """Chốt một nến cơ sở đã đóng vào nến khung lớn của nó"""
+        start = bucket_start(kline[0], target_ms, offset_ms)
+        if state.bucket is not None and state.bucket.open_time != start:
+            state.completed.append(state.bucket.to_kline(target_ms))
+            state.bucket = None
+        if state.bucket is None:
+            state.bucket = _Bucket(start)
+        state.bucket.add(kline)
+
+    @staticmethod
+    def _output(state: _ResampleState, target_ms: int, offset_ms: int) -> List[list]:
+        klines = list(state.completed)
+        bucket, pending = state.bucket, state.pending
+        if pending is None:
+            if bucket is not None:
+                klines.append(bucket.to_kline(target_ms))
+            return klines
+        pending_start = bucket_start(pending[0], target_ms, offset_ms)
+        if bucket is not None and bucket.open_time == pending_start:
+            klines.append(bucket.copy().add(pending).to_kline(target_ms))
+        else:
+            if bucket is not None:
+                klines.append(bucket.to_kline(target_ms))
+            klines.append(_Bucket(pending_start).add(pending).to_kline(target_ms))
+        return klines
+
+    def reset(self, symbol: str = None) -> None:
+        if symbol is None:
+            self._states.clear()
+            return
+        for key in [key for key in self._states if key[0] == symbol]:
+            del self._states[key]
+
+
+def resample_klines(base_klines: Sequence[list], base_interval: str, target_interval: str) -> List[list]:
+    """Resample một lần cả chuỗi (dùng để kiểm tra / backtest)"""
+    return KlineResampler(base_interval, max_candles=len(base_klines) + 1).update('_', target_interval, base_klines)
+
+
+def compare_klines(resampled: Sequence[list], native: Sequence[list], tolerance: float = 1e-8) -> dict:
+    """So sánh nến resample với nến native theo open_time (chỉ các nến có ở cả hai phía)"""
+    native_by_time = {int(kline[0]): kline for kline in native}
+    compared, mismatches = 0, []
+    max_error = {name: 0.0 for name in COMPARED_COLUMNS.values()}
+    for kline in resampled:
+        other = native_by_time.get(int(kline[0]))
+        if other is None:
+            continue
+        compared += 1
+        for column, name in COMPARED_COLUMNS.items():
+            ours, theirs = float(kline[column]), float(other[column])
+            error = abs(ours - theirs) / max(1.0, abs(theirs))
+            max_error[name] = max(max_error[name], error)
+            if error > tolerance:
+                mismatches.append((int(kline[0]), name, ours, theirs))
+    return {'compared': compared, 'mismatches': mismatches, 'max_error': max_error}
+
+
+def _read_csv_klines(file_path: str) -> List[list]:
+    """CSV nến của data.binance.vision (12 cột, có thể có header)"""
+    klines = []
+    with open(file_path, 'r', encoding='utf-8') as f:
+        for row in csv.reader(f):
+            if not row or not row[0].strip().isdigit():
+                continue
+            open_time = int(row[0])
+            # File từ 2025 dùng micro-giây
+            if open_time > 10 ** 14:
+                open_time //= 1000
+            klines.append([open_time] + row[1:6] + [int(row[6])] + [row[7], int(row[8])] + row[9:12])
+    return klines
+
+
+def _write_csv_klines(file_path: str, klines: Sequence[list]) -> None:
+    with open(file_path, 'w', encoding='utf-8', newline='') as f:
+        csv.writer(f).writerows(klines)
+
+
+def record_klines(out_dir: str, symbol: str, intervals: Sequence[str], start: str, end: str) -> List[str]:
+    """Tải nến [start, end) của từng interval từ Binance và ghi <out_dir>/<SYMBOL>-<interval>.csv"""
+    import os
+
+    from binance.client import Client
+    from binance.helpers import convert_ts_str
+
+    client = Client(ping=False)
+    end_ms = convert_ts_str(end) if end else None
+    paths = []
+    for interval in intervals:
+        klines = client.get_historical_klines(symbol, interval, start, end)
+        # end_str của python-binance tính cả nến mở đúng lúc end
+        klines = [kline for kline in klines if end_ms is None or kline[0] < end_ms]
+        path = os.path.join(out_dir, f"{symbol}-{interval}.csv")
+        _write_csv_klines(path, klines)
+        paths.append(path)
+    return paths
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description='Kiểm tra nến resample so với nến native đã ghi lại')
+    parser.add_argument('--base', default='15m')
+    parser.add_argument('--target', default='1h')
+    parser.add_argument('--store-dir', help='KlineStore có cả hai interval')
+    parser.add_argument('--symbol', default='BTCUSDT')
+    parser.add_argument('--base-csv')
+    parser.add_argument('--native-csv')
+    parser.add_argument('--tolerance', type=float, default=1e-8)
+    parser.add_argument('--record', metavar='DIR', help='tải nến --base và --target từ Binance (--start/--end) vào DIR')
+    parser.add_argument('--start', help="vd: 2025-01-06T00:00 hoặc '1 day ago UTC'")
+    parser.add_argument('--end')
+    args = parser.parse_args(argv)
+
+    if args.record:
+        if not args.start:
+            parser.error('--record cần --start')
+        for path in record_klines(args.record, args.symbol, (args.base, args.target), args.start, args.end):
+            print(f"✅ {path}")
+        return 0
+    if args.store_dir:
+        from binance_coin.services.kline_store import KlineStore
+        store = KlineStore(args.store_dir)
+        base = store.tail_klines(args.symbol, args.base, store.rows(args.symbol, args.base))
+        native = store.tail_klines(args.symbol, args.target, store.rows(args.symbol, args.target))
+    elif args.base_csv and args.native_csv:
+        base, native = _read_csv_klines(args.base_csv), _read_csv_klines(args.native_csv)
+    else:
+        parser.error('cần --store-dir hoặc --base-csv + --native-csv')
+
+    # Bỏ nến khung lớn cuối nếu dữ liệu cơ sở chưa phủ hết
+    resampled = resample_klines(base, args.base, args.target)
+    if base and not KlineResampler(args.base).closes_bucket(base[-1], args.target):
+        resampled = resampled[:-1]
+    result = compare_klines(resampled, native, args.tolerance)
+    print(f"{args.symbol} {args.base} -> {args.target}: {len(resampled)} resampled, {result['compared']} compared, "
+          f"{len(result['mismatches'])} mismatches")
+    for name, error in result['max_error'].items():
+        print(f"  max rel error {name:>12}: {error:.3e}")
+    for open_time, name, ours, theirs in result['mismatches'][:10]:
+        print(f"  ❌ {open_time} {name}: {ours} != {theirs}")
+    return 1 if result['mismatches'] or not result['compared'] else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
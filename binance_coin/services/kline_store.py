@@ -0,0 +1,167 @@
+# -*- coding: utf-8 -*-
+import json
+import os
+import threading
+from typing import Dict, List, Optional, Sequence
+
+import numpy as np
+
+import binance_coin.utils.log_common as logCommon
+
+# Thư mục mặc định: <project>/data/klines/<SYMBOL>/<interval>/<column>.bin
+PROJECT_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), os.pardir, os.pardir))
+DEFAULT_STORE_DIR = os.path.join(PROJECT_ROOT, 'data', 'klines')
+
+# Cột cố định độ rộng (little-endian) và vị trí tương ứng trong mảng nến REST của Binance (mọi cột số)
+COLUMNS = {
+    'open_time': ('<i8', 0),
+    'open': ('<f8', 1),
+    'high': ('<f8', 2),
+    'low': ('<f8', 3),
+    'close': ('<f8', 4),
+    'volume': ('<f8', 5),
+    'close_time': ('<i8', 6),
+    'quote_asset_volume': ('<f8', 7),
+    'trades': ('<i8', 8),
+    'taker_buy_base_asset_volume': ('<f8', 9),
+    'taker_buy_quote_asset_volume': ('<f8', 10),
+}
+# Kho ghi trước khi meta.json có 'columns' chỉ có các cột này
+LEGACY_COLUMNS = ['open_time', 'open', 'high', 'low', 'close', 'volume', 'trades']
+META_FILE = 'meta.json'
+
+
+class KlineStore:
+    """
+    Kho nến dạng cột, append-only, mỗi (symbol, interval) một thư mục, mỗi cột một file nhị phân.
+    Số dòng đã commit nằm trong meta.json (ghi atomic bằng os.replace) nên đuôi file ghi dở bị bỏ qua
+    và được cắt đi ở lần append kế tiếp. Đọc bằng numpy.memmap, không cần parse.
+    Cột không có trong kho (kho định dạng cũ) không bao giờ được điền giá trị giả: read / tail_klines
+    báo ValueError, append ghi lại kho từ đầu với đủ cột.
+    """
+
+    def __init__(self, root: str = DEFAULT_STORE_DIR):
+        self.logger = logCommon.getLog(__name__)
+        self.root = root
+        self._locks: Dict[tuple, threading.Lock] = {}
+        self._locks_guard = threading.Lock()
+
+    def _path(self, symbol: str, interval: str, name: str = '') -> str:
+        return os.path.join(self.root, symbol.upper(), interval, name)
+
+    def _lock(self, symbol: str, interval: str) -> threading.Lock:
+        with self._locks_guard:
+            return self._locks.setdefault((symbol, interval), threading.Lock())
+
+    def _read_meta(self, symbol: str, interval: str) -> dict:
+        try:
+            with open(self._path(symbol, interval, META_FILE), 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except (FileNotFoundError, ValueError):
+            return {'rows': 0, 'last_open_time': None, 'columns': list(COLUMNS)}
+
+    def _write_meta(self, symbol: str, interval: str, meta: dict) -> None:
+        path = self._path(symbol, interval, META_FILE)
+        tmp_path = path + '.tmp'
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(meta, f)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, path)
+
+    def rows(self, symbol: str, interval: str) -> int:
+        return self._read_meta(symbol, interval)['rows']
+
+    def last_open_time(self, symbol: str, interval: str) -> Optional[int]:
+        return self._read_meta(symbol, interval)['last_open_time']
+
+    def columns(self, symbol: str, interval: str) -> List[str]:
+        """Các cột kho thật sự lưu cho (symbol, interval)"""
+        return self._read_meta(symbol, interval).get('columns', LEGACY_COLUMNS)
+
+    def symbols(self, interval: str) -> List[str]:
+        """Các symbol đã có dữ liệu cho interval"""
+        if not os.path.isdir(self.root):
+            return []
+        return sorted(symbol for symbol in os.listdir(self.root)
+                      if os.path.isfile(self._path(symbol, interval, META_FILE)))
+
+    def append(self, symbol: str, interval: str, klines: Sequence[list]) -> int:
+        """
+        Nối các nến ĐÃ ĐÓNG (định dạng REST 12 cột) vào kho.
+        Nến có open_time <= nến cuối đã lưu bị bỏ qua. Trả về số nến được ghi.
+        """
+        with self._lock(symbol, interval):
+            meta = self._read_meta(symbol, interval)
+            if meta.get('columns', LEGACY_COLUMNS) != list(COLUMNS) and meta['rows']:
+                self.logger.warning(f"⚠️ Kho nến {symbol} {interval} định dạng cũ (thiếu cột), ghi lại từ đầu")
+                meta = {'rows': 0, 'last_open_time': None}
+            last_open_time = meta['last_open_time']
+            new_rows = [kline for kline in klines if last_open_time is None or int(kline[0]) > last_open_time]
+            if not new_rows:
+                return 0
+            new_rows.sort(key=lambda kline: int(kline[0]))
+
+            os.makedirs(self._path(symbol, interval), exist_ok=True)
+            committed = meta['rows']
+            for column, (dtype, index) in COLUMNS.items():
+                values = np.array([kline[index] for kline in new_rows], dtype=np.float64).astype(dtype)
+                with open(self._path(symbol, interval, f'{column}.bin'), 'ab') as f:
+                    # Cắt phần đuôi của lần ghi trước bị gián đoạn (chưa commit trong meta)
+                    if f.tell() != committed * 8:
+                        f.truncate(committed * 8)
+                        f.seek(committed * 8)
+                    f.write(values.tobytes())
+                    f.flush()
+                    os.fsync(f.fileno())
+
+            meta = {'rows': committed + len(new_rows), 'last_open_time': int(new_rows[-1][0]),
+                    'columns': list(COLUMNS)}
+            self._write_meta(symbol, interval, meta)
+            return len(new_rows)
+
+    def read(self, symbol: str, interval: str, columns: Sequence[str] = None) -> Dict[str, np.ndarray]:
+        """Memmap chỉ-đọc của các cột (mặc định tất cả), chỉ gồm các dòng đã commit; ValueError nếu kho thiếu cột"""
+        meta = self._read_meta(symbol, interval)
+        rows = meta['rows']
+        columns = list(columns or COLUMNS)
+        missing = [column for column in columns if column not in meta.get('columns', LEGACY_COLUMNS)]
+        if missing and rows:
+            raise ValueError(f"Kho nến {symbol} {interval} không có cột {', '.join(missing)}")
+        result = {}
+        for column in columns:
+            dtype = COLUMNS[column][0]
+            if rows == 0:
+                result[column] = np.empty(0, dtype=dtype)
+                continue
+            result[column] = np.memmap(self._path(symbol, interval, f'{column}.bin'),
+                                       dtype=dtype, mode='r', shape=(rows,))
+        return result
+
+    def read_range(self, symbol: str, interval: str, start_time: int = None, end_time: int = None,
+                   columns: Sequence[str] = None) -> Dict[str, np.ndarray]:
+        """Các nến có start_time <= open_time < end_time (ms), tìm bằng searchsorted trên cột open_time"""
+        open_times = self.read(symbol, interval, ['open_time'])['open_time']
+        start = 0 if start_time is None else int(np.searchsorted(open_times, start_time, side='left'))
+        end = len(open_times) if end_time is None else int(np.searchsorted(open_times, end_time, side='left'))
+        data = self.read(symbol, interval, columns)
+        return {column: values[start:end] for column, values in data.items()}
+
+    def tail_klines(self, symbol: str, interval: str, count: int) -> List[list]:
+        """
+        count nến cuối dưới dạng mảng 12 cột giống REST (để seed KlineCache); cột 'ignore' là '0' như Binance.
+        ValueError nếu kho định dạng cũ thiếu cột.
+        """
+        if self.rows(symbol, interval) == 0:
+            return []
+        data = {column: values[-count:] for column, values in self.read(symbol, interval).items()}
+        klines = []
+        for i in range(len(data['open_time'])):
+            klines.append([
+                int(data['open_time'][i]), repr(float(data['open'][i])), repr(float(data['high'][i])),
+                repr(float(data['low'][i])), repr(float(data['close'][i])), repr(float(data['volume'][i])),
+                int(data['close_time'][i]), repr(float(data['quote_asset_volume'][i])), int(data['trades'][i]),
+                repr(float(data['taker_buy_base_asset_volume'][i])),
+                repr(float(data['taker_buy_quote_asset_volume'][i])), '0'
+            ])
+        return klines
@@ -1,8 +1,10 @@
 # manager_trading_coin
-import json
 import os
-from pathlib import Path
+from datetime import datetime
+from typing import Optional
+from binance_coin.models.position_table import PositionTable
 from binance_coin.models.sell_buy import SellBuy
+from binance_coin.services.state_journal import StateJournal
 import binance_coin.utils.log_common as logCommon
 
 manager_trading_coin = {}
@@ -18,69 +20,148 @@ class ManagementCoin(object):
         # Setup logger
         self.logger = logCommon.getLog(__name__)
         self.__file_path = file_path
-        self.__manager_trading_coin = self.load_state()
+        self.__journal = StateJournal(
+            file_path,
+            # 1 = fsync mỗi giao dịch (mặc định); > 1 chỉ cho backtest/benchmark, crash có thể mất tới N-1 giao dịch
+            batch_size=int(os.getenv('STATE_FSYNC_BATCH', 1)),
+            compact_every=int(os.getenv('STATE_COMPACT_EVERY', 1000)),
+        ) if file_path else None
+        # Toàn bộ vị thế + lịch sử giao dịch nằm trong một bảng dạng cột, SellBuy chỉ là view
+        self.__positions = PositionTable()
+        self.load_state()
+
+    @property
+    def positions(self) -> PositionTable:
+        return self.__positions
 
     # @staticmethod
     def get_item_coin(self, coin_symbol) -> SellBuy:
-        if not coin_symbol in self.__manager_trading_coin:
-            self.__manager_trading_coin[coin_symbol] = SellBuy(
-                coin_symbol=coin_symbol)
-        return self.__manager_trading_coin[coin_symbol]
+        row = self.__positions.get_or_create(coin_symbol)
+        return SellBuy.view(self.__positions, row, listener=self._on_transition)
+
+    def _on_transition(self, coin_symbol: str, action: str, value, at: datetime) -> None:
+        """Ghi mỗi lần mua/bán (value = giá) và mỗi lần đổi lượng đang giữ (QTY, value = lượng) vào journal"""
+        if self.__journal is None:
+            return
+        if action == 'QTY':
+            self.__journal.record(coin_symbol, action, None, at, quantity=value)
+        else:
+            self.__journal.record(coin_symbol, action, value, at)
+
+    @property
+    def holdings(self) -> 'BookHoldings':
+        return BookHoldings(self)
+
+    def _snapshot(self) -> dict:
+        table = self.__positions
+        return {
+            'positions': {symbol: SellBuy.view(table, table.row_of(symbol)).to_dict() for symbol in table.symbols},
+            'history': table.history_rows(),
+        }
+
+    # --- CHUYỂN GIAO VỊ THẾ GIỮA CÁC WORKER (SHARDING) ---
+    def export_position(self, coin_symbol: str) -> dict:
+        """Vị thế + lịch sử giao dịch của một symbol (kèm sổ của từng chiến lược) để worker khác nhận tiếp"""
+        table = self.__positions
+        books = {key: {'position': SellBuy.view(table, table.row_of(key)).to_dict(), 'history': table.history_rows(key)}
+                 for key in table.symbols if key.startswith(coin_symbol + '@')}
+        return {'position': SellBuy.view(table, table.get_or_create(coin_symbol)).to_dict(),
+                'history': table.history_rows(coin_symbol), 'books': books}
+
+    def import_position(self, coin_symbol: str, data: dict) -> None:
+        """
+        Nhận vị thế do worker khác chuyển giao (ghi đè dòng hiện tại, chỉ nối các giao dịch lịch sử chưa có),
+        rồi nén snapshot ngay để trạng thái nhận về bền vững như các giao dịch trong journal.
+        """
+        table = self.__positions
+        with table.lock:
+            for key, book in [(coin_symbol, data)] + list(data.get('books', {}).items()):
+                SellBuy.from_dict(dict(book['position'], coin_symbol=key), table=table)
+                known = {(trade[1], trade[3]) for trade in table.history_rows(key)}
+                table.load_history([trade for trade in book.get('history', []) if (trade[1], trade[3]) not in known])
+            if self.__journal is not None:
+                self.__journal.compact(self._snapshot, background=False)
 
     # --- CÁC HÀM LƯU/TẢI TRẠNG THÁI (MỚI) ---
     def save_state(self):
-        """Lưu từ điển trạng thái vào một file JSON."""
-        self.logger.info(self.__file_path)
-        if self.__file_path is None :
+        """
+        Commit các giao dịch còn chờ trong journal (chỉ khi STATE_FSYNC_BATCH > 1), chi phí không phụ thuộc số symbol.
+        Khi journal đủ dài thì nén thành snapshot ở thread nền.
+        """
+        if self.__journal is None:
             return
-        if not os.path.isfile(self.__file_path):
-            # Tạo thư mục nếu chưa tồn tại
-            Path(self.__file_path).touch(exist_ok=True)
-            
+
         try:
-            with open(self.__file_path, 'w', encoding='utf-8') as f:
-                json.dump(self.__manager_trading_coin, f, indent=4)
-            self.logger.info(f"Đã lưu trạng thái vào file: {self.__file_path}")
+            committed = self.__journal.commit()
+            if committed:
+                self.logger.info(f"Đã ghi {committed} giao dịch vào journal: {self.__journal.journal_path}")
+            if self.__journal.needs_compaction():
+                # Giữ lock của bảng (cùng thứ tự lock với SellBuy.buy/sell) để snapshot khớp seq
+                with self.__positions.lock:
+                    self.__journal.compact(self._snapshot)
         except Exception as e:
             self.logger.error(f"Loi khi lưu trạng thái: {e}")
 
-    def load_state(self) -> dict:
-        """Tải trạng thái từ một file JSON. Nếu file không tồn tại, trả về trạng thái mặc định."""
-        if self.__file_path is None:
-            return {}
+    def close(self):
+        """Commit và nén snapshot đồng bộ khi dừng bot"""
+        if self.__journal is None:
+            return
+        try:
+            with self.__positions.lock:
+                self.__journal.close(self._snapshot)
+        except Exception as e:
+            self.logger.error(f"Loi khi đóng journal trạng thái: {e}")
+
+    def load_state(self) -> PositionTable:
+        """Dựng lại bảng vị thế từ snapshot + journal. Nếu chưa có file, bảng rỗng."""
+        table = self.__positions
+        if self.__journal is None:
+            return table
 
         try:
-            if not os.path.isfile(self.__file_path) or os.path.getsize(self.__file_path) == 0:
-                return {}
-
-            with open(self.__file_path, 'r') as f:
-                content = f.read().strip()
-                # Kiểm tra file rỗng
-                if not content:
-                    return {}
-
-                state_data = json.load(content)
-                self.logger.info(
-                    f"Da tai trang thai tu file: {self.__file_path} - Du lieu: {state_data}")
-                return state_data
-        except FileNotFoundError:
-            self.logger.warning(
-                f"Khong tim thay file trang thai. Bat dau voi trang thai mac dinh.")
-            return {'position_active': False}
+            snapshot, events = self.__journal.recover()
+            for symbol, data in snapshot['positions'].items():
+                data.setdefault('coin_symbol', symbol)
+                SellBuy.from_dict(data, table=table)
+            table.load_history(snapshot.get('history', []))
+
+            # Phát lại journal (view không có listener để không ghi lại chính các sự kiện này)
+            for event in events:
+                item = SellBuy.view(table, table.get_or_create(event['symbol']))
+                at = datetime.fromisoformat(event['time'])
+                if event['action'] == 'BUY':
+                    item.buy(event['price'], at=at)
+                elif event['action'] == 'SELL':
+                    item.sell(event['price'], at=at)
+                elif event['action'] == 'QTY':
+                    item.set_quantity(event.get('quantity'), at=at)
+
+            self.logger.info(
+                f"Da tai trang thai tu file: {self.__file_path} - {len(table)} symbols, {len(events)} su kien journal")
+            return table
         except Exception as e:
-            self.logger.error(
-                f"Loi khi tai trang thai, su dung trang thai mac dinh: {e}")
-            return {'position_active': False}
-    def to_dict(self):
-        return {
-            "coin_symbol": self.__coin_symbol,
-            "sell_time": self.__sell_time.isoformat() if self.__sell_time else None,
-            "sell_price": self.__sell_price,
-            "buy_time": self.__buy_time.isoformat() if self.__buy_time else None,
-            "buy_price": self.__buy_price,
-            "position_active": self.__position_active.name,
-            "profit": self.__profit
-        }
+            # Không chạy tiếp với trạng thái rỗng: lần nén sau sẽ ghi đè và làm mất vị thế
+            self.logger.error(f"Loi khi tai trang thai: {e}")
+            raise
+
+
+class BookHoldings:
+    """
+    Lượng đang giữ của từng sổ cho OrderExecutor, đọc/ghi thẳng vào cột quantity của bảng vị thế
+    (ghi qua journal nên còn nguyên sau khi khởi động lại). Giao diện như dict: get / [] =.
+    """
+
+    def __init__(self, management_coin: ManagementCoin):
+        self._management_coin = management_coin
+
+    def get(self, key: str, default=None) -> Optional[float]:
+        table = self._management_coin.positions
+        row = table.row_of(key)
+        quantity = None if row is None else SellBuy.view(table, row).quantity
+        return default if quantity is None else quantity
+
+    def __setitem__(self, key: str, quantity: Optional[float]) -> None:
+        self._management_coin.get_item_coin(key).set_quantity(quantity)
 
 
 # def get_item_coin_global(coin_symbol) -> SellBuy:
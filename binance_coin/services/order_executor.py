@@ -0,0 +1,619 @@
+# -*- coding: utf-8 -*-
+"""
+Thực thi lệnh tách khỏi phân tích: process_signal chỉ đưa lệnh vào hàng đợi (không chờ mạng),
+thread riêng làm tròn theo filter của exchangeInfo (cache), gửi MARKET/LIMIT với client order id tất định
+và theo dõi khớp lệnh qua user data stream.
+
+Kiểm tra đầu-cuối với sàn giả lập cục bộ (REST + WebSocket user data):
+    python -m binance_coin.benchmarks.order_pipeline --orders 96 --latency 0.02
+"""
+import asyncio
+import hashlib
+import json
+import queue
+import threading
+import time
+import zlib
+from collections import Counter, deque, namedtuple
+from decimal import ROUND_CEILING, ROUND_FLOOR, Decimal
+from typing import Callable, Dict, List, Optional
+
+import numpy as np
+
+import binance_coin.utils.log_common as logCommon
+from binance_coin.apis.binance_client import is_api_error
+from binance_coin.services.stream_feed import BINANCE_STREAM_URL
+
+ORDER_MARKET = 'MARKET'
+ORDER_LIMIT = 'LIMIT'
+
+# Trạng thái lệnh của Binance (X trong executionReport) + trạng thái nội bộ trước khi sàn trả lời
+STATUS_QUEUED = 'QUEUED'
+STATUS_FAILED = 'FAILED'
+FINAL_STATUSES = frozenset(('FILLED', 'CANCELED', 'REJECTED', 'EXPIRED', 'EXPIRED_IN_MATCH', STATUS_FAILED))
+
+# Lỗi Binance mà trạng thái lệnh không xác định (có thể đã vào sổ): tra lại rồi mới gửi lại
+RETRYABLE_CODES = frozenset((-1001, -1006, -1007, -1008))
+ORDER_NOT_FOUND = -2013
+
+SymbolFilters = namedtuple('SymbolFilters', ['symbol', 'base_asset', 'quote_asset', 'tick_size', 'step_size',
+                                             'market_step_size', 'min_qty', 'min_notional', 'quote_step'])
+
+
+def floor_to_step(value, step: Decimal) -> Decimal:
+    value = Decimal(str(value))
+    if not step:
+        return value
+    return (value / step).to_integral_value(rounding=ROUND_FLOOR) * step
+
+
+def ceil_to_step(value, step: Decimal) -> Decimal:
+    value = Decimal(str(value))
+    if not step:
+        return value
+    return (value / step).to_integral_value(rounding=ROUND_CEILING) * step
+
+
+def format_decimal(value: Decimal) -> str:
+    """Chuỗi không mũ, không số 0 thừa (Binance từ chối '1E-5' và số lẻ vượt precision)"""
+    text = format(value.normalize(), 'f')
+    return text if text != '-0' else '0'
+
+
+def parse_symbol_filters(info: dict) -> SymbolFilters:
+    """Một phần tử 'symbols' của exchangeInfo -> các bước làm tròn và ngưỡng tối thiểu"""
+    filters = {item['filterType']: item for item in info.get('filters', [])}
+    step = Decimal(filters.get('LOT_SIZE', {}).get('stepSize', '0'))
+    market_step = Decimal(filters.get('MARKET_LOT_SIZE', {}).get('stepSize', '0')) or step
+    notional = filters.get('NOTIONAL') or filters.get('MIN_NOTIONAL') or {}
+    return SymbolFilters(
+        symbol=info['symbol'], base_asset=info.get('baseAsset', ''), quote_asset=info.get('quoteAsset', ''),
+        tick_size=Decimal(filters.get('PRICE_FILTER', {}).get('tickSize', '0')).normalize(),
+        step_size=step.normalize(), market_step_size=market_step.normalize(),
+        min_qty=Decimal(filters.get('LOT_SIZE', {}).get('minQty', '0')),
+        min_notional=Decimal(notional.get('minNotional', '0')),
+        quote_step=Decimal(1).scaleb(-int(info.get('quoteAssetPrecision', info.get('quotePrecision', 8)))),
+    )
+
+
+def client_order_id(key: str, side: str, signal_id) -> str:
+    """
+    Id tất định cho một tín hiệu (sổ + chiều + mốc nến): cùng tín hiệu luôn cho cùng id, nên tra được lệnh
+    đã gửi bằng get_order(origClientOrderId). Binance giới hạn 36 ký tự [.A-Z:/a-z0-9_-].
+    """
+    digest = hashlib.sha1(f"{key}|{side}|{signal_id}".encode('utf-8')).hexdigest()
+    return f"bc-{digest[:32]}"
+
+
+class ExchangeFilters:
+    """Cache filter của mọi symbol từ một lần get_exchange_info (weight 20), tải lại khi gặp symbol lạ hoặc hết hạn"""
+
+    def __init__(self, client, ttl_seconds: float = 3600):
+        self.client = client
+        self.ttl_seconds = ttl_seconds
+        self._filters: Dict[str, SymbolFilters] = {}
+        self._loaded_at = None
+        self._lock = threading.Lock()
+
+    def load(self) -> int:
+        info = self.client.get_exchange_info()
+        filters = {item['symbol']: parse_symbol_filters(item) for item in info.get('symbols', [])}
+        with self._lock:
+            self._filters = filters
+            self._loaded_at = time.monotonic()
+        return len(filters)
+
+    def get(self, symbol: str) -> SymbolFilters:
+        with self._lock:
+            filters = self._filters.get(symbol)
+            stale = self._loaded_at is None or time.monotonic() - self._loaded_at > self.ttl_seconds
+        if filters is None or stale:
+            self.load()
+            with self._lock:
+                filters = self._filters.get(symbol)
+        if filters is None:
+            raise KeyError(f"{symbol} không có trong exchangeInfo")
+        return filters
+
+
+class OrderRejected(ValueError):
+    """Lệnh không hợp lệ trước khi gửi (dưới minQty / minNotional, không biết lượng của sổ để bán)"""
+
+
+OrderIntent = namedtuple('OrderIntent', ['key', 'symbol', 'side', 'order_type', 'price', 'client_order_id',
+                                         'signal_id', 'signal_ns'])
+
+
+class OrderRecord:
+    """Trạng thái một lệnh từ lúc vào hàng đợi tới khi kết thúc (cập nhật từ REST ack và user data stream)"""
+    __slots__ = ('intent', 'status', 'order_id', 'quantity', 'limit_price', 'executed_qty', 'quote_qty',
+                 'commission_base', 'attempts', 'error', 'ack_ns', 'fill_ns', 'done')
+
+    def __init__(self, intent: OrderIntent):
+        self.intent = intent
+        self.status = STATUS_QUEUED
+        self.order_id = None
+        self.quantity = None
+        self.limit_price = None
+        self.executed_qty = 0.0
+        self.quote_qty = 0.0
+        self.commission_base = 0.0
+        self.attempts = 0
+        self.error = None
+        self.ack_ns = None
+        self.fill_ns = None
+        self.done = threading.Event()
+
+    @property
+    def ack_latency_ms(self) -> Optional[float]:
+        return None if self.ack_ns is None else (self.ack_ns - self.intent.signal_ns) / 1e6
+
+    @property
+    def fill_latency_ms(self) -> Optional[float]:
+        return None if self.fill_ns is None else (self.fill_ns - self.intent.signal_ns) / 1e6
+
+    @property
+    def avg_price(self) -> Optional[float]:
+        return self.quote_qty / self.executed_qty if self.executed_qty else None
+
+    def to_dict(self) -> dict:
+        return {'client_order_id': self.intent.client_order_id, 'key': self.intent.key, 'symbol': self.intent.symbol,
+                'side': self.intent.side, 'type': self.intent.order_type, 'status': self.status,
+                'order_id': self.order_id, 'quantity': self.quantity, 'limit_price': self.limit_price,
+                'executed_qty': self.executed_qty, 'avg_price': self.avg_price, 'attempts': self.attempts,
+                'ack_ms': self.ack_latency_ms, 'fill_ms': self.fill_latency_ms, 'error': self.error}
+
+
+class OrderExecutor:
+    """
+    Hàng đợi lệnh + workers thread gửi lệnh; mỗi sổ (key) luôn vào cùng một hàng đợi nên lệnh của một sổ
+    được gửi đúng thứ tự tín hiệu, các sổ khác nhau gửi song song.
+    - submit() không gọi mạng: trả OrderRecord ngay; trong cùng tiến trình, cùng id thì trả lại lệnh cũ.
+    - Binance chỉ chặn id trùng với lệnh đang mở (lệnh đã khớp gửi lại sẽ thành lệnh mới) nên tra
+      get_order(origClientOrderId) trước khi gửi lại sau lỗi mạng / timeout, và trước lần gửi đầu của tín hiệu
+      có signal_id <= resume_signal_id (có thể đã được lần chạy trước gửi; None = luôn tra trước lần gửi đầu).
+    - fills_from_stream: ack dạng ACK (nhỏ, trả sớm nhất) và khớp lệnh lấy từ executionReport;
+      False thì dùng ack FULL (trạng thái khớp + phí ngay trong response).
+    - holdings: lượng đang giữ của từng sổ (dict, hoặc ManagementCoin.holdings để còn sau khi khởi động lại).
+      Số lượng bán = lượng đã mua của sổ (từ khớp lệnh, trừ phí tính bằng base asset; lệnh chỉ đối soát được
+      qua get_order thì lấy phí từ get_my_trades); chưa biết thì từ chối lệnh bán, không bán số dư chung
+      của tài khoản (có thể là của sổ khác / người dùng).
+    - on_event(stage, record): 'ack', 'fill' (lần khớp đầu), 'done' — mỗi loại đúng một lần cho mỗi lệnh,
+      gọi trong lock nên phải nhanh (vd: cập nhật metrics, cập nhật sổ theo kết quả lệnh).
+    """
+
+    def __init__(self, client, filters: ExchangeFilters, order_type: str = ORDER_MARKET, quote_amount: float = 20.0,
+                 limit_offset_bps: float = 5.0, max_retries: int = 3, retry_delay: float = 0.5,
+                 fills_from_stream: bool = True, on_event: Callable[[str, OrderRecord], None] = None,
+                 workers: int = 4, latency_window: int = 1000, holdings=None, resume_signal_id=None):
+        self.logger = logCommon.getLog(__name__)
+        self.client = client
+        self.filters = filters
+        self.order_type = order_type.upper()
+        if self.order_type not in (ORDER_MARKET, ORDER_LIMIT):
+            raise ValueError(f"Loại lệnh không hỗ trợ: {order_type}")
+        self.quote_amount = quote_amount
+        self.limit_offset = limit_offset_bps / 10000
+        self.max_retries = max_retries
+        self.retry_delay = retry_delay
+        self.fills_from_stream = fills_from_stream
+        self.on_event = on_event
+        self.holdings = holdings if holdings is not None else {}
+        self.resume_signal_id = resume_signal_id
+        self.orders: Dict[str, OrderRecord] = {}
+        # Lệnh chưa kết thúc của từng sổ
+        self._active: Dict[str, OrderRecord] = {}
+        self.counts = Counter()
+        self._ack_ms = deque(maxlen=latency_window)
+        self._fill_ms = deque(maxlen=latency_window)
+        self._queues: List['queue.Queue[Optional[OrderRecord]]'] = [queue.Queue() for _ in range(max(1, workers))]
+        self._lock = threading.RLock()
+        self._threads: List[threading.Thread] = []
+
+    # --- HÀNG ĐỢI ---
+    def start(self) -> 'OrderExecutor':
+        if not self._threads:
+            for index, orders in enumerate(self._queues):
+                thread = threading.Thread(target=self._run, args=(orders,), name=f'order-executor-{index}',
+                                          daemon=True)
+                thread.start()
+                self._threads.append(thread)
+        return self
+
+    def stop(self, timeout: float = 10) -> None:
+        """Gửi hết các lệnh đã vào hàng đợi rồi dừng các thread"""
+        for orders in self._queues:
+            orders.put(None)
+        for thread in self._threads:
+            thread.join(timeout)
+        self._threads = []
+
+    def submit(self, key: str, symbol: str, side: str, price: float, signal_id, order_type: str = None) -> OrderRecord:
+        signal_ns = time.perf_counter_ns()
+        intent = OrderIntent(key, symbol, side.upper(), (order_type or self.order_type).upper(), float(price),
+                             client_order_id(key, side.upper(), signal_id), signal_id, signal_ns)
+        with self._lock:
+            existing = self.orders.get(intent.client_order_id)
+            if existing is not None:
+                return existing
+            record = self.orders[intent.client_order_id] = self._active[key] = OrderRecord(intent)
+        self._queues[zlib.crc32(key.encode('utf-8')) % len(self._queues)].put(record)
+        return record
+
+    def pending(self) -> int:
+        return sum(orders.qsize() for orders in self._queues)
+
+    def in_flight(self, key: str) -> bool:
+        """Sổ còn lệnh chưa kết thúc (đang chờ gửi, đã gửi chưa khớp xong)"""
+        return key in self._active
+
+    def _run(self, orders: 'queue.Queue[Optional[OrderRecord]]') -> None:
+        while True:
+            record = orders.get()
+            if record is None:
+                break
+            try:
+                self.execute(record)
+            except Exception as e:
+                self._finish(record, STATUS_FAILED, str(e))
+                self.logger.error(f"❌ Lỗi khi gửi lệnh {record.intent.client_order_id}: {e}")
+
+    # --- GỬI LỆNH ---
+    def build_params(self, record: OrderRecord) -> dict:
+        """Tham số create_order đã làm tròn theo filter; OrderRejected nếu không đạt ngưỡng tối thiểu"""
+        intent = record.intent
+        filters = self.filters.get(intent.symbol)
+        params = {'symbol': intent.symbol, 'side': intent.side, 'type': intent.order_type,
+                  'newClientOrderId': intent.client_order_id,
+                  'newOrderRespType': 'ACK' if self.fills_from_stream else 'FULL'}
+
+        price = None
+        if intent.order_type == ORDER_LIMIT:
+            # Giá giới hạn lệch về phía khớp được ngay, làm tròn về phía không xấu hơn offset
+            if intent.side == 'BUY':
+                price = floor_to_step(intent.price * (1 + self.limit_offset), filters.tick_size)
+            else:
+                price = ceil_to_step(intent.price * (1 - self.limit_offset), filters.tick_size)
+            params['price'] = record.limit_price = format_decimal(price)
+            params['timeInForce'] = 'GTC'
+
+        if intent.side == 'BUY' and intent.order_type == ORDER_MARKET:
+            quote = floor_to_step(self.quote_amount, filters.quote_step)
+            if quote < filters.min_notional:
+                raise OrderRejected(f"{intent.symbol}: {quote} < minNotional {filters.min_notional}")
+            params['quoteOrderQty'] = format_decimal(quote)
+            return params
+
+        step = filters.market_step_size if intent.order_type == ORDER_MARKET else filters.step_size
+        if intent.side == 'BUY':
+            quantity = floor_to_step(Decimal(str(self.quote_amount)) / price, step)
+        else:
+            quantity = floor_to_step(self._sell_quantity(intent.key), step)
+        notional = quantity * (price if price is not None else Decimal(str(intent.price)))
+        if quantity <= 0 or quantity < filters.min_qty:
+            raise OrderRejected(f"{intent.symbol}: quantity {quantity} < minQty {filters.min_qty}")
+        if notional < filters.min_notional:
+            raise OrderRejected(f"{intent.symbol}: notional {notional} < minNotional {filters.min_notional}")
+        params['quantity'] = record.quantity = format_decimal(quantity)
+        return params
+
+    def _sell_quantity(self, key: str) -> float:
+        with self._lock:
+            held = self.holdings.get(key)
+        if held is None:
+            raise OrderRejected(f"{key}: không biết lượng sổ đang giữ, không bán")
+        return held
+
+    def execute(self, record: OrderRecord) -> OrderRecord:
+        intent = record.intent
+        try:
+            params = self.build_params(record)
+        except OrderRejected as e:
+            self._finish(record, 'REJECTED', str(e))
+            self.logger.warning(f"⚠️ Bỏ lệnh {intent.side} {intent.key}: {e}")
+            return record
+
+        for attempt in range(self.max_retries + 1):
+            record.attempts = attempt + 1
+            try:
+                if attempt > 0 or self._may_exist(intent):
+                    existing = self._lookup(intent)
+                    if existing is not None:
+                        self._on_found(record, existing)
+                        return record
+                self._on_ack(record, self.client.create_order(**params))
+                return record
+            except Exception as e:
+                record.error = str(e)
+                if not self._is_retryable(e) or attempt == self.max_retries:
+                    status = 'REJECTED' if is_api_error(e) else STATUS_FAILED
+                    self._finish(record, status, str(e))
+                    self.logger.error(f"❌ Lệnh {intent.side} {intent.key} ({intent.client_order_id}) thất bại: {e}")
+                    return record
+                self.counts['retries'] += 1
+                self.logger.warning(f"⚠️ Gửi lệnh {intent.client_order_id} lỗi ({e}), thử lại lần {attempt + 1}")
+                time.sleep(self.retry_delay * (2 ** attempt))
+        return record
+
+    def _may_exist(self, intent: OrderIntent) -> bool:
+        """Lệnh của tín hiệu này có thể đã được gửi trước khi tiến trình khởi động (chưa có trong self.orders)"""
+        return self.resume_signal_id is None or intent.signal_id <= self.resume_signal_id
+
+    def _lookup(self, intent: OrderIntent) -> Optional[dict]:
+        """Lệnh với client order id này đã vào sổ chưa (None nếu sàn báo không tồn tại)"""
+        try:
+            return self.client.get_order(symbol=intent.symbol, origClientOrderId=intent.client_order_id)
+        except Exception as e:
+            if is_api_error(e) and getattr(e, 'code', None) == ORDER_NOT_FOUND:
+                return None
+            raise
+
+    @staticmethod
+    def _is_retryable(error: Exception) -> bool:
+        if is_api_error(error):
+            return error.code in RETRYABLE_CODES or (error.status_code or 0) >= 500
+        # Lỗi mạng / timeout của requests: lệnh có thể đã tới sàn
+        return not isinstance(error, (KeyError, TypeError, ValueError))
+
+    def _mark_ack(self, record: OrderRecord, response: dict) -> None:
+        if record.ack_ns is None:
+            record.ack_ns = time.perf_counter_ns()
+            self._ack_ms.append(record.ack_latency_ms)
+            self._emit('ack', record)
+        record.order_id = response.get('orderId', record.order_id)
+
+    def _on_ack(self, record: OrderRecord, response: dict) -> None:
+        with self._lock:
+            self._mark_ack(record, response)
+            if not self.fills_from_stream and 'status' in response and record.status not in FINAL_STATUSES:
+                self._apply_fill(record, response['status'], float(response.get('executedQty', 0)),
+                                 float(response.get('cummulativeQuoteQty', 0)), self._commission_base(record, response))
+            elif record.status == STATUS_QUEUED:
+                # Khớp lệnh (kèm phí) đến từ executionReport, có thể trước cả ack
+                record.status = 'NEW'
+
+    def _on_found(self, record: OrderRecord, response: dict) -> None:
+        """Lệnh đã có trên sàn (tra trước khi gửi / gửi lại): coi như ack rồi cập nhật theo trạng thái tổng"""
+        with self._lock:
+            self._mark_ack(record, response)
+            if record.status == STATUS_QUEUED:
+                record.status = 'NEW'
+        self._apply_order(record, response)
+
+    def _apply_order(self, record: OrderRecord, response: dict) -> None:
+        """
+        Trạng thái tổng của lệnh từ get_order (không kèm phí): lệnh đã kết thúc thì thay phí cộng dồn
+        bằng tổng phí lấy từ get_my_trades (gọi ngoài lock)
+        """
+        final = response['status'] in FINAL_STATUSES
+        commission = self._order_commission_base(record.intent, response) if final else None
+        with self._lock:
+            if record.status in FINAL_STATUSES:
+                return
+            record.order_id = response.get('orderId', record.order_id)
+            if final:
+                record.commission_base = commission
+            self._apply_fill(record, response['status'], float(response.get('executedQty', 0)),
+                             float(response.get('cummulativeQuoteQty', 0)), 0.0)
+
+    def _commission_base(self, record: OrderRecord, response: dict) -> Optional[float]:
+        """Phí tính bằng base asset từ 'fills' của response FULL; None nếu không biết"""
+        if 'fills' not in response:
+            return None
+        base_asset = self.filters.get(record.intent.symbol).base_asset
+        return sum(float(fill['commission']) for fill in response['fills'] if fill.get('commissionAsset') == base_asset)
+
+    def _order_commission_base(self, intent: OrderIntent, response: dict) -> Optional[float]:
+        """Tổng phí base asset của một lệnh BUY đã khớp qua get_my_trades(orderId); None nếu không tra được"""
+        if intent.side != 'BUY' or not float(response.get('executedQty', 0)):
+            return 0.0
+        try:
+            trades = self.client.get_my_trades(symbol=intent.symbol, orderId=response['orderId'])
+        except Exception as e:
+            self.logger.warning(f"⚠️ Không lấy được phí của lệnh {intent.client_order_id}: {e}")
+            return None
+        base_asset = self.filters.get(intent.symbol).base_asset
+        return sum(float(trade['commission']) for trade in trades if trade.get('commissionAsset') == base_asset)
+
+    # --- USER DATA STREAM ---
+    def on_execution_report(self, event: dict) -> None:
+        """Sự kiện executionReport: cập nhật lệnh theo client order id (C là id gốc khi hủy)"""
+        record = self.orders.get(event.get('C') or event.get('c')) or self.orders.get(event.get('c'))
+        if record is None:
+            return
+        commission = float(event.get('n') or 0)
+        if commission and event.get('N') != self.filters.get(record.intent.symbol).base_asset:
+            commission = 0.0
+        with self._lock:
+            if record.status in FINAL_STATUSES:
+                return
+            record.order_id = event.get('i', record.order_id)
+            self._apply_fill(record, event['X'], float(event.get('z', 0)), float(event.get('Z', 0)), commission)
+
+    def _apply_fill(self, record: OrderRecord, status: str, executed_qty: float, quote_qty: float,
+                    commission_base: Optional[float]) -> None:
+        if executed_qty > record.executed_qty and record.fill_ns is None:
+            record.fill_ns = time.perf_counter_ns()
+            self._fill_ms.append(record.fill_latency_ms)
+            self._emit('fill', record)
+        record.executed_qty = max(record.executed_qty, executed_qty)
+        record.quote_qty = max(record.quote_qty, quote_qty)
+        if commission_base is None or record.commission_base is None:
+            record.commission_base = None
+        else:
+            record.commission_base += commission_base
+        record.status = status
+        if status in FINAL_STATUSES:
+            self._settle(record)
+
+    def _settle(self, record: OrderRecord) -> None:
+        """Lệnh kết thúc: cập nhật lượng đang giữ của sổ và đánh dấu xong"""
+        if record.done.is_set():
+            return
+        intent = record.intent
+        if record.executed_qty:
+            held = self.holdings.get(intent.key)
+            if intent.side == 'SELL':
+                self.holdings[intent.key] = None if held is None else max(0.0, held - record.executed_qty)
+            elif record.commission_base is None:
+                # Không biết phí -> không biết chính xác lượng nhận về, lần bán sau bị từ chối thay vì bán đoán
+                self.holdings[intent.key] = None
+                self.logger.warning(f"⚠️ Không biết lượng {intent.key} đang giữ sau lệnh {intent.client_order_id}")
+            else:
+                self.holdings[intent.key] = (held or 0.0) + record.executed_qty - record.commission_base
+        if self._active.get(intent.key) is record:
+            del self._active[intent.key]
+        self.counts[record.status] += 1
+        record.done.set()
+        self._emit('done', record)
+
+    def _finish(self, record: OrderRecord, status: str, error: str = None) -> None:
+        with self._lock:
+            record.status = status
+            record.error = error
+            self._settle(record)
+
+    def _emit(self, stage: str, record: OrderRecord) -> None:
+        if self.on_event is not None:
+            try:
+                self.on_event(stage, record)
+            except Exception as e:
+                self.logger.error(f"❌ Lỗi trong callback lệnh: {e}")
+
+    def reconcile(self) -> int:
+        """Tra REST các lệnh đã gửi chưa kết thúc (gọi sau khi user stream kết nối lại, bù sự kiện bị lỡ)"""
+        with self._lock:
+            open_records = [record for record in self.orders.values()
+                            if record.ack_ns is not None and record.status not in FINAL_STATUSES]
+        for record in open_records:
+            try:
+                response = self._lookup(record.intent)
+                if response is not None:
+                    self._apply_order(record, response)
+            except Exception as e:
+                self.logger.error(f"❌ Lỗi khi đối soát lệnh {record.intent.client_order_id}: {e}")
+        return len(open_records)
+
+    # --- SỐ LIỆU ---
+    def stats(self) -> dict:
+        with self._lock:
+            ack, fill = np.array(self._ack_ms, dtype=np.float64), np.array(self._fill_ms, dtype=np.float64)
+            counts = dict(self.counts)
+            open_orders = sum(1 for record in self.orders.values() if record.status not in FINAL_STATUSES)
+
+        def percentiles(values: np.ndarray) -> dict:
+            if not len(values):
+                return {'p50': None, 'p95': None, 'max': None}
+            p50, p95 = np.percentile(values, (50, 95))
+            return {'p50': float(p50), 'p95': float(p95), 'max': float(values.max())}
+
+        return {'submitted': len(self.orders), 'queued': self.pending(), 'open': open_orders,
+                'filled': counts.get('FILLED', 0), 'rejected': counts.get('REJECTED', 0),
+                'failed': counts.get(STATUS_FAILED, 0), 'retries': counts.get('retries', 0),
+                'ack_ms': percentiles(ack), 'fill_ms': percentiles(fill)}
+
+
+class UserDataStream:
+    """
+    User data stream (listenKey) chạy trong thread nền có event loop riêng: chuyển executionReport
+    cho on_event, gia hạn listenKey định kỳ, kết nối lại + on_reconnect (đối soát REST) khi mất kết nối.
+    """
+
+    def __init__(self, client, on_event: Callable[[dict], None], on_reconnect: Optional[Callable[[], None]] = None,
+                 base_url: str = BINANCE_STREAM_URL, keepalive_seconds: float = 30 * 60,
+                 reconnect_delay: float = 1.0, max_reconnect_delay: float = 60.0):
+        self.logger = logCommon.getLog(__name__)
+        self.client = client
+        self.on_event = on_event
+        self.on_reconnect = on_reconnect
+        self.base_url = base_url.rstrip('/')
+        self.keepalive_seconds = keepalive_seconds
+        self.reconnect_delay = reconnect_delay
+        self.max_reconnect_delay = max_reconnect_delay
+        self.is_running = False
+        self.connect_count = 0
+        self.event_count = 0
+        self.connected = threading.Event()
+        self._loop = None
+        self._thread = None
+        self._websocket = None
+
+    def handle_message(self, message) -> Optional[str]:
+        data = json.loads(message)
+        data = data.get('data', data)
+        event_type = data.get('e')
+        self.event_count += 1
+        if event_type == 'executionReport':
+            self.on_event(data)
+        return event_type
+
+    async def _keepalive(self, listen_key: str) -> None:
+        while True:
+            await asyncio.sleep(self.keepalive_seconds)
+            try:
+                await asyncio.to_thread(self.client.stream_keepalive, listen_key)
+            except Exception as e:
+                self.logger.warning(f"⚠️ Không gia hạn được listenKey: {e}")
+
+    async def run(self) -> None:
+        from websockets.asyncio.client import connect
+        from websockets.exceptions import ConnectionClosed
+
+        self.is_running = True
+        delay = self.reconnect_delay
+        while self.is_running:
+            keepalive = None
+            try:
+                listen_key = await asyncio.to_thread(self.client.stream_get_listen_key)
+                async with connect(f"{self.base_url}/ws/{listen_key}", ping_interval=20, ping_timeout=20) as websocket:
+                    self._websocket = websocket
+                    self.connect_count += 1
+                    self.connected.set()
+                    self.logger.info(f"User data stream connected (lần #{self.connect_count})")
+                    keepalive = asyncio.create_task(self._keepalive(listen_key))
+                    if self.on_reconnect is not None and self.connect_count > 1:
+                        await asyncio.to_thread(self.on_reconnect)
+                    delay = self.reconnect_delay
+
+                    async for message in websocket:
+                        try:
+                            if self.handle_message(message) == 'listenKeyExpired':
+                                self.logger.warning("⚠️ listenKey hết hạn, tạo key mới")
+                                break
+                        except Exception as e:
+                            self.logger.error(f"❌ Lỗi khi xử lý sự kiện user data: {e}")
+                    if not self.is_running:
+                        break
+            except (ConnectionClosed, OSError, asyncio.TimeoutError) as e:
+                if not self.is_running:
+                    break
+                self.logger.warning(f"⚠️ Mất kết nối user data stream: {e}. Thử lại sau {delay:.1f}s")
+            except Exception as e:
+                if not self.is_running:
+                    break
+                self.logger.error(f"❌ Lỗi user data stream: {e}. Thử lại sau {delay:.1f}s")
+            finally:
+                self.connected.clear()
+                self._websocket = None
+                if keepalive is not None:
+                    keepalive.cancel()
+
+            await asyncio.sleep(delay)
+            delay = min(delay * 2, self.max_reconnect_delay)
+
+    def start(self) -> 'UserDataStream':
+        if self._thread is None:
+            self._loop = asyncio.new_event_loop()
+            self._thread = threading.Thread(target=self._loop.run_until_complete, args=(self.run(),),
+                                            name='user-data-stream', daemon=True)
+            self._thread.start()
+        return self
+
+    def stop(self, timeout: float = 5) -> None:
+        self.is_running = False
+        if self._thread is None:
+            return
+        if self._websocket is not None:
+            asyncio.run_coroutine_threadsafe(self._websocket.close(), self._loop)
+        self._thread.join(timeout)
+        self._thread = None
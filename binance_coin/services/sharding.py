@@ -0,0 +1,491 @@
+# -*- coding: utf-8 -*-
+"""
+Chạy nhiều worker (process / máy) chia nhau LIST_COIN_SYMBOL bằng consistent hashing.
+
+Coordinator là một thư mục dùng chung (ổ local hoặc NFS cho nhiều máy, các máy cần đồng bộ giờ NTP):
+    <SHARD_DIR>/members/<worker>.json   heartbeat của từng worker
+    <SHARD_DIR>/views/<worker>.json     vị thế + lịch sử + tín hiệu gần nhất của các symbol worker đang giữ
+    <SHARD_DIR>/state/<worker>.json     STATE_FILE riêng của worker (journal + snapshot)
+
+Mỗi worker tự tính vòng hash từ các worker còn sống; khi có worker vào/ra chỉ các symbol đổi chủ bị di chuyển.
+Worker mất symbol đánh dấu released trong view (kèm trạng thái cuối); worker nhận chỉ bắt đầu xử lý symbol
+sau khi nhận được trạng thái đó (hoặc chủ cũ đã chết) nên một symbol không bao giờ được giao dịch ở hai nơi.
+
+    python -m binance_coin.services.sharding status --root data/shards
+    python -m binance_coin.services.sharding ring --symbols 1000 --workers 4
+    python -m binance_coin.services.sharding demo --workers 3 --symbols 24
+"""
+import argparse
+import bisect
+import hashlib
+import json
+import os
+import re
+import signal
+import socket
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from typing import Callable, Dict, Iterable, List, Optional
+
+from binance_coin.services.state_journal import fsync_directory
+import binance_coin.utils.log_common as logCommon
+
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+def _hash(key: str) -> int:
+    return int.from_bytes(hashlib.md5(key.encode('utf-8')).digest()[:8], 'big')
+
+
+def _write_json(path: str, data: dict) -> None:
+    """
+    Ghi atomic (file tạm + os.replace) để worker khác không bao giờ đọc phải file ghi dở,
+    fsync file tạm + thư mục để view (trạng thái chuyển giao) còn nguyên sau khi crash
+    """
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump(data, f)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp_path, path)
+    fsync_directory(path)
+
+
+def _read_json(path: str) -> Optional[dict]:
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def default_worker_id() -> str:
+    return f"{socket.gethostname()}-{os.getpid()}"
+
+
+class HashRing:
+    """Vòng consistent hashing với vnodes điểm ảo mỗi worker (phân bố đều, thêm/bớt worker chỉ dời ~1/N symbol)"""
+
+    def __init__(self, nodes: Iterable[str] = (), vnodes: int = 64):
+        self.vnodes = vnodes
+        self.nodes = sorted(set(nodes))
+        points = sorted((_hash(f"{node}#{index}"), node) for node in self.nodes for index in range(vnodes))
+        self._keys = [point for point, _ in points]
+        self._owners = [node for _, node in points]
+
+    def owner(self, key: str) -> Optional[str]:
+        if not self._keys:
+            return None
+        index = bisect.bisect(self._keys, _hash(key)) % len(self._keys)
+        return self._owners[index]
+
+    def assignment(self, keys: Iterable[str]) -> Dict[str, List[str]]:
+        result = {node: [] for node in self.nodes}
+        for key in keys:
+            owner = self.owner(key)
+            if owner is not None:
+                result[owner].append(key)
+        return result
+
+
+class ShardCoordinator:
+    """Coordinator dạng file trong thư mục dùng chung: danh sách worker (heartbeat) và view của từng worker"""
+
+    def __init__(self, root: str, worker_id: str = None, heartbeat_ttl: float = 30.0, vnodes: int = 64,
+                 clock: Callable[[], float] = time.time):
+        self.root = root
+        self.worker_id = worker_id
+        self.heartbeat_ttl = heartbeat_ttl
+        self.vnodes = vnodes
+        self._clock = clock
+        self.members_dir = os.path.join(root, 'members')
+        self.views_dir = os.path.join(root, 'views')
+        self.state_dir = os.path.join(root, 'state')
+        for path in (self.members_dir, self.views_dir, self.state_dir):
+            os.makedirs(path, exist_ok=True)
+
+    @staticmethod
+    def _file_name(worker_id: str) -> str:
+        return re.sub(r'[^A-Za-z0-9_.-]', '_', worker_id) + '.json'
+
+    def now(self) -> float:
+        return self._clock()
+
+    def state_file(self, worker_id: str = None) -> str:
+        return os.path.join(self.state_dir, self._file_name(worker_id or self.worker_id))
+
+    # --- THÀNH VIÊN ---
+    def heartbeat(self) -> None:
+        _write_json(os.path.join(self.members_dir, self._file_name(self.worker_id)),
+                    {'worker': self.worker_id, 'host': socket.gethostname(), 'pid': os.getpid(),
+                     'time': self._clock()})
+
+    def leave(self) -> None:
+        try:
+            os.remove(os.path.join(self.members_dir, self._file_name(self.worker_id)))
+        except OSError:
+            pass
+
+    def members(self) -> Dict[str, dict]:
+        members = {}
+        for name in os.listdir(self.members_dir):
+            if name.endswith('.json'):
+                data = _read_json(os.path.join(self.members_dir, name))
+                if data and 'worker' in data:
+                    members[data['worker']] = data
+        return members
+
+    def live_workers(self) -> List[str]:
+        now = self._clock()
+        return sorted(worker for worker, data in self.members().items()
+                      if now - data.get('time', 0) <= self.heartbeat_ttl)
+
+    def ring(self, workers: Iterable[str] = None) -> HashRing:
+        return HashRing(self.live_workers() if workers is None else workers, self.vnodes)
+
+    # --- VIEW ---
+    def write_view(self, view: dict) -> None:
+        _write_json(os.path.join(self.views_dir, self._file_name(self.worker_id)), view)
+
+    def read_views(self) -> Dict[str, dict]:
+        views = {}
+        for name in os.listdir(self.views_dir):
+            if name.endswith('.json'):
+                data = _read_json(os.path.join(self.views_dir, name))
+                if data and 'worker' in data:
+                    views[data['worker']] = data
+        return views
+
+    def aggregate(self) -> dict:
+        return aggregate_views(self.read_views(), self.live_workers())
+
+
+def aggregate_views(views: Dict[str, dict], live: Iterable[str]) -> dict:
+    """
+    Gộp view của mọi worker thành một bảng: mỗi symbol lấy từ worker đang giữ (chưa released, export mới nhất),
+    nếu không ai giữ thì lấy bản released export mới nhất.
+    """
+    live = set(live)
+    positions, signals, owners, ranks = {}, {}, {}, {}
+    for view in views.values():
+        for symbol, entry in view.get('positions', {}).items():
+            rank = (not entry.get('released'), entry.get('exported', 0))
+            if symbol in ranks and ranks[symbol] >= rank:
+                continue
+            ranks[symbol] = rank
+            owners[symbol] = (view['worker'], entry.get('released', False))
+            positions[symbol] = dict(entry['position'], worker=view['worker'],
+                                     realized_profit=sum(trade[5] for trade in entry.get('history', [])))
+        for symbol, item in view.get('signals', {}).items():
+            if symbol not in signals or item.get('time', 0) >= signals[symbol].get('time', 0):
+                signals[symbol] = dict(item, worker=view['worker'])
+
+    workers = {}
+    for view in views.values():
+        owned = [symbol for symbol, (worker, released) in owners.items() if worker == view['worker'] and not released]
+        workers[view['worker']] = {'alive': view['worker'] in live, 'symbols': len(owned),
+                                   'updated': view.get('updated'), 'cycle_seconds': view.get('cycle_seconds')}
+    for worker in live - set(workers):
+        workers[worker] = {'alive': True, 'symbols': 0, 'updated': None, 'cycle_seconds': None}
+
+    return {
+        'workers': workers,
+        'positions': positions,
+        'signals': signals,
+        'summary': {
+            'symbols': len(positions),
+            'open_positions': sum(1 for item in positions.values() if item.get('position_active') == 'CO_VI_THE'),
+            'realized_profit': sum(item['realized_profit'] for item in positions.values()),
+        },
+    }
+
+
+class ShardWorker:
+    """
+    Phần sharding của một TradingBot: heartbeat nền, tính symbol mình sở hữu mỗi chu kỳ,
+    chuyển giao vị thế khi rebalance và công bố view cho bảng tổng hợp.
+    """
+
+    def __init__(self, coordinator: ShardCoordinator, management_coin, handoff_wait: float = 10.0,
+                 poll_interval: float = 0.5):
+        self.logger = logCommon.getLog(__name__)
+        self.coordinator = coordinator
+        self.management_coin = management_coin
+        self.handoff_wait = handoff_wait
+        self.poll_interval = poll_interval
+        self.owned: set = set()
+        self._released: Dict[str, dict] = {}
+        self._signals: Dict[str, dict] = {}
+        self._signals_lock = threading.Lock()
+        self._cycle_seconds: Optional[float] = None
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def worker_id(self) -> str:
+        return self.coordinator.worker_id
+
+    def start(self) -> 'ShardWorker':
+        """Đăng ký ngay và heartbeat nền (chu kỳ dài hơn TTL vẫn không bị coi là chết)"""
+        self.coordinator.heartbeat()
+        self._thread = threading.Thread(target=self._heartbeat_loop, name='shard-heartbeat', daemon=True)
+        self._thread.start()
+        return self
+
+    def _heartbeat_loop(self) -> None:
+        while not self._stop.wait(self.coordinator.heartbeat_ttl / 3):
+            try:
+                self.coordinator.heartbeat()
+            except OSError as e:
+                self.logger.error(f"❌ Shard heartbeat lỗi: {e}")
+
+    def sync(self, symbols: List[str]) -> List[str]:
+        """Cập nhật tập symbol sở hữu theo các worker đang sống; trả về các symbol được xử lý chu kỳ này"""
+        self.coordinator.heartbeat()
+        workers = self.coordinator.live_workers()
+        if self.worker_id not in workers:
+            workers.append(self.worker_id)
+        ring = self.coordinator.ring(workers)
+        wanted = {symbol for symbol in symbols if ring.owner(symbol) == self.worker_id}
+
+        released = self.owned - wanted
+        if released:
+            for symbol in released:
+                self._released[symbol] = self._export(symbol)
+            self.owned -= released
+            # Công bố ngay để worker nhận không phải chờ
+            self.publish()
+
+        acquired = self._acquire(wanted - self.owned, workers)
+        for symbol in acquired:
+            self._released.pop(symbol, None)
+        self.owned |= acquired
+        # Symbol không còn trong danh sách coin: bỏ luôn khỏi view
+        for symbol in list(self._released):
+            if symbol not in symbols:
+                del self._released[symbol]
+        self._forget_taken_over(workers)
+
+        waiting = len(wanted) - len(self.owned)
+        if released or acquired or waiting:
+            self.logger.info(f"Shard {self.worker_id}: {len(self.owned)}/{len(symbols)} symbols "
+                             f"(+{len(acquired)} -{len(released)}, chờ chuyển giao {waiting}) | workers: {len(workers)}")
+        self.publish()
+        return [symbol for symbol in symbols if symbol in self.owned]
+
+    def _acquire(self, candidates: set, workers: List[str]) -> set:
+        """Nhận các symbol mới: chờ (tối đa handoff_wait) chủ cũ còn sống released rồi nạp trạng thái cuối"""
+        acquired = set()
+        deadline = time.monotonic() + self.handoff_wait
+        while candidates:
+            views = self.coordinator.read_views()
+            for symbol in list(candidates):
+                source = self._handoff_source(symbol, views, workers)
+                if source is False:
+                    continue
+                if source is not None:
+                    self.management_coin.import_position(symbol, source)
+                    self.logger.info(f"Shard {self.worker_id}: nhận {symbol} "
+                                     f"({source['position'].get('position_active')})")
+                candidates.discard(symbol)
+                acquired.add(symbol)
+            if not candidates or time.monotonic() >= deadline or self._stop.wait(self.poll_interval):
+                break
+        return acquired
+
+    def _export(self, symbol: str) -> dict:
+        """Trạng thái hiện tại của symbol, đóng dấu thời điểm export để so bản nào mới hơn khi chuyển giao"""
+        return dict(self.management_coin.export_position(symbol), exported=self.coordinator.now())
+
+    def _forget_taken_over(self, workers: List[str]) -> None:
+        """Bỏ bản released khi worker khác còn sống đã công bố đang giữ symbol (bản đó từ đây là cũ)"""
+        if not self._released:
+            return
+        for worker, view in self.coordinator.read_views().items():
+            if worker == self.worker_id or worker not in workers:
+                continue
+            for symbol, entry in view.get('positions', {}).items():
+                if symbol in self._released and not entry.get('released'):
+                    del self._released[symbol]
+
+    def _handoff_source(self, symbol: str, views: Dict[str, dict], workers: List[str]):
+        """
+        Trạng thái cần nạp cho symbol: dict (từ view released hoặc của worker đã chết), None (chưa ai từng giữ),
+        False (worker khác còn sống vẫn đang giữ -> chờ). Nhiều bản thì lấy bản export sau cùng.
+        """
+        best = None
+        for worker, view in views.items():
+            if worker == self.worker_id:
+                continue
+            entry = view.get('positions', {}).get(symbol)
+            if entry is None:
+                continue
+            if not entry.get('released') and worker in workers:
+                return False
+            if best is None or entry.get('exported', 0) > best[0]:
+                best = (entry.get('exported', 0), entry)
+        return None if best is None else best[1]
+
+    def record_signal(self, symbol: str, action: str, price: float) -> None:
+        with self._signals_lock:
+            self._signals[symbol] = {'action': action, 'price': price, 'time': self.coordinator.now()}
+
+    def publish(self, cycle_seconds: float = None) -> None:
+        """Ghi view: vị thế + lịch sử của symbol đang giữ (và bản cuối của symbol đã nhả) + tín hiệu gần nhất"""
+        if cycle_seconds is not None:
+            self._cycle_seconds = cycle_seconds
+        positions = {}
+        for symbol in self.owned:
+            positions[symbol] = dict(self._export(symbol), released=False)
+        for symbol, data in self._released.items():
+            positions[symbol] = dict(data, released=True)
+        with self._signals_lock:
+            # Tín hiệu của sổ chiến lược có key dạng SYMBOL@strategy
+            signals = {key: item for key, item in self._signals.items() if key.split('@')[0] in self.owned}
+        try:
+            self.coordinator.write_view({'worker': self.worker_id, 'updated': self.coordinator.now(),
+                                         'cycle_seconds': self._cycle_seconds,
+                                         'positions': positions, 'signals': signals})
+        except OSError as e:
+            self.logger.error(f"❌ Không ghi được shard view: {e}")
+
+    def leave(self) -> None:
+        """Dừng có chủ đích: nhả mọi symbol (kèm trạng thái cuối) rồi rời nhóm để worker khác nhận ngay"""
+        self._stop.set()
+        for symbol in self.owned:
+            self._released[symbol] = self._export(symbol)
+        self.owned = set()
+        self.publish()
+        self.coordinator.leave()
+
+
+# --- CÔNG CỤ DÒNG LỆNH ---
+def _print_status(report: dict) -> None:
+    for worker, info in sorted(report['workers'].items()):
+        cycle = f"{info['cycle_seconds']:.2f}s" if info.get('cycle_seconds') is not None else '-'
+        print(f"  {'✅' if info['alive'] else '❌'} {worker}: {info['symbols']} symbols, cycle {cycle}")
+    summary = report['summary']
+    print(f"  {summary['symbols']} symbols | open positions: {summary['open_positions']} | "
+          f"realized profit: {summary['realized_profit']:.2f}% | signals: {len(report['signals'])}")
+
+
+def _ring_report(symbol_count: int, worker_count: int, vnodes: int) -> None:
+    symbols = [f"SYM{i:05d}USDT" for i in range(symbol_count)]
+    workers = [f"worker-{i}" for i in range(worker_count)]
+    base = HashRing(workers, vnodes)
+    sizes = [len(keys) for keys in base.assignment(symbols).values()]
+    print(f"{worker_count} workers, {symbol_count} symbols: min {min(sizes)} / max {max(sizes)} "
+          f"(ideal {symbol_count / worker_count:.0f})")
+    for label, changed in (('join', workers + [f"worker-{worker_count}"]), ('leave', workers[1:])):
+        ring = HashRing(changed, vnodes)
+        moved = sum(1 for symbol in symbols if base.owner(symbol) != ring.owner(symbol))
+        ideal = symbol_count / max(len(changed), worker_count)
+        print(f"  {label}: moved {moved} symbols (ideal {ideal:.0f})")
+
+
+def _run_worker(args) -> None:
+    """Worker của demo: TradingBot thật với client giả"""
+    import binance_coin.services.trading_bot as trading_bot
+    from binance_coin.benchmarks.fake_client import SyntheticClient
+
+    symbols = os.environ['LIST_COIN_SYMBOL'].split('|')
+    bot = trading_bot.TradingBot(client=SyntheticClient(symbols, interval=os.environ['TIME_INTERVAL']))
+    signal.signal(signal.SIGTERM, lambda *_: bot.stop())
+    bot.run()
+
+
+def _demo(args) -> int:
+    root = args.root or tempfile.mkdtemp(prefix='shards-')
+    symbols = [f"SYM{i:03d}USDT" for i in range(args.symbols)]
+    env = dict(os.environ)
+    env.update({
+        'PYTHONPATH': PROJECT_ROOT + os.pathsep + env.get('PYTHONPATH', ''),
+        'API_KEY': 'demo', 'SECRET_KEY': 'demo',
+        'LIST_COIN_SYMBOL': '|'.join(symbols),
+        'TIME_INTERVAL': '1m', 'SCHEDULE_MODE': 'sleep', 'SLEEP_INTERVAL_SECONDS': '1',
+        'KLINE_STORE_DIR': '', 'ACCOUNT_CHECK': 'off', 'LOG_LEVEL': 'WARNING',
+        'LOG_FILENAME': os.path.join(root, 'trading_bot.log'),
+        'SIGNAL_LOG_FILENAME': os.path.join(root, 'signals.log'),
+        'SHARD_DIR': root, 'SHARD_HEARTBEAT_TTL': '6',
+    })
+    processes = {}
+
+    def spawn(index: int) -> None:
+        worker_env = dict(env, SHARD_WORKER_ID=f"worker-{index}")
+        processes[index] = subprocess.Popen([sys.executable, '-m', 'binance_coin.services.sharding', 'worker'],
+                                            cwd=root, env=worker_env, stdout=subprocess.DEVNULL)
+
+    def check(label: str) -> bool:
+        time.sleep(args.settle)
+        coordinator = ShardCoordinator(root, heartbeat_ttl=6)
+        report = coordinator.aggregate()
+        owners = {}
+        for view in coordinator.read_views().values():
+            for symbol, entry in view.get('positions', {}).items():
+                if not entry.get('released'):
+                    owners.setdefault(symbol, []).append(view['worker'])
+        duplicated = [symbol for symbol, workers in owners.items() if len(workers) > 1]
+        missing = [symbol for symbol in symbols if symbol not in owners]
+        print(f"[{label}] {len(owners)}/{len(symbols)} symbols owned, duplicated: {len(duplicated)}, "
+              f"missing: {len(missing)}")
+        _print_status(report)
+        return not duplicated and not missing
+
+    ok = True
+    try:
+        for index in range(args.workers):
+            spawn(index)
+        ok &= check(f"{args.workers} workers")
+        spawn(args.workers)
+        ok &= check('join')
+        processes.pop(0).terminate()
+        ok &= check('leave')
+    finally:
+        for process in processes.values():
+            process.terminate()
+        for process in processes.values():
+            process.wait(timeout=30)
+    print(f"{'✅' if ok else '❌'} shard dir: {root}")
+    return 0 if ok else 1
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description='Sharded deployment tools')
+    commands = parser.add_subparsers(dest='command', required=True)
+    status = commands.add_parser('status', help='bảng tổng hợp vị thế / tín hiệu của mọi worker')
+    status.add_argument('--root', default=os.getenv('SHARD_DIR', 'data/shards'))
+    status.add_argument('--ttl', type=float, default=float(os.getenv('SHARD_HEARTBEAT_TTL', 30)))
+    status.add_argument('--json', action='store_true')
+    ring = commands.add_parser('ring', help='phân bố và số symbol bị dời khi thêm/bớt worker')
+    ring.add_argument('--symbols', type=int, default=1000)
+    ring.add_argument('--workers', type=int, default=4)
+    ring.add_argument('--vnodes', type=int, default=64)
+    demo = commands.add_parser('demo', help='chạy worker local với client giả, thêm rồi bớt một worker')
+    demo.add_argument('--root')
+    demo.add_argument('--workers', type=int, default=3)
+    demo.add_argument('--symbols', type=int, default=24)
+    demo.add_argument('--settle', type=float, default=12.0, help='giây chờ mỗi bước')
+    commands.add_parser('worker', help=argparse.SUPPRESS)
+    args = parser.parse_args(argv)
+
+    if args.command == 'status':
+        report = ShardCoordinator(args.root, heartbeat_ttl=args.ttl).aggregate()
+        if args.json:
+            print(json.dumps(report, indent=2))
+        else:
+            _print_status(report)
+        return 0
+    if args.command == 'ring':
+        _ring_report(args.symbols, args.workers, args.vnodes)
+        return 0
+    if args.command == 'worker':
+        _run_worker(args)
+        return 0
+    return _demo(args)
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,133 @@
+# -*- coding: utf-8 -*-
+from collections import namedtuple
+from typing import List, Optional, Sequence
+
+import numpy as np
+
+# Mã tín hiệu trong mảng kết quả
+SIGNAL_SELL = -1
+SIGNAL_NONE = 0
+SIGNAL_BUY = 1
+
+SignalBatch = namedtuple('SignalBatch', ['signals', 'ma_fast', 'ma_slow', 'prev_ma_fast', 'prev_ma_slow'])
+
+
+def stack_closes(series: Sequence[Optional[np.ndarray]], n_candles: int) -> np.ndarray:
+    """
+    Xếp giá đóng cửa của nhiều symbol thành ma trận (symbols x n_candles), căn phải theo nến mới nhất.
+    Symbol thiếu dữ liệu được đệm NaN ở đầu (sẽ không sinh tín hiệu).
+    """
+    matrix = np.full((len(series), n_candles), np.nan, dtype=np.float64)
+    for row, closes in enumerate(series):
+        if closes is None or len(closes) == 0:
+            continue
+        tail = np.asarray(closes, dtype=np.float64)[-n_candles:]
+        matrix[row, n_candles - len(tail):] = tail
+    return matrix
+
+
+def last_two_means(closes: np.ndarray, window: int):
+    """MA của nến cuối và nến trước đó cho mọi hàng, chỉ dùng window + 1 cột cuối"""
+    tail = closes[:, -(window + 1):]
+    current = tail[:, 1:].sum(axis=1) / window
+    previous = tail[:, :-1].sum(axis=1) / window
+    return current, previous
+
+
+def rolling_mean(closes: np.ndarray, window: int) -> np.ndarray:
+    """
+    MA theo trục cuối (hỗ trợ mảng 1D hoặc 2D), NaN cho window - 1 nến đầu giống pandas rolling().mean().
+    Dùng sliding window thay vì cumsum để không tích lũy sai số trên chuỗi dài nhiều năm.
+    """
+    closes = np.asarray(closes, dtype=np.float64)
+    result = np.full(closes.shape, np.nan, dtype=np.float64)
+    if closes.shape[-1] >= window:
+        windows = np.lib.stride_tricks.sliding_window_view(closes, window, axis=-1)
+        result[..., window - 1:] = windows.sum(axis=-1) / window
+    return result
+
+
+def crossover_conditions(ma_fast, ma_slow, prev_ma_fast, prev_ma_slow, current_prices, price_filter: bool = True):
+    """
+    Điều kiện MUA/BÁN của analyze_and_signal (chưa xét vị thế), áp dụng từng phần tử trên mảng numpy.
+    MUA: MA nhanh cắt lên MA chậm, MA nhanh đang tăng và nằm dưới giá hiện tại.
+    BÁN: MA nhanh cắt xuống MA chậm và MA nhanh đang giảm.
+    """
+    # So sánh với NaN luôn False -> dữ liệu thiếu không sinh tín hiệu
+    with np.errstate(invalid='ignore'):
+        crossover_up = (prev_ma_fast < prev_ma_slow) & (ma_fast > ma_slow)
+        ma_fast_rising = ma_fast > prev_ma_fast
+        if price_filter:
+            ma_fast_rising &= ma_fast < current_prices
+        crossover_down = (prev_ma_fast > prev_ma_slow) & (ma_fast < ma_slow)
+        ma_fast_falling = ma_fast < prev_ma_fast
+    return crossover_up & ma_fast_rising, crossover_down & ma_fast_falling
+
+
+def evaluate_signals(closes: np.ndarray, current_prices: np.ndarray, has_position: np.ndarray,
+                     fast: int = 7, slow: int = 25, price_filter: bool = True) -> SignalBatch:
+    """
+    Đánh giá điều kiện MUA/BÁN của analyze_and_signal cho toàn bộ symbol trong một lượt vector hóa.
+    closes: ma trận (symbols x candles) với ít nhất slow + 1 cột, current_prices / has_position: mảng theo symbol.
+    """
+    if closes.ndim != 2 or closes.shape[1] < slow + 1:
+        raise ValueError(f"closes phải là ma trận 2 chiều với ít nhất {slow + 1} cột")
+
+    ma_fast, prev_ma_fast = last_two_means(closes, fast)
+    ma_slow, prev_ma_slow = last_two_means(closes, slow)
+    has_position = np.asarray(has_position, dtype=bool)
+
+    buy_condition, sell_condition = crossover_conditions(ma_fast, ma_slow, prev_ma_fast, prev_ma_slow,
+                                                         current_prices, price_filter)
+    buy = buy_condition & ~has_position
+    sell = sell_condition & has_position
+
+    signals = np.zeros(closes.shape[0], dtype=np.int8)
+    signals[buy] = SIGNAL_BUY
+    signals[sell] = SIGNAL_SELL
+    return SignalBatch(signals, ma_fast, ma_slow, prev_ma_fast, prev_ma_slow)
+
+
+def _scalar_signals(frames: List, prices: np.ndarray, has_position: np.ndarray) -> np.ndarray:
+    """Cách cũ: rolling pandas + iloc theo từng symbol (chỉ dùng để benchmark/đối chiếu)"""
+    signals = np.zeros(len(frames), dtype=np.int8)
+    for i, df in enumerate(frames):
+        df = df.copy()
+        df['MA7'] = df['close'].rolling(window=7).mean()
+        df['MA25'] = df['close'].rolling(window=25).mean()
+        df.dropna(inplace=True)
+        df.reset_index(drop=True, inplace=True)
+        last, prev = df.iloc[-1], df.iloc[-2]
+        if (prev['MA7'] < prev['MA25'] and last['MA7'] > last['MA25'] and last['MA7'] > prev['MA7']
+                and last['MA7'] < prices[i] and not has_position[i]):
+            signals[i] = SIGNAL_BUY
+        elif (prev['MA7'] > prev['MA25'] and last['MA7'] < last['MA25'] and last['MA7'] < prev['MA7']
+              and has_position[i]):
+            signals[i] = SIGNAL_SELL
+    return signals
+
+
+if __name__ == '__main__':
+    import time
+    import pandas as pd
+
+    n_symbols, n_candles = 1000, 480
+    rng = np.random.default_rng(42)
+    closes = 100 * np.cumprod(1 + rng.normal(0, 0.01, size=(n_symbols, n_candles)), axis=1)
+    prices = closes[:, -1] * (1 + rng.normal(0, 0.001, size=n_symbols))
+    has_position = rng.random(n_symbols) < 0.5
+    frames = [pd.DataFrame({'close': row}) for row in closes]
+
+    start = time.perf_counter()
+    expected = _scalar_signals(frames, prices, has_position)
+    scalar_seconds = time.perf_counter() - start
+
+    start = time.perf_counter()
+    batch = evaluate_signals(stack_closes(list(closes), 26), prices, has_position)
+    vector_seconds = time.perf_counter() - start
+
+    mismatches = int((batch.signals != expected).sum())
+    print(f"{n_symbols} symbols x {n_candles} candles")
+    print(f"scalar pandas : {scalar_seconds * 1000:9.2f} ms")
+    print(f"vectorized    : {vector_seconds * 1000:9.2f} ms  (x{scalar_seconds / vector_seconds:,.0f})")
+    print(f"signals       : {int((batch.signals != 0).sum())} | mismatches: {mismatches}")
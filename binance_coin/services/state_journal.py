@@ -0,0 +1,210 @@
+# -*- coding: utf-8 -*-
+import json
+import os
+import threading
+import time
+from datetime import datetime
+from typing import List, Optional, Tuple
+
+import binance_coin.utils.log_common as logCommon
+
+
+def fsync_directory(path: str) -> None:
+    """fsync thư mục chứa file để phép os.replace bền vững (bỏ qua trên Windows)"""
+    try:
+        fd = os.open(os.path.dirname(os.path.abspath(path)), os.O_RDONLY)
+    except OSError:
+        return
+    try:
+        os.fsync(fd)
+    except OSError:
+        pass
+    finally:
+        os.close(fd)
+
+
+class StateJournal:
+    """
+    Lưu trạng thái vị thế bằng write-ahead journal + snapshot.
+    - Mỗi lần mua/bán ghi một dòng JSON vào <state>.journal và fsync trước khi record() trả về (batch_size=1),
+      nên chi phí tỉ lệ với số giao dịch; batch_size > 1 (gom fsync) chỉ dành cho backtest/benchmark.
+    - Khi journal đủ dài, nén thành snapshot <state> (ghi file tạm, fsync, os.replace) trên thread nền.
+    - Khởi động: đọc snapshot rồi phát lại các dòng journal có seq lớn hơn seq của snapshot.
+    """
+
+    def __init__(self, file_path: str, batch_size: int = 1, compact_every: int = 1000):
+        self.logger = logCommon.getLog(__name__)
+        self.file_path = file_path
+        self.journal_path = file_path + '.journal'
+        self.rotated_path = file_path + '.journal.old'
+        self.batch_size = batch_size
+        self.compact_every = compact_every
+
+        self._lock = threading.Lock()
+        self._file = None
+        self._seq = 0
+        self._pending = 0
+        self._entries_since_snapshot = 0
+        self._compaction_thread = None
+
+    # --- KHÔI PHỤC ---
+    def recover(self) -> Tuple[dict, List[dict]]:
+        """
+        Trả về (nội dung snapshot {'positions': ..., 'history': ...}, các sự kiện journal cần phát lại theo thứ tự).
+        Dòng cuối bị ghi dở (crash) được bỏ qua và cắt khỏi journal.
+        """
+        snapshot_seq, snapshot = self._read_snapshot()
+        events = []
+        for path in (self.rotated_path, self.journal_path):
+            for event in self._read_journal(path):
+                if event['seq'] > snapshot_seq:
+                    events.append(event)
+        events.sort(key=lambda event: event['seq'])
+
+        self._seq = max([snapshot_seq] + [event['seq'] for event in events])
+        self._entries_since_snapshot = len(events)
+        return snapshot, events
+
+    def _read_snapshot(self) -> Tuple[int, dict]:
+        if not os.path.isfile(self.file_path) or os.path.getsize(self.file_path) == 0:
+            return 0, {'positions': {}}
+        try:
+            with open(self.file_path, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+        except ValueError as e:
+            # Snapshot chỉ được thay bằng os.replace nên file hỏng là file cũ (định dạng trước journal)
+            self.logger.error(f"Loi khi doc snapshot {self.file_path}, bo qua: {e}")
+            return 0, {'positions': {}}
+        if 'positions' not in data:
+            # Định dạng cũ: {symbol: {...}}
+            return 0, {'positions': {symbol: value for symbol, value in data.items() if isinstance(value, dict)}}
+        return int(data.pop('seq', 0)), data
+
+    def _read_journal(self, path: str) -> List[dict]:
+        if not os.path.isfile(path):
+            return []
+        events = []
+        valid_size = 0
+        with open(path, 'rb') as f:
+            for line in f:
+                try:
+                    if not line.endswith(b'\n'):
+                        raise ValueError('dòng ghi dở')
+                    events.append(json.loads(line))
+                except ValueError:
+                    self.logger.warning(f"Journal {path} bị cắt ngang tại byte {valid_size}, bỏ phần đuôi")
+                    break
+                valid_size += len(line)
+        if valid_size < os.path.getsize(path):
+            with open(path, 'r+b') as f:
+                f.truncate(valid_size)
+        return events
+
+    # --- GHI ---
+    def record(self, symbol: str, action: str, price: Optional[float], at: datetime, **fields) -> None:
+        """
+        Ghi một chuyển trạng thái (fields: thuộc tính thêm, vd: quantity).
+        Mặc định fsync ngay: vị thế bot đã hành động theo (lệnh đã gửi) không được mất khi crash.
+        """
+        with self._lock:
+            if self._file is None:
+                self._file = open(self.journal_path, 'a', encoding='utf-8')
+            self._seq += 1
+            event = {'seq': self._seq, 'symbol': symbol, 'action': action, 'price': price, 'time': at.isoformat(),
+                     **fields}
+            self._file.write(json.dumps(event) + '\n')
+            self._pending += 1
+            self._entries_since_snapshot += 1
+            if self._pending >= self.batch_size:
+                self._commit_locked()
+
+    def commit(self) -> int:
+        """fsync các dòng đang chờ (gọi mỗi chu kỳ). Trả về số dòng vừa được commit"""
+        with self._lock:
+            return self._commit_locked()
+
+    def _commit_locked(self) -> int:
+        if self._file is None or self._pending == 0:
+            return 0
+        self._file.flush()
+        os.fsync(self._file.fileno())
+        committed, self._pending = self._pending, 0
+        return committed
+
+    @property
+    def pending(self) -> int:
+        return self._pending
+
+    # --- NÉN SNAPSHOT ---
+    def needs_compaction(self) -> bool:
+        return self._entries_since_snapshot >= self.compact_every
+
+    def compact(self, snapshot_provider, background: bool = True) -> bool:
+        """
+        Xoay journal hiện tại sang .old, chụp trạng thái (snapshot_provider() -> {'positions': ..., ...}),
+        rồi ghi snapshot atomic. Các giao dịch mới trong lúc nén đi vào journal mới nên không bị mất.
+        """
+        if self._compaction_thread is not None and self._compaction_thread.is_alive():
+            return False
+
+        with self._lock:
+            self._commit_locked()
+            if self._file is not None:
+                self._file.close()
+                self._file = None
+            if os.path.isfile(self.rotated_path):
+                # Lần nén trước chưa xong (crash) -> ghép journal hiện tại vào journal cũ để vẫn phát lại được
+                self._append_file(self.journal_path, self.rotated_path)
+            elif os.path.isfile(self.journal_path):
+                os.replace(self.journal_path, self.rotated_path)
+            seq = self._seq
+            snapshot = snapshot_provider()
+            self._entries_since_snapshot = 0
+
+        if background:
+            self._compaction_thread = threading.Thread(target=self._write_snapshot, args=(seq, snapshot),
+                                                       name='state-compaction', daemon=True)
+            self._compaction_thread.start()
+        else:
+            self._write_snapshot(seq, snapshot)
+        return True
+
+    @staticmethod
+    def _append_file(source: str, target: str) -> None:
+        if not os.path.isfile(source):
+            return
+        with open(source, 'rb') as src, open(target, 'ab') as dst:
+            dst.write(src.read())
+            dst.flush()
+            os.fsync(dst.fileno())
+        os.remove(source)
+
+    def _write_snapshot(self, seq: int, snapshot: dict) -> None:
+        start = time.perf_counter()
+        tmp_path = self.file_path + '.tmp'
+        try:
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                json.dump(dict(snapshot, seq=seq), f, indent=4)
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(tmp_path, self.file_path)
+            fsync_directory(self.file_path)
+            # Snapshot đã bền vững -> journal cũ không còn cần
+            if os.path.isfile(self.rotated_path):
+                os.remove(self.rotated_path)
+            self.logger.info(f"Đã nén trạng thái vào snapshot {self.file_path} (seq {seq}, "
+                             f"{len(snapshot['positions'])} symbols, {(time.perf_counter() - start) * 1000:.1f} ms)")
+        except Exception as e:
+            self.logger.error(f"Loi khi ghi snapshot: {e}")
+
+    def close(self, snapshot_provider=None) -> None:
+        """Commit phần còn lại, nén đồng bộ nếu có snapshot_provider"""
+        if self._compaction_thread is not None:
+            self._compaction_thread.join()
+        if snapshot_provider is not None and self._entries_since_snapshot:
+            self.compact(snapshot_provider, background=False)
+        with self._lock:
+            self._commit_locked()
+            if self._file is not None:
+                self._file.close()
+                self._file = None
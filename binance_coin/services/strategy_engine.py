@@ -0,0 +1,398 @@
+# -*- coding: utf-8 -*-
+"""
+Nhiều chiến lược chạy song song trên cùng symbol, dùng chung một đồ thị indicator có memo.
+
+Mỗi indicator (SMA(7), SMA(25), EMA, RSI, ...) là một node có tham số và các node phụ thuộc; giá trị được cache
+theo (symbol, interval, node, phiên bản nến cuối) với LRU, nên mỗi node chỉ tính một lần cho mỗi nến
+dù bao nhiêu chiến lược dùng tới. Tín hiệu của từng chiến lược đi vào sổ SellBuy riêng (book_key).
+
+    STRATEGIES="ma_cross:7:25|rsi:14:30:70|breakout:20"
+    python -m binance_coin.services.strategy_engine
+"""
+from collections import OrderedDict, namedtuple
+from typing import Dict, List, Sequence, Tuple
+
+import numpy as np
+
+from binance_coin.enums.position_state import PositionState
+from binance_coin.services.kline_decoder import decode_klines
+from binance_coin.services.signal_evaluator import crossover_conditions, rolling_mean
+
+Candles = namedtuple('Candles', ['open_time', 'open', 'high', 'low', 'close', 'volume'])
+StrategySignal = namedtuple('StrategySignal', ['position', 'price', 'reason'])
+
+NO_SIGNAL = StrategySignal(PositionState.NONE, 0, '')
+
+
+def candles_from_klines(klines: Sequence[list]) -> Candles:
+    """Các cột cần cho indicator từ nến dạng REST (12 cột, số dạng chuỗi)"""
+    return Candles(**decode_klines(klines, Candles._fields))
+
+
+def book_key(symbol: str, strategy: str) -> str:
+    """Tên dòng trong PositionTable cho sổ của một chiến lược (journal / snapshot dùng chung định dạng)"""
+    return f"{symbol}@{strategy}"
+
+
+# --- INDICATOR ---
+class Indicator:
+    """Node của đồ thị: key định danh (tên + tham số), deps là các node đầu vào"""
+    name = ''
+
+    def __init__(self, *params, deps: Tuple['Indicator', ...] = ()):
+        self.params = params
+        self.deps = deps
+        self.key = (self.name,) + params + tuple(dep.key for dep in deps)
+
+    def compute(self, candles: Candles, *inputs: np.ndarray) -> np.ndarray:
+        raise NotImplementedError
+
+    def __repr__(self) -> str:
+        return f"{self.name.upper()}({', '.join(str(param) for param in self.params)})"
+
+
+class Source(Indicator):
+    """Một cột của nến (close, high, low, ...)"""
+    name = 'source'
+
+    def __init__(self, column: str = 'close'):
+        super().__init__(column)
+
+    def compute(self, candles, *inputs):
+        return getattr(candles, self.params[0])
+
+
+class SMA(Indicator):
+    name = 'sma'
+
+    def __init__(self, period: int, source: Indicator = None):
+        super().__init__(period, deps=(source or Source('close'),))
+
+    def compute(self, candles, values):
+        return rolling_mean(values, self.params[0])
+
+
+class EMA(Indicator):
+    """EMA giống pandas ewm(span=period, adjust=False)"""
+    name = 'ema'
+
+    def __init__(self, period: int, source: Indicator = None):
+        super().__init__(period, deps=(source or Source('close'),))
+
+    def compute(self, candles, values):
+        alpha = 2.0 / (self.params[0] + 1)
+        result = np.empty(len(values), dtype=np.float64)
+        current = np.nan
+        for i, value in enumerate(values.tolist()):
+            current = value if i == 0 else current + alpha * (value - current)
+            result[i] = current
+        return result
+
+
+class RSI(Indicator):
+    """RSI làm mượt kiểu Wilder; NaN cho period nến đầu"""
+    name = 'rsi'
+
+    def __init__(self, period: int = 14, source: Indicator = None):
+        super().__init__(period, deps=(source or Source('close'),))
+
+    def compute(self, candles, values):
+        period = self.params[0]
+        result = np.full(len(values), np.nan, dtype=np.float64)
+        if len(values) <= period:
+            return result
+        change = np.diff(values)
+        gains, losses = np.clip(change, 0, None).tolist(), np.clip(-change, 0, None).tolist()
+        avg_gain, avg_loss = sum(gains[:period]) / period, sum(losses[:period]) / period
+        for i in range(period, len(values)):
+            if i > period:
+                avg_gain = (avg_gain * (period - 1) + gains[i - 1]) / period
+                avg_loss = (avg_loss * (period - 1) + losses[i - 1]) / period
+            result[i] = 100.0 if avg_loss == 0 else 100.0 - 100.0 / (1 + avg_gain / avg_loss)
+        return result
+
+
+class Highest(Indicator):
+    """Giá trị lớn nhất của period nến gần nhất (tính cả nến hiện tại)"""
+    name = 'highest'
+
+    def __init__(self, period: int, source: Indicator = None):
+        super().__init__(period, deps=(source or Source('high'),))
+
+    def compute(self, candles, values):
+        return _rolling(values, self.params[0], np.max)
+
+
+class Lowest(Indicator):
+    name = 'lowest'
+
+    def __init__(self, period: int, source: Indicator = None):
+        super().__init__(period, deps=(source or Source('low'),))
+
+    def compute(self, candles, values):
+        return _rolling(values, self.params[0], np.min)
+
+
+def _rolling(values: np.ndarray, window: int, reducer) -> np.ndarray:
+    result = np.full(len(values), np.nan, dtype=np.float64)
+    if len(values) >= window:
+        result[window - 1:] = reducer(np.lib.stride_tricks.sliding_window_view(values, window), axis=-1)
+    return result
+
+
+class IndicatorGraph:
+    """
+    Cache LRU các giá trị indicator theo (symbol, interval, node.key, phiên bản nến).
+    Phiên bản nến = (open_time, close) của nến cuối: nến đang mở đổi giá thì tính lại, còn trong cùng
+    một chu kỳ mọi chiến lược dùng chung kết quả. Khi có phiên bản mới, bản cũ của cùng node bị bỏ ngay.
+    """
+
+    def __init__(self, max_entries: int = 4096):
+        self.max_entries = max_entries
+        self._cache: 'OrderedDict[tuple, np.ndarray]' = OrderedDict()
+        self._latest: Dict[tuple, tuple] = {}
+        self.hits = 0
+        self.computed = 0
+        self.evictions = 0
+
+    def evaluate(self, indicator: Indicator, symbol: str, interval: str, candles: Candles) -> np.ndarray:
+        if isinstance(indicator, Source):
+            return indicator.compute(candles)
+        version = (int(candles.open_time[-1]), float(candles.close[-1])) if len(candles.open_time) else None
+        series_key = (symbol, interval, indicator.key)
+        cache_key = series_key + (version,)
+        value = self._cache.get(cache_key)
+        if value is not None:
+            self._cache.move_to_end(cache_key)
+            self.hits += 1
+            return value
+
+        inputs = [self.evaluate(dep, symbol, interval, candles) for dep in indicator.deps]
+        value = indicator.compute(candles, *inputs)
+        self.computed += 1
+        previous = self._latest.get(series_key)
+        if previous is not None:
+            self._cache.pop(previous, None)
+        self._latest[series_key] = cache_key
+        self._cache[cache_key] = value
+        while len(self._cache) > self.max_entries:
+            evicted, _ = self._cache.popitem(last=False)
+            self._latest.pop(evicted[:3], None)
+            self.evictions += 1
+        return value
+
+    def reset(self, symbol: str = None) -> None:
+        for key in [key for key in self._cache if symbol is None or key[0] == symbol]:
+            del self._cache[key]
+            self._latest.pop(key[:3], None)
+
+    def stats(self) -> dict:
+        return {'entries': len(self._cache), 'hits': self.hits, 'computed': self.computed,
+                'evictions': self.evictions}
+
+
+class StrategyContext:
+    """Dữ liệu một symbol cho các chiến lược: nến, giá hiện tại, truy cập indicator qua graph"""
+    __slots__ = ('symbol', 'interval', 'candles', 'price', '_graph')
+
+    def __init__(self, graph: IndicatorGraph, symbol: str, interval: str, candles: Candles, price: float):
+        self._graph = graph
+        self.symbol = symbol
+        self.interval = interval
+        self.candles = candles
+        self.price = price
+
+    def value(self, indicator: Indicator) -> np.ndarray:
+        return self._graph.evaluate(indicator, self.symbol, self.interval, self.candles)
+
+    def last_two(self, indicator: Indicator) -> Tuple[float, float]:
+        """(giá trị nến trước, giá trị nến cuối)"""
+        values = self.value(indicator)
+        return float(values[-2]), float(values[-1])
+
+
+# --- CHIẾN LƯỢC ---
+class Strategy:
+    """Giao diện chiến lược: evaluate trả về StrategySignal (position NONE = không có tín hiệu)"""
+    name = ''
+
+    @property
+    def min_candles(self) -> int:
+        return 2
+
+    def evaluate(self, ctx: StrategyContext, position: PositionState) -> StrategySignal:
+        raise NotImplementedError
+
+
+class MACrossoverStrategy(Strategy):
+    """Chiến lược gốc của analyze_and_signal: MA nhanh cắt MA chậm"""
+    name = 'ma_cross'
+
+    def __init__(self, fast: int = 7, slow: int = 25):
+        if fast >= slow:
+            raise ValueError("fast window phải nhỏ hơn slow window")
+        self.fast, self.slow = SMA(fast), SMA(slow)
+
+    @property
+    def min_candles(self) -> int:
+        return self.slow.params[0] + 2
+
+    def evaluate(self, ctx, position):
+        prev_fast, ma_fast = ctx.last_two(self.fast)
+        prev_slow, ma_slow = ctx.last_two(self.slow)
+        buy, sell = crossover_conditions(ma_fast, ma_slow, prev_fast, prev_slow, ctx.price)
+        if buy and position != PositionState.CO_VI_THE:
+            return StrategySignal(PositionState.CO_VI_THE, ctx.price, f"{self.fast} crosses above {self.slow}")
+        if sell and position == PositionState.CO_VI_THE:
+            return StrategySignal(PositionState.KHONG_VI_THE, ctx.price, f"{self.fast} crosses below {self.slow}")
+        return NO_SIGNAL
+
+
+class RSIStrategy(Strategy):
+    """MUA khi RSI vượt lên khỏi vùng quá bán, BÁN khi RSI rơi xuống khỏi vùng quá mua"""
+    name = 'rsi'
+
+    def __init__(self, period: int = 14, oversold: float = 30, overbought: float = 70):
+        self.rsi = RSI(period)
+        self.oversold, self.overbought = oversold, overbought
+
+    @property
+    def min_candles(self) -> int:
+        return self.rsi.params[0] + 2
+
+    def evaluate(self, ctx, position):
+        previous, current = ctx.last_two(self.rsi)
+        if previous < self.oversold <= current and position != PositionState.CO_VI_THE:
+            return StrategySignal(PositionState.CO_VI_THE, ctx.price, f"{self.rsi} {current:.1f} leaves oversold")
+        if previous > self.overbought >= current and position == PositionState.CO_VI_THE:
+            return StrategySignal(PositionState.KHONG_VI_THE, ctx.price,
+                                  f"{self.rsi} {current:.1f} leaves overbought")
+        return NO_SIGNAL
+
+
+class BreakoutStrategy(Strategy):
+    """MUA khi giá đóng cửa vượt đỉnh period nến trước, BÁN khi thủng đáy period nến trước"""
+    name = 'breakout'
+
+    def __init__(self, period: int = 20):
+        self.highest, self.lowest = Highest(period), Lowest(period)
+
+    @property
+    def min_candles(self) -> int:
+        return self.highest.params[0] + 1
+
+    def evaluate(self, ctx, position):
+        # Kênh của các nến trước nến hiện tại
+        upper = float(ctx.value(self.highest)[-2])
+        lower = float(ctx.value(self.lowest)[-2])
+        close = float(ctx.candles.close[-1])
+        if close > upper and position != PositionState.CO_VI_THE:
+            return StrategySignal(PositionState.CO_VI_THE, ctx.price, f"close {close:.4f} > {self.highest} {upper:.4f}")
+        if close < lower and position == PositionState.CO_VI_THE:
+            return StrategySignal(PositionState.KHONG_VI_THE, ctx.price, f"close {close:.4f} < {self.lowest} {lower:.4f}")
+        return NO_SIGNAL
+
+
+STRATEGY_TYPES = {strategy.name: strategy for strategy in (MACrossoverStrategy, RSIStrategy, BreakoutStrategy)}
+
+
+def build_strategies(spec: str) -> List[Strategy]:
+    """
+    'ma_cross:7:25|rsi:14:30:70|breakout:20' -> danh sách chiến lược (tham số theo thứ tự của __init__).
+    Tên trùng (cùng loại, khác tham số) được gắn thêm tham số: vd ma_cross_5_20.
+    """
+    strategies, names = [], set()
+    for part in spec.split('|'):
+        part = part.strip()
+        if not part:
+            continue
+        kind, *params = part.split(':')
+        if kind not in STRATEGY_TYPES:
+            raise ValueError(f"Chiến lược không hỗ trợ: {kind} (có: {', '.join(STRATEGY_TYPES)})")
+        strategy = STRATEGY_TYPES[kind](*(float(param) if '.' in param else int(param) for param in params))
+        if kind in names:
+            strategy.name = '_'.join([kind] + params)
+        if strategy.name in names:
+            raise ValueError(f"Chiến lược bị lặp: {part}")
+        names.add(strategy.name)
+        strategies.append(strategy)
+    return strategies
+
+
+class StrategyEngine:
+    """Chạy mọi chiến lược trên một symbol, indicator dùng chung qua IndicatorGraph"""
+
+    def __init__(self, strategies: Sequence[Strategy], graph: IndicatorGraph = None):
+        if not strategies:
+            raise ValueError("Cần ít nhất một chiến lược")
+        self.strategies = list(strategies)
+        self.graph = graph or IndicatorGraph()
+
+    @property
+    def min_candles(self) -> int:
+        return max(strategy.min_candles for strategy in self.strategies)
+
+    def evaluate(self, symbol: str, interval: str, candles: Candles, price: float,
+                 positions: Dict[str, PositionState]) -> Dict[str, StrategySignal]:
+        """positions: vị thế hiện tại theo tên chiến lược. Chiến lược chưa đủ nến trả về NO_SIGNAL"""
+        ctx = StrategyContext(self.graph, symbol, interval, candles, price)
+        signals = {}
+        for strategy in self.strategies:
+            if len(candles.close) < strategy.min_candles:
+                signals[strategy.name] = NO_SIGNAL
+                continue
+            signals[strategy.name] = strategy.evaluate(ctx, positions.get(strategy.name, PositionState.KHONG_VI_THE))
+        return signals
+
+
+def verify_against_pandas(n_candles: int = 500, seed: int = 7) -> float:
+    """So sánh SMA/EMA/RSI với pandas; trả về sai số tương đối lớn nhất"""
+    import pandas as pd
+
+    rng = np.random.default_rng(seed)
+    close = 100 * np.cumprod(1 + rng.normal(0, 0.01, n_candles))
+    candles = Candles(np.arange(n_candles, dtype=np.int64), close, close * 1.01, close * 0.99, close,
+                      np.ones(n_candles))
+    series = pd.Series(close)
+    delta = series.diff()
+    # Wilder: trung bình đơn giản của period giá trị đầu rồi làm mượt alpha = 1/period
+    gain = delta.clip(lower=0).iloc[1:]
+    loss = (-delta.clip(upper=0)).iloc[1:]
+    seed_gain, seed_loss = gain.iloc[:14].mean(), loss.iloc[:14].mean()
+    avg_gain = pd.concat([pd.Series([seed_gain]), gain.iloc[14:]]).ewm(alpha=1 / 14, adjust=False).mean()
+    avg_loss = pd.concat([pd.Series([seed_loss]), loss.iloc[14:]]).ewm(alpha=1 / 14, adjust=False).mean()
+    expected_rsi = (100 - 100 / (1 + avg_gain / avg_loss)).to_numpy()
+
+    graph = IndicatorGraph()
+    pairs = [(graph.evaluate(SMA(25), 'T', '1m', candles), series.rolling(25).mean().to_numpy()),
+             (graph.evaluate(EMA(12), 'T', '1m', candles), series.ewm(span=12, adjust=False).mean().to_numpy()),
+             (graph.evaluate(RSI(14), 'T', '1m', candles)[14:], expected_rsi)]
+    max_error = 0.0
+    for actual, expected in pairs:
+        mask = ~np.isnan(expected)
+        error = np.max(np.abs(actual[mask] - expected[mask]) / np.maximum(1.0, np.abs(expected[mask])))
+        max_error = max(max_error, float(error))
+    return max_error
+
+
+if __name__ == '__main__':
+    import time
+
+    from binance_coin.benchmarks.fake_client import SyntheticClient
+
+    print(f"Sai số lớn nhất so với pandas (SMA/EMA/RSI): {verify_against_pandas():.3e}")
+
+    symbols = [f"SYM{i:03d}USDT" for i in range(200)]
+    fake = SyntheticClient(symbols, interval='15m')
+    engine = StrategyEngine(build_strategies('ma_cross:7:25|ma_cross:25:99|rsi:14:30:70|breakout:20'))
+    data = {symbol: candles_from_klines(fake.get_klines(symbol=symbol, interval='15m', limit=1000))
+            for symbol in symbols}
+    start = time.perf_counter()
+    for _ in range(3):
+        for symbol, candles in data.items():
+            engine.evaluate(symbol, '15m', candles, float(candles.close[-1]), {})
+    elapsed = time.perf_counter() - start
+    stats = engine.graph.stats()
+    # 4 chiến lược dùng 6 node (SMA 7/25/99, RSI, Highest, Lowest): mỗi node tính đúng một lần mỗi symbol
+    print(f"{len(engine.strategies)} strategies x {len(symbols)} symbols x 3 lần: {elapsed * 1000:.1f} ms | "
+          f"computed {stats['computed']} (= {stats['computed'] // len(symbols)} node/symbol), hits {stats['hits']}")
@@ -0,0 +1,214 @@
+# -*- coding: utf-8 -*-
+import asyncio
+import json
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Callable, List, Optional
+
+import binance_coin.utils.log_common as logCommon
+
+# Endpoint combined streams của Binance Spot
+BINANCE_STREAM_URL = 'wss://stream.binance.com:9443'
+
+
+def kline_event_to_row(kline: dict) -> list:
+    """Chuyển payload 'k' của sự kiện kline WebSocket sang định dạng 12 cột giống REST get_klines"""
+    return [
+        kline['t'], kline['o'], kline['h'], kline['l'], kline['c'], kline['v'],
+        kline['T'], kline['q'], kline['n'], kline['V'], kline['Q'], '0'
+    ]
+
+
+class MarketStream:
+    """
+    Đăng ký kline + ticker cho danh sách symbol qua combined streams.
+    Tự kết nối lại khi mất kết nối, gọi on_reconnect (vd: backfill REST) trước khi đọc tiếp dữ liệu.
+    update(): đổi danh sách symbol / interval khi đang chạy bằng SUBSCRIBE/UNSUBSCRIBE trên kết nối hiện tại.
+    Khi run(): on_kline, on_reconnect, on_added chạy lần lượt trên một thread worker riêng (đúng thứ tự frame,
+    không chạy song song với nhau) nên phân tích / fsync / REST không chặn event loop (ping, đọc frame);
+    on_ticker phải nhanh, chạy ngay trên event loop.
+    """
+
+    def __init__(self, symbols: List[str], interval: str,
+                 on_kline: Callable[[str, str, list, bool], None],
+                 on_ticker: Optional[Callable[[str, float, int], None]] = None,
+                 on_reconnect: Optional[Callable[[], None]] = None,
+                 base_url: str = BINANCE_STREAM_URL,
+                 reconnect_delay: float = 1.0, max_reconnect_delay: float = 60.0):
+        self.logger = logCommon.getLog(__name__)
+        self.symbols = list(symbols)
+        self.interval = interval
+        self.on_kline = on_kline
+        self.on_ticker = on_ticker
+        self.on_reconnect = on_reconnect
+        self.base_url = base_url.rstrip('/')
+        self.reconnect_delay = reconnect_delay
+        self.max_reconnect_delay = max_reconnect_delay
+        self.is_running = False
+        self.connect_count = 0
+        self.message_count = 0
+        self._websocket = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._worker: Optional[ThreadPoolExecutor] = None
+        self._stopped: Optional[asyncio.Event] = None
+        self._request_id = 0
+
+    def streams(self, symbols: List[str] = None, interval: str = None) -> List[str]:
+        streams = []
+        for symbol in self.symbols if symbols is None else symbols:
+            name = symbol.lower()
+            streams.append(f"{name}@kline_{interval or self.interval}")
+            if self.on_ticker is not None:
+                streams.append(f"{name}@ticker")
+        return streams
+
+    def build_url(self) -> str:
+        return f"{self.base_url}/stream?streams={'/'.join(self.streams())}"
+
+    def handle_message(self, message) -> None:
+        """Phân tích một frame combined stream và gọi callback tương ứng"""
+        payload = json.loads(message)
+        data = payload.get('data', payload)
+        event_type = data.get('e')
+        self.message_count += 1
+
+        if event_type == 'kline':
+            kline = data['k']
+            self._dispatch(self.on_kline, data['s'], kline['i'], kline_event_to_row(kline), bool(kline['x']))
+        elif event_type == '24hrTicker' and self.on_ticker is not None:
+            self.on_ticker(data['s'], float(data['c']), int(data['E']))
+
+    def _dispatch(self, callback: Callable, *args) -> None:
+        """Đưa callback vào thread worker (đang run()), hoặc gọi ngay nếu không có worker"""
+        if self._worker is None:
+            callback(*args)
+            return
+        self._worker.submit(callback, *args).add_done_callback(self._log_callback_error)
+
+    def submit(self, callback: Callable, *args) -> None:
+        """
+        Chạy callback trên thread worker sau các frame đã nhận, gọi được từ thread khác (vd: hot reload cấu hình)
+        nên không chạy song song với on_kline. Stream đã dừng: gọi ngay trên thread hiện tại.
+        """
+        try:
+            self._dispatch(callback, *args)
+        except RuntimeError:
+            # Worker vừa shutdown
+            callback(*args)
+
+    def _log_callback_error(self, future: Future) -> None:
+        error = future.exception()
+        if error is not None:
+            self.logger.error(f"❌ Lỗi khi xử lý frame WebSocket: {error}")
+
+    async def _call_in_worker(self, callback: Callable, *args) -> None:
+        """Chạy callback trên thread worker sau các frame đã nhận và chờ xong (vd: backfill trước khi đọc tiếp)"""
+        await asyncio.get_running_loop().run_in_executor(self._worker, callback, *args)
+
+    async def run(self) -> None:
+        """Vòng lặp kết nối / đọc / kết nối lại cho tới khi stop() được gọi"""
+        self._loop = asyncio.get_running_loop()
+        self._stopped = asyncio.Event()
+        self._worker = ThreadPoolExecutor(max_workers=1, thread_name_prefix='stream-worker')
+        try:
+            await self._run()
+        finally:
+            # Xử lý nốt các frame đã nhận rồi mới trả về
+            worker, self._worker = self._worker, None
+            await asyncio.to_thread(worker.shutdown, wait=True)
+
+    async def _run(self) -> None:
+        from websockets.asyncio.client import connect
+        from websockets.exceptions import ConnectionClosed
+
+        self.is_running = True
+        delay = self.reconnect_delay
+
+        while self.is_running:
+            try:
+                # URL dựng lại mỗi lần kết nối: danh sách symbol có thể đã đổi qua update()
+                async with connect(self.build_url(), ping_interval=20, ping_timeout=20) as websocket:
+                    self._websocket = websocket
+                    self.connect_count += 1
+                    self.logger.info(f"WebSocket connected ({len(self.symbols)} symbols, lần #{self.connect_count})")
+
+                    # Bù dữ liệu bị lỡ trong lúc mất kết nối trước khi xử lý frame mới
+                    if self.on_reconnect is not None:
+                        await self._call_in_worker(self.on_reconnect)
+                    delay = self.reconnect_delay
+
+                    async for message in websocket:
+                        try:
+                            self.handle_message(message)
+                        except Exception as e:
+                            self.logger.error(f"❌ Lỗi khi xử lý frame WebSocket: {e}")
+
+                    if not self.is_running:
+                        break
+                    self.logger.warning("WebSocket đóng bởi server, kết nối lại...")
+            except (ConnectionClosed, OSError, asyncio.TimeoutError) as e:
+                if not self.is_running:
+                    break
+                self.logger.warning(f"⚠️ Mất kết nối WebSocket: {e}. Thử lại sau {delay:.1f}s")
+            finally:
+                self._websocket = None
+
+            if not self.is_running:
+                break
+            try:
+                await asyncio.wait_for(self._stopped.wait(), delay)
+            except asyncio.TimeoutError:
+                pass
+            delay = min(delay * 2, self.max_reconnect_delay)
+
+    def run_forever(self) -> None:
+        asyncio.run(self.run())
+
+    async def _resubscribe(self, symbols: List[str], interval: str,
+                           on_added: Optional[Callable[[List[str]], None]]) -> None:
+        old_streams = set(self.streams())
+        new_streams = self.streams(symbols, interval)
+        added = [symbol for symbol in symbols
+                 if f"{symbol.lower()}@kline_{interval}" not in old_streams]
+        self.symbols, self.interval = list(symbols), interval
+
+        websocket = self._websocket
+        if websocket is not None:
+            # Binance trả {"result": null, "id": ...} cho mỗi request (handle_message bỏ qua vì không có 'e')
+            for method, params in (('UNSUBSCRIBE', sorted(old_streams - set(new_streams))),
+                                   ('SUBSCRIBE', [stream for stream in new_streams if stream not in old_streams])):
+                if params:
+                    self._request_id += 1
+                    await websocket.send(json.dumps({'method': method, 'params': params, 'id': self._request_id}))
+        if added and on_added is not None:
+            await self._call_in_worker(on_added, added)
+
+    def update(self, symbols: List[str], interval: str = None,
+               on_added: Optional[Callable[[List[str]], None]] = None, timeout: float = 60.0) -> None:
+        """
+        Đổi danh sách symbol / interval từ thread khác: stream của symbol không đổi giữ nguyên (không kết nối lại),
+        on_added(symbol mới) chạy sau khi đăng ký (vd: backfill REST, frame tới trước lúc seed cache bị bỏ qua).
+        """
+        interval = interval or self.interval
+        if self._loop is None or not self.is_running:
+            self.symbols, self.interval = list(symbols), interval
+            return
+        asyncio.run_coroutine_threadsafe(self._resubscribe(list(symbols), interval, on_added),
+                                         self._loop).result(timeout)
+
+    async def stop(self) -> None:
+        self.is_running = False
+        if self._stopped is not None:
+            self._stopped.set()
+        if self._websocket is not None:
+            await self._websocket.close()
+
+    def request_stop(self) -> None:
+        """Dừng từ thread khác (vd: TradingBot.stop), không chờ: run() trả về sau khi xử lý nốt các frame đã nhận"""
+        self.is_running = False
+        loop = self._loop
+        try:
+            if loop is not None and not loop.is_closed():
+                asyncio.run_coroutine_threadsafe(self.stop(), loop)
+        except RuntimeError:
+            # Loop vừa đóng: run() đã kết thúc
+            pass
@@ -1,47 +1,158 @@
 # -*- coding: utf-8 -*-
 import os
+import threading
 import time
 import sys
-from typing import Optional, Tuple
-from dotenv import load_dotenv
-import pandas as pd
-from binance.client import Client
-from binance.exceptions import BinanceAPIException
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from typing import TYPE_CHECKING, Dict, List, Optional, Sequence, Tuple
+from dotenv import dotenv_values, find_dotenv, load_dotenv
+import numpy as np
 
 # Fix relative imports
+from binance_coin.apis.binance_client import AccountCheck, LazyClient, create_client, is_api_error
+from binance_coin.apis.request_scheduler import RequestScheduler, ScheduledClient
 from binance_coin.services.manager_coin import ManagementCoin
-from binance_coin.models.sell_buy import SellBuy
+from binance_coin.services.kline_cache import KlineCache
+from binance_coin.services.kline_decoder import decode_klines
+from binance_coin.services.kline_resampler import KlineResampler
+from binance_coin.services.config_watcher import ConfigWatcher, apply_env, diff_env
+from binance_coin.services.cycle_scheduler import TICK_PRICE, TICK_WAKE, CandleScheduler
+from binance_coin.services.kline_store import DEFAULT_STORE_DIR, KlineStore
+from binance_coin.services.indicator_engine import MovingAverageEngine
+from binance_coin.services.stream_feed import BINANCE_STREAM_URL, MarketStream
+from binance_coin.services.sharding import ShardCoordinator, ShardWorker, default_worker_id
+from binance_coin.services.order_executor import ExchangeFilters, OrderExecutor, OrderRecord, UserDataStream
+from binance_coin.services.strategy_engine import Candles, IndicatorGraph, StrategyEngine, book_key, build_strategies
+from binance_coin.services.universe_screener import UniverseScreener
+from binance_coin.services.signal_evaluator import SIGNAL_BUY, evaluate_signals, stack_closes
+from binance_coin.models.sell_buy import SellBuy, calculate_profit
+from binance_coin.models.price_table import PriceTable
 from binance_coin.enums.position_state import PositionState
+from binance_coin.utils.clock import SYSTEM_CLOCK
+from binance_coin.utils.common import interval_to_milliseconds
+from binance_coin.utils.metrics import BotMetrics, MetricsServer
 import binance_coin.utils.log_common as logCommon
 
-# Fix console output buffering and encoding
-sys.stdout.reconfigure(line_buffering=True, encoding='utf-8')
+# Fix console output encoding (stdout được listener log flush theo lô, không cần line buffering)
+sys.stdout.reconfigure(line_buffering=False, encoding='utf-8')
 sys.stderr.reconfigure(line_buffering=True, encoding='utf-8')
 os.environ['PYTHONIOENCODING'] = 'utf-8'
 
+if TYPE_CHECKING:
+    # pandas chỉ được import khi dựng DataFrame lần đầu (khởi động nhanh hơn)
+    import pandas as pd
+
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# Biến môi trường áp dụng được khi đang chạy (CONFIG_RELOAD_SECONDS), các biến khác cần khởi động lại
+HOT_RELOAD_KEYS = ('LIST_COIN_SYMBOL', 'TIME_INTERVAL', 'BASE_INTERVAL', 'SLEEP_INTERVAL_SECONDS',
+                   'CANDLE_GRACE_SECONDS', 'PRICE_TICK_SECONDS')
+
+# Chu kỳ MA của chiến lược gốc, cần MA_SLOW + 2 nến (xem MovingAverageEngine.min_candles)
+MA_FAST, MA_SLOW = 7, 25
+# Lịch sử tải lần đầu ("5 days ago UTC")
+HISTORY_LOOKBACK_MS = 5 * 24 * 60 * 60 * 1000
+
 class TradingBot:
     """
     Trading Bot class để quản lý tất cả logic trading
     """
     
-    def __init__(self):
-        """Khởi tạo bot với cấu hình từ environment variables"""
+    def __init__(self, client=None, clock=None):
+        """
+        Khởi tạo bot với cấu hình từ environment variables.
+        client: Binance Client có sẵn (vd: client giả khi benchmark); None thì tự tạo ở thread nền.
+        clock: nguồn thời gian (SimClock khi replay thị trường); None = đồng hồ thật.
+        """
         load_dotenv()
+        # File .env mà load_dotenv đã dùng (chưa có thì .env ở thư mục gốc project), theo dõi khi bật hot reload
+        self.env_file = os.path.abspath(find_dotenv() or os.path.join(PROJECT_ROOT, '.env'))
         
         # Setup logger
         self.logger = logCommon.getLog(__name__)
+        self.clock = clock or SYSTEM_CLOCK
         
         # Load configuration
         self._load_config()
         
-        # Initialize Binance client
-        self._init_binance_client()
+        # Initialize Binance client (không chặn: import + khởi tạo chạy song song với phần còn lại)
+        self._init_binance_client(client)
+
+        # Cache nến theo (symbol, interval), seed từ kho trên đĩa nếu có
+        self.kline_store = KlineStore(self.kline_store_dir) if self.kline_store_dir else None
+        self.kline_cache = KlineCache(self.client, max_candles=self.kline_cache_size, store=self.kline_store,
+                                      clock=self.clock.time)
+        # Nến khung lớn dựng lại từ nến BASE_INTERVAL trong cache (không tải thêm)
+        self.kline_resampler = (KlineResampler(self.base_interval, max_candles=self.kline_cache_size)
+                                if self.base_interval else None)
+
+        # MA7/MA25 tính tăng dần theo từng symbol
+        self.ma_engine = MovingAverageEngine(fast=MA_FAST, slow=MA_SLOW)
+
+        self.screener: Optional[UniverseScreener] = None
+        self._last_screen = None
+        if self.screen_enabled:
+            self.screener = UniverseScreener(
+                quote_asset=os.getenv('SCREEN_QUOTE_ASSET', 'USDT'),
+                min_quote_volume=float(os.getenv('SCREEN_MIN_QUOTE_VOLUME', 5e6)),
+                max_spread_bps=float(os.getenv('SCREEN_MAX_SPREAD_BPS', 10)),
+                min_volatility=float(os.getenv('SCREEN_MIN_VOLATILITY', 1)),
+                max_volatility=float(os.getenv('SCREEN_MAX_VOLATILITY', 50)),
+                min_move=float(os.getenv('SCREEN_MIN_MOVE', 0)),
+                max_symbols=int(os.getenv('SCREEN_MAX_SYMBOLS', 50)))
+
+        # Nhiều chiến lược song song (STRATEGIES), indicator dùng chung qua graph có memo; None = chiến lược MA gốc
+        self.strategy_engine = (StrategyEngine(build_strategies(self.strategy_spec),
+                                               IndicatorGraph(max_entries=self.indicator_cache_size))
+                                if self.strategy_spec else None)
+
+        # Bảng giá dùng chung cho phân tích và xử lý tín hiệu (snapshot mỗi chu kỳ hoặc ticker stream)
+        self.price_table = PriceTable(clock=self.clock.time)
+
+        # Histogram thời gian theo bước/symbol + counter weight API, lỗi (xuất Prometheus)
+        self.metrics = BotMetrics()
+        self.metrics_server: Optional[MetricsServer] = None
+
+        # Worker pool phân tích song song + lock theo symbol để cập nhật SellBuy tuần tự
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self._symbol_locks = {}
+        self._symbol_locks_guard = threading.Lock()
         
         # Bot state
         self.is_running = True
+        self.cycle_scheduler = self._build_cycle_scheduler()
 
         # Khoi tao quan li coin
         self.management_coin = ManagementCoin(self.file_state)
+
+        # Sharding: chỉ xử lý phần symbol được chia cho worker này (mặc định toàn bộ danh sách)
+        self.active_symbols = list(self.coin_symbol_list)
+        self.shard: Optional[ShardWorker] = None
+        if self.shard_coordinator is not None:
+            self.shard = ShardWorker(self.shard_coordinator, self.management_coin,
+                                     handoff_wait=self.shard_handoff_wait).start()
+
+        # Hot reload cấu hình: watcher nền đọc + kiểm tra, vòng chạy chính áp dụng ở điểm an toàn
+        self.config_watcher: Optional[ConfigWatcher] = None
+        self._env_values = dotenv_values(self.env_file) if os.path.exists(self.env_file) else {}
+        self._pending_config: Optional[dict] = None
+        self._config_lock = threading.Lock()
+        self._stream: Optional[MarketStream] = None
+
+        # Thực thi lệnh (ORDER_MODE): hàng đợi + thread gửi lệnh riêng, khớp lệnh theo dõi qua user data stream
+        self.order_executor: Optional[OrderExecutor] = None
+        self.user_stream: Optional[UserDataStream] = None
+        if self.order_mode != 'off':
+            self.order_executor = OrderExecutor(
+                self.client, ExchangeFilters(self.client), order_type=self.order_mode,
+                quote_amount=self.order_quote_amount, limit_offset_bps=self.order_limit_offset_bps,
+                max_retries=self.order_max_retries, fills_from_stream=self.user_stream_enabled,
+                on_event=self._on_order_event, workers=self.order_workers, holdings=self.management_coin.holdings)
+            if self.user_stream_enabled:
+                self.user_stream = UserDataStream(self.client, self.order_executor.on_execution_report,
+                                                  on_reconnect=self.order_executor.reconcile,
+                                                  base_url=self.user_stream_url)
         
     def _load_config(self):
         """Load configuration từ environment variables"""
@@ -52,72 +163,212 @@ class TradingBot:
             raise ValueError("API_KEY chưa được cấu hình trong file .env")
             
         self.coin_symbol = os.getenv('COIN_SYMBOL', 'BTCUSDT')
-        coin_symbol_list_str = os.getenv('LIST_COIN_SYMBOL', 'BTCUSDT')
-        self.coin_symbol_list = [symbol.strip() for symbol in coin_symbol_list_str.split('|') if symbol.strip()]
-        
-        self.time_interval = os.getenv('TIME_INTERVAL', '15m')
-        self.sleep_interval = int(os.getenv('SLEEP_INTERVAL_SECONDS', 60))
+        # Danh sách coin, interval và tham số lịch chạy (đổi được khi đang chạy, xem _read_reloadable)
+        settings = self._read_reloadable(os.environ)
+        self.coin_symbol_list = settings.pop('coin_symbol_list')
+        for name, value in settings.items():
+            setattr(self, name, value)
+        # Lịch chạy: 'candle' = ngay sau khi nến TIME_INTERVAL đóng (+ grace), 'sleep' = ngủ SLEEP_INTERVAL_SECONDS như cũ
+        self.schedule_mode = os.getenv('SCHEDULE_MODE', 'candle').lower()
+        self.kline_cache_size = int(os.getenv('KLINE_CACHE_SIZE', 1000))
+        # Kho nến dạng cột trên đĩa (để trống để tắt)
+        self.kline_store_dir = os.getenv('KLINE_STORE_DIR', DEFAULT_STORE_DIR)
+
+        # Chế độ WebSocket: phân tích ngay khi nến đóng thay vì polling
+        self.stream_mode = os.getenv('STREAM_MODE', 'false').lower() in ('1', 'true', 'yes')
+        self.stream_url = os.getenv('STREAM_URL', BINANCE_STREAM_URL)
+
+        # Số symbol được phân tích đồng thời trong một chu kỳ (1 = tuần tự như trước)
+        self.max_concurrent_symbols = max(1, int(os.getenv('MAX_CONCURRENT_SYMBOLS', 8)))
+
+        # Đánh giá tín hiệu cho toàn bộ symbol trong một lượt numpy thay vì từng symbol
+        self.batch_signals = os.getenv('BATCH_SIGNALS', 'false').lower() in ('1', 'true', 'yes')
+
+        # Sàng lọc toàn thị trường mỗi chu kỳ (một request ticker 24h), chỉ phân tích sâu tập symbol đạt + đang có vị thế.
+        # Khi bật, LIST_COIN_SYMBOL là các symbol luôn được phân tích thêm
+        self.screen_enabled = os.getenv('SCREEN_MODE', 'off').lower() in ('1', 'true', 'yes', 'on')
+        if self.screen_enabled and self.stream_mode:
+            raise ValueError("SCREEN_MODE chưa hỗ trợ STREAM_MODE")
+        self.pinned_symbols = list(self.coin_symbol_list) if os.getenv('LIST_COIN_SYMBOL') else []
+        self.screen_interval = float(os.getenv('SCREEN_INTERVAL_SECONDS', 0))
+
+        # Chiến lược chạy song song, vd "ma_cross:7:25|rsi:14:30:70|breakout:20" (mỗi chiến lược một sổ SellBuy)
+        self.strategy_spec = os.getenv('STRATEGIES', '')
+        self.indicator_cache_size = int(os.getenv('INDICATOR_CACHE_SIZE', 4096))
+
+        # Gửi lệnh thật khi có tín hiệu: off (chỉ ghi sổ SellBuy) | market | limit
+        self.order_mode = os.getenv('ORDER_MODE', 'off').lower()
+        if self.order_mode not in ('off', 'market', 'limit'):
+            raise ValueError(f"ORDER_MODE không hợp lệ: {self.order_mode}")
+        # Giá trị mỗi lệnh mua (quote asset), LIMIT đặt lệch khỏi giá tín hiệu về phía khớp
+        self.order_quote_amount = float(os.getenv('ORDER_QUOTE_AMOUNT', 20))
+        self.order_limit_offset_bps = float(os.getenv('ORDER_LIMIT_OFFSET_BPS', 5))
+        self.order_max_retries = int(os.getenv('ORDER_MAX_RETRIES', 3))
+        self.order_workers = max(1, int(os.getenv('ORDER_WORKERS', 4)))
+        # Khớp lệnh qua user data stream; tắt thì đọc trạng thái từ response của create_order
+        self.user_stream_enabled = os.getenv('USER_STREAM', 'on').lower() in ('1', 'true', 'yes', 'on')
+        self.user_stream_url = os.getenv('USER_STREAM_URL', BINANCE_STREAM_URL)
+
+        # Giá trong bảng cũ hơn ngưỡng này sẽ được lấy lại qua REST
+        self.price_max_age_ms = int(os.getenv('PRICE_MAX_AGE_SECONDS', 60)) * 1000
+
+        # Giới hạn request weight / phút của Binance và tỉ lệ được phép dùng
+        self.api_weight_limit = int(os.getenv('API_WEIGHT_LIMIT', 6000))
+        self.api_weight_headroom = float(os.getenv('API_WEIGHT_HEADROOM', 0.9))
+        self.api_timeout = float(os.getenv('API_TIMEOUT_SECONDS', 10))
+        # Kiểm tra tài khoản: background (mặc định), blocking (như cũ) hoặc off
+        self.account_check_mode = os.getenv('ACCOUNT_CHECK', 'background').lower()
+
+        # Metrics Prometheus: cổng HTTP cục bộ (0 = tắt) và/hoặc file cho textfile collector
+        self.metrics_port = int(os.getenv('METRICS_PORT', 0))
+        self.metrics_host = os.getenv('METRICS_HOST', '127.0.0.1')
+        self.metrics_textfile = os.getenv('METRICS_TEXTFILE', '')
+
+        # Hot reload: chu kỳ (giây) kiểm tra .env / config.yaml / dataRun.yaml, 0 = tắt
+        self.config_reload_seconds = float(os.getenv('CONFIG_RELOAD_SECONDS', 0))
         
         self.logger.info(f"Cấu hình loaded: {len(self.coin_symbol_list)} coins, interval: {self.time_interval}")
 
-        self.file_state = os.getenv('STATE_FILE', 'bot_state.json')
+        # Sharding nhiều process/máy: thư mục coordinator dùng chung (để trống = một process xử lý tất cả)
+        self.shard_dir = os.getenv('SHARD_DIR', '')
+        self.shard_coordinator = None
+        if self.shard_dir:
+            if self.stream_mode:
+                raise ValueError("SHARD_DIR chưa hỗ trợ STREAM_MODE")
+            self.shard_coordinator = ShardCoordinator(
+                self.shard_dir, os.getenv('SHARD_WORKER_ID') or default_worker_id(),
+                heartbeat_ttl=float(os.getenv('SHARD_HEARTBEAT_TTL', 30)),
+                vnodes=int(os.getenv('SHARD_VNODES', 64)), clock=self.clock.time)
+            self.shard_handoff_wait = float(os.getenv('SHARD_HANDOFF_WAIT_SECONDS', 10))
+
+        # Mỗi worker có file trạng thái riêng trong thư mục shard (trừ khi STATE_FILE được chỉ định)
+        default_state = self.shard_coordinator.state_file() if self.shard_coordinator else 'bot_state.json'
+        self.file_state = os.getenv('STATE_FILE', default_state)
         
-    def _init_binance_client(self):
+    @staticmethod
+    def _read_reloadable(env) -> dict:
+        """
+        Đọc + kiểm tra các cấu hình trong HOT_RELOAD_KEYS từ env (os.environ hoặc bản xem trước khi hot reload).
+        ValueError nếu không hợp lệ.
+        """
+        symbols = [symbol.strip() for symbol in env.get('LIST_COIN_SYMBOL', 'BTCUSDT').split('|') if symbol.strip()]
+        invalid = [symbol for symbol in symbols if not symbol.isalnum() or symbol != symbol.upper()]
+        if invalid:
+            raise ValueError(f"Symbol không hợp lệ trong LIST_COIN_SYMBOL: {', '.join(invalid)}")
+        settings = {
+            'coin_symbol_list': symbols,
+            'time_interval': env.get('TIME_INTERVAL', '15m'),
+            # Khung nến duy nhất được tải (REST/stream); các khung là bội số của nó được resample tại chỗ.
+            # Để trống: tải trực tiếp từng interval như cũ
+            'base_interval': env.get('BASE_INTERVAL', ''),
+            'sleep_interval': int(env.get('SLEEP_INTERVAL_SECONDS', 60)),
+            'candle_grace_seconds': float(env.get('CANDLE_GRACE_SECONDS', 2)),
+            # > 0: giữa hai lần đóng nến chỉ làm mới bảng giá mỗi PRICE_TICK_SECONDS giây
+            'price_tick_seconds': float(env.get('PRICE_TICK_SECONDS', 0)),
+        }
+        interval_to_milliseconds(settings['time_interval'])
+        base_interval, time_interval = settings['base_interval'], settings['time_interval']
+        if base_interval and time_interval != base_interval and not KlineResampler(base_interval).supports(time_interval):
+            raise ValueError(f"TIME_INTERVAL {time_interval} không phải bội số của BASE_INTERVAL {base_interval}")
+        if base_interval and time_interval != base_interval:
+            # Mỗi nến khung lớn cần ratio nến cơ sở; +1 nến vì nến khung lớn đầu tiên có thể bị bỏ (lệch mốc)
+            ratio = interval_to_milliseconds(time_interval) // interval_to_milliseconds(base_interval)
+            needed = ratio * (MA_SLOW + 3)
+            cache_size = int(env.get('KLINE_CACHE_SIZE', 1000))
+            if needed > cache_size or needed * interval_to_milliseconds(base_interval) > HISTORY_LOOKBACK_MS:
+                raise ValueError(f"BASE_INTERVAL {base_interval} quá nhỏ cho TIME_INTERVAL {time_interval}: cần {needed} "
+                                 f"nến cơ sở (KLINE_CACHE_SIZE={cache_size}, lịch sử 5 ngày) để đủ MA{MA_SLOW}")
+        if settings['candle_grace_seconds'] < 0 or settings['price_tick_seconds'] < 0 or settings['sleep_interval'] <= 0:
+            raise ValueError("CANDLE_GRACE_SECONDS / PRICE_TICK_SECONDS không được âm, SLEEP_INTERVAL_SECONDS phải > 0")
+        return settings
+
+    def _build_cycle_scheduler(self) -> CandleScheduler:
+        return CandleScheduler(self.time_interval, grace_seconds=self.candle_grace_seconds,
+                               price_tick_seconds=self.price_tick_seconds, clock=self.clock.time,
+                               monotonic=self.clock.monotonic, waiter=self.clock.wait)
+
+    def _init_binance_client(self, client=None):
         """Khởi tạo Binance client"""
         try:
-            self.client = Client(self.api_key, self.secret_key)
+            if client is None:
+                # Pool đủ cho các worker phân tích + luồng chính + kiểm tra tài khoản
+                pool_size = self.max_concurrent_symbols + 2
+                client = LazyClient(lambda: create_client(self.api_key, self.secret_key, pool_size=pool_size,
+                                                          timeout=(3.05, self.api_timeout)))
+            # Mọi request REST đi qua scheduler (ưu tiên + giới hạn weight)
+            self.request_scheduler = RequestScheduler(weight_limit=self.api_weight_limit,
+                                                      headroom=self.api_weight_headroom, wall_clock=self.clock.time)
+            self.client = ScheduledClient(client, self.request_scheduler)
             # self.client.API_URL = 'https://testnet.binance.vision/api'
-            
+
             # Test connection
-            account_info = self.client.get_account()
-            self.logger.info("✅ Kết nối Binance API thành công!")
-            self.logger.info(f"Account status: {account_info.get('accountType', 'Unknown')}")
-            
-        except (ValueError, BinanceAPIException) as e:
-            self.logger.error(f"❌ Lỗi kết nối Binance API: {e}")
-            raise
+            self.account_check = AccountCheck(self.client)
+            if self.account_check_mode == 'blocking':
+                self.account_check.run()
+                if self.account_check.error is not None:
+                    raise self.account_check.error
+            elif self.account_check_mode != 'off':
+                self.account_check.start()
+
         except Exception as e:
             self.logger.error(f"❌ Lỗi Khong xác định khi kết nối API: {e}")
             raise
 
-    def get_historical_data(self, symbol: str, interval: str, lookback: str = "5 days ago UTC") -> Optional[pd.DataFrame]:
+    @property
+    def kline_interval(self) -> str:
+        """Interval thực sự tải từ Binance (REST + stream)"""
+        return self.base_interval or self.time_interval
+
+    def _get_klines(self, symbol: str, interval: str, lookback: str) -> List[list]:
+        """Nến của interval bất kỳ: resample từ BASE_INTERVAL nếu được, nếu không thì tải trực tiếp"""
+        if (self.kline_resampler is not None and interval != self.base_interval
+                and self.kline_resampler.supports(interval)):
+            base_klines = self.kline_cache.get_klines(symbol, self.base_interval, lookback)
+            return self.kline_resampler.update(symbol, interval, base_klines)
+        return self.kline_cache.get_klines(symbol, interval, lookback)
+
+    def get_kline_arrays(self, symbol: str, interval: str, columns: Sequence[str] = ('open_time', 'close'),
+                         lookback: str = "5 days ago UTC") -> Optional[Dict[str, np.ndarray]]:
         """
-        Lấy dữ liệu lịch sử với error handling tốt hơn
+        Nến dạng mảng numpy có kiểu (open_time int64 ms, giá float64), chỉ giải mã các cột cần dùng
         """
         try:
             self.logger.debug(f"📊 Đang tải dữ liệu lịch sử cho {symbol}...")
             
-            klines = self.client.get_historical_klines(symbol, interval, lookback)
+            klines = self._get_klines(symbol, interval, lookback)
             
             if not klines:
                 self.logger.warning(f"⚠️ Khong có dữ liệu cho {symbol}")
                 return None
-                
-            df = pd.DataFrame(klines, columns=[
-                'open_time', 'open', 'high', 'low', 'close', 'volume', 
-                'close_time', 'quote_asset_volume', 'number_of_trades', 
-                'taker_buy_base_asset_volume', 'taker_buy_quote_asset_volume', 'ignore'
-            ])
-            
-            # Chỉ lấy các cột cần thiết
-            df = df[['open_time', 'close']].copy()
-            df['open_time'] = pd.to_datetime(df['open_time'], unit='ms')
-            df['close'] = pd.to_numeric(df['close'], errors='coerce')
-            
-            # Remove any NaN values
-            df.dropna(inplace=True)
-            
-            self.logger.debug(f"✅ Tải thành công {len(df)} dòng dữ liệu cho {symbol}")
-            return df
+
+            data = decode_klines(klines, columns)
+            self.logger.debug(f"✅ Tải thành công {len(klines)} dòng dữ liệu cho {symbol}")
+            return data
             
-        except BinanceAPIException as e:
-            self.logger.error(f"❌ Lỗi Binance API cho {symbol}: {e}")
-            return None
         except Exception as e:
-            self.logger.error(f"❌ Lỗi Khong xác định khi tải dữ liệu {symbol}: {e}")
+            self.metrics.error('get_historical_data')
+            if is_api_error(e):
+                self.logger.error(f"❌ Lỗi Binance API cho {symbol}: {e}")
+            else:
+                self.logger.error(f"❌ Lỗi Khong xác định khi tải dữ liệu {symbol}: {e}")
             return None
 
-    def calculate_moving_averages(self, df: pd.DataFrame) -> Optional[pd.DataFrame]:
+    def get_historical_data(self, symbol: str, interval: str, lookback: str = "5 days ago UTC") -> Optional['pd.DataFrame']:
+        """
+        DataFrame (open_time datetime64, close) cho nơi cần pandas; phân tích trong bot dùng get_kline_arrays
+        """
+        data = self.get_kline_arrays(symbol, interval, lookback=lookback)
+        if data is None:
+            return None
+        import pandas as pd
+        return pd.DataFrame({'open_time': pd.to_datetime(data['open_time'], unit='ms'), 'close': data['close']})
+
+    def get_candles(self, symbol: str, interval: str, lookback: str = "5 days ago UTC") -> Optional[Candles]:
+        """Nến dạng mảng numpy cho strategy engine (không qua pandas)"""
+        data = self.get_kline_arrays(symbol, interval, Candles._fields, lookback)
+        return None if data is None else Candles(**data)
+
+    def calculate_moving_averages(self, df: 'pd.DataFrame') -> Optional['pd.DataFrame']:
         """
         Tính toán các đường trung bình động
         """
@@ -127,14 +378,16 @@ class TradingBot:
                 return None
                 
             df = df.copy()
-            df['MA7'] = df['close'].rolling(window=7).mean()
-            df['MA25'] = df['close'].rolling(window=25).mean()
+            with self.metrics.span('calculate_moving_averages'):
+                df['MA7'] = df['close'].rolling(window=7).mean()
+                df['MA25'] = df['close'].rolling(window=25).mean()
             df.dropna(inplace=True)
             df.reset_index(drop=True, inplace=True)
             
             return df
             
         except Exception as e:
+            self.metrics.error('calculate_moving_averages')
             self.logger.error(f"❌ Lỗi khi tính MA: {e}")
             return None
 
@@ -144,36 +397,33 @@ class TradingBot:
         """
         try:
             # Lấy dữ liệu
-            df = self.get_historical_data(symbol, interval)
-            if df is None:
+            with self.metrics.span('get_historical_data', symbol):
+                data = self.get_kline_arrays(symbol, interval)
+            if data is None:
                 return PositionState.NONE, 0
                 
-            # Tính MA
-            df = self.calculate_moving_averages(df)
-            if df is None or len(df) < 3:
+            # Cập nhật MA tăng dần (chỉ xử lý nến mới / nến đang mở)
+            with self.metrics.span('calculate_moving_averages', symbol):
+                ma = self.ma_engine.sync(symbol, interval, data['open_time'], data['close'])
+            if ma.count < self.ma_engine.min_candles:
                 self.logger.warning(f"⚠️ Khong đủ dữ liệu để phân tích {symbol}")
                 return PositionState.NONE, 0
             
             
             # Lấy thông tin giá mới nhất
-            ticker = self.client.get_symbol_ticker(symbol=symbol)
-            
-            # Lấy dữ liệu candle cuối và trước đó
-            last_candle = df.iloc[-1]
-            previous_candle = df.iloc[-2]
-            current_price = float(ticker['price'])
+            current_price = self._get_current_price(symbol)
             
             # Log thong tin phan tich (English only)
             position_status = "HAS_POSITION" if current_position == PositionState.CO_VI_THE else "NO_POSITION"
             self.logger.info(f"Analysis {symbol} | Status: {position_status}")
-            self.logger.info(f"Price: {current_price:.4f} | MA7: {last_candle['MA7']:.4f} | MA25: {last_candle['MA25']:.4f}")
+            self.logger.info(f"Price: {current_price:.4f} | MA7: {ma.ma_fast:.4f} | MA25: {ma.ma_slow:.4f}")
             
             # Logic tín hiệu MUA
             ma_crossover_buy = (
-                previous_candle['MA7'] < previous_candle['MA25'] and 
-                last_candle['MA7'] > last_candle['MA25']
+                ma.prev_ma_fast < ma.prev_ma_slow and 
+                ma.ma_fast > ma.ma_slow
             )
-            ma7_rising = last_candle['MA7'] > previous_candle['MA7'] and last_candle['MA7'] < current_price # giá hiện tại phải cao hơn đường MA7
+            ma7_rising = ma.ma_fast > ma.prev_ma_fast and ma.ma_fast < current_price # giá hiện tại phải cao hơn đường MA7
             
             
             # Chi mua khi chua co vi the
@@ -183,17 +433,14 @@ class TradingBot:
                 self.logger.info(f"Reason: MA7 crosses above MA25 and MA7 rising")
                 self.logger.info(f"Signal price: {current_price:.4f}")
                 self.logger.info("=" * 60)
-                
-                # Force flush log
-                sys.stdout.flush()
                 return PositionState.CO_VI_THE, current_price
             
             # Logic tín hiệu BÁN
             ma_crossover_sell = (
-                previous_candle['MA7'] > previous_candle['MA25'] and 
-                last_candle['MA7'] < last_candle['MA25']
+                ma.prev_ma_fast > ma.prev_ma_slow and 
+                ma.ma_fast < ma.ma_slow
             )
-            ma7_falling = last_candle['MA7'] < previous_candle['MA7']
+            ma7_falling = ma.ma_fast < ma.prev_ma_fast
             
             # Chi ban khi dang co vi the
             if ma_crossover_sell and ma7_falling and current_position == PositionState.CO_VI_THE:
@@ -202,137 +449,677 @@ class TradingBot:
                 self.logger.info(f"Reason: MA7 crosses below MA25 and MA7 falling")
                 self.logger.info(f"Signal price: {current_price:.4f}")
                 self.logger.info("=" * 60)
-                
-                # Force flush log
-                sys.stdout.flush()
                 return PositionState.KHONG_VI_THE, current_price
             
             self.logger.info("No signal. Continue monitoring...")
-            
-            # Force flush immediately after each log
-            self._force_flush_logs()
-            
             return PositionState.NONE, 0
             
         except Exception as e:
+            self.metrics.error('analyze_and_signal')
             self.logger.error(f"❌ Lỗi khi phân tích {symbol}: {e}")
             return PositionState.NONE, 0
 
-    def process_signal(self, symbol: str, position_suggest: PositionState, price_suggest: float, item: SellBuy):
+    def process_signal(self, symbol: str, position_suggest: PositionState, price_suggest: float, item: SellBuy,
+                       strategy: str = None):
         """
-        Xử lý tín hiệu giao dịch
+        Xử lý tín hiệu giao dịch (strategy: tên chiến lược sở hữu sổ item, None = chiến lược gốc)
         """
         try:
+            label = f"{symbol} [{strategy}]" if strategy else symbol
+            signal_key = book_key(symbol, strategy) if strategy else symbol
+            # Lệnh vào hàng đợi trước mọi bước khác (không chờ mạng), giá thị trường bên dưới chỉ để log.
+            # Có lệnh thật thì sổ chỉ đổi khi lệnh khớp (_on_order_event), lệnh bị từ chối / lỗi giữ nguyên sổ
+            trade_live = self.order_executor is not None
+            if trade_live and position_suggest != PositionState.NONE:
+                if self.order_executor.in_flight(signal_key):
+                    self.logger.info(f"{label}: lệnh trước của sổ chưa kết thúc, bỏ qua tín hiệu")
+                    return
+                side = 'BUY' if position_suggest == PositionState.CO_VI_THE else 'SELL'
+                self.order_executor.submit(signal_key, symbol, side, price_suggest, signal_id=self._signal_id())
+            # Dùng cùng giá với lúc phân tích (bảng giá của chu kỳ)
+            current_price = self._get_current_price(symbol)
+            # Định dạng giá có dấu phẩy ngăn cách hàng nghìn
+            current_price_str = f"{current_price:,.4f}"
+
             if position_suggest == PositionState.CO_VI_THE:
-                # Lấy thông tin giá mới nhất
-                ticker = self.client.get_symbol_ticker(symbol=symbol)
-                # Định dạng giá có dấu phẩy ngăn cách hàng nghìn
-                current_price = float(ticker['price'])
-                current_price_str = f"{current_price:,.4f}"
-
-                self.logger.warning(f"Executing BUY order for {symbol} at price suggest {price_suggest:.4f} and market value {current_price_str} ")
-                item.buy(price_suggest)
+                self.logger.warning(f"Executing BUY order for {label} at price suggest {price_suggest:.4f} and market value {current_price_str} ",
+                                    extra={'signal': {'symbol': symbol, 'strategy': strategy, 'action': 'BUY',
+                                                      'price': price_suggest, 'market_price': current_price}})
+                if not trade_live:
+                    item.buy(price_suggest, at=datetime.fromtimestamp(self.clock.time()))
+                    if self.shard is not None:
+                        self.shard.record_signal(signal_key, 'BUY', price_suggest)
                 
             elif position_suggest == PositionState.KHONG_VI_THE:
-                # Lấy thông tin giá mới nhất
-                ticker = self.client.get_symbol_ticker(symbol=symbol)
-                # Định dạng giá có dấu phẩy ngăn cách hàng nghìn
-                current_price_str = f"{current_price:,.4f}"
-                current_price = float(ticker['price'])
-
-                self.logger.warning(f"Executing SELL order for {symbol} at price {price_suggest:.4f} and market value {current_price_str} with effective {item.get_profit_price()} ")
-                item.sell(price_suggest)  # Fix: should be sell, not buy
+                if trade_live:
+                    profit = calculate_profit(item.buy_price, price_suggest)
+                else:
+                    item.sell(price_suggest, at=datetime.fromtimestamp(self.clock.time()))
+                    if self.shard is not None:
+                        self.shard.record_signal(signal_key, 'SELL', price_suggest)
+                    profit = item.get_profit_price()
+                self.logger.warning(f"Executing SELL order for {label} at price {price_suggest:.4f} and market value {current_price_str} with effective {profit} ",
+                                    extra={'signal': {'symbol': symbol, 'strategy': strategy, 'action': 'SELL',
+                                                      'price': price_suggest, 'market_price': current_price,
+                                                      'profit': profit}})
                 
         except Exception as e:
+            self.metrics.error('process_signal')
             self.logger.error(f"Error processing signal for {symbol}: {e}")
 
+    def _on_order_event(self, stage: str, record: OrderRecord):
+        """
+        Callback của OrderExecutor (thread gửi lệnh / user data stream): metrics, và khi lệnh kết thúc thì
+        cập nhật sổ theo kết quả thật — BUY khớp (dù một phần) thì sổ có vị thế, SELL chỉ đóng sổ khi khớp hết;
+        giá ghi vào sổ là giá khớp trung bình.
+        """
+        self.metrics.record_order(stage, record)
+        if stage != 'done':
+            return
+        intent = record.intent
+        filled = record.executed_qty > 0 if intent.side == 'BUY' else record.status == 'FILLED'
+        if not filled:
+            self.logger.warning(f"⚠️ Lệnh {intent.side} {intent.key} kết thúc {record.status}"
+                                f"{f' ({record.error})' if record.error else ''}: giữ nguyên sổ")
+            return
+        item = self.management_coin.get_item_coin(intent.key)
+        price = record.avg_price or intent.price
+        at = datetime.fromtimestamp(self.clock.time())
+        if intent.side == 'BUY':
+            item.buy(price, at=at)
+        else:
+            item.sell(price, at=at)
+        if self.shard is not None:
+            self.shard.record_signal(intent.key, intent.side, price)
+        self.logger.info(f"✅ {intent.side} {intent.key} khớp {record.executed_qty:g} @ {price:.4f}")
+
+    def _signal_id(self) -> int:
+        """Mốc nến TIME_INTERVAL hiện tại: cùng tín hiệu phát lại trong cùng nến cho cùng client order id"""
+        interval_ms = self.cycle_scheduler.interval_ms
+        return int(self.clock.time() * 1000) // interval_ms * interval_ms
+
+    def _get_current_price(self, symbol: str) -> float:
+        """Giá mới nhất từ bảng giá; chỉ gọi REST khi symbol chưa có giá hoặc giá đã cũ"""
+        price = self.price_table.get(symbol, max_age_ms=self.price_max_age_ms)
+        if price is not None:
+            return price
+        ticker = self.client.get_symbol_ticker(symbol=symbol)
+        price = float(ticker['price'])
+        self.price_table.set(symbol, price)
+        return price
+
+    def _get_price_or_nan(self, symbol: str) -> float:
+        try:
+            return self._get_current_price(symbol)
+        except Exception as e:
+            self.logger.error(f"❌ Lỗi khi lấy giá {symbol}: {e}")
+            return float('nan')
+
+    def refresh_prices(self):
+        """Lấy giá toàn bộ symbol bằng một request duy nhất cho cả chu kỳ"""
+        try:
+            count = self.price_table.load_snapshot(self.client.get_all_tickers(), self.active_symbols)
+            self.logger.debug(f"Price snapshot: {count} symbols")
+        except Exception as e:
+            self.logger.error(f"❌ Lỗi khi lấy bảng giá: {e}")
+
+    def _get_symbol_lock(self, symbol: str) -> threading.Lock:
+        with self._symbol_locks_guard:
+            lock = self._symbol_locks.get(symbol)
+            if lock is None:
+                lock = threading.Lock()
+                self._symbol_locks[symbol] = lock
+            return lock
+
+    def _get_executor(self) -> ThreadPoolExecutor:
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(max_workers=self.max_concurrent_symbols,
+                                                thread_name_prefix='symbol-worker')
+        return self._executor
+
+    def _shutdown_executor(self):
+        if self._executor is not None:
+            self._executor.shutdown(wait=True)
+            self._executor = None
+
+    def process_symbol(self, symbol: str):
+        """
+        Phân tích một symbol và xử lý tín hiệu (lỗi của symbol này không ảnh hưởng symbol khác)
+        """
+        if self.strategy_engine is not None:
+            self.process_symbol_strategies(symbol)
+            return
+        try:
+            with self._get_symbol_lock(symbol):
+                # Lấy thông tin vị thế hiện tại
+                item: SellBuy = self.management_coin.get_item_coin(symbol)
+                current_position = item.get_position()
+                
+                # Phân tích và lấy tín hiệu
+                with self.metrics.span('analyze_and_signal', symbol):
+                    position_suggest, price_suggest = self.analyze_and_signal(
+                        symbol, self.time_interval, current_position
+                    )
+                
+                # Xử lý tín hiệu
+                if position_suggest != PositionState.NONE:
+                    with self.metrics.span('process_signal', symbol):
+                        self.process_signal(symbol, position_suggest, price_suggest, item)
+                
+        except Exception as e:
+            self.metrics.error('process_symbol')
+            self.logger.error(f"❌ Lỗi khi xử lý {symbol}: {e}")
+
+    def process_symbol_strategies(self, symbol: str):
+        """
+        Chạy mọi chiến lược của STRATEGIES trên symbol: tải nến một lần, indicator dùng chung,
+        tín hiệu của mỗi chiến lược đi vào sổ SellBuy riêng (SYMBOL@strategy)
+        """
+        try:
+            with self._get_symbol_lock(symbol):
+                with self.metrics.span('get_historical_data', symbol):
+                    candles = self.get_candles(symbol, self.time_interval)
+                if candles is None:
+                    return
+                if len(candles.close) < self.strategy_engine.min_candles:
+                    self.logger.warning(f"⚠️ Khong đủ dữ liệu cho mọi chiến lược của {symbol}")
+
+                current_price = self._get_current_price(symbol)
+                books = {strategy.name: self.management_coin.get_item_coin(book_key(symbol, strategy.name))
+                         for strategy in self.strategy_engine.strategies}
+                with self.metrics.span('evaluate_strategies', symbol):
+                    signals = self.strategy_engine.evaluate(
+                        symbol, self.time_interval, candles, current_price,
+                        {name: item.get_position() for name, item in books.items()})
+
+                for name, signal in signals.items():
+                    if signal.position == PositionState.NONE:
+                        continue
+                    label = "BUY" if signal.position == PositionState.CO_VI_THE else "SELL"
+                    self.logger.info(f"{label} SIGNAL [{name}]: {symbol} | Price: {signal.price:.4f} | "
+                                     f"Reason: {signal.reason}")
+                    with self.metrics.span('process_signal', symbol):
+                        self.process_signal(symbol, signal.position, signal.price, books[name], strategy=name)
+
+        except Exception as e:
+            self.metrics.error('process_symbol')
+            self.logger.error(f"❌ Lỗi khi xử lý {symbol}: {e}")
+
     def run_single_cycle(self):
         """
         Chạy một chu kỳ phân tích
         """
         try:
+            if self.screener is not None:
+                self.run_screen()
+
             if not self.coin_symbol_list:
                 self.logger.warning("⚠️ Danh sách coin trống!")
                 return
+
+            if self.shard is not None:
+                self.active_symbols = self.shard.sync(self.coin_symbol_list)
+
+            # Một snapshot giá cho cả chu kỳ thay vì 2 request ticker mỗi symbol
+            self.refresh_prices()
+
+            # Chu kỳ vector hóa chỉ áp dụng cho chiến lược MA gốc
+            if self.batch_signals and self.strategy_engine is None:
+                self.run_batch_cycle()
+                return
                 
-            for symbol in self.coin_symbol_list:
-                try:
-                    # Lấy thông tin vị thế hiện tại
-                    item: SellBuy = self.management_coin.get_item_coin(symbol)
-                    current_position = item.get_position()
-                    
-                    # Phân tích và lấy tín hiệu
-                    position_suggest, price_suggest = self.analyze_and_signal(
-                        symbol, self.time_interval, current_position
-                    )
-                    
-                    # Xử lý tín hiệu
-                    if position_suggest != PositionState.NONE:
-                        self.process_signal(symbol, position_suggest, price_suggest, item)
-                        
-                except Exception as e:
-                    self.logger.error(f"❌ Lỗi khi xử lý {symbol}: {e}")
-                    continue
+            if self.max_concurrent_symbols <= 1:
+                for symbol in self.active_symbols:
+                    self.process_symbol(symbol)
+                return
+
+            # Fan-out có giới hạn; chờ toàn bộ symbol xong rồi mới kết thúc chu kỳ
+            futures = [self._get_executor().submit(self.process_symbol, symbol) for symbol in self.active_symbols]
+            for future in futures:
+                future.result()
                     
         except Exception as e:
+            self.metrics.error('cycle')
             self.logger.error(f"❌ Lỗi trong chu kỳ phân tích: {e}")
 
+    def run_screen(self):
+        """
+        Sàng lọc thị trường: thay coin_symbol_list bằng tập làm việc (symbol đạt + symbol đang có vị thế
+        + LIST_COIN_SYMBOL), giải phóng cache/indicator của các symbol bị loại
+        """
+        now = self.clock.monotonic()
+        if self._last_screen is not None and now - self._last_screen < self.screen_interval:
+            return
+        try:
+            with self.metrics.span('screen'):
+                tickers = self.client.get_ticker()
+                # Sổ chiến lược có key SYMBOL@strategy
+                held = [key.split('@')[0] for key in self.management_coin.positions.open_positions()]
+                result = self.screener.screen(tickers, pinned=self.pinned_symbols + held)
+        except Exception as e:
+            self.metrics.error('screen')
+            self.logger.error(f"❌ Lỗi khi sàng lọc thị trường, giữ danh sách cũ: {e}")
+            return
+        self._last_screen = now
+        self.coin_symbol_list = result.symbols
+        if self.shard is None:
+            self.active_symbols = list(result.symbols)
+        for symbol in result.removed:
+            self._forget_symbol(symbol)
+        self.logger.info(f"Screen: {result.universe} symbols -> {result.passed} passed -> "
+                         f"working set {len(result.symbols)} (+{len(result.added)} -{len(result.removed)})")
+
+    def _forget_symbol(self, symbol: str, interval: str = None):
+        """
+        Bỏ dữ liệu tính toán của symbol không còn được theo dõi (vị thế vẫn giữ trong ManagementCoin).
+        interval: chỉ bỏ nến/MA của khung đó (khi đổi interval lúc đang chạy)
+        """
+        self.kline_cache.invalidate(symbol, interval)
+        self.ma_engine.reset(symbol, interval)
+        if self.kline_resampler is not None:
+            self.kline_resampler.reset(symbol)
+        if self.strategy_engine is not None:
+            self.strategy_engine.graph.reset(symbol)
+        if interval is None:
+            self.metrics.forget_symbol(symbol)
+
+    def run_batch_cycle(self):
+        """
+        Chu kỳ vector hóa: tải dữ liệu mọi symbol, xếp thành ma trận giá đóng cửa,
+        đánh giá tín hiệu trong một lượt rồi chỉ xử lý các symbol có tín hiệu
+        """
+        symbols = list(self.active_symbols)
+        def fetch(symbol):
+            with self.metrics.span('get_historical_data', symbol):
+                data = self.get_kline_arrays(symbol, self.time_interval, ('close',))
+                return None if data is None else data['close']
+        if self.max_concurrent_symbols > 1:
+            series = list(self._get_executor().map(fetch, symbols))
+        else:
+            series = [fetch(symbol) for symbol in symbols]
+
+        min_candles = self.ma_engine.min_candles
+        closes = stack_closes(series, min_candles)
+        prices = np.array([self._get_price_or_nan(symbol) for symbol in symbols], dtype=np.float64)
+        items = [self.management_coin.get_item_coin(symbol) for symbol in symbols]
+        has_position = np.array([item.get_position() == PositionState.CO_VI_THE for item in items], dtype=bool)
+
+        batch = evaluate_signals(closes, prices, has_position, fast=self.ma_engine.fast, slow=self.ma_engine.slow)
+        # Cùng điều kiện với analyze_and_signal: symbol chưa đủ min_candles nến không sinh tín hiệu
+        enough = np.array([values is not None and len(values) >= min_candles for values in series], dtype=bool)
+        batch.signals[~enough] = 0
+        self.logger.info(f"Batch analysis: {len(symbols)} symbols | signals: {int(np.count_nonzero(batch.signals))}")
+
+        for index in np.flatnonzero(batch.signals):
+            symbol, item, price = symbols[index], items[index], float(prices[index])
+            position_suggest = PositionState.CO_VI_THE if batch.signals[index] == SIGNAL_BUY else PositionState.KHONG_VI_THE
+            label = "BUY" if batch.signals[index] == SIGNAL_BUY else "SELL"
+            self.logger.info(f"{label} SIGNAL: {symbol} | Price: {price:.4f} | MA7: {batch.ma_fast[index]:.4f} | MA25: {batch.ma_slow[index]:.4f}")
+            try:
+                with self._get_symbol_lock(symbol), self.metrics.span('process_signal', symbol):
+                    self.process_signal(symbol, position_suggest, price, item)
+            except Exception as e:
+                self.logger.error(f"❌ Lỗi khi xử lý {symbol}: {e}")
+
     def run(self):
         """
         Chạy bot chính
         """
         self.logger.info("=" * 50)
         self.logger.info("STARTING TRADING BOT")
-        self.logger.info(f"Coin list: {', '.join(self.coin_symbol_list)}")
+        if self.screener is not None:
+            self.logger.info(f"Coin list: screened {self.screener.quote_asset} market "
+                             f"(max {self.screener.max_symbols}, pinned: {', '.join(self.pinned_symbols) or '-'})")
+        else:
+            self.logger.info(f"Coin list: {', '.join(self.coin_symbol_list)}")
         self.logger.info(f"Time interval: {self.time_interval}")
-        self.logger.info(f"Sleep cycle: {self.sleep_interval} seconds")
+        if self.base_interval and self.base_interval != self.time_interval:
+            self.logger.info(f"Base interval: {self.base_interval} (resample -> {self.time_interval})")
+        if self.schedule_mode == 'candle':
+            self.logger.info(f"Schedule: candle close + {self.candle_grace_seconds:g}s grace"
+                             f"{f', price tick {self.price_tick_seconds:g}s' if self.price_tick_seconds > 0 else ''}")
+        else:
+            self.logger.info(f"Sleep cycle: {self.sleep_interval} seconds")
+        self.logger.info(f"Concurrent symbols: {self.max_concurrent_symbols}")
+        if self.strategy_engine is not None:
+            self.logger.info(f"Strategies: {', '.join(strategy.name for strategy in self.strategy_engine.strategies)}")
+        if self.shard is not None:
+            self.logger.info(f"Shard worker: {self.shard.worker_id} ({self.shard_dir})")
+        if self.order_executor is not None:
+            self.logger.info(f"Orders: {self.order_mode.upper()} {self.order_quote_amount:g} per buy | fills: "
+                             f"{'user data stream' if self.user_stream is not None else 'REST response'}")
         self.logger.info("=" * 50)
+        self._start_metrics()
+        self._start_execution()
+        self._start_config_watcher()
+
+        if self.stream_mode:
+            self.run_streaming()
+            return
         
         cycle_count = 0
+        # Chu kỳ đầu chạy ngay khi khởi động, các chu kỳ sau bám theo lúc đóng nến
+        self.cycle_scheduler.mark_started()
         
         try:
             while self.is_running:
+                # Cấu hình mới (sleep mode, hoặc tới trong lúc chạy chu kỳ) được áp dụng trước chu kỳ kế tiếp
+                self._apply_pending_config()
                 cycle_count += 1
-                self.logger.info(f"Cycle #{cycle_count} - {time.strftime('%Y-%m-%d %H:%M:%S')}")
+                self.logger.info(f"Cycle #{cycle_count} - {time.strftime('%Y-%m-%d %H:%M:%S', time.localtime(self.clock.time()))}")
                 
                 # Chay mot chu ky phan tich
+                cycle_start = time.perf_counter()
                 self.run_single_cycle()
+                cycle_seconds = time.perf_counter() - cycle_start
+                self.metrics.cycle_seconds.observe(cycle_seconds)
+                self.metrics.cycles.inc()
+
+                cache_stats = self.kline_cache.stats()
+                self.logger.info(f"Kline cache: {cache_stats['hits']} hits, {cache_stats['misses']} misses")
+                api_stats = self.request_scheduler.stats()
+                self.logger.info(f"API weight: {api_stats['used_weight_1m']}/{api_stats['weight_limit']} | "
+                                 f"requests: {api_stats['requests']} | queue: {api_stats['queue_depth']} | "
+                                 f"throttled: {api_stats['throttled']}")
+                self._log_order_stats()
                 
-                # Log va sleep
-                self.logger.info(f"Waiting {self.sleep_interval} seconds for next cycle...")
-                
-                # Force flush tat ca logs
-                self._force_flush_logs()
-                
-                self.management_coin.save_state()
+                self._save_state()
+                self._export_metrics()
+                if self.shard is not None:
+                    self.shard.publish(cycle_seconds)
 
-                time.sleep(self.sleep_interval)
+                # Log va cho chu ky tiep theo
+                self._wait_for_next_cycle()
                 
         except KeyboardInterrupt:
             self.logger.info("Received stop signal (Ctrl+C). Shutting down.")
             self.is_running = False
             
-        except Exception as e:
+        except Exception:
             self.logger.critical("Critical error in main loop!", exc_info=True)
             
         finally:
+            self._stop_config_watcher()
+            self._shutdown_executor()
+            self._stop_execution()
+            if self.shard is not None:
+                self.shard.leave()
+            self.management_coin.close()
+            self._stop_metrics()
             self.logger.info("Trading Bot stopped.")
     
+    def _wait_for_next_cycle(self):
+        """Chờ tới lần đóng nến kế tiếp (các tick giữa chừng chỉ làm mới giá) hoặc sleep cố định"""
+        if self.schedule_mode != 'candle':
+            self.logger.info(f"Waiting {self.sleep_interval} seconds for next cycle...")
+            self._force_flush_logs()
+            self.clock.sleep(self.sleep_interval)
+            return
+
+        next_close = time.strftime('%H:%M:%S', time.localtime(self.cycle_scheduler.next_fire_ms() / 1000))
+        self.logger.info(f"Waiting for candle close at {next_close} "
+                         f"({self.cycle_scheduler.seconds_until_next():.0f}s)...")
+        self._force_flush_logs()
+        while self.is_running:
+            tick = self.cycle_scheduler.wait_next()
+            if tick == TICK_WAKE:
+                # Hot reload: scheduler có thể đã được thay (đổi interval), chờ tiếp theo lịch mới
+                self._apply_pending_config()
+                continue
+            if tick != TICK_PRICE:
+                if self.cycle_scheduler.missed_candles:
+                    self.logger.warning(f"⚠️ Chu kỳ chạy quá lâu, đã bỏ qua {self.cycle_scheduler.missed_candles} nến")
+                    self.cycle_scheduler.missed_candles = 0
+                return
+            self.refresh_prices()
+
+    def _backfill_klines(self, symbols: List[str] = None):
+        """
+        Bù nến bị lỡ qua REST sau mỗi lần (re)connect WebSocket (hoặc cho symbol mới đăng ký khi hot reload),
+        rồi chuyển cache sang chế độ live
+        """
+        for symbol in self.coin_symbol_list if symbols is None else symbols:
+            try:
+                self.kline_cache.set_live(symbol, self.kline_interval, False)
+                self.kline_cache.get_klines(symbol, self.kline_interval)
+                self.kline_cache.set_live(symbol, self.kline_interval, True)
+            except Exception as e:
+                self.logger.error(f"❌ Lỗi khi backfill {symbol}: {e}")
+
+    def _on_stream_kline(self, symbol: str, interval: str, kline: list, is_closed: bool):
+        """Chạy trên thread worker của MarketStream (không phải event loop): phân tích, fsync, REST được phép chặn"""
+        if interval != self.kline_interval or not self.kline_cache.update(symbol, interval, [kline]):
+            return
+        # Với BASE_INTERVAL: chỉ phân tích khi nến cơ sở cuối cùng của nến TIME_INTERVAL đóng
+        if is_closed and (interval == self.time_interval
+                          or self.kline_resampler.closes_bucket(kline, self.time_interval)):
+            self.process_symbol(symbol)
+            self._save_state()
+            self._export_metrics()
+
+    def _on_stream_ticker(self, symbol: str, price: float, event_time: int):
+        self.price_table.set(symbol, price, event_time)
+
+    def run_streaming(self):
+        """
+        Chạy bot ở chế độ WebSocket: kline + ticker qua combined streams, phân tích khi nến đóng
+        """
+        self.logger.info(f"STREAM MODE: {self.stream_url}")
+        self._stream = stream = MarketStream(
+            self.coin_symbol_list, self.kline_interval,
+            on_kline=self._on_stream_kline,
+            on_ticker=self._on_stream_ticker,
+            on_reconnect=self._backfill_klines,
+            base_url=self.stream_url,
+        )
+        try:
+            stream.run_forever()
+        except KeyboardInterrupt:
+            self.logger.info("Received stop signal (Ctrl+C). Shutting down.")
+            self.is_running = False
+        except Exception:
+            self.logger.critical("Critical error in stream loop!", exc_info=True)
+        finally:
+            self._stop_config_watcher()
+            self._stream = None
+            for symbol in self.coin_symbol_list:
+                self.kline_cache.set_live(symbol, self.kline_interval, False)
+            self._stop_execution()
+            self.management_coin.close()
+            self._stop_metrics()
+            self.logger.info("Trading Bot stopped.")
+
+    def _start_config_watcher(self):
+        if self.config_reload_seconds <= 0 or self.config_watcher is not None:
+            return
+        # Import khi cần: binance_coin.config tải YAML (và cấu hình logging gốc) ngay lúc import
+        from binance_coin.config import APP_CONFIG_PATH, DATA_RUN_CONFIG_PATH
+        self.config_watcher = ConfigWatcher([self.env_file, APP_CONFIG_PATH, DATA_RUN_CONFIG_PATH],
+                                            self._on_config_change, interval=self.config_reload_seconds).start()
+        self.logger.info(f"Config reload: every {self.config_reload_seconds:g}s "
+                         f"({', '.join(os.path.basename(path) for path in self.config_watcher.paths)})")
+
+    def _stop_config_watcher(self):
+        if self.config_watcher is not None:
+            self.config_watcher.stop()
+            self.config_watcher = None
+
+    def _on_config_change(self, paths: List[str]):
+        """
+        Thread ConfigWatcher: tải lại YAML (AppConfig) và .env, kiểm tra cấu hình mới trước khi ghi vào os.environ.
+        Cấu hình lỗi -> giữ nguyên cấu hình đang chạy. Áp dụng: stream mode trên thread worker của stream
+        (sau các frame đã nhận, không song song với phân tích), polling ở điểm chờ kế tiếp.
+        """
+        yaml_paths = [path for path in paths if path != self.env_file]
+        if yaml_paths:
+            from binance_coin.config import config
+            changed = config.reload()
+            if changed:
+                self.logger.info(f"🔄 Đã tải lại {', '.join(os.path.basename(path) for path in yaml_paths)}: "
+                                 f"{', '.join(changed)}")
+        if self.env_file not in paths:
+            return
+
+        values = dotenv_values(self.env_file) if os.path.exists(self.env_file) else {}
+        changes = diff_env(self._env_values, values)
+        preview = dict(os.environ)
+        apply_env(changes, preview)
+        # KLINE_CACHE_SIZE cần khởi động lại: kiểm tra BASE_INTERVAL/TIME_INTERVAL mới theo cache đang chạy
+        preview['KLINE_CACHE_SIZE'] = str(self.kline_cache_size)
+        try:
+            settings = self._read_reloadable(preview)
+        except ValueError as e:
+            self.logger.error(f"❌ Cấu hình mới trong {self.env_file} không hợp lệ, giữ cấu hình cũ: {e}")
+            return
+        if not settings['coin_symbol_list'] and self.screener is None:
+            self.logger.error("❌ LIST_COIN_SYMBOL mới trống, giữ cấu hình cũ")
+            return
+        apply_env(changes)
+        self._env_values = values
+
+        restart_keys = sorted(key for key in changes if key not in HOT_RELOAD_KEYS)
+        if restart_keys:
+            self.logger.warning(f"⚠️ {', '.join(restart_keys)} chỉ có hiệu lực sau khi khởi động lại bot")
+        if not any(key in HOT_RELOAD_KEYS for key in changes):
+            return
+        if self.stream_mode:
+            stream = self._stream
+            if stream is not None:
+                stream.submit(self._apply_config, settings)
+            else:
+                self._apply_config(settings)
+            return
+        with self._config_lock:
+            self._pending_config = settings
+        self.cycle_scheduler.interrupt()
+
+    def _apply_pending_config(self):
+        with self._config_lock:
+            settings, self._pending_config = self._pending_config, None
+        if settings is not None:
+            self._apply_config(settings)
+
+    def _apply_config(self, settings: dict):
+        """
+        Áp dụng cấu hình đã kiểm tra: chỉ symbol bị bỏ / khung nến bị đổi mất cache + indicator,
+        symbol không đổi giữ nguyên dữ liệu (không tải lại từ đầu).
+        Stream mode: chạy trên thread worker của MarketStream (cùng thread với _on_stream_kline).
+        """
+        settings = dict(settings)
+        symbols = settings.pop('coin_symbol_list')
+        old_symbols, old_kline_interval, old_time_interval = self.coin_symbol_list, self.kline_interval, self.time_interval
+        old_schedule = (self.time_interval, self.candle_grace_seconds, self.price_tick_seconds)
+        if settings['base_interval'] != self.base_interval:
+            self.kline_resampler = (KlineResampler(settings['base_interval'], max_candles=self.kline_cache_size)
+                                    if settings['base_interval'] else None)
+        for name, value in settings.items():
+            setattr(self, name, value)
+
+        if self.screener is not None:
+            # LIST_COIN_SYMBOL là danh sách ghim, tập làm việc được tính lại ngay ở chu kỳ kế tiếp
+            self.pinned_symbols = list(symbols)
+            self._last_screen = None
+            symbols = old_symbols
+        kept = set(symbols)
+        removed = [symbol for symbol in old_symbols if symbol not in kept]
+        added = [symbol for symbol in symbols if symbol not in set(old_symbols)]
+        self.coin_symbol_list = list(symbols)
+        if self.shard is None:
+            self.active_symbols = list(symbols)
+
+        # Stream: SUBSCRIBE/UNSUBSCRIBE trên kết nối đang mở (đang ở thread worker nên backfill gọi trực tiếp,
+        # frame của stream mới tới trước lúc seed cache bị bỏ qua)
+        if self._stream is not None:
+            self._stream.update(self.coin_symbol_list, self.kline_interval)
+        for symbol in removed:
+            self.kline_cache.set_live(symbol, old_kline_interval, False)
+            self._forget_symbol(symbol)
+        for symbol in self.coin_symbol_list:
+            if self.kline_interval != old_kline_interval:
+                self.kline_cache.set_live(symbol, old_kline_interval, False)
+                self._forget_symbol(symbol, old_kline_interval)
+            if self.time_interval != old_time_interval:
+                self._forget_symbol(symbol, old_time_interval)
+        if self._stream is not None:
+            self._backfill_klines(self.coin_symbol_list if self.kline_interval != old_kline_interval else added)
+
+        if (self.time_interval, self.candle_grace_seconds, self.price_tick_seconds) != old_schedule:
+            old_scheduler, self.cycle_scheduler = self.cycle_scheduler, self._build_cycle_scheduler()
+            self.cycle_scheduler.mark_started()
+            if not self.is_running:
+                self.cycle_scheduler.stop()
+            old_scheduler.stop()
+
+        interval = (f"interval {old_time_interval} -> {self.time_interval}" if self.time_interval != old_time_interval
+                    else f"interval {self.time_interval}")
+        self.logger.info(f"🔄 Cấu hình mới: {len(self.coin_symbol_list)} coins (+{len(added)} -{len(removed)}), "
+                         f"{interval}, kline {self.kline_interval}")
+
+    def _save_state(self):
+        with self.metrics.span('save_state'):
+            self.management_coin.save_state()
+
+    def _start_execution(self):
+        if self.order_executor is None:
+            return
+        # Tín hiệu của nến hiện tại có thể đã được lần chạy trước gửi: tra sàn trước lần gửi đầu
+        self.order_executor.resume_signal_id = self._signal_id()
+        try:
+            self.order_executor.filters.load()
+        except Exception as e:
+            # Sẽ tải lại ở lệnh đầu tiên
+            self.logger.error(f"❌ Lỗi khi tải exchangeInfo: {e}")
+        self.order_executor.start()
+        if self.user_stream is not None:
+            self.user_stream.start()
+
+    def _stop_execution(self):
+        """Gửi nốt lệnh trong hàng đợi rồi đóng user data stream"""
+        if self.order_executor is None:
+            return
+        self.order_executor.stop()
+        if self.user_stream is not None:
+            self.user_stream.stop()
+        self._log_order_stats()
+
+    def _log_order_stats(self):
+        if self.order_executor is None:
+            return
+        stats = self.order_executor.stats()
+        ack, fill = stats['ack_ms'], stats['fill_ms']
+        latency = (f" | signal->ack p50 {ack['p50']:.1f}ms p95 {ack['p95']:.1f}ms" if ack['p50'] is not None else '')
+        latency += (f" | signal->fill p50 {fill['p50']:.1f}ms p95 {fill['p95']:.1f}ms"
+                    if fill['p50'] is not None else '')
+        self.logger.info(f"Orders: {stats['filled']} filled, {stats['open']} open, {stats['rejected']} rejected, "
+                         f"{stats['failed']} failed, {stats['retries']} retries{latency}")
+
+    def _start_metrics(self):
+        if self.metrics_port and self.metrics_server is None:
+            try:
+                self.metrics_server = MetricsServer(self.metrics.registry, self.metrics_port,
+                                                    host=self.metrics_host).start()
+            except OSError as e:
+                self.logger.error(f"❌ Không mở được cổng metrics {self.metrics_port}: {e}")
+
+    def _export_metrics(self):
+        """Cập nhật số liệu API và ghi textfile (nếu cấu hình) sau mỗi chu kỳ"""
+        self.metrics.record_api(self.request_scheduler.stats())
+        if self.metrics_textfile:
+            try:
+                self.metrics.registry.write_textfile(self.metrics_textfile)
+            except OSError as e:
+                self.logger.error(f"❌ Lỗi khi ghi metrics: {e}")
+
+    def _stop_metrics(self):
+        self._export_metrics()
+        if self.metrics_server is not None:
+            self.metrics_server.stop()
+            self.metrics_server = None
+
     def _force_flush_logs(self):
-        """Force flush all output buffers"""
+        """Ghi hết log đang chờ trong queue (gọi một lần mỗi chu kỳ, không phải mỗi symbol)"""
         try:
-            sys.stdout.flush()
-            sys.stderr.flush()
-            
-            # Flush all logging handlers
-            for handler in self.logger.handlers:
-                if hasattr(handler, 'flush'):
-                    handler.flush()
-                    
-            # Also flush root logger handlers
-            for handler in logCommon.logging.getLogger().handlers:
-                if hasattr(handler, 'flush'):
-                    handler.flush()
+            logCommon.flush_all_logs()
         except Exception as e:
             print(f"Error flushing logs: {e}")
 
@@ -341,6 +1128,9 @@ class TradingBot:
         Dừng bot
         """
         self.is_running = False
-        self.management_coin.save_state()
+        self.cycle_scheduler.stop()
+        if self._stream is not None:
+            self._stream.request_stop()
+        self.management_coin.close()
         self.logger.info("🛑 Bot đang được dừng...")
 
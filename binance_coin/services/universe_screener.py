@@ -0,0 +1,161 @@
+# -*- coding: utf-8 -*-
+"""
+Sàng lọc toàn thị trường trước chu kỳ phân tích: một request ticker 24h cho mọi symbol,
+lọc vector hóa theo quote volume, spread, biến động và mức thay đổi giá, rồi xếp hạng và giới hạn
+số symbol được phân tích sâu (tải nến + MA).
+
+    python -m binance_coin.services.universe_screener --symbols 500 --max-symbols 40
+"""
+import argparse
+import sys
+from collections import namedtuple
+from typing import Dict, Iterable, List, Sequence
+
+import numpy as np
+
+# Base asset bị loại: stablecoin và token đòn bẩy (không có xu hướng để giao dịch theo MA).
+# Danh sách tường minh: so hậu tố UP/DOWN/BULL/BEAR sẽ loại nhầm cặp thật như JUPUSDT, SYRUPUSDT, SETUPUSDT
+STABLE_ASSETS = frozenset(('USDT', 'USDC', 'FDUSD', 'TUSD', 'BUSD', 'DAI', 'USDP', 'EUR', 'AEUR', 'USD1'))
+LEVERAGED_TOKENS = frozenset(
+    [f"{base}{side}" for base in ('BTC', 'ETH', 'BNB', 'XRP', 'ADA', 'LINK', 'DOT', 'LTC', 'TRX', 'EOS', 'XTZ',
+                                  'SXP', 'FIL', 'YFI', 'BCH', 'UNI', 'SUSHI', 'AAVE', '1INCH', 'XLM')
+     for side in ('UP', 'DOWN')]
+    + ['BULL', 'BEAR'] + [f"{base}{side}" for base in ('ETH', 'BNB', 'EOS', 'XRP') for side in ('BULL', 'BEAR')])
+DEFAULT_EXCLUDE = STABLE_ASSETS | LEVERAGED_TOKENS
+
+ScreenResult = namedtuple('ScreenResult', ['symbols', 'universe', 'passed', 'added', 'removed', 'metrics'])
+
+_TICKER_FIELDS = ('lastPrice', 'bidPrice', 'askPrice', 'highPrice', 'lowPrice', 'quoteVolume', 'priceChangePercent')
+
+
+def tickers_to_arrays(tickers: Sequence[dict]) -> Dict[str, np.ndarray]:
+    """Chuyển kết quả client.get_ticker() (list dict, số dạng chuỗi) thành các cột numpy"""
+    columns = {'symbol': np.array([ticker['symbol'] for ticker in tickers], dtype=object)}
+    for field in _TICKER_FIELDS:
+        columns[field] = np.array([ticker.get(field) or 'nan' for ticker in tickers], dtype=np.float64)
+    return columns
+
+
+def _percentile_rank(values: np.ndarray) -> np.ndarray:
+    """Hạng phần trăm 0..1 (cao = tốt) để gộp các tiêu chí khác đơn vị"""
+    if len(values) <= 1:
+        return np.ones(len(values))
+    ranks = np.empty(len(values), dtype=np.float64)
+    ranks[np.argsort(values, kind='stable')] = np.arange(len(values))
+    return ranks / (len(values) - 1)
+
+
+class UniverseScreener:
+    """
+    Lọc và xếp hạng symbol theo thống kê 24h:
+    - quote volume >= min_quote_volume, spread <= max_spread_bps
+    - biến động (high - low) / last trong [min_volatility, max_volatility] (%)
+    - |thay đổi| >= min_move (%): so với lần sàng trước nếu có, không thì thay đổi 24h
+    Điểm = trung bình hạng của quote volume, biến động và |thay đổi|. Symbol đang trong tập làm việc được giữ
+    nếu vẫn đạt và nằm trong top max_symbols * keep_factor để tập không bị xáo liên tục.
+    """
+
+    def __init__(self, quote_asset: str = 'USDT', min_quote_volume: float = 5e6, max_spread_bps: float = 10.0,
+                 min_volatility: float = 1.0, max_volatility: float = 50.0, min_move: float = 0.0,
+                 max_symbols: int = 50, keep_factor: float = 1.5, exclude: Iterable[str] = DEFAULT_EXCLUDE):
+        self.quote_asset = quote_asset
+        self.min_quote_volume = min_quote_volume
+        self.max_spread_bps = max_spread_bps
+        self.min_volatility = min_volatility
+        self.max_volatility = max_volatility
+        self.min_move = min_move
+        self.max_symbols = max_symbols
+        self.keep_factor = keep_factor
+        # Base asset không giao dịch (so khớp chính xác sau khi bỏ quote_asset)
+        self.exclude = frozenset(exclude)
+        self.working_set: List[str] = []
+        self._last_prices: Dict[str, float] = {}
+
+    def screen(self, tickers: Sequence[dict], pinned: Iterable[str] = ()) -> ScreenResult:
+        """tickers: client.get_ticker(); pinned: symbol luôn giữ (vd: đang có vị thế), không tính vào giới hạn"""
+        data = tickers_to_arrays([ticker for ticker in tickers if self._in_universe(ticker['symbol'])])
+        symbols, last = data['symbol'], data['lastPrice']
+
+        with np.errstate(invalid='ignore', divide='ignore'):
+            mid = (data['bidPrice'] + data['askPrice']) / 2
+            spread_bps = (data['askPrice'] - data['bidPrice']) / mid * 10000
+            volatility = (data['highPrice'] - data['lowPrice']) / last * 100
+            previous = np.array([self._last_prices.get(symbol, np.nan) for symbol in symbols], dtype=np.float64)
+            move = np.where(np.isnan(previous), data['priceChangePercent'], (last / previous - 1) * 100)
+
+            # So sánh với NaN luôn False -> ticker thiếu dữ liệu bị loại
+            passed = ((data['quoteVolume'] >= self.min_quote_volume)
+                      & (spread_bps <= self.max_spread_bps)
+                      & (volatility >= self.min_volatility) & (volatility <= self.max_volatility)
+                      & (np.abs(move) >= self.min_move) & (last > 0))
+
+        candidates = np.flatnonzero(passed)
+        score = (_percentile_rank(np.log10(data['quoteVolume'][candidates]))
+                 + _percentile_rank(volatility[candidates])
+                 + _percentile_rank(np.abs(move[candidates]))) / 3
+        ranked = [symbols[index] for index in candidates[np.argsort(-score, kind='stable')]]
+
+        keep_rank = int(self.max_symbols * self.keep_factor)
+        incumbents = set(self.working_set)
+        selected = [symbol for symbol in ranked[:keep_rank] if symbol in incumbents][:self.max_symbols]
+        chosen = set(selected)
+        for symbol in ranked:
+            if len(selected) >= self.max_symbols:
+                break
+            if symbol not in chosen:
+                selected.append(symbol)
+                chosen.add(symbol)
+        # Giữ thứ tự theo hạng, symbol pinned (không đạt hoặc ngoài top) nối cuối
+        selected = [symbol for symbol in ranked if symbol in chosen]
+        selected += [symbol for symbol in dict.fromkeys(pinned) if symbol not in chosen]
+
+        added = [symbol for symbol in selected if symbol not in incumbents]
+        removed = [symbol for symbol in self.working_set if symbol not in set(selected)]
+        self.working_set = selected
+        self._last_prices = {symbol: price for symbol, price in zip(symbols, last.tolist()) if price > 0}
+
+        rows = {symbols[index]: i for i, index in enumerate(candidates)}
+        metrics = {symbol: {'quote_volume': float(data['quoteVolume'][candidates[row]]),
+                            'spread_bps': float(spread_bps[candidates[row]]),
+                            'volatility': float(volatility[candidates[row]]),
+                            'move': float(move[candidates[row]]), 'score': float(score[row])}
+                   for symbol, row in rows.items() if symbol in chosen}
+        return ScreenResult(selected, len(symbols), int(passed.sum()), added, removed, metrics)
+
+    def _in_universe(self, symbol: str) -> bool:
+        if not symbol.endswith(self.quote_asset) or len(symbol) == len(self.quote_asset):
+            return False
+        return symbol[:-len(self.quote_asset)] not in self.exclude
+
+
+def main(argv=None) -> int:
+    import time
+
+    from binance_coin.benchmarks.fake_client import SyntheticClient
+
+    parser = argparse.ArgumentParser(description='Sàng lọc thị trường giả lập')
+    parser.add_argument('--symbols', type=int, default=500)
+    parser.add_argument('--max-symbols', type=int, default=40)
+    parser.add_argument('--min-quote-volume', type=float, default=5e6)
+    args = parser.parse_args(argv)
+
+    fake = SyntheticClient([f"SYM{i:04d}USDT" for i in range(args.symbols)] + ['BTCUPUSDT', 'USDCUSDT'])
+    screener = UniverseScreener(max_symbols=args.max_symbols, min_quote_volume=args.min_quote_volume)
+    tickers = fake.get_ticker()
+    start = time.perf_counter()
+    result = screener.screen(tickers, pinned=['SYM0000USDT'])
+    elapsed = time.perf_counter() - start
+    print(f"universe {result.universe} | passed {result.passed} | working set {len(result.symbols)} | "
+          f"{elapsed * 1000:.2f} ms")
+    for symbol in result.symbols[:10]:
+        item = result.metrics.get(symbol)
+        if item:
+            print(f"  {symbol}: qv {item['quote_volume']:.3g} spread {item['spread_bps']:.1f}bps "
+                  f"vol {item['volatility']:.2f}% move {item['move']:+.2f}% score {item['score']:.3f}")
+        else:
+            print(f"  {symbol}: pinned")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,101 @@
+# -*- coding: utf-8 -*-
+"""
+Nguồn thời gian của bot: đồng hồ thật khi chạy production, SimClock khi replay thị trường
+(benchmarks/replay.py) để chạy nhiều ngày giao dịch trong vài phút.
+"""
+import threading
+import time
+from typing import Callable, Optional
+
+
+class SystemClock:
+    """Đồng hồ thật (mặc định)"""
+
+    def time(self) -> float:
+        return time.time()
+
+    def monotonic(self) -> float:
+        return time.monotonic()
+
+    def sleep(self, seconds: float) -> None:
+        time.sleep(seconds)
+
+    def wait(self, event: threading.Event, timeout: Optional[float]) -> bool:
+        return event.wait(timeout)
+
+
+SYSTEM_CLOCK = SystemClock()
+
+
+class SimClock:
+    """
+    Đồng hồ giả lập bắt đầu từ start (epoch giây).
+    - speed > 0: chạy nhanh gấp speed lần thời gian thực (thời gian xử lý của bot cũng bị nhân lên).
+    - speed <= 0: chỉ nhảy khi bot ngủ/chờ (xử lý tốn 0 giây giả lập) -> nhanh nhất và tất định.
+    end + on_end: khi một lần ngủ/chờ vượt qua end, đồng hồ dừng ở end và gọi on_end một lần (vd: bot.stop).
+    """
+
+    def __init__(self, start: float, speed: float = 1000.0, end: float = None, on_end: Callable[[], None] = None):
+        self.start = start
+        self.speed = speed
+        self.end = end
+        self.on_end = on_end
+        self._origin = time.monotonic()
+        self._skipped = 0.0
+        self._ended = False
+        self._lock = threading.Lock()
+
+    def monotonic(self) -> float:
+        elapsed = (time.monotonic() - self._origin) * self.speed if self.speed > 0 else 0.0
+        return elapsed + self._skipped
+
+    def time(self) -> float:
+        return self.start + self.monotonic()
+
+    @property
+    def ended(self) -> bool:
+        return self._ended
+
+    def _advance(self, seconds: float) -> bool:
+        """Bước thời gian của chế độ nhảy; True nếu vừa chạm end"""
+        with self._lock:
+            if self.end is not None and self.time() + seconds >= self.end:
+                self._skipped += max(0.0, self.end - self.time())
+                return self._reach_end()
+            self._skipped += seconds
+            return False
+
+    def _reach_end(self) -> bool:
+        if self._ended:
+            return True
+        self._ended = True
+        if self.on_end is not None:
+            self.on_end()
+        return True
+
+    def sleep(self, seconds: float) -> None:
+        seconds = max(0.0, seconds)
+        if self.speed > 0:
+            time.sleep(seconds / self.speed)
+            if self.end is not None and self.time() >= self.end:
+                self._reach_end()
+        else:
+            self._advance(seconds)
+
+    def wait(self, event: threading.Event, timeout: Optional[float]) -> bool:
+        if event.is_set():
+            return True
+        if self.speed > 0:
+            if event.wait(None if timeout is None else max(0.0, timeout) / self.speed):
+                return True
+            if self.end is not None and self.time() >= self.end:
+                self._reach_end()
+            return event.is_set()
+        if timeout is None:
+            # Không có gì khác làm thời gian trôi: coi như tới end
+            if self.end is None:
+                return event.wait()
+            self._advance(self.end - self.time())
+            return event.is_set()
+        self._advance(max(0.0, timeout))
+        return event.is_set()
@@ -6,9 +6,9 @@ class AsciiFilter(logging.Filter):
     def to_ascii(self, text: str) -> str:
         return str(text).encode('ascii', 'ignore').decode('ascii')
     def filter(self, record: logging.LogRecord) -> bool:
-        record.msg = self.to_ascii(record.msg)
-        if record.args:
-            record.args = tuple(self.to_ascii(arg) for arg in record.args)
+        # Ghép message một lần rồi mới bỏ ký tự non-ASCII (không đổi args sang chuỗi -> '%.4f' vẫn đúng)
+        record.msg = self.to_ascii(record.getMessage())
+        record.args = None
         return True
 
 # >>> BƯỚC 1: TẠO BỘ LỌC TÍN HIỆU <<<
@@ -22,3 +22,28 @@ class SignalFilter(logging.Filter):
         msg_str = str(record.msg)
         # Chỉ cho phép các log chứa emoji tín hiệu hoặc dòng phân cách '==='
         return 'MUA' in msg_str or 'BAN' in msg_str or 'BUY' in msg_str or 'SELL' in msg_str  # or msg_str.startswith("=")
+
+
+# Số mili-giây của mỗi đơn vị trong chuỗi interval của Binance (1m, 15m, 1h, 4h, 1d, 1w)
+INTERVAL_UNIT_MS = {
+    'm': 60 * 1000,
+    'h': 60 * 60 * 1000,
+    'd': 24 * 60 * 60 * 1000,
+    'w': 7 * 24 * 60 * 60 * 1000,
+}
+
+# Nến tuần của Binance mở vào thứ Hai 00:00 UTC, còn epoch 1970-01-01 là thứ Năm
+WEEK_OFFSET_MS = 4 * 24 * 60 * 60 * 1000
+
+
+def interval_to_milliseconds(interval: str) -> int:
+    """ '15m' -> 900000. Không hỗ trợ '1M' (tháng) vì độ dài không cố định """
+    try:
+        return int(interval[:-1]) * INTERVAL_UNIT_MS[interval[-1]]
+    except (ValueError, KeyError):
+        raise ValueError(f"Interval không hợp lệ: {interval}")
+
+
+def interval_offset_ms(interval: str) -> int:
+    """ Độ lệch mốc nến so với epoch: nến tuần lệch WEEK_OFFSET_MS, các khung khác chia đều từ epoch """
+    return WEEK_OFFSET_MS if interval.endswith('w') else 0
@@ -1,18 +1,18 @@
-
 # anh xạ chuoi cau hình sang cac hằng so cua thu vien
+import atexit
+import json
 import logging
-from logging.handlers import RotatingFileHandler
+from logging.handlers import QueueHandler, RotatingFileHandler
 import os
+import queue
 import sys
+import threading
+import time
+from datetime import datetime
 
 from binance_coin.utils.common import AsciiFilter, SignalFilter
 
 
-log_level_str = os.getenv('LOG_LEVEL', 'INFO')
-log_filename = os.getenv('LOG_FILENAME', 'trading_bot.log')
-# >>> THÊM TÊN FILE LOG CHO TÍN HIỆU <<<
-signal_log_filename = os.getenv('SIGNAL_LOG_FILENAME', 'signals.log')
-
 LOG_LEVELS = {
     'DEBUG': logging.DEBUG,
     'INFO': logging.INFO,
@@ -20,65 +20,194 @@ LOG_LEVELS = {
     'ERROR': logging.ERROR,
     'CRITICAL': logging.CRITICAL
 }
-log_level = LOG_LEVELS.get(log_level_str.upper(), logging.INFO)
 
 # logging.basicConfig(level=log_level, format='%(asctime)s - %(levelname)s - %(message)s')
 # logger = logging.getLogger(__name__)
 
-def getLog(name=None):
-    # --- PHẦN 2: CaU HÌNH LOGGER (Su dụng gia tri từ file config) ---
-    logger = logging.getLogger(name)
-    logger.setLevel(log_level)
-    ascii_filter = AsciiFilter()
+
+class _DeferredFlush:
+    """
+    StreamHandler.emit() gọi flush() sau mỗi record -> bỏ qua ở đây,
+    listener sẽ gọi flush_batch() theo lô (đủ số record hoặc hết thời gian).
+    """
+    def flush(self):
+        pass
+
+    def flush_batch(self):
+        super().flush()
+
+
+class BatchFileHandler(_DeferredFlush, RotatingFileHandler):
+    pass
+
+
+class BatchStreamHandler(_DeferredFlush, logging.StreamHandler):
+    pass
+
+
+class SignalJsonHandler(_DeferredFlush, logging.FileHandler):
+    pass
+
+
+class SignalJsonFormatter(logging.Formatter):
+    """
+    Mỗi tín hiệu là một dòng JSON: time, level, logger, message
+    + các trường có cấu trúc truyền qua extra={'signal': {...}} (symbol, action, price, ...)
+    """
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            'time': datetime.fromtimestamp(record.created).isoformat(timespec='milliseconds'),
+            'level': record.levelname,
+            'logger': record.name,
+            'message': record.getMessage(),
+        }
+        entry.update(getattr(record, 'signal', None) or {})
+        return json.dumps(entry, ensure_ascii=False)
+
+
+class BatchingListener(threading.Thread):
+    """
+    Thread nền nhận record từ queue và ghi ra các handler; flush khi đủ batch_size record
+    hoặc sau flush_interval giây, nên thread giao dịch không bao giờ chờ I/O log.
+    """
+    _STOP = object()
+
+    def __init__(self, log_queue: queue.Queue, handlers, batch_size: int = 256, flush_interval: float = 0.5):
+        super().__init__(name='log-listener', daemon=True)
+        self.queue = log_queue
+        self.handlers = list(handlers)
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+
+    def run(self):
+        pending = 0
+        deadline = None
+        while True:
+            timeout = None if deadline is None else max(0.0, deadline - time.monotonic())
+            try:
+                record = self.queue.get(timeout=timeout)
+            except queue.Empty:
+                record = None
+
+            if record is self._STOP:
+                self._flush()
+                return
+            if isinstance(record, threading.Event):
+                # Yêu cầu flush ngay (flush_all_logs)
+                self._flush()
+                pending, deadline = 0, None
+                record.set()
+                continue
+            if record is not None:
+                for handler in self.handlers:
+                    if record.levelno >= handler.level:
+                        handler.handle(record)
+                pending += 1
+                if deadline is None:
+                    deadline = time.monotonic() + self.flush_interval
+            if pending and (pending >= self.batch_size or time.monotonic() >= deadline):
+                self._flush()
+                pending, deadline = 0, None
+
+    def _flush(self):
+        for handler in self.handlers:
+            try:
+                handler.flush_batch()
+            except Exception as e:
+                sys.stderr.write(f"Error flushing logs: {e}\n")
+
+    def flush(self, timeout: float = 5.0) -> bool:
+        """Chờ listener ghi + flush mọi record đã vào queue trước lời gọi này"""
+        if not self.is_alive():
+            return False
+        done = threading.Event()
+        self.queue.put(done)
+        return done.wait(timeout)
+
+    def stop(self):
+        if self.is_alive():
+            self.queue.put(self._STOP)
+            self.join()
+        for handler in self.handlers:
+            handler.close()
+
+
+_setup_lock = threading.Lock()
+_queue_handler = None
+_listener = None
+
+
+def _build_handlers():
+    """Tạo các handler đúng một lần cho cả process (đọc cấu hình lúc đó, sau load_dotenv)"""
+    log_level = LOG_LEVELS.get(os.getenv('LOG_LEVEL', 'INFO').upper(), logging.INFO)
+    log_filename = os.getenv('LOG_FILENAME', 'trading_bot.log')
+    # >>> TÊN FILE LOG CHO TÍN HIỆU (JSON-lines) <<<
+    signal_log_filename = os.getenv('SIGNAL_LOG_FILENAME', 'signals.log')
+    formatter = logging.Formatter('%(asctime)s - %(levelname)s - %(message)s', datefmt='%Y-%m-%d %H:%M:%S')
 
     # --- Cấu hình handler chính (ghi mọi thứ vào trading_bot.log) ---
-    file_handler = RotatingFileHandler(filename = log_filename, mode='w',
+    file_handler = BatchFileHandler(filename=log_filename, mode='w',
         backupCount=5,             # Số lượng file backup muốn giữ lại
         maxBytes=10 * 1024 * 1024, # Kích thước tối đa của file log (ví dụ: 10 MB)
         encoding='utf-8')
     file_handler.setLevel(log_level)
-    file_handler.addFilter(ascii_filter)
+    file_handler.addFilter(AsciiFilter())
+    file_handler.setFormatter(formatter)
 
     # --- Cấu hình handler cho console ---
-    # --- FIX: Cấu hình handler cho console với flush ngay lập tức ---
-    stream_handler = logging.StreamHandler(sys.stdout)  # Chỉ định rõ stdout
+    stream_handler = BatchStreamHandler(sys.stdout)  # Chỉ định rõ stdout
     stream_handler.setLevel(log_level)
-    # FIX: Force flush sau mỗi log message
-    stream_handler.flush = lambda: sys.stdout.flush()
+    stream_handler.setFormatter(formatter)
 
-    # --- Cấu hình handler phu ghi lai chot (ghi mọi thứ vào trading_bot.log) ---
-    # Dùng mode 'a' (append) để lưu lại lịch sử các tín hiệu qua mỗi lần chạy
-    signal_file_handler = logging.FileHandler(signal_log_filename, mode='a', encoding='utf-8')
+    # --- Handler tín hiệu: mỗi dòng một JSON, mode 'a' để giữ lịch sử qua mỗi lần chạy ---
+    signal_file_handler = SignalJsonHandler(signal_log_filename, mode='a', encoding='utf-8')
     signal_file_handler.setLevel(logging.WARNING) # Chỉ quan tâm đến level WARNING trở lên
-    # >>> BƯỚC 3: GẮN BỘ LỌC TÍN HIỆU VÀO HANDLER MỚI <<<
     signal_file_handler.addFilter(SignalFilter())
-    signal_file_handler.addFilter(ascii_filter) # Tùy chọn: Dùng bộ lọc ASCII cho file signal
+    signal_file_handler.setFormatter(SignalJsonFormatter())
 
+    return log_level, [file_handler, stream_handler, signal_file_handler]
 
-    formatter = logging.Formatter('%(asctime)s - %(levelname)s - %(message)s', datefmt='%Y-%m-%d %H:%M:%S')
-    file_handler.setFormatter(formatter)
-    stream_handler.setFormatter(formatter)
-    signal_file_handler.setFormatter(formatter)
-    
-    # FIX: Clear handlers cũ để tránh duplicate
-    if logger.handlers:
+
+def _setup():
+    global _queue_handler, _listener
+    with _setup_lock:
+        if _queue_handler is None:
+            log_level, handlers = _build_handlers()
+            log_queue = queue.Queue()
+            _listener = BatchingListener(
+                log_queue, handlers,
+                batch_size=int(os.getenv('LOG_BATCH_SIZE', 256)),
+                flush_interval=float(os.getenv('LOG_FLUSH_INTERVAL', 0.5)),
+            )
+            _listener.start()
+            atexit.register(_listener.stop)
+            _queue_handler = QueueHandler(log_queue)
+            _queue_handler.setLevel(log_level)
+    return _queue_handler
+
+
+def getLog(name=None):
+    """
+    Logger chỉ có một QueueHandler dùng chung: trên thread gọi chỉ tốn format + put vào queue,
+    việc ghi file/console do listener nền đảm nhận.
+    """
+    queue_handler = _setup()
+    logger = logging.getLogger(name)
+    logger.setLevel(queue_handler.level)
+    if logger.handlers != [queue_handler]:
+        # FIX: Clear handlers cũ để tránh duplicate
         logger.handlers.clear()
-    
-    logger.addHandler(file_handler)
-    logger.addHandler(stream_handler)
-    logger.addHandler(signal_file_handler)
+        logger.addHandler(queue_handler)
 
     # FIX: Đảm bảo không bị propagate lên parent logger
     logger.propagate = False
 
     return logger
-    
-# FIX: Thêm function để force flush toàn bộ system
-def flush_all_logs():
-    """Force flush tất cả output buffers"""
+
+
+def flush_all_logs(timeout: float = 5.0):
+    """Ghi + flush ngay mọi log đang chờ trong queue (vd: cuối chu kỳ, trước khi dừng)"""
+    if _listener is not None:
+        _listener.flush(timeout)
     sys.stdout.flush()
     sys.stderr.flush()
-    # Flush tất cả handlers
-    for handler in logging.getLogger().handlers:
-        if hasattr(handler, 'flush'):
-            handler.flush()
\ No newline at end of file
@@ -0,0 +1,281 @@
+# -*- coding: utf-8 -*-
+import bisect
+import os
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, Optional, Tuple
+
+import binance_coin.utils.log_common as logCommon
+
+# Bucket (giây) cho độ trễ: từ 0.5ms tới 30s, đủ cho cả tính MA lẫn tải nến qua mạng
+LATENCY_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30)
+
+
+def _escape(value) -> str:
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _format_labels(names: Tuple[str, ...], values: Tuple[str, ...], extra: str = '') -> str:
+    parts = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        parts.append(extra)
+    return '{' + ','.join(parts) + '}' if parts else ''
+
+
+class _Metric:
+    kind = ''
+
+    def __init__(self, name: str, help_text: str, label_names: Tuple[str, ...] = ()):
+        self.name = name
+        self.help_text = help_text
+        self.label_names = tuple(label_names)
+        self._lock = threading.Lock()
+
+    def _series_map(self) -> dict:
+        raise NotImplementedError
+
+    def remove(self, label: str, value: str) -> int:
+        """Bỏ mọi series có label = value (vd symbol đã rời working set), trả về số series đã bỏ"""
+        index = self.label_names.index(label)
+        with self._lock:
+            series = self._series_map()
+            stale = [labels for labels in series if len(labels) > index and labels[index] == value]
+            for labels in stale:
+                del series[labels]
+        return len(stale)
+
+    def render(self) -> str:
+        raise NotImplementedError
+
+
+class Counter(_Metric):
+    """Bộ đếm chỉ tăng, theo từng bộ label"""
+    kind = 'counter'
+
+    def __init__(self, name: str, help_text: str, label_names: Tuple[str, ...] = ()):
+        super().__init__(name, help_text, label_names)
+        self._values: Dict[tuple, float] = {}
+
+    def inc(self, amount: float = 1, *labels) -> None:
+        with self._lock:
+            self._values[labels] = self._values.get(labels, 0) + amount
+
+    def value(self, *labels) -> float:
+        return self._values.get(labels, 0)
+
+    def _series_map(self) -> dict:
+        return self._values
+
+    def render(self) -> str:
+        with self._lock:
+            items = list(self._values.items())
+        return ''.join(f"{self.name}{_format_labels(self.label_names, labels)} {value}\n" for labels, value in items)
+
+
+class Gauge(Counter):
+    """Giá trị tức thời (ghi đè)"""
+    kind = 'gauge'
+
+    def set(self, value: float, *labels) -> None:
+        with self._lock:
+            self._values[labels] = value
+
+
+class Histogram(_Metric):
+    """
+    Histogram bucket cố định: observe() chỉ là bisect + cộng vào mảng đếm (không lưu từng mẫu),
+    nên bộ nhớ và chi phí không phụ thuộc số lần đo.
+    """
+    kind = 'histogram'
+
+    def __init__(self, name: str, help_text: str, label_names: Tuple[str, ...] = (),
+                 buckets: Tuple[float, ...] = LATENCY_BUCKETS):
+        super().__init__(name, help_text, label_names)
+        self.buckets = tuple(buckets)
+        # labels -> [đếm theo bucket..., +Inf], tổng, số mẫu
+        self._series: Dict[tuple, list] = {}
+
+    def observe(self, value: float, *labels) -> None:
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(labels)
+            if series is None:
+                series = self._series[labels] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+            series[0][index] += 1
+            series[1] += value
+            series[2] += 1
+
+    def snapshot(self, *labels) -> Optional[dict]:
+        """{'count', 'sum'} của một bộ label (để log / kiểm tra)"""
+        series = self._series.get(labels)
+        return None if series is None else {'count': series[2], 'sum': series[1]}
+
+    def _series_map(self) -> dict:
+        return self._series
+
+    def render(self) -> str:
+        with self._lock:
+            items = [(labels, list(series[0]), series[1], series[2]) for labels, series in self._series.items()]
+        lines = []
+        for labels, counts, total, count in items:
+            cumulative = 0
+            for bound, bucket_count in zip(self.buckets + (float('inf'),), counts):
+                cumulative += bucket_count
+                le = 'le="+Inf"' if bound == float('inf') else f'le="{bound}"'
+                lines.append(f"{self.name}_bucket{_format_labels(self.label_names, labels, le)} {cumulative}\n")
+            lines.append(f"{self.name}_sum{_format_labels(self.label_names, labels)} {total}\n")
+            lines.append(f"{self.name}_count{_format_labels(self.label_names, labels)} {count}\n")
+        return ''.join(lines)
+
+
+class _Span:
+    __slots__ = ('_histogram', '_labels', '_start')
+
+    def __init__(self, histogram: Histogram, labels: tuple):
+        self._histogram = histogram
+        self._labels = labels
+
+    def __enter__(self):
+        self._start = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self._histogram.observe(time.perf_counter() - self._start, *self._labels)
+        return False
+
+
+class MetricsRegistry:
+    """Tập các metric của bot, xuất dạng Prometheus text (HTTP hoặc textfile)"""
+
+    def __init__(self, namespace: str = 'tradingbot'):
+        self.namespace = namespace
+        self._metrics: Dict[str, _Metric] = {}
+        self._lock = threading.Lock()
+
+    def _register(self, metric: _Metric) -> _Metric:
+        with self._lock:
+            existing = self._metrics.get(metric.name)
+            if existing is not None:
+                return existing
+            self._metrics[metric.name] = metric
+            return metric
+
+    def counter(self, name: str, help_text: str, label_names: Tuple[str, ...] = ()) -> Counter:
+        return self._register(Counter(f"{self.namespace}_{name}", help_text, label_names))
+
+    def gauge(self, name: str, help_text: str, label_names: Tuple[str, ...] = ()) -> Gauge:
+        return self._register(Gauge(f"{self.namespace}_{name}", help_text, label_names))
+
+    def histogram(self, name: str, help_text: str, label_names: Tuple[str, ...] = (),
+                  buckets: Tuple[float, ...] = LATENCY_BUCKETS) -> Histogram:
+        return self._register(Histogram(f"{self.namespace}_{name}", help_text, label_names, buckets))
+
+    def render(self) -> str:
+        with self._lock:
+            metrics = list(self._metrics.values())
+        return ''.join(f"# HELP {metric.name} {metric.help_text}\n# TYPE {metric.name} {metric.kind}\n{metric.render()}"
+                       for metric in metrics)
+
+    def write_textfile(self, path: str) -> None:
+        """Ghi atomic cho textfile collector của node_exporter"""
+        tmp_path = path + '.tmp'
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            f.write(self.render())
+        os.replace(tmp_path, path)
+
+
+class BotMetrics:
+    """Các metric của TradingBot: span theo symbol, thời gian chu kỳ, weight API và lỗi"""
+
+    def __init__(self, registry: MetricsRegistry = None):
+        self.registry = registry or MetricsRegistry()
+        self.span_seconds = self.registry.histogram(
+            'span_seconds', 'Thời gian từng bước xử lý theo symbol', ('span', 'symbol'))
+        self.cycle_seconds = self.registry.histogram('cycle_seconds', 'Thời gian một chu kỳ phân tích')
+        self.cycles = self.registry.counter('cycles_total', 'Số chu kỳ đã chạy')
+        self.errors = self.registry.counter('errors_total', 'Số lỗi theo bước', ('stage',))
+        self.api_requests = self.registry.counter('api_requests_total', 'Số request REST tới Binance')
+        self.api_weight = self.registry.counter('api_weight_total', 'Tổng request weight ước lượng đã dùng')
+        self.api_throttled = self.registry.counter('api_throttled_total', 'Số lần bị 429/418')
+        self.cycle_api_weight = self.registry.gauge('cycle_api_weight', 'Request weight dùng trong chu kỳ gần nhất')
+        self.used_weight_1m = self.registry.gauge('api_used_weight_1m', 'X-MBX-USED-WEIGHT-1M gần nhất')
+        self.api_queue_depth = self.registry.gauge('api_queue_depth', 'Số request đang chờ trong scheduler')
+        self.order_ack_seconds = self.registry.histogram('order_ack_seconds', 'Thời gian từ tín hiệu tới khi sàn nhận lệnh')
+        self.order_fill_seconds = self.registry.histogram('order_fill_seconds', 'Thời gian từ tín hiệu tới lần khớp đầu')
+        self.orders = self.registry.counter('orders_total', 'Số lệnh đã kết thúc theo trạng thái', ('status',))
+        self._last_api = {'requests': 0, 'weight': 0, 'throttled': 0}
+
+    def span(self, name: str, symbol: str = '') -> _Span:
+        return _Span(self.span_seconds, (name, symbol))
+
+    def forget_symbol(self, symbol: str) -> None:
+        """Symbol không còn được theo dõi: bỏ series span của nó để số series không tăng mãi khi universe xoay vòng"""
+        self.span_seconds.remove('symbol', symbol)
+
+    def error(self, stage: str) -> None:
+        self.errors.inc(1, stage)
+
+    def record_order(self, stage: str, record) -> None:
+        """Callback on_event của OrderExecutor"""
+        if stage == 'ack':
+            self.order_ack_seconds.observe(record.ack_latency_ms / 1000)
+        elif stage == 'fill':
+            self.order_fill_seconds.observe(record.fill_latency_ms / 1000)
+        elif stage == 'done':
+            self.orders.inc(1, record.status)
+
+    def record_api(self, stats: dict) -> None:
+        """Cập nhật từ RequestScheduler.stats() (gọi mỗi chu kỳ): tăng counter theo phần chênh lệch"""
+        requests_delta = stats['requests'] - self._last_api['requests']
+        weight_delta = stats['weight_spent'] - self._last_api['weight']
+        throttled_delta = stats['throttled'] - self._last_api['throttled']
+        self.api_requests.inc(requests_delta)
+        self.api_weight.inc(weight_delta)
+        self.api_throttled.inc(throttled_delta)
+        self.cycle_api_weight.set(weight_delta)
+        self.api_queue_depth.set(stats['queue_depth'])
+        if stats.get('used_weight_1m') is not None:
+            self.used_weight_1m.set(stats['used_weight_1m'])
+        self._last_api = {'requests': stats['requests'], 'weight': stats['weight_spent'],
+                          'throttled': stats['throttled']}
+
+
+class MetricsServer:
+    """HTTP server cục bộ (thread nền) trả /metrics dạng Prometheus text"""
+
+    def __init__(self, registry: MetricsRegistry, port: int, host: str = '127.0.0.1'):
+        self.logger = logCommon.getLog(__name__)
+        registry_ref = registry
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                if self.path.split('?')[0] not in ('/', '/metrics'):
+                    self.send_error(404)
+                    return
+                body = registry_ref.render().encode('utf-8')
+                self.send_response(200)
+                self.send_header('Content-Type', 'text/plain; version=0.0.4; charset=utf-8')
+                self.send_header('Content-Length', str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format, *args):
+                pass
+
+        self._server = ThreadingHTTPServer((host, port), Handler)
+        self._server.daemon_threads = True
+        self._thread = threading.Thread(target=self._server.serve_forever, name='metrics-http', daemon=True)
+
+    @property
+    def port(self) -> int:
+        return self._server.server_address[1]
+
+    def start(self) -> 'MetricsServer':
+        self._thread.start()
+        self.logger.info(f"Metrics: http://{self._server.server_address[0]}:{self.port}/metrics")
+        return self
+
+    def stop(self) -> None:
+        self._server.shutdown()
+        self._server.server_close()
@@ -0,0 +1,39 @@
+# -*- coding: utf-8 -*-
+import os
+import tempfile
+
+import pytest
+
+import binance_coin.utils.log_common as logCommon
+
+# Log của bot ghi vào thư mục tạm (phải đặt trước khi module nào gọi logCommon.getLog)
+_LOG_DIR = tempfile.mkdtemp(prefix='binance-coin-tests-')
+os.environ.setdefault('LOG_FILENAME', os.path.join(_LOG_DIR, 'trading_bot.log'))
+os.environ.setdefault('SIGNAL_LOG_FILENAME', os.path.join(_LOG_DIR, 'signals.log'))
+
+
+@pytest.fixture
+def bot_env(tmp_path, monkeypatch) -> dict:
+    """Cấu hình tối thiểu để dựng TradingBot với SyntheticClient: không mạng, state + log trong thư mục tạm"""
+    env = {
+        'API_KEY': 'test',
+        'SECRET_KEY': 'test',
+        'LIST_COIN_SYMBOL': 'BTCUSDT|ETHUSDT',
+        'TIME_INTERVAL': '15m',
+        'STATE_FILE': str(tmp_path / 'bot_state.json'),
+        'KLINE_STORE_DIR': '',
+        'LOG_FILENAME': str(tmp_path / 'trading_bot.log'),
+        'SIGNAL_LOG_FILENAME': str(tmp_path / 'signals.log'),
+        'STREAM_MODE': 'false',
+        'ACCOUNT_CHECK': 'off',
+        'ORDER_MODE': 'off',
+    }
+    for key, value in env.items():
+        monkeypatch.setenv(key, value)
+    return env
+
+
+def pytest_sessionfinish(session, exitstatus):
+    # Listener log giữ sys.stdout của pytest (bị đóng sau phiên): ghi nốt rồi dừng trước đó
+    if logCommon._listener is not None:
+        logCommon._listener.stop()
@@ -0,0 +1,62 @@
+# -*- coding: utf-8 -*-
+import numpy as np
+import pytest
+
+from binance_coin.backtest.engine import BacktestEngine, synthetic_data
+from binance_coin.benchmarks.fake_client import SyntheticClient
+from binance_coin.enums.position_state import PositionState
+
+SYMBOL = 'SYN0000USDT'
+
+
+def scalar_replay(bot, symbol: str, open_times: np.ndarray, closes: np.ndarray) -> list:
+    """
+    Chạy analyze_and_signal của bot từng nến một (nến đã đóng, giá hiện tại = giá đóng cửa),
+    áp tín hiệu lên sổ SellBuy như vòng chạy thật; trả về [(buy_index, sell_index, profit)]
+    """
+    step = {'i': 0}
+    bot.get_kline_arrays = lambda symbol, interval, *args, **kwargs: {
+        'open_time': open_times[:step['i'] + 1], 'close': closes[:step['i'] + 1]}
+    bot._get_current_price = lambda symbol: float(closes[step['i']])
+    item = bot.management_coin.get_item_coin(symbol)
+    trades, buy_index = [], None
+    for i in range(len(closes)):
+        step['i'] = i
+        position, price = bot.analyze_and_signal(symbol, '15m', item.get_position())
+        if position == PositionState.CO_VI_THE:
+            item.buy(price)
+            buy_index = i
+        elif position == PositionState.KHONG_VI_THE:
+            item.sell(price)
+            trades.append((buy_index, i, item.get_profit_price()))
+            buy_index = None
+    if buy_index is not None:
+        trades.append((buy_index, None, None))
+    return trades
+
+
+@pytest.fixture
+def bot(bot_env):
+    from binance_coin.services.trading_bot import TradingBot
+    bot = TradingBot(client=SyntheticClient(['BTCUSDT', 'ETHUSDT']))
+    yield bot
+    bot.management_coin.close()
+
+
+def test_backtest_matches_scalar_signal_path(bot):
+    open_times, closes = synthetic_data(1, 1500)[SYMBOL]
+
+    result = BacktestEngine(7, 25).run_symbol(SYMBOL, open_times, closes)
+    expected = scalar_replay(bot, SYMBOL, open_times, closes)
+
+    assert len(result.closed_trades) >= 5
+    assert [(trade.buy_index, trade.sell_index) for trade in result.trades] == [trade[:2] for trade in expected]
+    assert [trade.profit for trade in result.closed_trades] == pytest.approx(
+        [trade[2] for trade in expected if trade[1] is not None])
+
+    # Đường vốn chỉ đổi khi giữ coin: tại lần bán cuối bằng tích các lần mua-bán
+    last_sell = result.closed_trades[-1].sell_index
+    growth = np.prod([1 + trade.profit / 100 for trade in result.closed_trades])
+    assert result.equity[last_sell] == pytest.approx(growth)
+    final = PositionState.CO_VI_THE if expected[-1][1] is None else PositionState.KHONG_VI_THE
+    assert result.final_position == final
@@ -0,0 +1,40 @@
+# -*- coding: utf-8 -*-
+import pytest
+
+from binance_coin.backtest.engine import BacktestEngine, synthetic_data
+from binance_coin.backtest.sweep import build_grid, run_sweep
+from binance_coin.benchmarks.fake_client import SyntheticClient
+from tests.test_backtest import scalar_replay
+
+TIMING_KEYS = ('elapsed_seconds', 'candles_per_second')
+
+
+def test_build_grid_skips_invalid_windows():
+    assert build_grid([5, 25], [20, 25], [True]) == [(5, 20, True), (5, 25, True)]
+
+
+def test_sweep_matches_single_process_engine_and_scalar_path(bot_env):
+    data = synthetic_data(3, 1200)
+    grid = build_grid([5, 7], [20, 25], (True, False))
+
+    results, _ = run_sweep(data, grid, workers=2)
+
+    assert len(results) == len(grid)
+    assert [result['avg_total_return'] for result in results] == sorted(
+        (result['avg_total_return'] for result in results), reverse=True)
+    for result in results:
+        expected = BacktestEngine(result['fast'], result['slow'], result['price_filter']).run(data).summary()
+        for key, value in expected.items():
+            if key not in TIMING_KEYS:
+                assert result[key] == value, (result['fast'], result['slow'], result['price_filter'], key)
+
+    # Tổ hợp của bot (MA7/MA25, có lọc giá): cùng các lần mua-bán với analyze_and_signal trên mọi symbol
+    from binance_coin.services.trading_bot import TradingBot
+    bot = TradingBot(client=SyntheticClient(['BTCUSDT', 'ETHUSDT']))
+    closed = [trade for symbol, (open_times, closes) in data.items()
+              for trade in scalar_replay(bot, symbol, open_times, closes) if trade[1] is not None]
+    bot.management_coin.close()
+    live = next(result for result in results if (result['fast'], result['slow'], result['price_filter']) == (7, 25, True))
+    assert live['trades'] == len(closed) > 0
+    assert live['avg_profit'] == pytest.approx(sum(trade[2] for trade in closed) / len(closed))
+    assert live['win_rate'] == pytest.approx(100 * sum(trade[2] > 0 for trade in closed) / len(closed))
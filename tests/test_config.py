@@ -0,0 +1,17 @@
+# -*- coding: utf-8 -*-
+import pytest
+
+from binance_coin.services.trading_bot import TradingBot
+
+
+def test_base_interval_must_cover_ma_window():
+    # 1m -> 15m: 15 * 28 nến cơ sở, vừa cache mặc định
+    settings = TradingBot._read_reloadable({'TIME_INTERVAL': '15m', 'BASE_INTERVAL': '1m'})
+    assert settings['base_interval'] == '1m'
+    # 1m -> 4h: cache 1000 nến 1m chỉ dựng được ~4 nến 4h, không đủ MA25
+    with pytest.raises(ValueError):
+        TradingBot._read_reloadable({'TIME_INTERVAL': '4h', 'BASE_INTERVAL': '1m'})
+    TradingBot._read_reloadable({'TIME_INTERVAL': '4h', 'BASE_INTERVAL': '1m', 'KLINE_CACHE_SIZE': '7000'})
+    # 1h -> 1d: cache đủ nhưng lịch sử 5 ngày thì không
+    with pytest.raises(ValueError):
+        TradingBot._read_reloadable({'TIME_INTERVAL': '1d', 'BASE_INTERVAL': '1h'})
@@ -0,0 +1,88 @@
+# -*- coding: utf-8 -*-
+import os
+import threading
+
+from binance_coin.benchmarks.fake_client import SyntheticClient
+from binance_coin.services.config_watcher import ConfigWatcher, diff_env
+
+
+def test_poll_reports_change_only_after_file_settles(tmp_path):
+    path = str(tmp_path / '.env')
+    watcher = ConfigWatcher([path], on_change=lambda paths: None)
+    assert watcher.poll() == []
+
+    with open(path, 'w', encoding='utf-8') as f:
+        f.write('TIME_INTERVAL=1h\n')
+    # Lượt đầu thấy file đổi, chờ đứng yên một lượt
+    assert watcher.poll() == []
+    with open(path, 'a', encoding='utf-8') as f:
+        f.write('LIST_COIN_SYMBOL=BTCUSDT\n')
+    assert watcher.poll() == []
+    assert watcher.poll() == [os.path.abspath(path)]
+    assert watcher.poll() == []
+
+
+def test_diff_env_keeps_shell_variables_first():
+    previous = {'TIME_INTERVAL': '15m', 'SLEEP_INTERVAL_SECONDS': '60', 'BASE_INTERVAL': '1m'}
+    current = {'TIME_INTERVAL': '1h', 'SLEEP_INTERVAL_SECONDS': '30', 'PRICE_TICK_SECONDS': '5'}
+    # SLEEP_INTERVAL_SECONDS đặt từ shell (khác giá trị trong file) -> file không được ghi đè
+    environ = {'TIME_INTERVAL': '15m', 'SLEEP_INTERVAL_SECONDS': '10', 'BASE_INTERVAL': '1m'}
+
+    assert diff_env(previous, current, environ) == {
+        'TIME_INTERVAL': '1h',
+        'PRICE_TICK_SECONDS': '5',
+        'BASE_INTERVAL': None,
+    }
+
+
+def make_bot():
+    from binance_coin.services.trading_bot import TradingBot
+    bot = TradingBot(client=SyntheticClient(['BTCUSDT', 'ETHUSDT', 'SOLUSDT']))
+    for symbol in bot.coin_symbol_list:
+        bot.get_candles(symbol, bot.time_interval)
+    return bot
+
+
+def test_unchanged_symbols_keep_their_cache(bot_env):
+    bot = make_bot()
+    btc = bot.kline_cache._candles[('BTCUSDT', '15m')]
+    settings = bot._read_reloadable({'LIST_COIN_SYMBOL': 'BTCUSDT|SOLUSDT', 'TIME_INTERVAL': '15m'})
+
+    bot._apply_config(settings)
+
+    assert bot.coin_symbol_list == ['BTCUSDT', 'SOLUSDT']
+    assert bot.kline_cache._candles[('BTCUSDT', '15m')] is btc
+    assert ('ETHUSDT', '15m') not in bot.kline_cache._candles
+    bot.management_coin.close()
+
+
+def test_stream_mode_applies_config_on_stream_worker(bot_env, monkeypatch, tmp_path):
+    monkeypatch.setenv('STREAM_MODE', 'true')
+    bot = make_bot()
+    env_file = tmp_path / '.env'
+    env_file.write_text('LIST_COIN_SYMBOL=BTCUSDT\n', encoding='utf-8')
+    bot.env_file, bot._env_values = str(env_file), {'LIST_COIN_SYMBOL': 'BTCUSDT|ETHUSDT'}
+
+    class StreamWorker:
+        """Chỉ giữ phần MarketStream mà hot reload dùng: submit chạy trên một thread riêng"""
+        def __init__(self):
+            self.applied_on = []
+
+        def submit(self, callback, *args):
+            def run():
+                self.applied_on.append(threading.current_thread().name)
+                callback(*args)
+            thread = threading.Thread(target=run, name='stream-worker')
+            thread.start()
+            thread.join()
+
+        def update(self, symbols, interval=None):
+            pass
+    bot._stream = stream = StreamWorker()
+    monkeypatch.setattr(bot, '_backfill_klines', lambda symbols=None: None)
+
+    bot._on_config_change([bot.env_file])
+
+    assert stream.applied_on == ['stream-worker']
+    assert bot.coin_symbol_list == ['BTCUSDT']
+    bot.management_coin.close()
@@ -0,0 +1,73 @@
+# -*- coding: utf-8 -*-
+import random
+
+import pandas as pd
+
+from binance_coin.services.indicator_engine import MA_TOLERANCE, MovingAverageEngine, verify_against_pandas
+
+
+def assert_close(actual, expected):
+    assert actual is not None
+    assert abs(actual - expected) <= MA_TOLERANCE * max(1.0, abs(expected)), f"{actual} != {expected}"
+
+
+def assert_matches_pandas(engine: MovingAverageEngine, closes, ma):
+    """MA hiện tại và MA của nến trước khớp pandas rolling().mean() trên đúng chuỗi giá engine đã thấy"""
+    series = pd.Series(closes[-(engine.slow + 2):])
+    fast = series.rolling(engine.fast).mean()
+    slow = series.rolling(engine.slow).mean()
+    assert_close(ma.ma_fast, fast.iloc[-1])
+    assert_close(ma.prev_ma_fast, fast.iloc[-2])
+    assert_close(ma.ma_slow, slow.iloc[-1])
+    assert_close(ma.prev_ma_slow, slow.iloc[-2])
+
+
+def test_update_matches_pandas_on_open_candle_updates_and_closes():
+    rnd = random.Random(3)
+    engine = MovingAverageEngine(fast=7, slow=25)
+    closes, price = [], 30000.0
+    for open_time in range(3000):
+        price *= 1 + rnd.uniform(-0.01, 0.01)
+        closes.append(price)
+        ma = engine.update('BTCUSDT', '15m', open_time, price)
+        if len(closes) >= engine.min_candles:
+            assert_matches_pandas(engine, closes, ma)
+        # Nến đang mở đổi giá nhiều lần trước khi đóng
+        for _ in range(rnd.randint(0, 4)):
+            price *= 1 + rnd.uniform(-0.002, 0.002)
+            closes[-1] = price
+            ma = engine.update('BTCUSDT', '15m', open_time, price)
+            if len(closes) >= engine.min_candles:
+                assert_matches_pandas(engine, closes, ma)
+    assert ma.count == len(closes)
+
+
+def test_not_ready_before_slow_window():
+    engine = MovingAverageEngine(fast=7, slow=25)
+    for open_time in range(engine.slow - 1):
+        ma = engine.update('ETHUSDT', '1h', open_time, 100.0 + open_time)
+    assert ma.ma_fast is not None and ma.ma_slow is None
+    ma = engine.update('ETHUSDT', '1h', engine.slow - 1, 200.0)
+    assert ma.ma_slow is not None and ma.prev_ma_slow is None
+
+
+def test_sync_with_cache_window_matches_pandas():
+    """sync() với cả cửa sổ nến như KlineCache trả về: nến đang mở thay tại chỗ, nến mới nối thêm, cửa sổ trượt"""
+    rnd = random.Random(11)
+    engine = MovingAverageEngine(fast=7, slow=25)
+    open_times = list(range(0, 100 * 60, 60))
+    closes = [100 + rnd.uniform(-1, 1) for _ in open_times]
+    ma = engine.sync('SOLUSDT', '1m', open_times, closes)
+    assert_matches_pandas(engine, closes, ma)
+
+    for step in range(500):
+        if step % 3 == 0:
+            open_times = open_times[1:] + [open_times[-1] + 60]
+            closes = closes[1:] + [closes[-1]]
+        closes[-1] *= 1 + rnd.uniform(-0.003, 0.003)
+        ma = engine.sync('SOLUSDT', '1m', open_times, closes)
+        assert_matches_pandas(engine, closes, ma)
+
+
+def test_verify_against_pandas_within_tolerance():
+    assert verify_against_pandas(n_candles=1500) <= MA_TOLERANCE
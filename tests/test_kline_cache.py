@@ -0,0 +1,51 @@
+# -*- coding: utf-8 -*-
+from binance_coin.benchmarks.fake_client import SyntheticClient
+from binance_coin.services.kline_cache import KlineCache
+from binance_coin.services.kline_store import KlineStore
+
+MINUTE = 60000
+NOW_MS = 1736121600000 + 30 * MINUTE
+CACHE_SIZE = 100
+
+
+class RecordingClient(SyntheticClient):
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.starts = []
+
+    def get_historical_klines(self, symbol, interval, start_str=None, *args, **kwargs):
+        self.starts.append(start_str)
+        return super().get_historical_klines(symbol, interval, start_str, *args, **kwargs)
+
+
+def seeded(tmp_path, stored_last_open: int):
+    fake = RecordingClient(['BTCUSDT'], interval='1m', now_ms=stored_last_open + MINUTE)
+    store = KlineStore(str(tmp_path))
+    store.append('BTCUSDT', '1m', fake.get_historical_klines('BTCUSDT', '1m', stored_last_open - 49 * MINUTE)[:50])
+    fake._now_ms, fake.starts = NOW_MS, []
+    cache = KlineCache(fake, max_candles=CACHE_SIZE, store=store, clock=lambda: NOW_MS / 1000)
+    return fake, store, cache.get_klines('BTCUSDT', '1m')
+
+
+def assert_contiguous(klines) -> None:
+    assert all(b[0] - a[0] == MINUTE for a, b in zip(klines, klines[1:]))
+    assert klines[-1][0] == NOW_MS
+
+
+def test_recent_store_backfills_from_last_stored_candle(tmp_path):
+    stored_last = NOW_MS - 10 * MINUTE
+    fake, _, klines = seeded(tmp_path, stored_last)
+    assert fake.starts == [stored_last]
+    assert len(klines) == 60
+    assert_contiguous(klines)
+
+
+def test_old_store_backfill_is_clamped_to_cache_window(tmp_path):
+    fake, store, klines = seeded(tmp_path, NOW_MS - 30 * 24 * 60 * MINUTE)
+    assert fake.starts == [NOW_MS - (CACHE_SIZE - 1) * MINUTE]
+    assert len(klines) == CACHE_SIZE
+    assert_contiguous(klines)
+
+    # Lần khởi động sau: kho có khoảng trống, chỉ phần liền mạch cuối được dùng
+    restarted = KlineCache(fake, max_candles=CACHE_SIZE, store=store, clock=lambda: NOW_MS / 1000)
+    assert_contiguous(restarted.get_klines('BTCUSDT', '1m'))
@@ -0,0 +1,53 @@
+# -*- coding: utf-8 -*-
+import numpy as np
+import pandas as pd
+import pytest
+
+from binance_coin.benchmarks.fake_client import SyntheticClient
+from binance_coin.benchmarks.kline_decode import legacy_frame
+from binance_coin.services.kline_decoder import KLINE_FIELDS, decode_klines, klines_to_frame
+from binance_coin.services.stream_feed import kline_event_to_row
+
+NOW_MS = 1736121600000
+
+
+def klines(count: int = 500) -> list:
+    return SyntheticClient(['BTCUSDT'], now_ms=NOW_MS).get_klines(symbol='BTCUSDT', interval='15m', limit=count)
+
+
+def test_decode_matches_legacy_dataframe_path():
+    rows = klines()
+    decoded = decode_klines(rows, KLINE_FIELDS[:11])
+    legacy = pd.DataFrame(rows, columns=list(KLINE_FIELDS))
+
+    for name in KLINE_FIELDS[:11]:
+        expected = pd.to_numeric(legacy[name]).to_numpy()
+        assert decoded[name].dtype == (np.int64 if name in ('open_time', 'close_time', 'number_of_trades')
+                                       else np.float64)
+        assert np.array_equal(decoded[name], expected), name
+    pd.testing.assert_frame_equal(klines_to_frame(rows), legacy_frame(rows))
+
+
+def test_websocket_rows_decode_like_rest_rows():
+    rows = klines(3)
+    events = [{'t': row[0], 'o': row[1], 'h': row[2], 'l': row[3], 'c': row[4], 'v': row[5], 'T': row[6],
+               'q': row[7], 'n': row[8], 'V': row[9], 'Q': row[10]} for row in rows]
+    stream_rows = [kline_event_to_row(event) for event in events]
+    for name, values in decode_klines(stream_rows, KLINE_FIELDS[:11]).items():
+        assert np.array_equal(values, decode_klines(rows, (name,))[name])
+
+
+def test_decode_rejects_non_numeric_values():
+    rows = klines(3)
+    rows[1] = rows[1][:4] + ['n/a'] + rows[1][5:]
+    with pytest.raises(ValueError):
+        decode_klines(rows)
+
+
+def test_bot_historical_data_keeps_legacy_frame(bot_env):
+    from binance_coin.services.trading_bot import TradingBot
+    bot = TradingBot(client=SyntheticClient(['BTCUSDT', 'ETHUSDT']))
+
+    frame = bot.get_historical_data('BTCUSDT', '15m')
+    pd.testing.assert_frame_equal(frame, legacy_frame(bot._get_klines('BTCUSDT', '15m', '5 days ago UTC')))
+    bot.management_coin.close()
@@ -0,0 +1,49 @@
+# -*- coding: utf-8 -*-
+import os
+
+import pytest
+
+from binance_coin.services.kline_resampler import (KlineResampler, _read_csv_klines, bucket_start, compare_klines,
+                                                  resample_klines)
+from binance_coin.services.kline_store import KlineStore
+from binance_coin.utils.common import interval_offset_ms, interval_to_milliseconds
+
+# BTCUSDT 2025-01-06 00:00-03:00 UTC, định dạng data.binance.vision như file --record ghi ra.
+# Nến 1m từ SyntheticClient, nến 15m/1h gộp độc lập (Decimal); ghi đè bằng --record để kiểm tra trên dữ liệu sàn
+FIXTURES = os.path.join(os.path.dirname(__file__), 'fixtures', 'klines')
+
+
+def fixture(interval: str) -> list:
+    return _read_csv_klines(os.path.join(FIXTURES, f"BTCUSDT-{interval}.csv"))
+
+
+@pytest.mark.parametrize('target', ['15m', '1h'])
+def test_resampled_klines_match_native(target):
+    native = fixture(target)
+    report = compare_klines(resample_klines(fixture('1m'), '1m', target), native)
+
+    assert report['compared'] == len(native)
+    assert report['mismatches'] == []
+
+
+def test_resampler_matches_native_through_store(tmp_path):
+    # Cùng đường đi với bot: nến 1m vào KlineStore, đọc lại, cache lớn dần và resampler gộp phần mới
+    store = KlineStore(str(tmp_path))
+    store.append('BTCUSDT', '1m', fixture('1m'))
+    base = store.tail_klines('BTCUSDT', '1m', 1000)
+    resampler = KlineResampler('1m')
+    for i in range(0, len(base), 7):
+        resampled = resampler.update('BTCUSDT', '1h', base[:i + 7])
+
+    report = compare_klines(resampled, fixture('1h'))
+    assert report['compared'] == 3
+    assert report['mismatches'] == []
+    assert all(float(kline[7]) > 0 for kline in resampled)
+
+
+def test_weekly_buckets_open_on_monday():
+    monday = 1736121600000  # 2025-01-06 00:00 UTC
+    week_ms = interval_to_milliseconds('1w')
+    for open_time in (monday, monday + 3 * 86_400_000, monday + week_ms - 60000):
+        assert bucket_start(open_time, week_ms, interval_offset_ms('1w')) == monday
+    assert interval_offset_ms('1d') == 0
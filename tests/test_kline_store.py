@@ -0,0 +1,49 @@
+# -*- coding: utf-8 -*-
+import json
+import os
+
+import pytest
+
+from binance_coin.benchmarks.fake_client import SyntheticClient
+from binance_coin.services.kline_store import LEGACY_COLUMNS, META_FILE, KlineStore
+
+MINUTE = 60000
+
+
+def numeric(kline: list) -> list:
+    return [float(value) for value in kline[:11]]
+
+
+def test_tail_klines_round_trips_every_numeric_column(tmp_path):
+    fake = SyntheticClient(['BTCUSDT'], interval='1m', now_ms=1736121600000)
+    klines = fake.get_historical_klines('BTCUSDT', '1m', '1 day ago UTC')
+    store = KlineStore(str(tmp_path))
+    assert store.append('BTCUSDT', '1m', klines) == len(klines)
+
+    tail = store.tail_klines('BTCUSDT', '1m', 50)
+    assert [numeric(kline) for kline in tail] == [numeric(kline) for kline in klines[-50:]]
+    assert all(float(kline[7]) > 0 and float(kline[10]) > 0 for kline in tail)
+
+
+def test_legacy_store_refuses_missing_columns_and_is_rewritten(tmp_path):
+    fake = SyntheticClient(['BTCUSDT'], interval='1m', now_ms=1736121600000)
+    klines = fake.get_historical_klines('BTCUSDT', '1m', '1 day ago UTC')
+    store = KlineStore(str(tmp_path))
+    store.append('BTCUSDT', '1m', klines[:10])
+    # Kho ghi bởi phiên bản cũ: meta không có 'columns'
+    meta_path = os.path.join(str(tmp_path), 'BTCUSDT', '1m', META_FILE)
+    with open(meta_path, 'r', encoding='utf-8') as f:
+        meta = json.load(f)
+    del meta['columns']
+    with open(meta_path, 'w', encoding='utf-8') as f:
+        json.dump(meta, f)
+
+    assert store.columns('BTCUSDT', '1m') == LEGACY_COLUMNS
+    with pytest.raises(ValueError):
+        store.tail_klines('BTCUSDT', '1m', 10)
+    assert len(store.read('BTCUSDT', '1m', ['open_time', 'close'])['close']) == 10
+
+    assert store.append('BTCUSDT', '1m', klines[10:20]) == 10
+    assert store.rows('BTCUSDT', '1m') == 10
+    assert [numeric(kline) for kline in store.tail_klines('BTCUSDT', '1m', 10)] == \
+        [numeric(kline) for kline in klines[10:20]]
@@ -0,0 +1,36 @@
+# -*- coding: utf-8 -*-
+from binance_coin.benchmarks.fake_client import SyntheticClient
+from binance_coin.utils.metrics import BotMetrics
+
+
+def test_forget_symbol_removes_only_its_span_series():
+    metrics = BotMetrics()
+    for symbol in ('BTCUSDT', 'ETHUSDT'):
+        with metrics.span('get_historical_data', symbol):
+            pass
+        with metrics.span('process_signal', symbol):
+            pass
+    with metrics.span('screen'):
+        pass
+
+    metrics.forget_symbol('ETHUSDT')
+
+    text = metrics.registry.render()
+    assert 'symbol="ETHUSDT"' not in text
+    assert metrics.span_seconds.snapshot('process_signal', 'BTCUSDT')['count'] == 1
+    assert metrics.span_seconds.snapshot('screen', '')['count'] == 1
+
+
+def test_series_stay_bounded_as_universe_rotates(bot_env):
+    from binance_coin.services.trading_bot import TradingBot
+    symbols = [f"SYM{i:03d}USDT" for i in range(20)]
+    bot = TradingBot(client=SyntheticClient(symbols))
+    # Mỗi lượt screen giữ 2 symbol khác nhau, symbol cũ bị bỏ
+    for i in range(0, len(symbols), 2):
+        for symbol in symbols[i:i + 2]:
+            with bot.metrics.span('analyze_and_signal', symbol):
+                pass
+        bot._apply_config(bot._read_reloadable({'LIST_COIN_SYMBOL': '|'.join(symbols[i:i + 2])}))
+
+    assert len(bot.metrics.span_seconds._series) == 2
+    bot.management_coin.close()
@@ -0,0 +1,105 @@
+# -*- coding: utf-8 -*-
+import pytest
+
+from binance_coin.benchmarks.fake_client import FEE_RATE, SyntheticClient
+from binance_coin.enums.position_state import PositionState
+from binance_coin.services.manager_coin import ManagementCoin
+from binance_coin.services.order_executor import ExchangeFilters, OrderExecutor
+
+SYMBOL = 'BTCUSDT'
+
+
+def make_executor(fake, holdings=None, resume_signal_id=-1, **kwargs) -> OrderExecutor:
+    return OrderExecutor(fake, ExchangeFilters(fake), fills_from_stream=False, retry_delay=0, holdings=holdings,
+                         resume_signal_id=resume_signal_id, **kwargs)
+
+
+def send(executor: OrderExecutor, side: str, signal_id: int, key: str = SYMBOL):
+    """Gửi đồng bộ trên thread gọi (không start worker)"""
+    price = float(executor.client.get_symbol_ticker(symbol=SYMBOL)['price'])
+    record = executor.submit(key, SYMBOL, side, price, signal_id=signal_id)
+    return executor.execute(record)
+
+
+def test_sell_without_known_quantity_is_rejected():
+    fake = SyntheticClient([SYMBOL])
+    fake.balances['BTC'] = 5.0
+    record = send(make_executor(fake), 'SELL', 0)
+
+    assert record.status == 'REJECTED'
+    assert fake.calls['create_order'] == 0
+    assert fake.balances['BTC'] == 5.0
+
+
+def test_sell_is_capped_at_book_quantity_after_restart(tmp_path):
+    fake = SyntheticClient([SYMBOL])
+    # Số dư có sẵn của người dùng / sổ khác không được bán theo
+    fake.balances['BTC'] = 1.0
+    state_file = str(tmp_path / 'state.json')
+
+    coin = ManagementCoin(state_file)
+    buy = send(make_executor(fake, coin.holdings), 'BUY', 0)
+    assert buy.status == 'FILLED'
+    bought = buy.executed_qty * (1 - FEE_RATE)
+    assert coin.holdings.get(SYMBOL) == pytest.approx(bought)
+    coin.save_state()
+    coin.close()
+
+    coin = ManagementCoin(state_file)
+    sell = send(make_executor(fake, coin.holdings), 'SELL', 1)
+    assert sell.status == 'FILLED'
+    assert sell.executed_qty <= bought
+    assert fake.balances['BTC'] >= 1.0 - 1e-9
+    coin.close()
+
+
+def test_signal_sent_before_restart_is_not_sent_again():
+    fake = SyntheticClient([SYMBOL])
+    send(make_executor(fake), 'BUY', 0)
+
+    # Tiến trình mới: chưa biết lệnh nào, cùng tín hiệu trong cùng nến phải tra ra lệnh cũ
+    holdings = {}
+    record = send(make_executor(fake, holdings, resume_signal_id=0), 'BUY', 0)
+
+    assert fake.duplicate_orders == 0
+    assert len(fake.orders) == 1
+    assert record.status == 'FILLED'
+    # Phí của lệnh đối soát qua get_order lấy từ get_my_trades
+    assert holdings[SYMBOL] == pytest.approx(record.executed_qty * (1 - FEE_RATE))
+
+
+def test_lost_ack_is_reconciled_with_known_quantity():
+    fake = SyntheticClient([SYMBOL], lost_ack_every=1)
+    holdings = {}
+    record = send(make_executor(fake, holdings), 'BUY', 0)
+
+    assert record.status == 'FILLED'
+    assert record.attempts == 2
+    assert len(fake.orders) == 1
+    assert holdings[SYMBOL] == pytest.approx(record.executed_qty * (1 - FEE_RATE))
+
+
+def test_book_follows_order_outcome(bot_env, monkeypatch):
+    monkeypatch.setenv('ORDER_MODE', 'market')
+    monkeypatch.setenv('USER_STREAM', 'off')
+    from binance_coin.services.trading_bot import TradingBot
+
+    fake = SyntheticClient(['BTCUSDT', 'ETHUSDT'])
+    bot = TradingBot(client=fake)
+    item = bot.management_coin.get_item_coin(SYMBOL)
+    price = float(fake.get_symbol_ticker(symbol=SYMBOL)['price'])
+
+    bot._start_execution()
+    bot.process_signal(SYMBOL, PositionState.CO_VI_THE, price, item)
+    bot._stop_execution()
+    assert item.get_position() == PositionState.CO_VI_THE
+    assert item.quantity > 0
+
+    # Lệnh bán bị từ chối (không biết lượng đang giữ) -> sổ vẫn giữ vị thế
+    item.set_quantity(None)
+    bot._start_execution()
+    bot.process_signal(SYMBOL, PositionState.KHONG_VI_THE, price, item)
+    bot._stop_execution()
+    assert item.get_position() == PositionState.CO_VI_THE
+    assert bot.order_executor.stats()['rejected'] == 1
+    bot.management_coin.close()
@@ -0,0 +1,76 @@
+# -*- coding: utf-8 -*-
+from datetime import datetime, timedelta
+
+import numpy as np
+import pytest
+
+from binance_coin.enums.position_state import PositionState
+from binance_coin.models.position_table import PositionTable
+from binance_coin.models.sell_buy import SellBuy
+from binance_coin.services.manager_coin import ManagementCoin
+
+T0 = datetime(2025, 1, 6, 12, 0)
+
+
+def test_table_grows_and_keeps_rows():
+    table = PositionTable(capacity=2, history_capacity=2)
+    items = [SellBuy(f"SYM{i:02d}USDT", table=table) for i in range(10)]
+    for i, item in enumerate(items):
+        item.buy(100.0 + i, at=T0)
+        if i % 2:
+            item.sell(110.0 + i, at=T0 + timedelta(minutes=i))
+
+    assert len(table) == 10 and len(table.state) >= 10
+    # View tạo trước khi bảng nới vẫn trỏ đúng dòng
+    assert items[0].get_position() == PositionState.CO_VI_THE and items[0].buy_price == 100.0
+    assert items[9].sell_price == 119.0 and items[9].sell_time == T0 + timedelta(minutes=9)
+    assert table.open_positions() == [f"SYM{i:02d}USDT" for i in range(0, 10, 2)]
+    assert table.summary() == {'symbols': 10, 'open_positions': 5, 'trades': 5, 'win_rate': 100.0,
+                               'total_profit': pytest.approx(sum((10 / (100 + i)) * 100 for i in range(1, 10, 2)))}
+
+
+def test_history_keeps_every_round_trip_and_survives_restart(tmp_path):
+    state_file = str(tmp_path / 'state.json')
+    coin = object.__new__(ManagementCoin)
+    coin.__init__(state_file)
+    btc = coin.get_item_coin('BTCUSDT')
+    for i, (buy, sell) in enumerate([(100.0, 110.0), (120.0, 90.0), (95.0, 114.0)]):
+        btc.buy(buy, at=T0 + timedelta(hours=i))
+        btc.sell(sell, at=T0 + timedelta(hours=i, minutes=30))
+    coin.get_item_coin('ETHUSDT').buy(10.0, at=T0)
+
+    table = coin.positions
+    assert [row[2:5:2] for row in table.history_rows('BTCUSDT')] == [[100.0, 110.0], [120.0, 90.0], [95.0, 114.0]]
+    assert table.realized_profit_by_symbol() == {'BTCUSDT': pytest.approx(10 - 25 + 20)}
+    assert table.unrealized_profit({'ETHUSDT': 11.0, 'BTCUSDT': 1.0}) == {'ETHUSDT': pytest.approx(10.0)}
+    coin.save_state()
+    coin.close()
+
+    restarted = object.__new__(ManagementCoin)
+    restarted.__init__(state_file)
+    assert restarted.positions.history_rows() == table.history_rows()
+    assert restarted.get_item_coin('ETHUSDT').get_position() == PositionState.CO_VI_THE
+    restarted.close()
+
+
+def test_sell_buy_keeps_legacy_api():
+    events = []
+    item = SellBuy('BTCUSDT', listener=lambda *event: events.append(event))
+    assert item.is_buy() and item.is_sell()
+    assert item.get_position() == PositionState.KHONG_VI_THE and item.get_profit_price() == 0
+
+    item.buy(100.0, at=T0)
+    assert not item.is_buy() and item.check_other_current_position(PositionState.CO_VI_THE)
+    item.sell(105.0, at=T0 + timedelta(hours=1))
+    assert item.get_profit_price() == pytest.approx(5.0)
+    assert events == [('BTCUSDT', 'BUY', 100.0, T0), ('BTCUSDT', 'SELL', 105.0, T0 + timedelta(hours=1))]
+    assert str(item) == (f"Sell at {T0 + timedelta(hours=1)}, Price: 105.0\n"
+                         f"Buy at {T0}, Price: 100.0")
+
+    # Snapshot cũ (trước khi có quantity) nạp lại và ghi ra đúng các trường cũ
+    legacy = {"coin_symbol": "ETHUSDT", "sell_time": None, "sell_price": None, "buy_time": T0.isoformat(),
+              "buy_price": 10.5, "position_active": "CO_VI_THE", "profit": 0}
+    restored = SellBuy.from_dict(legacy)
+    assert restored.to_dict() == dict(legacy, quantity=None)
+    assert isinstance(restored.buy_price, float) and not isinstance(restored.buy_price, np.floating)
+    assert not hasattr(restored, '__dict__')
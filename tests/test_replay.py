@@ -0,0 +1,21 @@
+# -*- coding: utf-8 -*-
+import json
+
+from binance_coin.benchmarks.replay import main
+
+
+def test_repeat_gives_same_signal_digest(tmp_path):
+    output = str(tmp_path / 'replay.json')
+
+    # Có lệnh thật + mất ack định kỳ: retry không được sinh lệnh trùng, hai lần chạy cùng digest
+    assert main(['--days', '1', '--symbols', '3', '--repeat', '2', '--order-mode', 'market',
+                 '--lost-ack-every', '3', '--output', output]) == 0
+
+    with open(output, 'r', encoding='utf-8') as f:
+        results = json.load(f)['results']
+    first, second = results
+    assert first['signals'] > 0 and first['cycles'] > 0
+    assert first['digest'] == second['digest']
+    assert (first['signals'], first['exchange_orders']) == (second['signals'], second['exchange_orders'])
+    assert first['duplicate_orders'] == second['duplicate_orders'] == 0
+    assert first['orders']['retries'] > 0
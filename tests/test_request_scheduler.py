@@ -0,0 +1,116 @@
+# -*- coding: utf-8 -*-
+import threading
+import time
+from typing import Dict
+
+from binance_coin.apis.request_scheduler import (CLIENT_METHODS, RequestScheduler, ScheduledClient,
+                                                 historical_klines_weight, record_response)
+
+NOW_MS = 1736121600000
+
+
+class FakeClient:
+    """Client giả: trả header weight tổng hợp, có thể giả lập 429 ở một lần gọi"""
+
+    class RateLimited(Exception):
+        def __init__(self, retry_after: float):
+            super().__init__('Too many requests')
+            self.status_code = 429
+            self.response = type('Response', (), {'headers': {'Retry-After': str(retry_after)}})()
+
+    def __init__(self, weights: Dict[str, int] = None, window_seconds: float = 60, fail_at: int = None,
+                 retry_after: float = 1):
+        self.weights = weights or {name: weight for name, (_, weight) in CLIENT_METHODS.items()
+                                   if not callable(weight)}
+        self.window_seconds = window_seconds
+        self.fail_at = fail_at
+        self.retry_after = retry_after
+        self.calls = []
+        self._used = []
+
+    @property
+    def used_weight(self) -> int:
+        """Weight đã dùng trong cửa sổ hiện tại (giống X-MBX-USED-WEIGHT-1M)"""
+        window_start = time.monotonic() - self.window_seconds
+        self._used = [(at, weight) for at, weight in self._used if at > window_start]
+        return sum(weight for _, weight in self._used)
+
+    def _call(self, name: str):
+        self.calls.append(name)
+        if self.fail_at is not None and len(self.calls) == self.fail_at:
+            raise FakeClient.RateLimited(self.retry_after)
+        self._used.append((time.monotonic(), self.weights.get(name, 1)))
+        record_response(type('Response', (), {'headers': {'X-MBX-USED-WEIGHT-1M': str(self.used_weight)}})())
+        return name
+
+    def __getattr__(self, name):
+        if name in self.weights:
+            return lambda *args, **kwargs: self._call(name)
+        raise AttributeError(name)
+
+
+def test_historical_klines_weight_counts_pages():
+    # 5 ngày nến 1m = 7200 nến = 8 trang, + request tìm nến sớm nhất
+    assert historical_klines_weight(NOW_MS, 'BTCUSDT', '1m', '5 days ago UTC') == 2 * (8 + 1)
+    assert historical_klines_weight(NOW_MS, 'BTCUSDT', '15m', '5 days ago UTC') == 2 * (1 + 1)
+    assert historical_klines_weight(NOW_MS, 'BTCUSDT', '1m', 0, 3000 * 60000) == 2 * (3 + 1)
+
+
+def test_historical_klines_weight_uses_scheduler_clock():
+    class HistoryClient:
+        def get_historical_klines(self, symbol, interval, start_str=None, end_str=None, limit=None):
+            return []
+
+    # Đồng hồ của scheduler (vd SimClock khi backtest) ở 2025: start_str cách 3000 nến 1m -> 3 trang
+    scheduler = RequestScheduler(wall_clock=lambda: NOW_MS / 1000)
+    client = ScheduledClient(HistoryClient(), scheduler)
+    client.get_historical_klines('BTCUSDT', '1m', NOW_MS - 3000 * 60000)
+    assert scheduler.weight_spent == 2 * (3 + 1)
+
+
+def test_used_weight_header_comes_from_own_request():
+    """Client dùng chung: header của thread này không bị response của thread khác ghi đè"""
+    other_done, mine_sent = threading.Event(), threading.Event()
+
+    class SharedClient:
+        def get_klines(self, used):
+            record_response(type('Response', (), {'headers': {'X-MBX-USED-WEIGHT-1M': str(used)}})())
+            if used == 10:
+                mine_sent.set()
+                other_done.wait(5)
+            return used
+
+    scheduler = RequestScheduler(weight_limit=6000)
+    client = ScheduledClient(SharedClient(), scheduler)
+    mine = threading.Thread(target=client.get_klines, args=(10,))
+    mine.start()
+    mine_sent.wait(5)
+    client.get_klines(500)
+    assert scheduler.used_weight_header == 500
+    other_done.set()
+    mine.join(5)
+    assert scheduler.used_weight_header == 10
+
+
+def test_orders_and_prices_are_served_before_klines():
+    # Request đầu bị 429: mọi request sau xếp hàng trong lúc dừng, rồi được phục vụ theo ưu tiên
+    fake = FakeClient(fail_at=1, retry_after=0.3)
+    scheduler = RequestScheduler(weight_limit=6000)
+    client = ScheduledClient(fake, scheduler)
+    first = threading.Thread(target=client.get_klines, kwargs={'symbol': 'BTCUSDT'})
+    first.start()
+    while not fake.calls:
+        time.sleep(0.001)
+    calls = ['get_klines'] * 20 + ['get_symbol_ticker'] * 10 + ['create_order'] * 5
+    threads = [threading.Thread(target=getattr(client, name), kwargs={'symbol': 'BTCUSDT'}) for name in calls]
+    for thread in threads:
+        thread.start()
+    for thread in [first] + threads:
+        thread.join(5)
+
+    positions = {name: [i for i, call in enumerate(fake.calls[1:]) if call == name] for name in set(calls)}
+    assert len(fake.calls) == 1 + 1 + len(calls)
+    assert max(positions['create_order']) < min(positions['get_symbol_ticker'])
+    assert max(positions['get_symbol_ticker']) < max(positions['get_klines'])
+    assert scheduler.throttled == 1
+    assert scheduler.used_weight_header == 20 * 2 + 10 * 2 + 5 + 2
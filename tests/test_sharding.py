@@ -0,0 +1,102 @@
+# -*- coding: utf-8 -*-
+from binance_coin.enums.position_state import PositionState
+from binance_coin.services.manager_coin import ManagementCoin
+from binance_coin.services.sharding import ShardCoordinator, ShardWorker
+
+SYMBOLS = [f"SYM{i:03d}USDT" for i in range(24)]
+TTL = 30.0
+
+
+class FakeClock:
+    """Mỗi lần đọc tăng 1ms (export luôn có thứ tự), jump() để heartbeat của worker khác hết hạn"""
+
+    def __init__(self, start: float = 1_000_000.0):
+        self.now = start
+
+    def __call__(self) -> float:
+        self.now += 0.001
+        return self.now
+
+    def jump(self, seconds: float) -> None:
+        self.now += seconds
+
+
+def make_worker(root, worker_id: str, clock: FakeClock) -> ShardWorker:
+    coordinator = ShardCoordinator(str(root), worker_id, heartbeat_ttl=TTL, clock=clock)
+    # ManagementCoin là singleton trong một process; mỗi worker ở đây cần sổ riêng như process riêng
+    book = object.__new__(ManagementCoin)
+    book.__init__(coordinator.state_file())
+    worker = ShardWorker(coordinator, book, handoff_wait=0, poll_interval=0)
+    coordinator.heartbeat()
+    return worker
+
+
+def sync_all(workers) -> dict:
+    """Hai vòng sync (vòng đầu nhả, vòng sau nhận); mỗi lần sync không symbol nào thuộc hai worker"""
+    for _ in range(2):
+        for worker in workers:
+            worker.sync(SYMBOLS)
+            assert_disjoint(workers)
+    return {symbol: worker.worker_id for worker in workers for symbol in worker.owned}
+
+
+def assert_disjoint(workers) -> None:
+    seen = set()
+    for worker in workers:
+        assert not seen & worker.owned
+        seen |= worker.owned
+
+
+def test_handoff_moves_minimal_symbols_and_carries_positions(tmp_path):
+    clock = FakeClock()
+    a, b = make_worker(tmp_path, 'worker-a', clock), make_worker(tmp_path, 'worker-b', clock)
+    owners = sync_all([a, b])
+    assert sorted(owners) == SYMBOLS
+
+    for symbol in a.owned:
+        a.management_coin.get_item_coin(symbol).buy(100.0)
+
+    # Worker mới vào: chỉ các symbol chuyển sang worker-c bị dời, vị thế đi theo
+    c = make_worker(tmp_path, 'worker-c', clock)
+    joined = sync_all([a, b, c])
+    assert sorted(joined) == SYMBOLS
+    moved = [symbol for symbol in SYMBOLS if joined[symbol] != owners[symbol]]
+    assert moved and all(joined[symbol] == 'worker-c' for symbol in moved)
+    for symbol in moved:
+        expected = PositionState.CO_VI_THE if owners[symbol] == 'worker-a' else PositionState.KHONG_VI_THE
+        assert c.management_coin.get_item_coin(symbol).get_position() == expected
+
+    # Worker rời nhóm có chủ đích: chỉ symbol của nó bị dời
+    b.leave()
+    left = sync_all([a, c])
+    assert sorted(left) == SYMBOLS
+    assert all(left[symbol] == joined[symbol] for symbol in SYMBOLS if joined[symbol] != 'worker-b')
+
+
+def test_handoff_after_owner_crash_uses_newest_state(tmp_path):
+    clock = FakeClock()
+    a, b = make_worker(tmp_path, 'worker-a', clock), make_worker(tmp_path, 'worker-b', clock)
+    before = sync_all([a, b])
+    c = make_worker(tmp_path, 'worker-c', clock)
+    sync_all([a, b, c])
+    symbol = sorted(c.owned)[0]
+    released_by = before[symbol]
+
+    # worker-c giao dịch sau khi nhận, worker nhả symbol bỏ bản released cũ khỏi view
+    c.management_coin.get_item_coin(symbol).buy(100.0)
+    c.management_coin.get_item_coin(symbol).sell(120.0)
+    c.publish()
+    sync_all([a, b])
+    views = a.coordinator.read_views()
+    assert symbol not in views[released_by]['positions']
+
+    # worker-c chết (không heartbeat): chủ mới nạp trạng thái cuối của worker-c
+    clock.jump(TTL + 1)
+    # Worker còn sống vẫn heartbeat (thread nền) trong lúc đó
+    a.coordinator.heartbeat()
+    b.coordinator.heartbeat()
+    owners = sync_all([a, b])
+    heir = a if owners[symbol] == 'worker-a' else b
+    item = heir.management_coin.get_item_coin(symbol)
+    assert item.get_position() == PositionState.KHONG_VI_THE
+    assert item.sell_price == 120.0
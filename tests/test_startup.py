@@ -0,0 +1,33 @@
+# -*- coding: utf-8 -*-
+import json
+import os
+import subprocess
+import sys
+import time
+
+from binance_coin.benchmarks.startup import PROJECT_ROOT
+
+# Ngưỡng hồi quy rộng cho máy CI chậm (thường ~0.5s với 20 symbol)
+MAX_FIRST_SIGNAL_SECONDS = 3.0
+
+
+def test_startup_is_lazy_and_reaches_first_signal_quickly(bot_env, tmp_path):
+    """Process mới: import + dựng TradingBot không nạp pandas / binance, tín hiệu đầu tiên trong ngưỡng"""
+    env = dict(os.environ)
+    env.update({
+        'PYTHONPATH': PROJECT_ROOT + os.pathsep + env.get('PYTHONPATH', ''),
+        'LIST_COIN_SYMBOL': '|'.join(f"SYM{i:04d}USDT" for i in range(20)),
+        'BATCH_SIGNALS': 'false',
+        'LOG_LEVEL': 'WARNING',
+    })
+    command = [sys.executable, '-m', 'binance_coin.benchmarks.startup', '--child', '--no-binance',
+               '--spawned-at', repr(time.time())]
+    output = subprocess.run(command, cwd=str(tmp_path), env=env, capture_output=True, text=True, check=True,
+                            timeout=60).stdout
+    result = json.loads(output.strip().splitlines()[-1])
+
+    assert result['eager_imports'] == []
+    assert result['init_imports'] == []
+    assert result['first_signal_s'] < MAX_FIRST_SIGNAL_SECONDS
+    # Tín hiệu đầu tiên chỉ cần tải nến một lần cho mỗi symbol
+    assert result['api_calls'].get('get_historical_klines') == 20
@@ -0,0 +1,78 @@
+# -*- coding: utf-8 -*-
+import os
+import shutil
+from datetime import datetime
+
+import pytest
+
+from binance_coin.enums.position_state import PositionState
+from binance_coin.services.manager_coin import ManagementCoin
+from binance_coin.services.state_journal import StateJournal
+
+T0 = datetime(2025, 1, 6, 12, 0)
+
+
+def snapshot_of(positions: dict):
+    return lambda: {'positions': positions, 'history': []}
+
+
+def test_truncated_last_line_is_dropped(tmp_path):
+    state_file = str(tmp_path / 'state.json')
+    journal = StateJournal(state_file)
+    journal.record('BTCUSDT', 'BUY', 100.0, T0)
+    journal.record('BTCUSDT', 'SELL', 110.0, T0)
+    size = os.path.getsize(journal.journal_path)
+    # Crash giữa lúc ghi dòng thứ ba
+    with open(journal.journal_path, 'a', encoding='utf-8') as f:
+        f.write('{"seq": 3, "symbol": "BTCUSDT", "act')
+
+    _, events = StateJournal(state_file).recover()
+
+    assert [(event['seq'], event['action']) for event in events] == [(1, 'BUY'), (2, 'SELL')]
+    assert os.path.getsize(journal.journal_path) == size
+
+
+def test_crash_during_compaction_keeps_rotated_journal(tmp_path):
+    state_file = str(tmp_path / 'state.json')
+    journal = StateJournal(state_file)
+    journal.record('BTCUSDT', 'BUY', 100.0, T0)
+    journal.record('ETHUSDT', 'BUY', 10.0, T0)
+    journal.close()
+    # Crash sau khi compact() xoay journal sang .old nhưng trước khi snapshot được ghi
+    os.replace(journal.journal_path, journal.rotated_path)
+
+    journal = StateJournal(state_file)
+    _, events = journal.recover()
+    assert [event['seq'] for event in events] == [1, 2]
+    # Giao dịch mới sau khởi động đi vào journal mới, lần nén kế tiếp ghép cả hai
+    journal.record('BTCUSDT', 'SELL', 120.0, T0)
+    assert os.path.isfile(journal.rotated_path)
+    journal.compact(snapshot_of({'BTCUSDT': {}, 'ETHUSDT': {}}), background=False)
+    journal.close()
+
+    assert not os.path.isfile(journal.rotated_path)
+    snapshot, events = StateJournal(state_file).recover()
+    assert events == []
+    assert set(snapshot['positions']) == {'BTCUSDT', 'ETHUSDT'}
+
+
+def test_positions_survive_unclean_stop(tmp_path):
+    state_file = str(tmp_path / 'live' / 'state.json')
+    os.makedirs(os.path.dirname(state_file))
+    coin = ManagementCoin(state_file)
+    coin.get_item_coin('BTCUSDT').buy(100.0, at=T0)
+    coin.get_item_coin('ETHUSDT').buy(10.0, at=T0)
+    coin.get_item_coin('ETHUSDT').sell(12.0, at=T0)
+    coin.get_item_coin('BTCUSDT').set_quantity(0.5, at=T0)
+
+    # Không save_state / close: chụp đĩa như lúc tiến trình bị kill (mỗi giao dịch đã fsync khi record trả về)
+    crashed = str(tmp_path / 'crashed')
+    shutil.copytree(os.path.dirname(state_file), crashed)
+
+    coin = ManagementCoin(os.path.join(crashed, 'state.json'))
+    btc, eth = coin.get_item_coin('BTCUSDT'), coin.get_item_coin('ETHUSDT')
+    assert btc.get_position() == PositionState.CO_VI_THE
+    assert btc.buy_price == 100.0 and btc.quantity == 0.5
+    assert eth.get_position() == PositionState.KHONG_VI_THE
+    assert eth.get_profit_price() == pytest.approx(20.0)
+    coin.close()
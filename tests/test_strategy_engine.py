@@ -0,0 +1,90 @@
+# -*- coding: utf-8 -*-
+import numpy as np
+import pytest
+
+from binance_coin.benchmarks.fake_client import SyntheticClient
+from binance_coin.enums.position_state import PositionState
+from binance_coin.services.strategy_engine import (NO_SIGNAL, SMA, IndicatorGraph, Strategy, StrategyEngine,
+                                                   StrategySignal, book_key, build_strategies, candles_from_klines)
+
+NOW_MS = 1736121600000
+
+
+def candles(symbol: str = 'BTCUSDT'):
+    fake = SyntheticClient([symbol], interval='15m', now_ms=NOW_MS)
+    return candles_from_klines(fake.get_klines(symbol=symbol, interval='15m', limit=200))
+
+
+def test_indicators_are_computed_once_per_candle_across_strategies():
+    engine = StrategyEngine(build_strategies('ma_cross:7:25|ma_cross:5:25|rsi:14:30:70|breakout:20'))
+    data = candles()
+    price = float(data.close[-1])
+
+    engine.evaluate('BTCUSDT', '15m', data, price, {})
+    # Node: SMA 7/25/5, RSI 14, Highest 20, Lowest 20; SMA(25) dùng chung giữa hai ma_cross
+    assert engine.graph.stats() == {'entries': 6, 'hits': 1, 'computed': 6, 'evictions': 0}
+
+    engine.evaluate('BTCUSDT', '15m', data, price, {})
+    assert engine.graph.computed == 6 and engine.graph.hits == 1 + 7
+
+    # Nến cuối đổi giá: tính lại, bản cũ của mỗi node bị bỏ
+    close = data.close.copy()
+    close[-1] *= 1.01
+    engine.evaluate('BTCUSDT', '15m', data._replace(close=close), price, {})
+    assert engine.graph.computed == 12 and len(engine.graph._cache) == 6
+
+
+def test_graph_evicts_least_recently_used_entry():
+    graph, data = IndicatorGraph(max_entries=3), candles()
+    for period in (2, 3, 4):
+        graph.evaluate(SMA(period), 'BTCUSDT', '15m', data)
+    graph.evaluate(SMA(2), 'BTCUSDT', '15m', data)
+    graph.evaluate(SMA(5), 'BTCUSDT', '15m', data)
+
+    assert graph.stats() == {'entries': 3, 'hits': 1, 'computed': 4, 'evictions': 1}
+    # SMA(3) ít dùng nhất bị bỏ, SMA(2) vừa dùng vẫn còn
+    graph.evaluate(SMA(2), 'BTCUSDT', '15m', data)
+    assert graph.hits == 2
+    expected = np.convolve(data.close, np.ones(3) / 3, mode='valid')
+    np.testing.assert_allclose(graph.evaluate(SMA(3), 'BTCUSDT', '15m', data)[2:], expected)
+    assert graph.computed == 5
+
+
+def test_build_strategies_names_duplicates_by_params():
+    strategies = build_strategies('ma_cross:7:25| ma_cross:5:20 |rsi:14:30:70|')
+    assert [strategy.name for strategy in strategies] == ['ma_cross', 'ma_cross_5_20', 'rsi']
+    with pytest.raises(ValueError):
+        build_strategies('ma_cross:7:25|ma_cross:5:20|ma_cross:5:20')
+    with pytest.raises(ValueError):
+        build_strategies('macd:12:26')
+
+
+class ScriptedStrategy(Strategy):
+    """Mua khi chưa có vị thế; flip=True thì bán khi đang có vị thế"""
+
+    def __init__(self, name: str, flip: bool):
+        self.name, self.flip = name, flip
+
+    def evaluate(self, ctx, position):
+        if position != PositionState.CO_VI_THE:
+            return StrategySignal(PositionState.CO_VI_THE, ctx.price, 'scripted buy')
+        if self.flip:
+            return StrategySignal(PositionState.KHONG_VI_THE, ctx.price * 1.1, 'scripted sell')
+        return NO_SIGNAL
+
+
+def test_each_strategy_trades_its_own_book(bot_env):
+    from binance_coin.services.trading_bot import TradingBot
+    bot = TradingBot(client=SyntheticClient(['BTCUSDT', 'ETHUSDT']))
+    bot.strategy_engine = StrategyEngine([ScriptedStrategy('hold', flip=False), ScriptedStrategy('flip', flip=True)])
+
+    bot.process_symbol_strategies('BTCUSDT')
+    bot.process_symbol_strategies('BTCUSDT')
+
+    books = bot.management_coin
+    hold, flip = books.get_item_coin(book_key('BTCUSDT', 'hold')), books.get_item_coin(book_key('BTCUSDT', 'flip'))
+    assert hold.get_position() == PositionState.CO_VI_THE
+    assert flip.get_position() == PositionState.KHONG_VI_THE and flip.sell_price > flip.buy_price
+    # Sổ của chiến lược gốc không bị đụng tới
+    assert books.get_item_coin('BTCUSDT').buy_price is None
+    bot.management_coin.close()
@@ -0,0 +1,100 @@
+# -*- coding: utf-8 -*-
+import asyncio
+import os
+import socket
+import threading
+import time
+
+import pytest
+
+from binance_coin.benchmarks.ws_replay_server import WsReplayServer, load_frames
+from binance_coin.benchmarks.fake_client import SyntheticClient
+
+FRAMES_FILE = os.path.join(os.path.dirname(__file__), 'fixtures', 'stream_frames.jsonl')
+T1 = 1736121600000
+MINUTE = 60000
+
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+
+def wait_until(condition, timeout: float = 10.0) -> bool:
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if condition():
+            return True
+        time.sleep(0.02)
+    return condition()
+
+
+@pytest.fixture
+def replay_server():
+    """WsReplayServer phát fixture, ngắt kết nối sau 3 frame đầu (chạy trên event loop riêng)"""
+    server = WsReplayServer(load_frames(FRAMES_FILE), port=free_port(), drop_after=3)
+    loop = asyncio.new_event_loop()
+    thread = threading.Thread(target=loop.run_forever, name='ws-replay', daemon=True)
+    thread.start()
+    asyncio.run_coroutine_threadsafe(server.start(), loop).result(5)
+    yield server
+    asyncio.run_coroutine_threadsafe(server.stop(), loop).result(5)
+    loop.call_soon_threadsafe(loop.stop)
+    thread.join(5)
+
+
+def test_stream_reconnects_and_backfills_gap(bot_env, monkeypatch, replay_server):
+    monkeypatch.setenv('LIST_COIN_SYMBOL', 'BTCUSDT')
+    monkeypatch.setenv('TIME_INTERVAL', '1m')
+    monkeypatch.setenv('STREAM_MODE', 'true')
+    monkeypatch.setenv('STREAM_URL', replay_server.url)
+    from binance_coin.services.trading_bot import TradingBot
+
+    fake = SyntheticClient(['BTCUSDT'], interval='1m', now_ms=T1 + 30000)
+    bot = TradingBot(client=fake)
+
+    # Trong lúc mất kết nối sàn đã sang nến T1+3m: lần backfill thứ hai phải lấy T1+1m, T1+2m qua REST
+    backfills = []
+    backfill = bot._backfill_klines
+
+    def backfill_after_gap(symbols=None):
+        backfills.append(symbols)
+        if len(backfills) == 2:
+            fake._now_ms = T1 + 3 * MINUTE + 30000
+        backfill(symbols)
+    bot._backfill_klines = backfill_after_gap
+
+    analyzed_on, seen = [], {}
+    process_symbol = bot.process_symbol
+
+    def recording_process_symbol(symbol):
+        analyzed_on.append(threading.current_thread().name)
+        # Cache lúc phân tích (live: chỉ đọc, không gọi REST)
+        seen['candles'] = bot.kline_cache.get_klines(symbol, '1m')
+        process_symbol(symbol)
+    bot.process_symbol = recording_process_symbol
+
+    runner = threading.Thread(target=bot.run, name='bot-loop', daemon=True)
+    runner.start()
+    try:
+        assert wait_until(lambda: len(analyzed_on) == 2), 'nến đóng sau khi kết nối lại chưa được phân tích'
+    finally:
+        bot.stop()
+        runner.join(10)
+    assert not runner.is_alive(), 'stop() phải dừng cả WebSocket stream'
+
+    assert replay_server.connections == 2
+    assert len(backfills) == 2
+    assert fake.calls['get_historical_klines'] == 1
+    assert fake.calls['get_klines'] >= 1
+
+    candles = seen['candles']
+    assert [kline[0] for kline in candles[-4:]] == [T1 + i * MINUTE for i in range(4)]
+    # Backfill hỏi lại REST từ nến cuối trong cache (T1) tới hiện tại, nến đóng sau đó đến từ stream
+    assert candles[-4] == fake._kline('BTCUSDT', T1, MINUTE)
+    assert candles[-3] == fake._kline('BTCUSDT', T1 + MINUTE, MINUTE)
+    assert candles[-2] == fake._kline('BTCUSDT', T1 + 2 * MINUTE, MINUTE)
+    assert candles[-1][4] == '101.30000000'
+    # Phân tích chạy trên thread worker của stream, không chặn event loop
+    assert all(name.startswith('stream-worker') for name in analyzed_on)
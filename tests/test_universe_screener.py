@@ -0,0 +1,57 @@
+# -*- coding: utf-8 -*-
+from binance_coin.services.universe_screener import UniverseScreener
+
+
+def ticker(symbol: str, quote_volume: float = 1e8, volatility: float = 10.0, change: float = 2.0,
+           spread_bps: float = 2.0, last: float = 100.0) -> dict:
+    half_spread = last * spread_bps / 20000
+    return {'symbol': symbol, 'lastPrice': str(last), 'bidPrice': str(last - half_spread),
+            'askPrice': str(last + half_spread), 'highPrice': str(last * (1 + volatility / 200)),
+            'lowPrice': str(last * (1 - volatility / 200)), 'quoteVolume': str(quote_volume),
+            'priceChangePercent': str(change)}
+
+
+def test_filters_exclude_only_stablecoins_and_leveraged_tokens():
+    screener = UniverseScreener(max_symbols=10)
+    tickers = [ticker(symbol) for symbol in ('JUPUSDT', 'SYRUPUSDT', 'SETUPUSDT', 'BTCUPUSDT', 'ETHDOWNUSDT',
+                                             'BULLUSDT', 'USDCUSDT', 'FDUSDUSDT', 'ETHBTC')]
+    tickers += [ticker('LOWVOLUSDT', quote_volume=1e5), ticker('WIDEUSDT', spread_bps=50),
+                ticker('FLATUSDT', volatility=0.2), ticker('WILDUSDT', volatility=80)]
+
+    result = screener.screen(tickers)
+
+    assert result.universe == 7
+    assert sorted(result.symbols) == ['JUPUSDT', 'SETUPUSDT', 'SYRUPUSDT']
+
+
+def test_quote_asset_is_configurable():
+    screener = UniverseScreener(quote_asset='FDUSD', max_symbols=10)
+    result = screener.screen([ticker('BTCFDUSD'), ticker('USDTFDUSD'), ticker('BTCUSDT')])
+    assert result.symbols == ['BTCFDUSD']
+
+
+def test_ranking_hysteresis_and_pinned():
+    screener = UniverseScreener(max_symbols=2, keep_factor=1.5)
+    first = screener.screen([ticker('AAAUSDT', quote_volume=1e9, volatility=20, change=5),
+                             ticker('BBBUSDT', quote_volume=5e8, volatility=15, change=4),
+                             ticker('CCCUSDT', quote_volume=1e8, volatility=10, change=3)])
+    assert first.symbols == ['AAAUSDT', 'BBBUSDT']
+    assert first.metrics['AAAUSDT']['score'] > first.metrics['BBBUSDT']['score']
+
+    # BBB tụt xuống hạng 3 (vẫn trong top 2 * 1.5) -> được giữ, DDD hạng 2 chưa vào
+    second = screener.screen([ticker('AAAUSDT', quote_volume=1e9, volatility=20, change=5),
+                              ticker('BBBUSDT', quote_volume=1e8, volatility=10, change=3),
+                              ticker('DDDUSDT', quote_volume=5e8, volatility=15, change=4),
+                              ticker('CCCUSDT', quote_volume=5e7, volatility=9, change=2)],
+                             pinned=['XYZUSDT'])
+    assert second.symbols == ['AAAUSDT', 'BBBUSDT', 'XYZUSDT']
+    assert second.added == ['XYZUSDT'] and second.removed == []
+
+    # Ngoài top keep_factor -> bị thay
+    third = screener.screen([ticker('AAAUSDT', quote_volume=1e9, volatility=20, change=5),
+                             ticker('DDDUSDT', quote_volume=5e8, volatility=15, change=4),
+                             ticker('EEEUSDT', quote_volume=4e8, volatility=14, change=4),
+                             ticker('FFFUSDT', quote_volume=3e8, volatility=13, change=4),
+                             ticker('BBBUSDT', quote_volume=1e7, volatility=2, change=1)])
+    assert third.symbols == ['AAAUSDT', 'DDDUSDT']
+    assert third.removed == ['BBBUSDT', 'XYZUSDT']